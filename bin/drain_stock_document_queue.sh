@@ -0,0 +1,9 @@
+#!/bin/bash
+source ~/env/bin/activate
+cd ~/project
+
+# Needed only when STOCK_DOCUMENT_INDEXER_ENABLED is on, indexes the queued stock documents
+# Usage:
+# */1 * * * * ~/project/bin/drain_stock_document_queue.sh live > ~/logs/cron.log 2>&1
+
+python projectile/manage.py drain_stock_document_queue --settings=projectile.settings_$1
@@ -0,0 +1,9 @@
+#!/bin/bash
+source ~/env/bin/activate
+cd ~/project
+
+# Rolls up the recent delivery dates into the daily sales cube
+# Usage:
+# 30 0 * * * ~/project/bin/stats_refresh_sales_cube.sh live > ~/logs/cron.log 2>&1
+
+python projectile/manage.py stats_refresh_sales_cube --recent --settings=projectile.settings_$1
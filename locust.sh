@@ -4,3 +4,5 @@
 locust -f locust/ecommerce_invoice_groups.py --host $1
 # locust -f locust/notifications.py --host $1
 # locust -f locust/lighthouse.py --host $1
+# Regression benchmark against seeded stand-in services, see locust/benchmark.py
+# python locust/benchmark.py --boot
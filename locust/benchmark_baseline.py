@@ -0,0 +1,63 @@
+"""Per endpoint results of a benchmark run and their comparison to a baseline"""
+import csv
+
+# Latency percentiles kept per endpoint, as named in the locust stats csv
+PERCENTILES = {
+    "p50": "50%",
+    "p95": "95%",
+    "p99": "99%",
+}
+
+
+def read_locust_stats(stats_csv_path):
+    """
+    Results per endpoint of the `<prefix>_stats.csv` written by `locust --csv`
+
+    Returns:
+        dict: endpoint name to its request count, failures, rps and percentiles in ms
+    """
+    results = {}
+    with open(stats_csv_path, newline="") as stats_file:
+        for row in csv.DictReader(stats_file):
+            if row["Name"] == "Aggregated":
+                continue
+            results[row["Name"]] = {
+                "requests": int(row["Request Count"]),
+                "failures": int(row["Failure Count"]),
+                "rps": float(row["Requests/s"]),
+                **{
+                    name: float(row[column]) if row[column] not in ("", "N/A") else 0.0
+                    for name, column in PERCENTILES.items()
+                },
+            }
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Regressions of a run, a percentile slower or a rps lower than the baseline by more
+    than `threshold` (a fraction), or more failures on an endpoint than in the baseline
+
+    Returns:
+        list: description of every regression
+    """
+    regressions = []
+    for endpoint, expected in sorted(baseline.items()):
+        actual = results.get(endpoint)
+        if actual is None:
+            regressions.append(f"{endpoint}: not requested")
+            continue
+        for name in PERCENTILES:
+            if expected[name] and actual[name] > expected[name] * (1 + threshold):
+                regressions.append(
+                    f"{endpoint}: {name} {actual[name]:.0f} ms, baseline {expected[name]:.0f} ms"
+                )
+        if expected["rps"] and actual["rps"] < expected["rps"] * (1 - threshold):
+            regressions.append(
+                f"{endpoint}: {actual['rps']:.1f} rps, baseline {expected['rps']:.1f} rps"
+            )
+        if actual["failures"] > expected["failures"]:
+            regressions.append(
+                f"{endpoint}: {actual['failures']} failures, baseline {expected['failures']}"
+            )
+    return regressions
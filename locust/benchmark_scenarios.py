@@ -0,0 +1,142 @@
+"""Weighted scenarios of the regression benchmark, see benchmark.py
+
+The users log in with the accounts of the dataset created by the
+`seed_benchmark_dataset` management command, its file is read from
+`BENCHMARK_DATASET`.
+"""
+import itertools
+import json
+import os
+import random
+import string
+
+from locust import HttpUser, between, task
+
+with open(os.environ.get("BENCHMARK_DATASET", "benchmark_dataset.json")) as dataset_file:
+    DATASET = json.load(dataset_file)
+
+_user_numbers = itertools.count()
+
+
+def get_related_id(value):
+    return value.get("id") if isinstance(value, dict) else value
+
+
+def build_checkout_payload(cart, account):
+    """
+    Order of the cart, in the shape the order create endpoint takes
+
+    `cart` is the cart group returned by the cart endpoint, every order of the group
+    (one per distributor) is placed with its lines as they are in the cart.
+    """
+    order_groups = []
+    for cart_order in cart.get("order_groups", []):
+        stock_io_logs = [
+            {
+                "stock": get_related_id(item.get("stock")),
+                "quantity": item.get("quantity"),
+                "rate": item.get("rate"),
+                "batch": item.get("batch") or "N/A",
+                "primary_unit": get_related_id(item.get("primary_unit")),
+                "secondary_unit": get_related_id(item.get("secondary_unit")),
+                "discount_rate": item.get("discount_rate", 0),
+                "discount_total": item.get("discount_total", 0),
+                "round_discount": item.get("round_discount", 0),
+            }
+            for item in cart_order.get("stock_io_logs", [])
+        ]
+        if not stock_io_logs:
+            continue
+        order_groups.append({
+            "distributor": get_related_id(cart_order.get("distributor")),
+            "receiver": account["person_id"],
+            "person_organization_receiver": account["person_organization_id"],
+            "is_queueing_order": cart_order.get("is_queueing_order", False),
+            "stock_io_logs": stock_io_logs,
+        })
+    return {"order_groups": order_groups}
+
+
+class BenchmarkUser(HttpUser):
+    abstract = True
+    wait_time = between(0.1, 0.5)
+    accounts_key = None
+
+    def on_start(self):
+        accounts = DATASET[self.accounts_key]
+        self.account = accounts[next(_user_numbers) % len(accounts)]
+        response = self.client.post(
+            "/api/v1/token/",
+            json=dict(id=self.account["phone"], password=DATASET["password"]),
+            name="token",
+        )
+        response.raise_for_status()
+        self.headers = dict(Authorization=f"Bearer {response.json().get('access')}")
+
+
+class PharmacyUser(BenchmarkUser):
+    weight = 4
+    accounts_key = "pharmacy_users"
+
+    @task(5)
+    def search(self):
+        keyword = "".join(random.choice(string.ascii_lowercase) for _ in range(random.randint(2, 4)))
+        self.client.get(
+            f"/api/v1/search/pharmacy/stock/products/e-com/?keyword={keyword}",
+            name="search",
+            headers=self.headers,
+        )
+
+    @task(3)
+    def add_to_cart(self):
+        self.client.post(
+            "/api/v1/pharmacy/distributor/order/cart/",
+            json={
+                "stock_io_logs": [
+                    {"stock": stock_id, "quantity": random.randint(1, 5), "batch": "N/A"}
+                    for stock_id in random.sample(DATASET["stock_ids"], 3)
+                ]
+            },
+            name="add-to-cart",
+            headers=self.headers,
+        )
+
+    @task(1)
+    def checkout(self):
+        cart = self.client.get(
+            "/api/v1/pharmacy/distributor/order/cart/",
+            name="cart",
+            headers=self.headers,
+        )
+        if cart.status_code != 200:
+            return
+        payload = build_checkout_payload(cart.json() or {}, self.account)
+        if not payload["order_groups"]:
+            return
+        self.client.post(
+            "/api/v1/pharmacy/distributor/order/",
+            json=payload,
+            name="checkout",
+            headers=self.headers,
+        )
+
+
+class DistributorUser(BenchmarkUser):
+    weight = 1
+    accounts_key = "distributor_users"
+
+    @task(2)
+    def invoice_group_list(self):
+        self.client.get(
+            "/api/v1/ecommerce/invoice-groups/",
+            name="invoice-group-list",
+            headers=self.headers,
+        )
+
+    @task(1)
+    def delivery_sheet(self):
+        self.client.get(
+            "/api/v1/ecommerce/invoice-group/delivery-sheets/",
+            name="delivery-sheet",
+            headers=self.headers,
+        )
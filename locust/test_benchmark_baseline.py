@@ -0,0 +1,61 @@
+"""Tests of the baseline comparison, run from this directory like benchmark.py
+
+    python -m unittest test_benchmark_baseline
+"""
+import unittest
+
+from benchmark_baseline import compare_to_baseline
+
+
+def endpoint_results(p50=100.0, p95=200.0, p99=300.0, rps=50.0, failures=0):
+    return {
+        "requests": 1000,
+        "failures": failures,
+        "rps": rps,
+        "p50": p50,
+        "p95": p95,
+        "p99": p99,
+    }
+
+
+class CompareToBaselineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.baseline = {"/api/v1/pharmacy/stocks/": endpoint_results()}
+
+    def test_within_threshold(self):
+        results = {
+            "/api/v1/pharmacy/stocks/": endpoint_results(p50=109.0, p99=329.0, rps=45.5),
+        }
+        self.assertEqual(compare_to_baseline(results, self.baseline, 0.1), [])
+
+    def test_beyond_threshold(self):
+        results = {
+            "/api/v1/pharmacy/stocks/": endpoint_results(p95=221.0, rps=44.0, failures=2),
+        }
+        self.assertEqual(
+            compare_to_baseline(results, self.baseline, 0.1),
+            [
+                "/api/v1/pharmacy/stocks/: p95 221 ms, baseline 200 ms",
+                "/api/v1/pharmacy/stocks/: 44.0 rps, baseline 50.0 rps",
+                "/api/v1/pharmacy/stocks/: 2 failures, baseline 0",
+            ]
+        )
+
+    def test_endpoint_not_requested(self):
+        self.assertEqual(
+            compare_to_baseline({}, self.baseline, 0.1),
+            ["/api/v1/pharmacy/stocks/: not requested"]
+        )
+
+    def test_no_baseline(self):
+        results = {"/api/v1/pharmacy/stocks/": endpoint_results(p99=9000.0)}
+        # Endpoints without a baseline (e.g. new ones) are not compared
+        self.assertEqual(compare_to_baseline(results, {}, 0.1), [])
+        # Neither are the values the baseline has no measure of
+        baseline = {"/api/v1/pharmacy/stocks/": endpoint_results(p99=0.0, rps=0.0)}
+        self.assertEqual(compare_to_baseline(results, baseline, 0.1), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
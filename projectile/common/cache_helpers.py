@@ -1,9 +1,16 @@
 import logging
+import time
 from datetime import timedelta
 
 from django.core.cache import cache
 from common.cache_keys import (
+    CACHE_NAMESPACE_GENERATION_KEY_PREFIX,
+    CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX,
+    CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX,
+    PERMISSION_CACHE_NAMESPACE_PREFIX,
+    PERMISSION_GROUPS_CACHE_KEY_PREFIX,
     QS_COUNT_CACHE_KEY_PREFIX,
+    SERIAL_CACHE_NAMESPACE_PREFIX,
     ORG_CUMULATIVE_DISCOUNT_FACTOR_VALUE_CACHE_KEY,
     ORGANIZATION_AND_AREA_DISCOUNT_CACHE_KEY,
     ORGANIZATION_HAS_ORDER_ON_DELIVERY_DATE,
@@ -14,13 +21,104 @@ from common.cache_keys import (
 logger = logging.getLogger(__name__)
 
 
+def get_cache_namespace_generation_key(namespace):
+    return f"{CACHE_NAMESPACE_GENERATION_KEY_PREFIX}{namespace}"
+
+
+def get_cache_namespace_generation(namespace):
+    """
+    Return the current generation number of a cache key namespace, every key of the
+    namespace contains it so bumping it invalidates the whole namespace.
+
+    Args:
+    - namespace (str): name of the namespace, e.g. `query-count-Purchase`
+
+    Returns:
+    - int: generation number of the namespace
+    """
+    generation_key = get_cache_namespace_generation_key(namespace)
+    generation = cache.get(generation_key)
+    if generation is None:
+        # Start from the current time so a lost generation key never brings back stale keys
+        cache.add(generation_key, int(time.time() * 1000), timeout=None)
+        generation = cache.get(generation_key)
+    return generation
+
+
+def get_namespaced_cache_key(namespace, key):
+    """
+    Build a cache key belongs to the current generation of the given namespace.
+
+    Args:
+    - namespace (str): name of the namespace
+    - key (str): the key inside the namespace
+
+    Returns:
+    - str: cache key formatted as "{namespace}:{generation}:{key}"
+    """
+    return f"{namespace}:{get_cache_namespace_generation(namespace)}:{key}"
+
+
+def expire_cache_namespace(namespace):
+    """
+    Invalidate every key of a namespace by bumping its generation number, this is O(1)
+    and never scans the keyspace (no KEYS / SCAN). Keys of older generations are left to expire
+    by their own timeout.
+
+    Args:
+    - namespace (str): name of the namespace
+    """
+    generation_key = get_cache_namespace_generation_key(namespace)
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        cache.set(generation_key, int(time.time() * 1000), timeout=None)
+
+
+def get_qs_count_cache_namespace(model_name):
+    return f"{QS_COUNT_CACHE_KEY_PREFIX}{model_name}"
+
+
 def delete_qs_count_cache(model):
     """
     Expiring the cache of query set counts for invoice group related view
     """
-    model_name = model.__name__
-    cache_key_prefix = f"{QS_COUNT_CACHE_KEY_PREFIX}{model_name}*"
-    cache.delete_many(keys=cache.keys(cache_key_prefix))
+    expire_cache_namespace(get_qs_count_cache_namespace(model.__name__))
+
+
+def get_customer_non_group_order_amount_cache_key(organization_id, delivery_date):
+    return get_namespaced_cache_key(
+        f"{CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX}_{organization_id}",
+        delivery_date
+    )
+
+
+def get_customer_delivery_coupon_availability_cache_key(organization_id, delivery_date):
+    return get_namespaced_cache_key(
+        f"{CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX}_{organization_id}",
+        delivery_date
+    )
+
+
+def expire_customer_non_group_order_cache(organization_id):
+    """
+    Expiring the cached non group order amount and delivery coupon availability
+    of an organization for all delivery dates
+    """
+    expire_cache_namespace(f"{CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX}_{organization_id}")
+    expire_cache_namespace(f"{CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX}_{organization_id}")
+
+
+def get_serial_cache_namespace(organization_id):
+    return f"{SERIAL_CACHE_NAMESPACE_PREFIX}{organization_id}"
+
+
+def get_permission_cache_namespace(person_id):
+    return f"{PERMISSION_CACHE_NAMESPACE_PREFIX}{str(person_id).zfill(7)}"
+
+
+def get_permission_groups_cache_key(person_id, organization_id):
+    return f"{PERMISSION_GROUPS_CACHE_KEY_PREFIX}{str(person_id).zfill(7)}_{str(organization_id or 0).zfill(7)}"
 
 
 def get_or_clear_cumulative_discount_factor(
@@ -137,4 +235,38 @@ def clear_notification_count_data_cache(user_id):
 
     cache.delete(key=notification_count_cache_key)
     # Log the action of clearing cached notification count data for the user
-    logger.info(f"Deleted cached notification count data for user id: {user_id}")
\ No newline at end of file
+    logger.info(f"Deleted cached notification count data for user id: {user_id}")
+
+class RedisCommandCounter:
+    """
+    Count the redis commands issued inside the context, used by the benchmark commands
+
+    Usage:
+        with RedisCommandCounter() as counter:
+            ...
+        counter.count, counter.commands
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.commands = {}
+
+    def __enter__(self):
+        from redis import Redis
+
+        self._execute_command = Redis.execute_command
+        counter = self
+
+        def execute_command(client, *args, **options):
+            counter.count += 1
+            command_name = str(args[0]) if args else ""
+            counter.commands[command_name] = counter.commands.get(command_name, 0) + 1
+            return counter._execute_command(client, *args, **options)
+
+        Redis.execute_command = execute_command
+        return self
+
+    def __exit__(self, *args):
+        from redis import Redis
+
+        Redis.execute_command = self._execute_command
@@ -0,0 +1,182 @@
+"""Coalesced cache invalidation
+
+`Product.expire_cache`, `Stock.expire_cache` and `Purchase.expire_cache` used to enqueue a
+`cache_expire_list` task on every save. The keys are now collected in a per thread buffer
+and expired once the transaction commits (`transaction.on_commit`), deduplicated and in as
+few `cache_expire_list` tasks as `CACHE_INVALIDATION_TASK_MAX_KEYS` allows. Outside of a
+transaction the keys are expired right away, bulk paths running in autocommit collect
+them with `batch_cache_invalidation`:
+
+    with batch_cache_invalidation():
+        for product in products:
+            product.save()
+
+Keys which need a query to be found (the stocks of a product) are deferred with a
+resolver, which is run once for all the collected values when the buffer is flushed.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from common.tasks import cache_expire_list
+
+logger = logging.getLogger(__name__)
+
+
+class CacheInvalidationStats:
+    """Invalidation requests of the process against the keys and tasks actually expired"""
+
+    def __init__(self):
+        self.requests = 0
+        self.keys_requested = 0
+        self.keys_expired = 0
+        self.flushes = 0
+        self.tasks = 0
+
+    @property
+    def tasks_saved(self):
+        # Every request used to be a task of its own
+        return max(self.requests - self.tasks, 0)
+
+    @property
+    def keys_saved(self):
+        return max(self.keys_requested - self.keys_expired, 0)
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'keys_requested': self.keys_requested,
+            'keys_expired': self.keys_expired,
+            'keys_saved': self.keys_saved,
+            'flushes': self.flushes,
+            'tasks': self.tasks,
+            'tasks_saved': self.tasks_saved,
+        }
+
+
+stats = CacheInvalidationStats()
+
+
+class CacheInvalidationBuffer:
+
+    def __init__(self):
+        self.keys = set()
+        self.deferred = {}
+        self.batch_depth = 0
+        # Invalidations collected since the last flush
+        self.requests = 0
+        # `run_on_commit` list of the connection the flush is registered in, django
+        # replaces the list when the transaction (or its savepoint) is rolled back
+        self.registered_in = None
+
+    def add(self, keys=(), resolver=None, values=()):
+        keys = list(keys)
+        values = list(values)
+        self.requests += 1
+        stats.requests += 1
+        # A deferred value counts as a key, its keys are only known once resolved
+        stats.keys_requested += len(keys) + len(values)
+        self.keys.update(keys)
+        if resolver is not None and values:
+            self.deferred.setdefault(resolver, set()).update(values)
+        if not self.batch_depth:
+            self.schedule()
+
+    def schedule(self):
+        if not connection.in_atomic_block:
+            self.flush()
+        elif self.registered_in is not connection.run_on_commit:
+            transaction.on_commit(self.flush)
+            self.registered_in = connection.run_on_commit
+
+    def pop_keys(self):
+        keys, deferred = self.keys, self.deferred
+        self.keys, self.deferred = set(), {}
+        self.registered_in = None
+        for resolver, values in deferred.items():
+            keys.update(resolver(values))
+        return sorted(keys)
+
+    def flush(self):
+        requests, self.requests = self.requests, 0
+        keys = self.pop_keys()
+        if not keys:
+            return
+        max_keys = settings.CACHE_INVALIDATION_TASK_MAX_KEYS
+        tasks = 0
+        for index in range(0, len(keys), max_keys):
+            cache_expire_list.apply_async(
+                (keys[index:index + max_keys], ),
+                countdown=5,
+                retry=True, retry_policy={
+                    'max_retries': 10,
+                    'interval_start': 0,
+                    'interval_step': 0.2,
+                    'interval_max': 0.2,
+                }
+            )
+            tasks += 1
+        stats.tasks += tasks
+        stats.flushes += 1
+        stats.keys_expired += len(keys)
+        if requests > 1:
+            logger.info(
+                f"Expired {len(keys)} cache keys of {requests} invalidations with {tasks} tasks, "
+                f"{requests - tasks} tasks saved ({stats.tasks_saved} by this process)"
+            )
+
+
+_local = threading.local()
+
+
+def get_buffer():
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = CacheInvalidationBuffer()
+    return buffer
+
+
+def expire_cache_keys(keys):
+    """
+    Expire cache keys once the current transaction commits
+
+    Args:
+        keys (list): cache keys
+    """
+    get_buffer().add(keys)
+
+
+def expire_cache_keys_deferred(resolver, values):
+    """
+    Expire the cache keys of values once the current transaction commits, the keys are
+    found with one call of the resolver for all the values collected until then
+
+    Args:
+        resolver (callable): takes a set of values, returns their cache keys
+        values (list): e.g. the ids of the changed instances
+    """
+    get_buffer().add(resolver=resolver, values=values)
+
+
+@contextmanager
+def batch_cache_invalidation():
+    """Collect the invalidations of a bulk path and expire them together at the end"""
+    buffer = get_buffer()
+    buffer.batch_depth += 1
+    try:
+        yield buffer
+    finally:
+        buffer.batch_depth -= 1
+        if not buffer.batch_depth:
+            buffer.schedule()
+
+
+def get_cache_invalidation_stats():
+    return stats.as_dict()
+
+
+def reset_cache_invalidation_stats():
+    stats.__init__()
@@ -16,6 +16,8 @@ TOP_MANUFACTURING_COMPANY_PK_LIST_CACHE_KEY = "top_manufacturing_company_pk_list
 TOP_SOLD_STOCKS_PK_LIST_CACHE_KEY = "top_sold_stocks_pk_list"
 DELIVERY_AREA_HUB_ID_CACHE_KEY = "delivery_areas_hub_id"
 STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX = "stock_instance_distributor"
+# Product / stock display fields of a stock, see `pharmacy.catalog`
+STOCK_CATALOG_CACHE_KEY_PREFIX = "stock_catalog_"
 DELIVERY_COUPON_STOCK_CACHE_KEY_PREFIX = "delivery_coupon_stock"
 CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX = "customer_org_non_group_order_grand_total"
 CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX = "customer_org_delivery_coupon_availability"
@@ -30,3 +32,18 @@ NOTIFICATION_COUNT_USER_CACHE_KEY_PREFIX = "notification_count_user_"
 DUPLICATE_ORDER_REQUEST_CACHE_KEY_PREFIX = "duplicate_order_request_"
 USER_HAS_CART_ITEM_CACHE_KEY_PREFIX = "user_has_cart_item_"
 DUPLICATE_USER_CREATION_CACHE_KEY_PREFIX = "duplicate_user_create_"
+# Generation number of a cache key namespace, see `common.cache_helpers.get_namespaced_cache_key`
+CACHE_NAMESPACE_GENERATION_KEY_PREFIX = "cache_namespace_generation_"
+SERIAL_CACHE_NAMESPACE_PREFIX = "serial_"
+PERMISSION_CACHE_NAMESPACE_PREFIX = "permission_"
+# Permission group names of a person in an organization, see `core.models.Person.get_permission_group_names`
+PERMISSION_GROUPS_CACHE_KEY_PREFIX = "permission_groups_"
+LOCAL_CACHE_NAMESPACE_PREFIX = "local_cache_"
+# Generation of the serialized fragments of a model, see `common.fragment_cache`
+FRAGMENT_CACHE_NAMESPACE_PREFIX = "fragment_cache_"
+# Stock ids waiting for an es document update, see `search.stock_indexer`
+STOCK_DOCUMENT_INDEX_QUEUE_CACHE_KEY = "stock_document_index_queue"
+STOCK_DOCUMENT_INDEXER_STATS_CACHE_KEY = "stock_document_indexer_stats"
+DROPPED_PHARMACIES_CACHE_KEY_PREFIX = "dropped_pharmacies_"
+SQL_PROFILER_VIEWS_CACHE_KEY = "sql_profiler_views"
+SQL_PROFILER_VIEW_CACHE_KEY_PREFIX = "sql_profiler_view_"
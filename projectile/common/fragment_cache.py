@@ -0,0 +1,209 @@
+"""Write-through cache of the serialized items of the list views
+
+`ListAPICustomView.get_from_cache` serves a page from one cached dict per object (a fragment)
+keyed `{base_key}_{pk:012}`. The fragments missing from the cache are serialized and written
+back in the same request with one pipelined SET per page, so the next request of the page is
+a hit and the payload never goes through the celery broker.
+
+Fragments are stored as orjson (smaller and faster to decode than pickle) along with the
+generation of their model (see `common.cache_helpers`), a fragment of an older generation is
+a miss. `expire_model_fragments` drops every fragment of a model in O(1), the keys are
+unchanged so `expire_cache` of the models still deletes the fragments of an object.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.utils.encoders import JSONEncoder
+
+from common.cache_helpers import expire_cache_namespace, get_cache_namespace_generation
+from common.cache_keys import CACHE_NAMESPACE_GENERATION_KEY_PREFIX, FRAGMENT_CACHE_NAMESPACE_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Values orjson can't serialize (e.g. Decimal) are rendered like the api renders them
+_json_encoder = JSONEncoder()
+
+
+class FragmentCacheStats:
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.bytes_saved = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+            "stale": self.stale,
+            "writes": self.writes,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            # Json payload the `bulk_cache_write` task used to send (publish and deliver) through the broker
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+_stats = defaultdict(FragmentCacheStats)
+_stats_lock = threading.Lock()
+
+
+def get_fragment_key(base_key, pk):
+    return f"{base_key}_{str(pk).zfill(12)}"
+
+
+def get_fragment_namespace(model):
+    return f"{FRAGMENT_CACHE_NAMESPACE_PREFIX}{model._meta.label_lower}"
+
+
+def expire_model_fragments(model):
+    """Invalidate the cached fragments of every object of the model"""
+    expire_cache_namespace(get_fragment_namespace(model))
+
+
+def encode_fragment(generation, data):
+    return orjson.dumps([generation, data], default=_json_encoder.default)
+
+
+def decode_fragment(value, generation):
+    """
+    Return the data of a fragment, None if it is of another generation or can't be decoded
+    (e.g. a value pickled before the fragment cache)
+    """
+    try:
+        fragment_generation, data = orjson.loads(value)
+    except (orjson.JSONDecodeError, TypeError, ValueError):
+        return None
+    if fragment_generation != generation:
+        return None
+    return data
+
+
+def read_fragments(namespace, keys):
+    """
+    Read the generation of the namespace and the fragments in one round trip
+
+    Returns:
+        tuple: generation, list of raw fragments (None if missing) in the order of `keys`
+    """
+    client = get_redis_connection("default")
+    generation_key = cache.make_key(f"{CACHE_NAMESPACE_GENERATION_KEY_PREFIX}{namespace}")
+    values = client.mget([generation_key] + [cache.make_key(key) for key in keys])
+    try:
+        # django redis stores integers as plain digits
+        generation = int(values[0])
+    except (TypeError, ValueError):
+        generation = get_cache_namespace_generation(namespace)
+    return generation, values[1:]
+
+
+def write_fragments(fragments, timeout=None):
+    """
+    Write the encoded fragments with a single pipelined round trip
+
+    Args:
+        fragments (dict): key to the encoded fragment
+        timeout (int, optional): lifetime of the fragments, `FRAGMENT_CACHE_TIMEOUT` by default
+    """
+    if timeout is None:
+        timeout = settings.FRAGMENT_CACHE_TIMEOUT
+    pipeline = get_redis_connection("default").pipeline(transaction=False)
+    for key, value in fragments.items():
+        pipeline.set(cache.make_key(key), value, ex=timeout)
+    pipeline.execute()
+
+
+def get_or_build_fragments(model, base_key, pks, build_missing):
+    """
+    Return the serialized objects of a page from the cache, serialize and cache the missing ones
+
+    Args:
+        model (Model): model of the objects, its generation invalidates all of its fragments
+        base_key (str): key prefix of the serializer
+        pks (list): primary keys of the page, in order
+        build_missing (callable): takes a list of missing pks and returns a dict of pk to serialized data
+
+    Returns:
+        list: serialized objects in the order of `pks`, pks which could not be built
+        (e.g. deleted meanwhile) are left out
+    """
+    stats = _stats[base_key]
+    namespace = get_fragment_namespace(model)
+    keys = [get_fragment_key(base_key, pk) for pk in pks]
+    fragments = {}
+    try:
+        generation, values = read_fragments(namespace, keys)
+    except RedisError as exception:
+        logger.error(f"Failed to read fragments of {base_key}: {exception}")
+        generation, values = None, [None] * len(keys)
+
+    stale = 0
+    bytes_read = 0
+    for key, value in zip(keys, values):
+        if value is None:
+            continue
+        data = decode_fragment(value, generation)
+        if data is None:
+            stale += 1
+            continue
+        fragments[key] = data
+        bytes_read += len(value)
+
+    missing_pks = [pk for pk, key in zip(pks, keys) if key not in fragments]
+    with _stats_lock:
+        stats.hits += len(fragments)
+        stats.misses += len(missing_pks)
+        stats.stale += stale
+        stats.bytes_read += bytes_read
+
+    if missing_pks:
+        built = {
+            get_fragment_key(base_key, pk): data
+            for pk, data in build_missing(missing_pks).items()
+        }
+        fragments.update(built)
+        if built and generation is not None:
+            encoded = {}
+            for key, data in built.items():
+                try:
+                    encoded[key] = encode_fragment(generation, data)
+                except orjson.JSONEncodeError as exception:
+                    # Still served, only left out of the cache
+                    logger.error(f"Failed to encode fragment {key}: {exception}")
+            if encoded:
+                try:
+                    write_fragments(encoded)
+                except RedisError as exception:
+                    logger.error(f"Failed to write fragments of {base_key}: {exception}")
+                else:
+                    bytes_written = sum(len(value) for value in encoded.values())
+                    with _stats_lock:
+                        stats.writes += len(encoded)
+                        stats.bytes_written += bytes_written
+                        stats.bytes_saved += 2 * bytes_written
+
+    return [fragments[key] for key in keys if key in fragments]
+
+
+def get_fragment_cache_stats():
+    """Hit / miss counters and bytes of the fragment caches of the current process, by base key"""
+    return {
+        base_key: stats.as_dict()
+        for base_key, stats in _stats.items()
+    }
+
+
+def reset_fragment_cache_stats():
+    _stats.clear()
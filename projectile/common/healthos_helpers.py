@@ -18,8 +18,6 @@ from common.cache_keys import (
     TOP_SOLD_STOCKS_PK_LIST_CACHE_KEY,
     DELIVERY_AREA_HUB_ID_CACHE_KEY,
     DELIVERY_COUPON_STOCK_CACHE_KEY_PREFIX,
-    CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX,
-    CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX,
     ORG_CUMULATIVE_DISCOUNT_FACTOR_VALUE_CACHE_KEY,
     ORG_INSTANCE_CACHE_KEY_PREFIX,
     PRODUCT_GENERIC_NULL_NAME_ID_CACHE_KEY,
@@ -28,7 +26,10 @@ from common.cache_keys import (
 )
 from common.enums import Status
 from common.utils import Round
+from common.local_cache import healthos_singleton_local_cache
 from common.cache_helpers import (
+    get_customer_delivery_coupon_availability_cache_key,
+    get_customer_non_group_order_amount_cache_key,
     get_or_clear_cumulative_discount_factor,
     set_or_clear_delivery_date_cache,
 )
@@ -277,7 +278,10 @@ class HealthOSHelper:
         return int(stock_id_from_env) if stock_id_from_env is not None else None
 
     def get_delivery_coupon_stock_data_from_cache(self):
-        cached_data = cache.get(DELIVERY_COUPON_STOCK_CACHE_KEY_PREFIX)
+        cached_data = healthos_singleton_local_cache.get_or_set(
+            DELIVERY_COUPON_STOCK_CACHE_KEY_PREFIX,
+            lambda: cache.get(DELIVERY_COUPON_STOCK_CACHE_KEY_PREFIX)
+        )
         if cached_data is not None:
             return cached_data
         delivery_coupon_stock_id = os.getenv("EXPRESS_DELIVERY_STOCK_ID", None)
@@ -334,6 +338,7 @@ class CustomerHelper:
     """
     def __init__(self, organization_id):
         self.organization_id = organization_id
+        self._organization_data = None
 
     def get_non_group_total_amount_for_regular_and_pre_order(self):
         """Calculate total order amount(grand total) for a specific delivery date the orders
@@ -375,7 +380,7 @@ class CustomerHelper:
         """
         if not delivery_date:
             delivery_date = get_delivery_date_for_product(is_queueing_item=is_pre_order)
-        cache_key = f"{CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX}_{self.organization_id}_{delivery_date}"
+        cache_key = get_customer_non_group_order_amount_cache_key(self.organization_id, delivery_date)
         cached_data = cache.get(cache_key)
         if cached_data is not None:
             return cached_data
@@ -427,7 +432,7 @@ class CustomerHelper:
         """
         if not delivery_date:
             delivery_date = get_delivery_date_for_product(is_queueing_item=is_pre_order)
-        cache_key = f"{CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX}_{self.organization_id}_{delivery_date}"
+        cache_key = get_customer_delivery_coupon_availability_cache_key(self.organization_id, delivery_date)
         cached_data = cache.get(cache_key)
         if cached_data is not None:
             return cached_data
@@ -503,10 +508,14 @@ class CustomerHelper:
         Retrieve organization data from the cache database
         """
 
+        # Read once per helper, most methods of the helper need it
+        if self._organization_data is not None:
+            return self._organization_data
         cache_key = f"{ORG_INSTANCE_CACHE_KEY_PREFIX}{self.organization_id}"
         # Get from cache
         org_data = cache.get(key=cache_key)
         if org_data is not None:
+            self._organization_data = org_data
             return org_data
         # Retrieve organization details
         try:
@@ -514,6 +523,7 @@ class CustomerHelper:
             organization = Organization().get_all_actives().get(id=self.organization_id)
             # Set cache for 7 days
             cache.set(key=cache_key, value=organization, timeout=604800)
+            self._organization_data = organization
             return organization
         except Organization.DoesNotExist:
             return None
@@ -0,0 +1,73 @@
+"""Keyword search of querysets on a normalized (lower case) text column
+
+Every word of the keyword must be contained in the column, e.g. `Stock.product_full_name`.
+On postgres the `LIKE '%word%'` lookups are served by a `pg_trgm` GIN index of the column
+(see the `pharmacy_stock_product_full_name_trgm` index) and the results can be ranked by
+`TrigramSimilarity`. Other databases (the in-memory sqlite of the tests) get the same filter
+without the index and a rank by exact / prefix match.
+"""
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+
+def normalize_keyword(keyword):
+    """Lower case the keyword and collapse its whitespace, as the searched columns are stored"""
+    return " ".join(str(keyword or "").split()).lower()
+
+
+def get_keyword_q(field, keyword):
+    """
+    Build the filter of a keyword, every word of it contained in the field
+
+    Args:
+        field (str): lookup of the normalized column, e.g. `product_full_name`
+        keyword (str): the keyword as typed
+
+    Returns:
+        Q: the filter, empty for a blank keyword
+    """
+    query = Q()
+    for word in normalize_keyword(keyword).split(" "):
+        if word:
+            query &= Q(**{f"{field}__contains": word})
+    return query
+
+
+def is_trigram_search_supported(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def get_keyword_rank(queryset, field, keyword):
+    """Expression of how close the field is to the keyword, from 0 to 1"""
+    keyword = normalize_keyword(keyword)
+    if is_trigram_search_supported(queryset):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return TrigramSimilarity(field, keyword)
+    return Case(
+        When(**{field: keyword}, then=Value(1.0)),
+        When(**{f"{field}__startswith": keyword}, then=Value(0.5)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def search_by_keyword(queryset, field, keyword, rank=False):
+    """
+    Filter a queryset by a keyword, see `get_keyword_q`
+
+    Args:
+        queryset (QuerySet): queryset to search
+        field (str): lookup of the normalized column
+        keyword (str): the keyword as typed
+        rank (bool): annotate `keyword_rank` and order by it, the most similar first
+
+    Returns:
+        QuerySet: the matching rows
+    """
+    queryset = queryset.filter(get_keyword_q(field, keyword))
+    if rank and normalize_keyword(keyword):
+        queryset = queryset.annotate(
+            keyword_rank=get_keyword_rank(queryset, field, keyword)
+        ).order_by(F("keyword_rank").desc(), "pk")
+    return queryset
@@ -0,0 +1,210 @@
+"""Per process (L1) cache in front of the django redis cache (L2)
+
+Hot singletons like the HealthOS settings or the authenticated user are read from redis
+and unpickled several times per request. `LocalCache` keeps them in the worker process for
+a short time. Every local cache has a cache namespace (see `common.cache_helpers`), the
+generation of the namespace is checked at most once per `generation_check_interval` seconds
+and bumping it (`LocalCache.expire`) drops the entries in every worker.
+
+`LocalCache.expire_key` drops a single key in every worker: it bumps the generation too
+and records the key under the new generation, a worker seeing the generation move drops
+only the recorded keys. When a record is missing (expired, or the generation moved too
+far) the worker clears all its entries, so stale data is never served.
+"""
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from common.cache_keys import LOCAL_CACHE_NAMESPACE_PREFIX
+from common.cache_helpers import (
+    expire_cache_namespace,
+    get_cache_namespace_generation,
+    get_cache_namespace_generation_key,
+)
+
+logger = logging.getLogger(__name__)
+
+_local_caches = {}
+
+# Generations a worker catches up on key by key, beyond it the worker clears its entries
+MAX_EXPIRED_KEY_GENERATIONS = 64
+
+
+class LocalCache:
+
+    def __init__(self, name, max_size=256, timeout=60, generation_check_interval=1):
+        self.name = name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.generation_check_interval = generation_check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked_at = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.key_invalidations = 0
+        self.generation_checks = 0
+        _local_caches[name] = self
+
+    @property
+    def namespace(self):
+        return f"{LOCAL_CACHE_NAMESPACE_PREFIX}{self.name}"
+
+    def get_expired_key_cache_key(self, generation):
+        return f"{self.namespace}:expired_key:{generation}"
+
+    @property
+    def enabled(self):
+        return getattr(settings, "LOCAL_CACHE_ENABLED", True)
+
+    def _get_expired_keys(self, previous_generation, generation):
+        """Keys expired by `expire_key` between two generations, None if they are not all known"""
+        if previous_generation is None or generation is None:
+            return None
+        if not 0 < generation - previous_generation <= MAX_EXPIRED_KEY_GENERATIONS:
+            return None
+        cache_keys = [
+            self.get_expired_key_cache_key(expired_generation)
+            for expired_generation in range(previous_generation + 1, generation + 1)
+        ]
+        try:
+            expired_keys = cache.get_many(cache_keys)
+        except Exception as exception:
+            logger.error(f"Failed to read expired keys of local cache {self.name}: {exception}")
+            return None
+        if len(expired_keys) != len(cache_keys):
+            return None
+        return list(expired_keys.values())
+
+    def _sync_generation(self):
+        now = time.monotonic()
+        if now - self._generation_checked_at < self.generation_check_interval:
+            return
+        self._generation_checked_at = now
+        try:
+            generation = get_cache_namespace_generation(self.namespace)
+        except Exception as exception:
+            # Never serve possibly stale data if the generation can't be verified
+            logger.error(f"Failed to check generation of local cache {self.name}: {exception}")
+            generation = None
+        self.generation_checks += 1
+        previous_generation = self._generation
+        if generation is not None and generation == previous_generation:
+            return
+        expired_keys = self._get_expired_keys(previous_generation, generation)
+        with self._lock:
+            if self._generation != previous_generation:
+                # Synced by another thread meanwhile
+                return
+            if expired_keys is not None:
+                for key in expired_keys:
+                    if self._entries.pop(key, None) is not None:
+                        self.key_invalidations += 1
+            else:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+            self._generation = generation
+
+    def get(self, key):
+        """Return the value of the key or None if not available or expired"""
+        if not self.enabled:
+            return None
+        self._sync_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers may change the instance (e.g. request.user), never share it between requests
+        return copy.copy(value)
+
+    def set(self, key, value):
+        if not self.enabled or value is None:
+            return
+        # Stored under the current generation, a later sync doesn't drop it
+        self._sync_generation()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, copy.copy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key, loader):
+        """
+        Return the value of the key from the local cache, otherwise from `loader`
+        (usually reads the redis cache and falls back to database) and keep it locally
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def delete(self, key):
+        """Delete the key from this process only, use `expire` to clear it from every worker"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def expire(self):
+        """Clear the local cache of every worker process"""
+        expire_cache_namespace(self.namespace)
+        with self._lock:
+            self._entries.clear()
+        self._generation_checked_at = 0
+
+    def expire_key(self, key):
+        """Delete the key from the local cache of every worker process"""
+        generation_key = get_cache_namespace_generation_key(self.namespace)
+        try:
+            generation = cache.incr(generation_key)
+        except ValueError:
+            # No generation yet, the workers compare to nothing and clear all their entries
+            self.expire()
+            return
+        # Kept while the entries the key may have in the workers are alive
+        cache.set(self.get_expired_key_cache_key(generation), key, self.timeout * 2)
+        self.delete(key)
+        self._generation_checked_at = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "key_invalidations": self.key_invalidations,
+            "generation_checks": self.generation_checks,
+        }
+
+
+def get_local_cache_stats():
+    """Hit / miss counters of every local cache of the current process"""
+    return {
+        name: local_cache.stats()
+        for name, local_cache in _local_caches.items()
+    }
+
+
+organization_settings_local_cache = LocalCache("organization_settings", max_size=64, timeout=60)
+auth_user_local_cache = LocalCache("auth_user", max_size=1024, timeout=30)
+healthos_singleton_local_cache = LocalCache("healthos_singleton", max_size=32, timeout=60)
@@ -0,0 +1,86 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.enums import Status
+from common.pagination import CustomPagination, KeysetPagination, encode_keyset_cursor
+from ecommerce.models import OrderInvoiceGroup
+from pharmacy.models import Purchase, StockIOLog
+
+QUERYSETS = {
+    'purchase': lambda: Purchase.objects.filter(status=Status.DISTRIBUTOR_ORDER),
+    'invoice-group': lambda: OrderInvoiceGroup.objects.filter(status=Status.ACTIVE),
+    'io-log': lambda: StockIOLog.objects.filter(status=Status.DISTRIBUTOR_ORDER),
+}
+
+
+class BenchmarkView:
+    keyset_ordering = ('-pk',)
+
+
+class Command(BaseCommand):
+    help = "Compare fetching deep list pages with OFFSET and with keyset (cursor) pagination"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--list',
+            dest='list',
+            choices=sorted(QUERYSETS),
+            default='purchase',
+            help='List to paginate',
+        )
+        parser.add_argument(
+            '--page',
+            dest='pages',
+            type=int,
+            action='append',
+            help='Page number to fetch, can be used multiple times (default 1 and 5000)',
+        )
+        parser.add_argument(
+            '--page-size',
+            dest='page_size',
+            type=int,
+            default=20,
+        )
+        parser.add_argument(
+            '--repeat',
+            dest='repeat',
+            type=int,
+            default=5,
+            help='Number of fetches of every page',
+        )
+
+    def fetch(self, paginator, queryset, params):
+        request = Request(APIRequestFactory().get('/', params))
+        start = time.perf_counter()
+        list(paginator.paginate_queryset(queryset, request, view=BenchmarkView))
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        queryset = QUERYSETS[options['list']]().order_by('-pk')
+        page_size = options['page_size']
+        total = queryset.count()
+        self.stdout.write(f"{options['list']}: {total} rows, {page_size} rows per page")
+
+        for page in options['pages'] or [1, 5000]:
+            page = min(page, max(total // page_size, 1))
+            offset_params = {'page': page, 'page_size': page_size}
+            keyset_params = {'pagination': 'keyset', 'page_size': page_size}
+            if page > 1:
+                # The cursor of the last row of the previous page, as the `next` link would give
+                last_pk = queryset.values_list('pk', flat=True)[(page - 1) * page_size - 1]
+                keyset_params['cursor'] = encode_keyset_cursor([last_pk])
+
+            offset_elapsed = min(
+                self.fetch(CustomPagination(), queryset, offset_params)
+                for _ in range(options['repeat'])
+            )
+            keyset_elapsed = min(
+                self.fetch(KeysetPagination(), queryset, keyset_params)
+                for _ in range(options['repeat'])
+            )
+            self.stdout.write(
+                f"page {page:<6} offset {offset_elapsed * 1000:8.2f} ms   keyset {keyset_elapsed * 1000:8.2f} ms"
+            )
@@ -0,0 +1,72 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common.cache_helpers import RedisCommandCounter
+from core.models import Person
+
+DEFAULT_ENDPOINTS = [
+    "/api/v1/pharmacy/distributor/order/cart/",
+    "/api/v1/search/pharmacy/stock/products/e-com/?keyword=napa",
+]
+
+
+class Command(BaseCommand):
+    help = "Compare redis round trips and latency per request with and without the local (L1) cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            dest='user_id',
+            type=int,
+            required=True,
+            help='Id of the (pharmacy) user used for the requests',
+        )
+        parser.add_argument(
+            '--requests',
+            dest='requests',
+            type=int,
+            default=20,
+            help='Number of requests for each endpoint',
+        )
+        parser.add_argument(
+            '--endpoint',
+            dest='endpoints',
+            action='append',
+            help='Endpoint to request, can be used multiple times',
+        )
+
+    def run(self, client, endpoint, number_of_requests):
+        with RedisCommandCounter() as counter:
+            start = time.perf_counter()
+            for _ in range(number_of_requests):
+                client.get(endpoint)
+            elapsed = time.perf_counter() - start
+        return counter.count / number_of_requests, elapsed * 1000 / number_of_requests
+
+    def handle(self, *args, **options):
+        from common.local_cache import get_local_cache_stats
+
+        user = Person.objects.get(pk=options['user_id'])
+        client = Client(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}",
+            SERVER_NAME=settings.ALLOWED_HOSTS[0],
+        )
+        number_of_requests = options['requests']
+        self.stdout.write(
+            f"{'endpoint':<64} {'L1':>4} {'redis/req':>10} {'ms/req':>8}"
+        )
+        for endpoint in options['endpoints'] or DEFAULT_ENDPOINTS:
+            for enabled in [False, True]:
+                with override_settings(LOCAL_CACHE_ENABLED=enabled):
+                    # warm up
+                    client.get(endpoint)
+                    commands, latency = self.run(client, endpoint, number_of_requests)
+                self.stdout.write(
+                    f"{endpoint[:64]:<64} {'on' if enabled else 'off':>4} {commands:>10.1f} {latency:>8.1f}"
+                )
+        self.stdout.write(f"Local cache stats: {get_local_cache_stats()}")
@@ -17,6 +17,7 @@ from common.utils import (
     mime_content_type,
 )
 from pharmacy.enums import SalesInactiveType
+from .cache_helpers import get_namespaced_cache_key, get_serial_cache_namespace
 from .enums import PublishStatus, Status
 from .validators import admin_validate_unique_name_with_org
 
@@ -213,7 +214,10 @@ class CreatedAtUpdatedAtBaseModel(models.Model):
         organization_id = 0
         if hasattr(self, 'organization_id') and self.organization_id:
             organization_id = self.organization_id
-        return "serial_{}_{}_{}_last_count".format(organization_id, self.status, model_str)
+        return get_namespaced_cache_key(
+            get_serial_cache_namespace(organization_id),
+            "{}_{}_last_count".format(self.status, model_str)
+        )
 
     def get_last_serial(self, cache_serial_flag=False):
         from pharmacy.models import OrderTracking
@@ -1,9 +1,16 @@
+import base64
 import hashlib
+import json
 from django.core.cache import caches
 from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, Q
 from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
-from common.cache_keys import QS_COUNT_CACHE_KEY_PREFIX
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from common.cache_helpers import get_namespaced_cache_key, get_qs_count_cache_namespace
 
 def cached_count_queryset(queryset, timeout=60*60, cache_name='default'):
     """
@@ -22,7 +29,10 @@ def cached_count_queryset(queryset, timeout=60*60, cache_name='default'):
 
     def count(queryset):
         try:
-            cache_key = f"{QS_COUNT_CACHE_KEY_PREFIX}{model_name}:{hashlib.md5(str(queryset.query).encode('utf8')).hexdigest()}"
+            cache_key = get_namespaced_cache_key(
+                get_qs_count_cache_namespace(model_name),
+                hashlib.md5(str(queryset.query).encode('utf8')).hexdigest()
+            )
 
             # return existing value, if any
             value = cache.get(cache_key)
@@ -51,6 +61,169 @@ class CachedCountPageNumberPagination(PageNumberPagination):
             queryset = cached_count_queryset(queryset, timeout)
         return super().paginate_queryset(queryset, *args, **kwargs)
 
+def encode_keyset_cursor(values, reverse=False):
+    """Encode the ordering values of a row into an opaque cursor"""
+    data = json.dumps({"v": list(values), "r": int(reverse)}, cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(data.encode('utf8')).decode('ascii')
+
+
+def decode_keyset_cursor(cursor):
+    """
+    Decode a cursor of `encode_keyset_cursor`
+
+    Returns:
+        tuple: (list of the ordering values, reverse)
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf8'))
+        return list(data["v"]), bool(data["r"])
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise NotFound("Invalid cursor")
+
+
+def get_keyset_filter(ordering, values, reverse=False):
+    """
+    Filter the rows after (or before when reverse) a row in the keyset ordering
+
+    For the ordering `('-date', '-id')` and values `(d, 7)` the rows after are
+    `date < d OR (date = d AND id < 7)`.
+
+    Args:
+        ordering (tuple): ordering fields, `-` prefixed for descending, the last one unique
+        values (list): ordering values of the row
+        reverse (bool): rows before the row instead of after
+
+    Returns:
+        Q: filter of the rows
+    """
+    keyset_filter = Q()
+    equal_filters = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+        keyset_filter |= Q(**equal_filters, **{"{}__{}".format(name, lookup): value})
+        equal_filters[name] = value
+    return keyset_filter
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else "-{}".format(field) for field in ordering)
+
+
+class KeysetPaginationMixin:
+    """
+    Keyset (cursor) pagination for the large lists, the page after a cursor is read
+    with `WHERE (date, id) < (...) ORDER BY date DESC, id DESC LIMIT n` so the deep
+    pages are as fast as the first one, without OFFSET and without count.
+
+    Opt in by mixing it into the pagination class of a view, the view stays page number
+    paginated unless the request passes `?pagination=keyset` (first page) or a `cursor`.
+    The ordering is `keyset_ordering` of the view (default `('-pk',)`), its fields must
+    not be null and the last one must be unique.
+    """
+    cursor_query_param = 'cursor'
+    keyset_query_param = 'pagination'
+    keyset_ordering = ('-pk',)
+    keyset = False
+
+    def is_keyset_request(self, request):
+        return (
+            self.cursor_query_param in request.query_params or
+            request.query_params.get(self.keyset_query_param, None) == 'keyset'
+        )
+
+    def get_keyset_ordering(self, queryset, view=None):
+        ordering = getattr(view, 'keyset_ordering', None) or self.keyset_ordering
+        # Use the column names, the rows of `values()` are keyed by them
+        return tuple(
+            field.replace('pk', queryset.model._meta.pk.attname) if field.lstrip('-') == 'pk' else field
+            for field in ordering
+        )
+
+    def get_keyset_values(self, item):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if isinstance(item, dict):
+                values.append(item[name])
+            elif isinstance(item, Model):
+                values.append(getattr(item, name))
+            else:
+                # `values_list(..., flat=True)` of the only ordering field
+                values.append(item)
+        return values
+
+    def to_python_values(self, queryset, values):
+        if len(values) != len(self.ordering):
+            raise NotFound("Invalid cursor")
+        try:
+            return [
+                queryset.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise NotFound("Invalid cursor")
+
+    def paginate_queryset(self, queryset, request, *args, **kwargs):
+        self.keyset = self.is_keyset_request(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, *args, **kwargs)
+
+        self.request = request
+        self.display_page_controls = False
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.ordering = self.get_keyset_ordering(queryset, kwargs.get('view', None))
+        cursor = request.query_params.get(self.cursor_query_param, None)
+        self.reverse = False
+        if cursor:
+            values, self.reverse = decode_keyset_cursor(cursor)
+            queryset = queryset.filter(
+                get_keyset_filter(self.ordering, self.to_python_values(queryset, values), self.reverse)
+            )
+        ordering = reverse_ordering(self.ordering) if self.reverse else self.ordering
+        results = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, bool(cursor)
+        self.page_results = results
+        return results
+
+    def get_keyset_link(self, item, reverse):
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        cursor = encode_keyset_cursor(self.get_keyset_values(item), reverse)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page_results:
+            return None
+        return self.get_keyset_link(self.page_results[-1], False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_results:
+            return None
+        return self.get_keyset_link(self.page_results[0], True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+
 class FasterDjangoPaginator(Paginator):
     @cached_property
     def count(self):
@@ -102,6 +275,12 @@ class ListPagination(PageNumberPagination):
             'results': data
         })
 
+class KeysetPagination(KeysetPaginationMixin, CustomPagination):
+    pass
+
+class CachedCountKeysetPagination(KeysetPaginationMixin, CachedCountPageNumberPagination):
+    pass
+
 class TwoHundredResultsSetPagination(PageNumberPagination):
     page_size = 200
     page_size_query_param = "page_size"
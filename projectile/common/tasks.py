@@ -284,10 +284,6 @@ def cache_write_lazy(self, cache_key, cache_data, timeout=settings.CACHES["defau
 def cache_expire(self, key):
     cache.delete(key)
 
-@app.task(bind=True, max_retries=10)
-def cache_pattern_expire(self, pattern):
-    cache.delete_pattern(pattern, itersize=10000)
-
 @app.task(bind=True, max_retries=10)
 def cache_expire_list(self, key_list):
     # logger.info("deleting {} keys".format(len(key_list)))
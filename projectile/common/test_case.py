@@ -104,29 +104,17 @@ class OmisTestCase(TestCase):
         - None
 
         Note:
-        - This function clears the cache for a specific permission group and user,
-          using the Django cache framework.
+        - The permission cache of the user is expired by the post_delete signal of
+          PersonOrganizationGroupPermission.
 
         """
 
-        # Import necessary modules
-        from common.utils import get_permission_cache_key
-        from django.core.cache import cache
-
         # Set the user according to the argument or default to self.user
         user = user if user else self.user
 
         # delete permissions from db by calling the clear permission method
         self.clear_permission_from_db(user=user)
 
-        # Clear cache before assigning new permission
-        cache_key = get_permission_cache_key(
-            person_id=user.id,
-            organization_id=user.organization_id,
-            group_name=permission_group
-        )
-        cache.delete(key=cache_key)
-
 
     def provide_permission_to_user(self, permission_group, user=None):
         """
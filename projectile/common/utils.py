@@ -410,10 +410,6 @@ def prepare_end_date(date, time_=time.max):
     return date
 
 
-def expire_cache(cache_key_pattern):
-    cache.delete_pattern(cache_key_pattern, itersize=10000)
-
-
 def get_ratio(whole_number, sliced_number):
     if whole_number != 0:
         return (sliced_number/whole_number)*100
@@ -983,17 +979,23 @@ def remove_brackets_from_word(word):
 
 def get_healthos_settings():
     from common.cache_keys import ORGANIZATION_SETTINGS_CACHE_KEY_PREFIX
+    from common.local_cache import organization_settings_local_cache
     from core.models import Organization
 
     distributor_id = os.environ.get('DISTRIBUTOR_ORG_ID', 303)
 
     org_setting_cache_key = f"{ORGANIZATION_SETTINGS_CACHE_KEY_PREFIX}{distributor_id}"
-    org_setting_cache = cache.get(org_setting_cache_key)
-    if org_setting_cache:
-        setting = org_setting_cache
-    else:
-        setting = Organization.objects.only('pk').get(pk=distributor_id).get_settings()
-    return setting
+
+    def get_settings_from_cache_or_db():
+        org_setting_cache = cache.get(org_setting_cache_key)
+        if org_setting_cache:
+            return org_setting_cache
+        return Organization.objects.only('pk').get(pk=distributor_id).get_settings()
+
+    return organization_settings_local_cache.get_or_set(
+        org_setting_cache_key,
+        get_settings_from_cache_or_db
+    )
 
 def get_url_from_image_key(image_path, image_key):
     """Build a URL from `image_key`."""
@@ -1050,32 +1052,6 @@ def build_versatileimagefield_url_set_from_image_name(image_name, size_set, requ
     return to_return
 
 
-def get_permission_cache_key(person_id, organization_id, group_name):
-    """
-    Generate a cache key for permission lookup based on person ID, organization ID, and group name.
-
-    Args:
-    - person_id (int): The ID of the person.
-    - organization_id (int or None): The ID of the organization. If None, defaults to 0.
-    - group_name (str): The name of the group.
-
-    Returns:
-    - str: A cache key formatted as "permission_{person_id}_{organization_id}_{group_name}".
-    """
-    # Check if organization_id is None and set it to 0 if so
-    if organization_id is None:
-        organization_id = 0
-    else:
-        organization_id = organization_id
-
-    # Generate the cache key with formatted strings
-    cache_key = "permission_{}_{}_{}".format(
-        str(person_id).zfill(7),
-        str(organization_id).zfill(7),
-        group_name
-    )
-    return cache_key
-
 def track_execute_time(print_time=True):
     import time
 
@@ -10,6 +10,7 @@ from rest_framework_simplejwt.models import TokenUser
 from rest_framework_simplejwt.utils import get_md5_hash_password
 
 from common.cache_keys import AUTH_USER_CACHE_KEY_PREFIX
+from common.local_cache import auth_user_local_cache
 
 
 AuthUser = TypeVar("AuthUser", AbstractBaseUser, TokenUser)
@@ -36,8 +37,10 @@ class CustomJWTAuthentication(JWTAuthentication):
 
     def get_user_from_cache(self, user_id):
         cache_key = self.get_auth_user_cache_key(user_id)
-        user = cache.get(cache_key)
-        return user
+        return auth_user_local_cache.get_or_set(
+            cache_key,
+            lambda: cache.get(cache_key)
+        )
 
     def get_user(self, validated_token: Token) -> AuthUser:
         """
@@ -0,0 +1,71 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import Person
+
+DEFAULT_ENDPOINTS = [
+    "/api/v1/pharmacy/distributor/order/cart/",
+    "/api/v1/search/pharmacy/stock/products/e-com/?keyword=napa",
+    "/api/v1/ecommerce/invoice-groups/",
+]
+
+
+class Command(BaseCommand):
+    help = "Compare the latency per request with and without the SQL profiler middleware"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            dest='user_id',
+            type=int,
+            required=True,
+            help='Id of the user used for the requests',
+        )
+        parser.add_argument(
+            '--requests',
+            dest='requests',
+            type=int,
+            default=50,
+            help='Number of requests for each endpoint and mode',
+        )
+        parser.add_argument(
+            '--endpoint',
+            dest='endpoints',
+            action='append',
+            help='Endpoint to request, can be used multiple times',
+        )
+
+    def run(self, client, endpoint, number_of_requests):
+        start = time.perf_counter()
+        for _ in range(number_of_requests):
+            client.get(endpoint)
+        return (time.perf_counter() - start) * 1000 / number_of_requests
+
+    def handle(self, *args, **options):
+        user = Person.objects.get(pk=options['user_id'])
+        client = Client(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}",
+            SERVER_NAME=settings.ALLOWED_HOSTS[0],
+        )
+        number_of_requests = options['requests']
+        self.stdout.write(f"{'endpoint':<64} {'off ms':>8} {'on ms':>8} {'overhead':>9}")
+        for endpoint in options['endpoints'] or DEFAULT_ENDPOINTS:
+            latencies = {}
+            # Alternate the modes so a drift of the database affects both
+            for enabled in [False, True, False, True]:
+                with override_settings(SQL_PROFILER_ENABLED=enabled, SQL_PROFILER_SAMPLE_RATE=1.0):
+                    # warm up
+                    client.get(endpoint)
+                    latencies.setdefault(enabled, []).append(
+                        self.run(client, endpoint, number_of_requests)
+                    )
+            off = min(latencies[False])
+            on = min(latencies[True])
+            self.stdout.write(
+                f"{endpoint[:64]:<64} {off:>8.2f} {on:>8.2f} {(on - off) / off * 100 if off else 0:>8.2f}%"
+            )
@@ -2,10 +2,10 @@ import logging
 
 from tqdm import tqdm
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
 
 from core.models import Person, PersonOrganization, PersonOrganizationGroupPermission
 from common.enums import Status
+from common.cache_helpers import expire_cache_namespace, get_permission_cache_namespace
 from common.helpers import query_yes_no
 from common.healthos_helpers import HealthOSHelper
 
@@ -15,9 +15,8 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
 
     def delete_permission_cache(self, person_id_list):
-        cache_keys = [f"permission_{str(person_id).zfill(7)}*" for person_id in person_id_list]
-        for cache_key in cache_keys:
-            cache.delete_pattern(cache_key, itersize=10000)
+        for person_id in person_id_list:
+            expire_cache_namespace(get_permission_cache_namespace(person_id))
 
     def get_all_healthos_users_po_id(self):
         """
@@ -0,0 +1,160 @@
+import json
+import os
+import random
+from datetime import date, timedelta
+
+import factory.random
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from common import models as common_models
+from common.enums import Status
+from core.enums import OrganizationType, PersonGroupType
+from core.models import GroupPermission, Organization
+from core.tests import (
+    OrganizationFactory,
+    OrganizationSettingFactory,
+    PersonFactory,
+    PersonOrganizationFactory,
+    PersonOrganizationGroupPermissionFactory,
+)
+from pharmacy.enums import DistributorOrderType, OrderTrackingStatus, PurchaseType, StockIOType
+from pharmacy.models import StockIOLog
+from pharmacy.tests import ProductFactory, PurchaseFactory, StockFactory, UnitFactory
+
+# Password of the generated users, see `core.tests.PersonFactory`
+PASSWORD = "testpass"
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the reproducible dataset the locust benchmark runs against, "
+        "a distributor with its stocks and pharmacies with their orders"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', dest='seed', type=int, default=42)
+        parser.add_argument('--stocks', dest='stocks', type=int, default=2000)
+        parser.add_argument('--pharmacies', dest='pharmacies', type=int, default=50)
+        parser.add_argument('--orders', dest='orders', type=int, default=20, help='Orders per pharmacy')
+        parser.add_argument('--lines', dest='lines', type=int, default=10, help='Lines per order')
+        parser.add_argument(
+            '--output',
+            dest='output',
+            type=str,
+            default='benchmark_dataset.json',
+            help='File the users and ids of the dataset are written to',
+        )
+
+    def create_user(self, organization, admin_group):
+        user = PersonFactory(
+            organization=organization,
+            person_group=PersonGroupType.EMPLOYEE,
+            is_staff=True,
+        )
+        person_organization = PersonOrganizationFactory(
+            person=user,
+            organization=organization,
+            person_group=PersonGroupType.EMPLOYEE,
+        )
+        PersonOrganizationGroupPermissionFactory(
+            person_organization=person_organization,
+            permission=admin_group,
+        )
+        return {
+            'phone': user.phone,
+            'person_id': user.id,
+            'person_organization_id': person_organization.id,
+        }
+
+    def create_distributor(self):
+        distributor_id = int(os.environ.get('DISTRIBUTOR_ORG_ID', 303))
+        distributor = Organization.objects.filter(pk=distributor_id).first()
+        if distributor is None:
+            distributor = OrganizationFactory(id=distributor_id, type=OrganizationType.DISTRIBUTOR)
+            OrganizationSettingFactory(organization=distributor)
+        return distributor
+
+    def create_orders(self, pharmacy, distributor, stocks, options):
+        lines = []
+        for index in range(options['orders']):
+            order = PurchaseFactory(
+                organization=pharmacy,
+                distributor=distributor,
+                status=Status.DISTRIBUTOR_ORDER,
+                purchase_type=PurchaseType.VENDOR_ORDER,
+                distributor_order_type=DistributorOrderType.ORDER,
+                current_order_status=random.choice([
+                    OrderTrackingStatus.PENDING,
+                    OrderTrackingStatus.ACCEPTED,
+                    OrderTrackingStatus.DELIVERED,
+                    OrderTrackingStatus.COMPLETED,
+                ]),
+                tentative_delivery_date=date.today() - timedelta(days=index),
+                is_queueing_order=False,
+            )
+            lines.extend(
+                StockIOLog(
+                    stock_id=stock.id,
+                    organization_id=pharmacy.id,
+                    purchase_id=order.id,
+                    quantity=random.randint(1, 20),
+                    rate=stock.product.trading_price,
+                    batch="N/A",
+                    type=StockIOType.OUT,
+                    status=Status.DISTRIBUTOR_ORDER,
+                    primary_unit_id=stock.product.primary_unit_id,
+                    secondary_unit_id=stock.product.secondary_unit_id,
+                    user_ip=common_models.USER_IP_ADDRESS,
+                )
+                for stock in random.sample(stocks, min(options['lines'], len(stocks)))
+            )
+        StockIOLog.objects.bulk_create(lines, batch_size=1000)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        factory.random.reseed_random(options['seed'])
+
+        with transaction.atomic():
+            admin_group, _ = GroupPermission.objects.get_or_create(
+                name='Admin', defaults={'status': Status.ACTIVE}
+            )
+            distributor = self.create_distributor()
+            distributor_user = self.create_user(distributor, admin_group)
+            unit = UnitFactory()
+            stocks = [
+                StockFactory(
+                    organization=distributor,
+                    product=ProductFactory(
+                        organization=distributor,
+                        primary_unit=unit,
+                        secondary_unit=unit,
+                        is_salesable=True,
+                        is_service=False,
+                    ),
+                    ecom_stock=random.randint(100, 1000),
+                    orderable_stock=random.randint(100, 1000),
+                )
+                for _ in range(options['stocks'])
+            ]
+            pharmacy_users = []
+            for _ in range(options['pharmacies']):
+                pharmacy = OrganizationFactory(type=OrganizationType.PHARMACY)
+                OrganizationSettingFactory(organization=pharmacy)
+                pharmacy_users.append(self.create_user(pharmacy, admin_group))
+                self.create_orders(pharmacy, distributor, stocks, options)
+
+        dataset = {
+            'seed': options['seed'],
+            'password': PASSWORD,
+            'distributor_id': distributor.id,
+            'distributor_users': [distributor_user],
+            'pharmacy_users': pharmacy_users,
+            'stock_ids': [stock.id for stock in stocks],
+        }
+        with open(options['output'], 'w') as dataset_file:
+            json.dump(dataset, dataset_file, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(stocks)} stocks and {len(pharmacy_users)} pharmacies, "
+            f"dataset written to {options['output']}"
+        ))
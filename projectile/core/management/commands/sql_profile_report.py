@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+
+from core.sql_profiler import (
+    LATENCY_MS_BUCKETS,
+    QUERY_COUNT_BUCKETS,
+    get_profiled_views,
+    reset_profiled_views,
+)
+
+ORDERINGS = {
+    'duplicates': 'duplicate_queries',
+    'queries': 'queries',
+    'db-time': 'db_time_us',
+    'time': 'time_us',
+}
+
+
+def get_percentile(counters, prefix, buckets, percentile):
+    """Upper bound of the histogram bucket holding the percentile"""
+    requests = counters.get('requests', 0)
+    seen = 0
+    for index in range(len(buckets) + 1):
+        seen += counters.get(f"{prefix}_{index}", 0)
+        if requests and seen >= requests * percentile:
+            return f"<={buckets[index]}" if index < len(buckets) else f">{buckets[-1]}"
+    return "-"
+
+
+class Command(BaseCommand):
+    help = "Print the views running the most queries per request, the N+1 offenders first"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', dest='top', type=int, default=20)
+        parser.add_argument(
+            '--order-by',
+            dest='order_by',
+            choices=list(ORDERINGS),
+            default='duplicates',
+            help='Average per request to order the views by',
+        )
+        parser.add_argument(
+            '--reset',
+            dest='reset',
+            action='store_true',
+            default=False,
+            help='Delete the profiles after printing them',
+        )
+
+    def handle(self, *args, **options):
+        views = get_profiled_views()
+        field = ORDERINGS[options['order_by']]
+        ranked = sorted(
+            views.items(),
+            key=lambda item: item[1].get(field, 0) / max(item[1].get('requests', 0), 1),
+            reverse=True
+        )[:options['top']]
+
+        self.stdout.write(
+            f"{'view':<72} {'requests':>9} {'queries':>8} {'dup':>7} {'db ms':>8} "
+            f"{'ms':>8} {'p95 queries':>12} {'p95 ms':>8}"
+        )
+        for view_name, counters in ranked:
+            requests = max(counters.get('requests', 0), 1)
+            self.stdout.write(
+                f"{view_name[-72:]:<72} {counters.get('requests', 0):>9} "
+                f"{counters.get('queries', 0) / requests:>8.1f} "
+                f"{counters.get('duplicate_queries', 0) / requests:>7.1f} "
+                f"{counters.get('db_time_us', 0) / requests / 1000:>8.1f} "
+                f"{counters.get('time_us', 0) / requests / 1000:>8.1f} "
+                f"{get_percentile(counters, 'queries_bucket', QUERY_COUNT_BUCKETS, 0.95):>12} "
+                f"{get_percentile(counters, 'latency_bucket', LATENCY_MS_BUCKETS, 0.95):>8}"
+            )
+        if options['reset']:
+            reset_profiled_views()
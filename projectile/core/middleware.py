@@ -1,35 +1,40 @@
 import logging
+import random
+import time
 
-from collections import Counter
-from operator import itemgetter
-
-from pprint import pformat
-from django.db import connection
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
 from common import models
+from core.sql_profiler import QueryProfile, get_view_name, view_sql_stats
 
 logger = logging.getLogger(__name__)
 
-# pylint: disable=old-style-class, no-init
-class LogSQLMiddleware(MiddlewareMixin):
-
-    calls = Counter()
-    queries = Counter()
-
-    def process_response(self, request, response):
-        """Log the SQL queries that the request ran"""
-        logger.debug('SQL Queries for request {}:\n{}'.format(
-            request.path, pformat(connection.queries)))
-        logger.debug('Total SQL Queries for request {}: {}'.format(
-            request.path, len(connection.queries)))
-        self.calls[request.path] += 1
-        self.queries[request.path] += len(connection.queries)
-        averages = [(ep, self.queries[ep] / float(self.calls[ep])
-                     if self.calls[ep] else 0.0) for ep in self.queries]
-        averages.sort(key=itemgetter(1))
-        logger.debug('Endpoint averages:\n{}'.format(
-            '\n'.join('{}: {}'.format(ep, avg) for ep, avg in averages)))
+
+class SQLProfilerMiddleware:
+    """Profile the SQL queries of the requests per view, see `core.sql_profiler`"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            not settings.SQL_PROFILER_ENABLED
+            or random.random() >= settings.SQL_PROFILER_SAMPLE_RATE
+        ):
+            return self.get_response(request)
+
+        profile = QueryProfile()
+        start = time.perf_counter()
+        with profile.wrap_connections():
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        view_name = get_view_name(request)
+        if view_name:
+            view_sql_stats.add(view_name, profile, elapsed)
+        if view_sql_stats.should_flush():
+            view_sql_stats.flush()
         return response
 
 
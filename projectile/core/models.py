@@ -41,7 +41,16 @@ from common.cache_keys import (
     AUTH_USER_CACHE_KEY_PREFIX,
     ORG_INSTANCE_CACHE_KEY_PREFIX,
 )
-from common.cache_helpers import get_or_clear_cumulative_discount_factor
+from common.cache_helpers import (
+    expire_cache_namespace,
+    get_cache_namespace_generation,
+    get_cache_namespace_generation_key,
+    get_or_clear_cumulative_discount_factor,
+    get_permission_cache_namespace,
+    get_permission_groups_cache_key,
+    get_serial_cache_namespace,
+)
+from common.local_cache import auth_user_local_cache, organization_settings_local_cache
 from common.models import (
     CreatedAtUpdatedAtBaseModel,
     NameSlugDescriptionBaseModel,
@@ -98,7 +107,7 @@ from .signals import (
     post_save_organization,
     pre_save_organization,
     pre_save_organization_settings,
-    pre_save_group_permission,
+    expire_group_permission_cache,
     post_save_person,
     pre_save_person_organization,
     post_save_issue_status,
@@ -237,12 +246,18 @@ class Organization(NameSlugDescriptionBaseModel):
             ).update(**data)
 
     def get_settings(self):
-        org_settings = cache.get(self.get_key())
-        if org_settings is None:
-            org_settings = OrganizationSetting.objects.filter(organization=self.id).first()
-            timeout = 604800 # 7 days (7*24*60*60)
-            cache.set(self.get_key(), org_settings, timeout)
-        return org_settings
+        def get_settings_from_cache_or_db():
+            org_settings = cache.get(self.get_key())
+            if org_settings is None:
+                org_settings = OrganizationSetting.objects.filter(organization=self.id).first()
+                timeout = 604800 # 7 days (7*24*60*60)
+                cache.set(self.get_key(), org_settings, timeout)
+            return org_settings
+
+        return organization_settings_local_cache.get_or_set(
+            self.get_key(),
+            get_settings_from_cache_or_db
+        )
 
     def get_settings_instance(self):
         org_settings = OrganizationSetting.objects.filter(
@@ -261,7 +276,7 @@ class Organization(NameSlugDescriptionBaseModel):
         return "organization_settings_{}".format(self.id)
 
     def expire_serial_cache(self):
-        cache.delete_pattern("serial_{}_*".format(self.id), itersize=10000)
+        expire_cache_namespace(get_serial_cache_namespace(self.id))
 
     def expire_cache(self, expire_user_details_cache=True, celery=True):
         from common.tasks import cache_expire_list
@@ -315,6 +330,8 @@ class Organization(NameSlugDescriptionBaseModel):
         #     )
         # else:
         cache.delete_many(settings_caches)
+        # Expire settings from local cache of every worker
+        organization_settings_local_cache.expire_key(self.get_key())
         # Delete cumulative discount factor cache
         get_or_clear_cumulative_discount_factor(organization_id=self.id, clear=True)
 
@@ -1600,18 +1617,6 @@ class Person(AbstractBaseUser, PermissionsMixin, CreatedAtUpdatedAtBaseModel, Us
     def get_username(self):
         return u"{}".format(self.id)
 
-    def get_permission_cache_key(self, group_name):
-        if self.organization_id is None:
-            organization_id = 0
-        else:
-            organization_id = self.organization_id
-        cache_key = "permission_{}_{}_{}".format(
-            str(self.id).zfill(7),
-            str(organization_id).zfill(7),
-            group_name
-        )
-        return cache_key
-
     def get_user_profile_details_cache_key(self):
         cache_key = f"{USER_PROFILE_DETAILS_CACHE_KEY_PREFIX}{self.id}"
         return cache_key
@@ -1627,6 +1632,7 @@ class Person(AbstractBaseUser, PermissionsMixin, CreatedAtUpdatedAtBaseModel, Us
                 self.get_auth_user_cache_key()
             ]
         )
+        auth_user_local_cache.expire_key(self.get_auth_user_cache_key())
 
     @property
     def profile_details(self):
@@ -1637,40 +1643,45 @@ class Person(AbstractBaseUser, PermissionsMixin, CreatedAtUpdatedAtBaseModel, Us
         return self
 
     def delete_permission_cache(self):
-        permission_pattern = "permission_{}*".format(
-            str(self.id).zfill(7)
-        )
-        cache.delete_pattern(permission_pattern, itersize=10000)
-
-    def does_belongs_to_group_or_admin(self, group_name):
-
-        cache_key = self.get_permission_cache_key(group_name)
-        data = cache.get(cache_key)
+        expire_cache_namespace(get_permission_cache_namespace(self.id))
 
-        if data is None:
-            data = list(
-                PersonOrganizationGroupPermission.objects.filter(
-                    person_organization__in=PersonOrganization.objects.filter(
-                        person=self,
-                        organization__id=self.organization_id,
-                        person_group__in=(PersonGroupType.EMPLOYEE, PersonGroupType.MONITOR),
-                        status=Status.ACTIVE
-                    ),
-                    permission__pk__in=GroupPermission.objects.filter(
-                        status=Status.ACTIVE,
-                        name__in=[group_name]
-                    ).select_related('permission').values_list('id', flat=True)
-                    )
-                )
-
-            if len(data) > 0:
-                cache.set(cache_key, True, 24*60*60)
-                return True
+    def get_permission_group_names(self):
+        """
+        Names of the permission groups of the person in the current organization.
+        The cached names and the generation of the permission cache namespace of the person
+        are read together, so it costs a single cache round trip, `delete_permission_cache`
+        invalidates them.
 
-            cache.set(cache_key, False, 24*60*60)
-            return False
+        Returns:
+            frozenset: names of the active permission groups
+        """
+        namespace = get_permission_cache_namespace(self.id)
+        generation_key = get_cache_namespace_generation_key(namespace)
+        cache_key = get_permission_groups_cache_key(self.id, self.organization_id)
+        cached_data = cache.get_many([generation_key, cache_key])
+        generation = cached_data.get(generation_key)
+        if generation is None:
+            generation = get_cache_namespace_generation(namespace)
+        cached_generation, group_names = cached_data.get(cache_key, (None, None))
+        if group_names is not None and cached_generation == generation:
+            return group_names
+
+        group_names = frozenset(
+            PersonOrganizationGroupPermission.objects.filter(
+                person_organization__in=PersonOrganization.objects.filter(
+                    person=self,
+                    organization__id=self.organization_id,
+                    person_group__in=(PersonGroupType.EMPLOYEE, PersonGroupType.MONITOR),
+                    status=Status.ACTIVE
+                ),
+                permission__status=Status.ACTIVE,
+            ).values_list('permission__name', flat=True)
+        )
+        cache.set(cache_key, (generation, group_names), 24*60*60)
+        return group_names
 
-        return data
+    def does_belongs_to_group_or_admin(self, group_name):
+        return group_name in self.get_permission_group_names()
 
     def get_stocks_from_recent_orders(self, limit=60):
         from pharmacy.models import Stock
@@ -2625,7 +2636,8 @@ post_save.connect(post_save_employee, sender=Person)
 post_save.connect(post_save_organization, sender=Organization)
 pre_save.connect(pre_save_organization, sender=Organization)
 pre_save.connect(pre_save_organization_settings, sender=OrganizationSetting)
-pre_save.connect(pre_save_group_permission, sender=PersonOrganizationGroupPermission)
+post_save.connect(expire_group_permission_cache, sender=PersonOrganizationGroupPermission)
+post_delete.connect(expire_group_permission_cache, sender=PersonOrganizationGroupPermission)
 post_delete.connect(delete_images, sender=Person)
 pre_save.connect(pre_save_person_organization, sender=PersonOrganization)
 post_save.connect(post_save_issue_status, sender=IssueStatus)
@@ -5,11 +5,19 @@ from common.enums import (
     Status,
 )
 from core.enums import PersonGroupType
-from core.models import (
-    PersonOrganization,
-    GroupPermission,
-    PersonOrganizationGroupPermission,
-)
+
+
+def get_request_permission_group_names(request):
+    """
+    Permission group names of the user, loaded once per request and shared by
+    every permission class checked for it
+    """
+    group_names = getattr(request, '_permission_group_names', None)
+    if group_names is None:
+        group_names = request.user.get_permission_group_names()
+        request._permission_group_names = group_names
+    return group_names
+
 
 class IsAuthenticatedOrCreate(permissions.IsAuthenticated):
     def has_permission(self, request, view):
@@ -200,7 +208,7 @@ class IsLoggedInOnOrganization(permissions.IsAuthenticated):
         if self.group_name == 'Public' or (self.group_name == 'Admin' and (request.user.is_staff or request.user.is_superuser)):
             return True
 
-        return request.user.does_belongs_to_group_or_admin(self.group_name)
+        return self.group_name in get_request_permission_group_names(request)
 
     def has_object_permission(self, request, view, obj):
         allowed_for_all_views_list = [
@@ -350,7 +358,7 @@ class StaffIsProcurementBuyerWithSupplier(IsLoggedInOnOrganization):
         if self.group_name == 'Public' or (self.group_name == 'Admin' and request.user.is_staff):
             return True
 
-        return request.user.does_belongs_to_group_or_admin(self.group_name) and request.user.has_tagged_supplier
+        return self.group_name in get_request_permission_group_names(request) and request.user.has_tagged_supplier
 
 
 class StaffIsProcurementOfficer(IsLoggedInOnOrganization):
@@ -365,7 +373,7 @@ class StaffIsProcurementOfficer(IsLoggedInOnOrganization):
         if self.group_name == 'Public' or (self.group_name == 'Admin' and request.user.is_staff):
             return True
 
-        return request.user.does_belongs_to_group_or_admin(self.group_name) and not request.user.has_tagged_supplier
+        return self.group_name in get_request_permission_group_names(request) and not request.user.has_tagged_supplier
 
 
 class StaffIsMarketer(IsLoggedInOnOrganization):
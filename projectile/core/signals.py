@@ -5,7 +5,6 @@ from django.utils import timezone
 from future.builtins import round
 
 import logging
-import pandas as pd
 import os
 
 from django.core.cache import cache
@@ -14,7 +13,11 @@ from django.db import transaction, IntegrityError
 from sorl.thumbnail import delete
 
 from common.enums import Status
-from common.cache_helpers import delete_qs_count_cache
+from common.cache_helpers import (
+    delete_qs_count_cache,
+    expire_cache_namespace,
+    get_permission_cache_namespace,
+)
 from common.cache_keys import DELIVERY_AREA_HUB_ID_CACHE_KEY, ORGANIZATION_AND_AREA_DISCOUNT_CACHE_KEY
 from common.helpers import populate_es_index
 from common.cache_helpers import get_or_clear_cumulative_discount_factor, clear_organization_and_area_discount_cache
@@ -236,12 +239,11 @@ def pre_save_organization(sender, instance, **kwargs):
                 Status.SUSPEND, Status.ACTIVE, instance.storepoint_set
             )
 
-def pre_save_group_permission(sender, instance, **kwargs):
-    if not instance._state.adding:
-        permission_pattern = "permission_{}*".format(
-            str(instance.person_organization.id).zfill(7)
-        )
-        cache.delete_pattern(permission_pattern, itersize=10000)
+def expire_group_permission_cache(sender, instance, **kwargs):
+    # Any added, changed or deleted group permission invalidates the permission groups of the person
+    expire_cache_namespace(
+        get_permission_cache_namespace(instance.person_organization.person_id)
+    )
 
 
 @transaction.atomic
@@ -374,9 +376,10 @@ def post_save_issue_status(sender, instance, created, **kwargs):
 
 @transaction.atomic
 def post_save_script_file_storage(sender, instance, created, **kwargs):
+    from pharmacy.stock_snapshot import get_stock_snapshot
     from pharmacy.tasks import set_ecom_stock_from_file_lazy
 
-    from procurement.tasks import create_purchase_prediction_from_file_lazy
+    from procurement.tasks import import_purchase_prediction_file_lazy
 
     if instance.date is None:
         instance.date = datetime.date.today()
@@ -384,8 +387,8 @@ def post_save_script_file_storage(sender, instance, created, **kwargs):
 
     if created and instance.set_stock_from_file and instance.file_purpose == FilePurposes.DISTRIBUTOR_STOCK:
         chunk_size = 500
-        stock_df =  pd.read_csv(instance.content)
-        row, column = stock_df.shape
+        # Parsed once here, the chunk tasks read their rows from the saved snapshot
+        row = len(get_stock_snapshot(instance))
         index = 0
         while index < row:
             next_index = index + chunk_size
@@ -413,62 +416,20 @@ def post_save_script_file_storage(sender, instance, created, **kwargs):
             )
             index = next_index
     elif created and instance.file_purpose == FilePurposes.PURCHASE_PREDICTION:
-        purchase_prediction_columns = [
-            'ID',
-            'MRP',
-            'SP',
-            'AVG',
-            'L_RATE',
-            'H_RATE',
-            'KIND',
-            'STATUS',
-            'OSTOCK',
-            'SELL',
-            'PUR',
-            'SHORT',
-            'RET',
-            'NSTOCK',
-            'PRED',
-            'NORDER',
-            'D3',
-            'SUPPLIER_S1',
-            'QTY_S1',
-            'RATE_S1',
-            'SUPPLIER_S2',
-            'QTY_S2',
-            'RATE_S2',
-            'SUPPLIER_S3',
-            'QTY_S3',
-            'RATE_S3'
-        ]
-
-        organization_id = os.environ.get('DISTRIBUTOR_ORG_ID', 303)
-        chunk_size = 50
-        stock_df =  pd.read_excel(instance.content)
-        columns_from_file = stock_df.columns.to_list()
-        missing_columns = list(set(purchase_prediction_columns) - set(columns_from_file))
-        row, column = stock_df.shape
-        index = 0
-        if not missing_columns:
-            while index < row:
-                next_index = index + chunk_size
-                create_purchase_prediction_from_file_lazy.apply_async(
-                    (
-                        instance.name,
-                        instance.pk,
-                        index,
-                        next_index,
-                        organization_id,
-                    ),
-                    countdown=5,
-                    retry=True, retry_policy={
-                        'max_retries': 10,
-                        'interval_start': 0,
-                        'interval_step': 0.2,
-                        'interval_max': 0.2,
-                    }
-                )
-                index = next_index
+        # The whole file is parsed and imported by one task, see procurement.prediction_importer
+        import_purchase_prediction_file_lazy.apply_async(
+            (
+                instance.pk,
+                os.environ.get('DISTRIBUTOR_ORG_ID', 303),
+            ),
+            countdown=5,
+            retry=True, retry_policy={
+                'max_retries': 10,
+                'interval_start': 0,
+                'interval_step': 0.2,
+                'interval_max': 0.2,
+            }
+        )
 
 
 def post_save_delivery_hub(sender, instance, created, **kwargs):
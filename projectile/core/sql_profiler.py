@@ -0,0 +1,164 @@
+"""Per view SQL profiling that works with DEBUG off
+
+`SQLProfilerMiddleware` installs `QueryProfile` as a database execute wrapper for the
+request. It counts the queries, their total time and the repeated queries, the queries
+with the same fingerprint (the SQL with the `IN` lists collapsed) run more than once,
+which is how an N+1 shows up. The profiles are aggregated per view in the process by
+`ViewSQLStats` and added to redis every `SQL_PROFILER_FLUSH_INTERVAL` seconds, where
+`sql_profile_report` reads the views of all the processes from.
+"""
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django_redis import get_redis_connection
+
+from common.cache_keys import SQL_PROFILER_VIEWS_CACHE_KEY, SQL_PROFILER_VIEW_CACHE_KEY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, the last bucket is unbounded
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+LATENCY_MS_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+IN_LIST_PATTERN = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+def get_fingerprint(sql):
+    """SQL with the `IN` lists collapsed, the same query with other values or list sizes"""
+    if "IN (" not in sql:
+        return sql
+    return IN_LIST_PATTERN.sub("IN (...)", sql)
+
+
+class QueryProfile:
+    """Database execute wrapper counting the queries of a request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[sql] += 1
+
+    @property
+    def duplicate_queries(self):
+        """Queries repeating an earlier query of the request"""
+        fingerprints = Counter()
+        for sql, count in self.fingerprints.items():
+            fingerprints[get_fingerprint(sql)] += count
+        return sum(count - 1 for count in fingerprints.values())
+
+    def wrap_connections(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+def get_bucket(buckets, value):
+    return bisect_left(buckets, value)
+
+
+class ViewSQLStats:
+    """Profiles of the requests of the process per view, added to redis by `flush`"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._flushed_at = time.monotonic()
+
+    def add(self, view_name, profile, elapsed):
+        duplicate_queries = profile.duplicate_queries
+        with self._lock:
+            counters = self._views.setdefault(view_name, Counter())
+            counters["requests"] += 1
+            counters["queries"] += profile.queries
+            counters["duplicate_queries"] += duplicate_queries
+            counters["db_time_us"] += int(profile.db_time * 1000000)
+            counters["time_us"] += int(elapsed * 1000000)
+            counters[f"queries_bucket_{get_bucket(QUERY_COUNT_BUCKETS, profile.queries)}"] += 1
+            counters[f"latency_bucket_{get_bucket(LATENCY_MS_BUCKETS, elapsed * 1000)}"] += 1
+            if duplicate_queries:
+                counters["requests_with_duplicates"] += 1
+
+    def should_flush(self):
+        return time.monotonic() - self._flushed_at >= settings.SQL_PROFILER_FLUSH_INTERVAL
+
+    def pop(self):
+        with self._lock:
+            views, self._views = self._views, {}
+            self._flushed_at = time.monotonic()
+        return views
+
+    def flush(self):
+        views = self.pop()
+        if not views:
+            return
+        try:
+            pipeline = get_redis_connection("default").pipeline(transaction=False)
+            for view_name, counters in views.items():
+                key = get_view_key(view_name)
+                for field, value in counters.items():
+                    pipeline.hincrby(key, field, value)
+                pipeline.sadd(cache.make_key(SQL_PROFILER_VIEWS_CACHE_KEY), view_name)
+            pipeline.execute()
+        except Exception as exception:
+            logger.error(f"Failed to flush the sql profiles of {len(views)} views: {exception}")
+
+
+view_sql_stats = ViewSQLStats()
+
+
+def get_view_key(view_name):
+    return cache.make_key(f"{SQL_PROFILER_VIEW_CACHE_KEY_PREFIX}{view_name}")
+
+
+def get_view_name(request):
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is None:
+        return None
+    view = getattr(resolver_match.func, "view_class", resolver_match.func)
+    return f"{view.__module__}.{view.__qualname__}"
+
+
+def get_profiled_views():
+    """
+    Profiles of all the processes per view, flushed to redis
+
+    Returns:
+        dict: view name to its counters
+    """
+    client = get_redis_connection("default")
+    view_names = sorted(
+        name.decode("utf-8")
+        for name in client.smembers(cache.make_key(SQL_PROFILER_VIEWS_CACHE_KEY))
+    )
+    pipeline = client.pipeline(transaction=False)
+    for view_name in view_names:
+        pipeline.hgetall(get_view_key(view_name))
+    return {
+        view_name: {field.decode("utf-8"): int(value) for field, value in counters.items()}
+        for view_name, counters in zip(view_names, pipeline.execute())
+    }
+
+
+def reset_profiled_views():
+    client = get_redis_connection("default")
+    views_key = cache.make_key(SQL_PROFILER_VIEWS_CACHE_KEY)
+    keys = [get_view_key(name.decode("utf-8")) for name in client.smembers(views_key)]
+    client.delete(views_key, *keys)
@@ -0,0 +1,168 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+
+from common.cache_invalidation import (
+    batch_cache_invalidation,
+    expire_cache_keys,
+    expire_cache_keys_deferred,
+    get_buffer,
+    get_cache_invalidation_stats,
+    reset_cache_invalidation_stats,
+)
+from common.cache_helpers import get_cache_namespace_generation
+from common.cache_keys import STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX
+from common.fragment_cache import get_fragment_key, get_fragment_namespace
+from core.tests import OrganizationFactory
+from pharmacy.models import Stock
+from pharmacy.tests import (
+    ProductCategoryFactory,
+    ProductFactory,
+    ProductFormFactory,
+    ProductGenericFactory,
+    ProductManufacturingCompanyFactory,
+    ProductSubGroupFactory,
+    StockFactory,
+    UnitFactory,
+)
+
+
+def get_expired_keys(cache_expire_list):
+    return [call.args[0][0] for call in cache_expire_list.apply_async.call_args_list]
+
+
+@mock.patch('common.cache_invalidation.cache_expire_list')
+class CacheInvalidationBufferTest(SimpleTestCase):
+
+    def setUp(self):
+        reset_cache_invalidation_stats()
+
+    def test_expired_right_away_outside_of_transaction(self, cache_expire_list):
+        expire_cache_keys(['first', 'second'])
+        self.assertEqual(get_expired_keys(cache_expire_list), [['first', 'second']])
+
+    @override_settings(CACHE_INVALIDATION_TASK_MAX_KEYS=1000)
+    def test_batch_deduplicates_keys(self, cache_expire_list):
+        with batch_cache_invalidation():
+            for index in range(5000):
+                expire_cache_keys([f"key_{index % 2500}", 'shared'])
+            cache_expire_list.apply_async.assert_not_called()
+
+        self.assertEqual(cache_expire_list.apply_async.call_count, 3)
+        self.assertEqual(sum(len(keys) for keys in get_expired_keys(cache_expire_list)), 2501)
+        stats = get_cache_invalidation_stats()
+        self.assertEqual(stats['requests'], 5000)
+        self.assertEqual(stats['tasks_saved'], 4997)
+        self.assertEqual(stats['keys_saved'], 10000 - 2501)
+
+    def test_deferred_keys_resolved_once(self, cache_expire_list):
+        resolver = mock.Mock(side_effect=lambda values: [f"stock_{value}" for value in sorted(values)])
+        with batch_cache_invalidation():
+            with batch_cache_invalidation():
+                expire_cache_keys_deferred(resolver, [1, 2])
+            expire_cache_keys_deferred(resolver, [2, 3])
+
+        resolver.assert_called_once_with({1, 2, 3})
+        self.assertEqual(get_expired_keys(cache_expire_list), [['stock_1', 'stock_2', 'stock_3']])
+
+
+@mock.patch('common.cache_invalidation.cache_expire_list')
+class CacheInvalidationOnCommitTest(TestCase):
+
+    def setUp(self):
+        reset_cache_invalidation_stats()
+
+    def test_expired_once_per_commit(self, cache_expire_list):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            expire_cache_keys(['first'])
+            expire_cache_keys(['second', 'first'])
+            cache_expire_list.apply_async.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(get_expired_keys(cache_expire_list), [['first', 'second']])
+
+    def test_registered_again_after_savepoint_rollback(self, cache_expire_list):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    expire_cache_keys(['rolled_back'])
+                    raise ValueError
+            except ValueError:
+                pass
+            expire_cache_keys(['committed'])
+
+        self.assertIn('committed', get_expired_keys(cache_expire_list)[0])
+
+    def test_product_import_enqueues_few_tasks(self, cache_expire_list):
+        organization = OrganizationFactory()
+        unit = UnitFactory()
+        product_fields = {
+            'organization': organization,
+            'manufacturing_company': ProductManufacturingCompanyFactory(),
+            'form': ProductFormFactory(),
+            'subgroup': ProductSubGroupFactory(),
+            'generic': ProductGenericFactory(),
+            'category': ProductCategoryFactory(),
+            'primary_unit': unit,
+            'secondary_unit': unit,
+        }
+        stocked_products = ProductFactory.create_batch(10, **product_fields)
+        stocks = [
+            StockFactory(organization=organization, product=product)
+            for product in stocked_products
+        ]
+        # The invalidations of the factories are flushed by the commit of the test case only
+        get_buffer().flush()
+        reset_cache_invalidation_stats()
+        cache_expire_list.reset_mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with batch_cache_invalidation():
+                ProductFactory.create_batch(4990, **product_fields)
+                for product in stocked_products:
+                    product.save()
+
+        self.assertLessEqual(cache_expire_list.apply_async.call_count, 3)
+        expired_keys = sum(get_expired_keys(cache_expire_list), [])
+        self.assertTrue(set(Stock.get_cache_keys([stock.id for stock in stocks])) <= set(expired_keys))
+        self.assertGreaterEqual(get_cache_invalidation_stats()['tasks_saved'], 5000 - 3)
+
+    @override_settings(CACHE_INVALIDATION_TASK_MAX_KEYS=5)
+    def test_bulk_product_change_expires_stock_fragments(self, cache_expire_list):
+        organization = OrganizationFactory()
+        unit = UnitFactory()
+        products = ProductFactory.create_batch(
+            10,
+            organization=organization,
+            manufacturing_company=ProductManufacturingCompanyFactory(),
+            form=ProductFormFactory(),
+            subgroup=ProductSubGroupFactory(),
+            generic=ProductGenericFactory(),
+            category=ProductCategoryFactory(),
+            primary_unit=unit,
+            secondary_unit=unit,
+        )
+        stocks = [
+            StockFactory(organization=organization, product=product)
+            for product in products
+        ]
+        # The invalidations of the factories are flushed by the commit of the test case only
+        get_buffer().flush()
+        namespace = get_fragment_namespace(Stock)
+        generation = get_cache_namespace_generation(namespace)
+        cache_expire_list.reset_mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with batch_cache_invalidation():
+                for product in products:
+                    product.save()
+
+        self.assertGreater(get_cache_namespace_generation(namespace), generation)
+        expired_keys = sum(get_expired_keys(cache_expire_list), [])
+        stock_ids = [stock.id for stock in stocks]
+        self.assertTrue(set(Stock.get_cache_keys(stock_ids, fragments=False)) <= set(expired_keys))
+        self.assertNotIn(
+            get_fragment_key(STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX, stocks[0].id), expired_keys
+        )
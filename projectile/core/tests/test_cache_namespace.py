@@ -0,0 +1,74 @@
+from unittest import mock
+
+from redis import Redis
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from common.cache_helpers import (
+    delete_qs_count_cache,
+    expire_cache_namespace,
+    get_customer_delivery_coupon_availability_cache_key,
+    get_cache_namespace_generation,
+    get_customer_non_group_order_amount_cache_key,
+    get_namespaced_cache_key,
+    get_permission_cache_namespace,
+)
+from core.models import Organization, Person
+from pharmacy.models import Purchase
+
+
+def fail_on_keyspace_scan(*args, **kwargs):
+    raise AssertionError("KEYS / SCAN must not be issued for cache invalidation")
+
+
+@mock.patch.object(Redis, "keys", fail_on_keyspace_scan)
+@mock.patch.object(Redis, "scan", fail_on_keyspace_scan)
+@mock.patch.object(Redis, "scan_iter", fail_on_keyspace_scan)
+class CacheNamespaceTest(SimpleTestCase):
+
+    def test_expire_cache_namespace_invalidates_all_keys(self):
+        namespace = "test-cache-namespace"
+        first_key = get_namespaced_cache_key(namespace, "first")
+        second_key = get_namespaced_cache_key(namespace, "second")
+        cache.set_many({first_key: 1, second_key: 2})
+
+        # Keys are stable while the namespace is not expired
+        self.assertEqual(get_namespaced_cache_key(namespace, "first"), first_key)
+        self.assertEqual(cache.get(get_namespaced_cache_key(namespace, "second")), 2)
+
+        expire_cache_namespace(namespace)
+
+        self.assertNotEqual(get_namespaced_cache_key(namespace, "first"), first_key)
+        self.assertIsNone(cache.get(get_namespaced_cache_key(namespace, "first")))
+        self.assertIsNone(cache.get(get_namespaced_cache_key(namespace, "second")))
+
+    def test_purchase_expire_cache_without_keyspace_scan(self):
+        purchase = Purchase(id=1, organization_id=1001)
+        non_group_total_key = get_customer_non_group_order_amount_cache_key(1001, "2023-10-25")
+        coupon_key = get_customer_delivery_coupon_availability_cache_key(1001, "2023-10-25")
+        other_org_key = get_customer_non_group_order_amount_cache_key(1002, "2023-10-25")
+        cache.set_many({non_group_total_key: 1500, coupon_key: True, other_org_key: 700})
+
+        purchase.expire_cache(celery=False)
+
+        self.assertIsNone(
+            cache.get(get_customer_non_group_order_amount_cache_key(1001, "2023-10-25"))
+        )
+        self.assertIsNone(
+            cache.get(get_customer_delivery_coupon_availability_cache_key(1001, "2023-10-25"))
+        )
+        # Other organizations are not affected
+        self.assertEqual(
+            cache.get(get_customer_non_group_order_amount_cache_key(1002, "2023-10-25")),
+            700
+        )
+
+    def test_qs_count_serial_and_permission_expiry_without_keyspace_scan(self):
+        delete_qs_count_cache(Purchase)
+        Organization(id=1001).expire_serial_cache()
+
+        person = Person(id=2001, organization_id=1001)
+        namespace = get_permission_cache_namespace(person.id)
+        generation = get_cache_namespace_generation(namespace)
+        person.delete_permission_cache()
+        self.assertGreater(get_cache_namespace_generation(namespace), generation)
@@ -0,0 +1,33 @@
+import os
+
+from django.urls import reverse
+
+from common.fragment_cache import get_fragment_cache_stats
+from common.local_cache import auth_user_local_cache
+from common.test_case import OmisTestCase
+
+
+class CacheStatsAPITest(OmisTestCase):
+    url = reverse('cache-stats')
+
+    def test_cache_stats_of_the_serving_worker(self):
+        request = self.client.get(self.url)
+        self.assertPermissionDenied(request)
+
+        login = self.client.login(phone=self.user.phone, password='testpass')
+        self.assertTrue(login)
+        request = self.client.get(self.url)
+        self.assertPermissionDenied(request)
+        self.client.logout()
+
+        login = self.client.login(phone=self.admin_user.phone, password='testpass')
+        self.assertTrue(login)
+        request = self.client.get(self.url)
+        self.assertSuccess(request)
+        self.assertEqual(request.data['pid'], os.getpid())
+        self.assertEqual(
+            request.data['local_caches'][auth_user_local_cache.name].keys(),
+            auth_user_local_cache.stats().keys()
+        )
+        self.assertEqual(request.data['fragment_caches'], get_fragment_cache_stats())
+        self.client.logout()
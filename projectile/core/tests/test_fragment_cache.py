@@ -0,0 +1,87 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from common.fragment_cache import (
+    expire_model_fragments,
+    get_fragment_cache_stats,
+    get_fragment_key,
+    get_or_build_fragments,
+    reset_fragment_cache_stats,
+)
+from pharmacy.models import Stock
+
+BASE_KEY = "test_fragment_cache_stock"
+
+
+def serialize(pks):
+    return {pk: {"id": pk, "rate": Decimal("12.50")} for pk in pks}
+
+
+class FragmentCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        reset_fragment_cache_stats()
+        self.pks = list(range(1, 26))
+        cache.delete_many([get_fragment_key(BASE_KEY, pk) for pk in self.pks])
+
+    def test_misses_written_back_for_any_page_size(self):
+        build_missing = mock.Mock(side_effect=serialize)
+
+        first = get_or_build_fragments(Stock, BASE_KEY, self.pks, build_missing)
+        second = get_or_build_fragments(Stock, BASE_KEY, self.pks, build_missing)
+
+        build_missing.assert_called_once_with(self.pks)
+        self.assertEqual([item["id"] for item in second], self.pks)
+        self.assertEqual(second[0]["rate"], 12.5)
+        self.assertEqual(len(first), len(second))
+        stats = get_fragment_cache_stats()[BASE_KEY]
+        self.assertEqual(stats["hits"], 25)
+        self.assertEqual(stats["misses"], 25)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+        self.assertGreater(stats["bytes_saved"], 0)
+
+    def test_only_missing_objects_built(self):
+        get_or_build_fragments(Stock, BASE_KEY, self.pks[:10], serialize)
+        cache.delete(get_fragment_key(BASE_KEY, 3))
+        build_missing = mock.Mock(side_effect=lambda pks: serialize([pk for pk in pks if pk != 20]))
+
+        response = get_or_build_fragments(Stock, BASE_KEY, self.pks, build_missing)
+
+        self.assertEqual(build_missing.call_args.args[0], [3] + self.pks[10:])
+        # Objects which can't be built any more are left out
+        self.assertEqual([item["id"] for item in response], [pk for pk in self.pks if pk != 20])
+
+    def test_expire_model_fragments(self):
+        get_or_build_fragments(Stock, BASE_KEY, self.pks, serialize)
+        expire_model_fragments(Stock)
+        build_missing = mock.Mock(side_effect=serialize)
+
+        get_or_build_fragments(Stock, BASE_KEY, self.pks, build_missing)
+
+        build_missing.assert_called_once_with(self.pks)
+        self.assertEqual(get_fragment_cache_stats()[BASE_KEY]["stale"], 25)
+
+    def test_pickled_value_is_a_miss(self):
+        cache.set(get_fragment_key(BASE_KEY, 1), {"id": 1, "rate": "old"})
+        build_missing = mock.Mock(side_effect=serialize)
+
+        response = get_or_build_fragments(Stock, BASE_KEY, [1], build_missing)
+
+        build_missing.assert_called_once_with([1])
+        self.assertEqual(response, [{"id": 1, "rate": Decimal("12.50")}])
+
+    def test_unencodable_fragment_served_not_cached(self):
+        def build_missing(pks):
+            data = serialize(pks)
+            data[2]["rate"] = object()
+            return data
+
+        response = get_or_build_fragments(Stock, BASE_KEY, [1, 2], build_missing)
+
+        self.assertEqual([item["id"] for item in response], [1, 2])
+        self.assertIsNotNone(cache.get(get_fragment_key(BASE_KEY, 1)))
+        self.assertIsNone(cache.get(get_fragment_key(BASE_KEY, 2)))
+        self.assertEqual(get_fragment_cache_stats()[BASE_KEY]["writes"], 1)
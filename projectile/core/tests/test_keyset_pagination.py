@@ -0,0 +1,73 @@
+import datetime
+from urllib.parse import parse_qsl, urlparse
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.pagination import (
+    KeysetPagination,
+    decode_keyset_cursor,
+    encode_keyset_cursor,
+    get_keyset_filter,
+)
+from common.test_case import OmisTestCase
+from core.models import Person
+
+
+class KeysetCursorTest(SimpleTestCase):
+
+    def test_cursor_round_trip(self):
+        date = datetime.date(2024, 1, 31)
+        cursor = encode_keyset_cursor([date, 42], reverse=True)
+        self.assertEqual(decode_keyset_cursor(cursor), (["2024-01-31", 42], True))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(NotFound):
+            decode_keyset_cursor("not-a-cursor")
+
+    def test_keyset_filter(self):
+        self.assertEqual(
+            str(get_keyset_filter(('-date', '-id'), ['2024-01-31', 42])),
+            "(OR: ('date__lt', '2024-01-31'), (AND: ('date', '2024-01-31'), ('id__lt', 42)))"
+        )
+        self.assertEqual(
+            str(get_keyset_filter(('-id',), [42], reverse=True)),
+            "(AND: ('id__gt', 42))"
+        )
+
+
+class KeysetView:
+    keyset_ordering = ('-created_at', '-pk')
+
+
+class KeysetPaginationTest(OmisTestCase):
+
+    def paginate(self, params):
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get('/api/v1/persons/', params))
+        results = paginator.paginate_queryset(Person.objects.all(), request, view=KeysetView)
+        return paginator.get_paginated_response([person.pk for person in results]).data
+
+    def get_params(self, url):
+        return dict(parse_qsl(urlparse(url).query))
+
+    def test_pages_follow_the_keyset_ordering(self):
+        expected = list(Person.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        pages = []
+        response = self.paginate({'pagination': 'keyset', 'page_size': 2})
+        self.assertIsNone(response['previous'])
+        self.assertNotIn('count', response)
+        pages.append(response['results'])
+        while response['next']:
+            response = self.paginate(self.get_params(response['next']))
+            pages.append(response['results'])
+        self.assertEqual(sum(pages, []), expected)
+
+        previous_page = self.paginate(self.get_params(response['previous']))
+        self.assertEqual(previous_page['results'], pages[-2])
+
+    def test_page_number_without_keyset(self):
+        response = self.paginate({'page': 1})
+        self.assertEqual(response['count'], Person.objects.count())
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from common.cache_helpers import get_cache_namespace_generation
+from common.local_cache import LocalCache
+
+
+@override_settings(LOCAL_CACHE_ENABLED=True)
+class LocalCacheTest(SimpleTestCase):
+
+    def test_get_or_set_loads_once(self):
+        local_cache = LocalCache("test-get-or-set", generation_check_interval=60)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return {"value": 1}
+
+        self.assertEqual(local_cache.get_or_set("key", loader), {"value": 1})
+        self.assertEqual(local_cache.get_or_set("key", loader), {"value": 1})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(local_cache.stats()["hits"], 1)
+
+    def test_lru_eviction(self):
+        local_cache = LocalCache("test-eviction", max_size=2, generation_check_interval=60)
+        local_cache.set("first", 1)
+        local_cache.set("second", 2)
+        local_cache.get("first")
+        local_cache.set("third", 3)
+        self.assertIsNone(local_cache.get("second"))
+        self.assertEqual(local_cache.get("first"), 1)
+        self.assertEqual(local_cache.stats()["evictions"], 1)
+
+    def test_generation_bump_clears_other_processes(self):
+        local_cache = LocalCache("test-generation", generation_check_interval=0)
+        # Same namespace, like the same cache in another worker process
+        other_worker_cache = LocalCache("test-generation", generation_check_interval=0)
+        local_cache.set("key", "value")
+        self.assertEqual(local_cache.get("key"), "value")
+
+        other_worker_cache.expire()
+
+        self.assertIsNone(local_cache.get("key"))
+
+    def test_expire_key_drops_only_the_key_in_other_processes(self):
+        local_cache = LocalCache("test-expire-key", generation_check_interval=0)
+        other_worker_cache = LocalCache("test-expire-key", generation_check_interval=0)
+        local_cache.set("key", "value")
+        local_cache.set("other", "value")
+
+        other_worker_cache.expire_key("key")
+
+        self.assertIsNone(local_cache.get("key"))
+        self.assertEqual(local_cache.get("other"), "value")
+        self.assertEqual(local_cache.stats()["key_invalidations"], 1)
+        self.assertEqual(local_cache.stats()["invalidations"], 0)
+
+    def test_unknown_expired_keys_clear_other_processes(self):
+        local_cache = LocalCache("test-expire-key-lost", generation_check_interval=0)
+        other_worker_cache = LocalCache("test-expire-key-lost", generation_check_interval=0)
+        local_cache.set("key", "value")
+        local_cache.set("other", "value")
+
+        other_worker_cache.expire_key("key")
+        generation = get_cache_namespace_generation(local_cache.namespace)
+        cache.delete(local_cache.get_expired_key_cache_key(generation))
+
+        self.assertIsNone(local_cache.get("other"))
+        self.assertEqual(local_cache.stats()["invalidations"], 1)
+
+    @override_settings(LOCAL_CACHE_ENABLED=False)
+    def test_disabled(self):
+        local_cache = LocalCache("test-disabled")
+        local_cache.set("key", "value")
+        self.assertIsNone(local_cache.get("key"))
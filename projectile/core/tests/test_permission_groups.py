@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.enums import PersonGroupType
+from core.permissions import (
+    CheckAnyPermission,
+    StaffIsAccountant,
+    StaffIsDeliveryMan,
+    StaffIsLaboratoryInCharge,
+    StaffIsMonitor,
+    StaffIsNurse,
+    StaffIsPhysician,
+    StaffIsReceptionist,
+    StaffIsSalesman,
+)
+from core.tests import (
+    GroupPermissionFactory,
+    PersonOrganizationFactory,
+    PersonOrganizationGroupPermissionFactory,
+)
+
+
+class StaffListView:
+    available_permission_classes = (
+        StaffIsPhysician,
+        StaffIsNurse,
+        StaffIsLaboratoryInCharge,
+        StaffIsReceptionist,
+        StaffIsMonitor,
+        StaffIsDeliveryMan,
+        StaffIsAccountant,
+        StaffIsSalesman,
+    )
+
+
+class PermissionGroupNamesTest(TestCase):
+
+    def setUp(self):
+        self.person_organization = PersonOrganizationFactory(person_group=PersonGroupType.EMPLOYEE)
+        self.person = self.person_organization.person
+        self.person.organization_id = self.person_organization.organization_id
+        self.person.delete_permission_cache()
+        PersonOrganizationGroupPermissionFactory(
+            person_organization=self.person_organization,
+            permission=GroupPermissionFactory(name='Salesman'),
+        )
+
+    def get_request(self):
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.person
+        return request
+
+    def test_group_names_loaded_once_per_request(self):
+        # Warm the cache
+        self.assertEqual(self.person.get_permission_group_names(), frozenset(['Salesman']))
+
+        with mock.patch.object(cache, 'get', wraps=cache.get) as cache_get, \
+                mock.patch.object(cache, 'get_many', wraps=cache.get_many) as cache_get_many:
+            self.assertTrue(CheckAnyPermission().has_permission(self.get_request(), StaffListView()))
+
+        cache_get.assert_not_called()
+        self.assertEqual(cache_get_many.call_count, 1)
+
+    def test_group_permission_change_invalidates_group_names(self):
+        self.assertFalse(self.person.does_belongs_to_group_or_admin('Accounts'))
+
+        group_permission = PersonOrganizationGroupPermissionFactory(
+            person_organization=self.person_organization,
+            permission=GroupPermissionFactory(name='Accounts'),
+        )
+        self.assertTrue(self.person.does_belongs_to_group_or_admin('Accounts'))
+
+        group_permission.delete()
+        self.assertFalse(self.person.does_belongs_to_group_or_admin('Accounts'))
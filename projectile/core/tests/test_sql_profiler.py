@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase
+
+from core.sql_profiler import QueryProfile, ViewSQLStats, get_fingerprint
+
+
+def execute(sql, params, many, context):
+    return None
+
+
+class SQLProfilerTest(SimpleTestCase):
+
+    def test_fingerprint_collapses_in_lists(self):
+        self.assertEqual(
+            get_fingerprint('SELECT "id" FROM "stock" WHERE "id" IN (%s, %s, %s)'),
+            get_fingerprint('SELECT "id" FROM "stock" WHERE "id" IN (%s)'),
+        )
+
+    def test_profile_counts_repeated_queries(self):
+        profile = QueryProfile()
+        for _ in range(3):
+            profile(execute, 'SELECT "id" FROM "stock" WHERE "product_id" = %s', [1], False, {})
+        profile(execute, 'SELECT "id" FROM "stock" WHERE "id" IN (%s, %s)', [1, 2], False, {})
+        profile(execute, 'SELECT "id" FROM "stock" WHERE "id" IN (%s)', [3], False, {})
+        profile(execute, 'SELECT "id" FROM "product"', [], False, {})
+
+        self.assertEqual(profile.queries, 6)
+        self.assertEqual(profile.duplicate_queries, 3)
+
+    def test_view_stats_aggregate_requests(self):
+        stats = ViewSQLStats()
+        profile = QueryProfile()
+        for _ in range(12):
+            profile(execute, 'SELECT 1', [], False, {})
+        stats.add("pharmacy.views.CartList", profile, 0.03)
+        stats.add("pharmacy.views.CartList", QueryProfile(), 0.001)
+
+        counters = stats.pop()["pharmacy.views.CartList"]
+        self.assertEqual(counters["requests"], 2)
+        self.assertEqual(counters["queries"], 12)
+        self.assertEqual(counters["duplicate_queries"], 11)
+        self.assertEqual(counters["requests_with_duplicates"], 1)
+        # 12 queries are in the bucket up to 20, no query in the first bucket
+        self.assertEqual(counters["queries_bucket_4"], 1)
+        self.assertEqual(counters["queries_bucket_0"], 1)
+        self.assertEqual(stats.pop(), {})
@@ -2,7 +2,7 @@
 from django.urls import re_path
 
 from django.urls import path, include
-from ..views.common import CountryList, DateFormatList, DeliveryAreaList
+from ..views.common import CacheStats, CountryList, DateFormatList, DeliveryAreaList
 from ..views.organizations import DistributorBuyerOrganizationMerge
 from ..views import public
 from ..views.organization import OrganizationPossiblePrimaryResponsiblePerson
@@ -32,6 +32,7 @@ urlpatterns = [
     re_path(r"^country/$", CountryList.as_view(), name="country-list"),
     re_path(r"^date-format/$", DateFormatList.as_view(), name="date_format-list"),
     re_path(r"^areas/$", DeliveryAreaList.as_view(), name="delivery-area-list"),
+    re_path(r"^cache-stats/$", CacheStats.as_view(), name="cache-stats"),
     re_path(
         r"^buyer-organization/merge/$",
         DistributorBuyerOrganizationMerge.as_view(),
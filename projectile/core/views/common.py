@@ -1,3 +1,5 @@
+import os
+
 from rest_framework import generics, status
 from rest_framework.response import Response
 
@@ -43,6 +45,27 @@ class DateFormatList(generics.ListAPIView):
     def get_queryset(self):
         return get_date_format_list()
 
+class CacheStats(APIView):
+    """
+    Hit / miss counters of the local (L1) caches and of the list fragment caches of the
+    worker process serving the request, call it several times to see the other workers
+    """
+    permission_classes = (IsSuperUser,)
+
+    def get(self, request):
+        from common.fragment_cache import get_fragment_cache_stats
+        from common.local_cache import get_local_cache_stats
+
+        return Response(
+            {
+                "pid": os.getpid(),
+                "local_caches": get_local_cache_stats(),
+                "fragment_caches": get_fragment_cache_stats(),
+            },
+            status=status.HTTP_200_OK
+        )
+
+
 class DeliveryAreaList(APIView):
 
     permission_classes = ()
@@ -1,5 +1,4 @@
 from validator_collection import checkers
-from django.core.cache import cache
 from rest_framework.generics import (
     ListAPIView,
     CreateAPIView,
@@ -9,7 +8,7 @@ from rest_framework.generics import (
 from common.enums import (
     Status,
 )
-from common.tasks import bulk_cache_write
+from common.fragment_cache import get_or_build_fragments
 from common.helpers import pk_extractor
 from common.pagination import CustomPagination
 # from common.utils import create_cache_key_name
@@ -188,50 +187,21 @@ class ListCreateAPICustomView(ListCreateAPIView):
         if page is not None:
             # finding every items pk
             objects_pk = pk_extractor(page)
-
-            cache_key_list = ["{}_{}".format(base_key, str(item).zfill(12)) for item in objects_pk]
-
-            cached_data = cache.get_many(cache_key_list)
-
-            if len(cached_data) < 20:
-
-                missing_key_data = []
-                for index, item in  enumerate(cache_key_list):
-                    if item not in cached_data:
-                        missing_key_data.append(objects_pk[index])
-                if missing_key_data:
-
-                    missing_data_queryset = self.get_serializer().Meta.model().get_queryset_for_cache(
-                        missing_key_data, request=request)
-
-                    new_cached_data = {}
-
-                    for each_missing_item in missing_data_queryset:
-                        missing_key = "{}_{}".format(base_key, str(each_missing_item.id).zfill(12))
-                        serializer = self.get_serializer_class()(
-                            'json',
-                            [each_missing_item],
-                            many=True
-                        )
-                        serializer.is_valid()
-                        new_cached_data.update({missing_key : serializer.data[0]})
-
-                    bulk_cache_write.apply_async(
-                        (new_cached_data,),
-                        countdown=5,
-                        retry=True, retry_policy={
-                            'max_retries': 10,
-                            'interval_start': 0,
-                            'interval_step': 0.2,
-                            'interval_max': 0.2,
-                        }
+            model = self.get_serializer().Meta.model
+
+            def serialize_missing(missing_pks):
+                serialized = {}
+                for each_missing_item in model().get_queryset_for_cache(missing_pks, request=request):
+                    serializer = self.get_serializer_class()(
+                        'json',
+                        [each_missing_item],
+                        many=True
                     )
-                    cached_data.update(new_cached_data)
-
+                    serializer.is_valid()
+                    serialized[each_missing_item.id] = serializer.data[0]
+                return serialized
 
-            for index, item in enumerate(objects_pk):
-                key = "{}_{}".format(base_key, str(item).zfill(12))
-                response.append(cached_data[key])
+            response = get_or_build_fragments(model, base_key, objects_pk, serialize_missing)
 
             if response_only:
                 return response
@@ -1,20 +1,23 @@
-import os
+import io
+import re
+from base64 import b64encode
 from collections import OrderedDict, defaultdict
+from functools import lru_cache
 from itertools import chain
-from pathlib import Path
 from decimal import Decimal
 from datetime import datetime
 import pytz
 import pandas as pd
 import barcode
-from barcode.writer import ImageWriter
+import billiard
+from barcode.writer import SVGWriter
 from jinja2 import Environment, FileSystemLoader
 from weasyprint import HTML
 from PyPDF2 import PdfMerger, PdfReader
 
 from django.db.models import Prefetch
 from django.conf import settings
-from django.core.files import File
+from django.core.files.base import ContentFile
 from common.enums import Status
 from common.healthos_helpers import HealthOSHelper
 from core.models import Organization
@@ -32,6 +35,9 @@ from projectile.celery import app
 
 health_os_helper = HealthOSHelper()
 
+INVOICE_TEMPLATE_NAME = 'templates/html/invoice.html'
+MM_TO_PX = 96 / 25.4
+
 
 def svg_embed(html):
     from base64 import b64encode
@@ -89,14 +95,23 @@ def get_invoice_stamp(date, delivery_date):
     return ""
 
 def create_barcode_image(invoice_id):
+    """Return the barcode of the invoice as an in memory SVG data URI"""
     string = f"* G-{invoice_id} *"
-    source = os.path.join(settings.REPO_DIR, "projectile")
-    dest = os.path.join(settings.REPO_DIR, "assets")
-    code128 = barcode.get('code128', str(string), writer=ImageWriter())
-    file = f"{dest}/{invoice_id}"
-    filename = code128.save(file)
-    # os.replace(f"{source}/{filename}", f"{dest}/{filename}")
-    return filename
+    rv = io.BytesIO()
+    barcode.get('code128', string, writer=SVGWriter()).write(rv)
+    svg = rv.getvalue().decode("utf-8")
+
+    # Add a viewBox so the barcode is stretched to the image box like the previous PNG
+    def add_view_box(match):
+        width, height = float(match.group(1)), float(match.group(2))
+        return (
+            f'{match.group(0)} viewBox="0 0 {width * MM_TO_PX:.3f} {height * MM_TO_PX:.3f}" '
+            'preserveAspectRatio="none"'
+        )
+
+    svg = re.sub(r'width="([\d.]+)mm" height="([\d.]+)mm"', add_view_box, svg, count=1)
+    encoded = b64encode(svg.encode("utf-8")).decode()
+    return f"data:image/svg+xml;base64,{encoded}"
 
 def to_barcode(string):
     import barcode
@@ -118,26 +133,78 @@ def to_barcode(string):
     svg = rv.read()
     return svg.decode("utf-8")
 
-def create_pdf(invoice_data):
-    """Create PDF"""
-    template_name = 'templates/html/invoice.html'
-    invoice_id = invoice_data.get("id")
-    outfile = f"{invoice_id}.pdf"
-    template_vars = invoice_data
-    env = Environment(loader=FileSystemLoader('.'))
+@lru_cache(maxsize=None)
+def get_invoice_template():
+    """Compile the invoice template once per process"""
+    env = Environment(loader=FileSystemLoader(settings.BASE_DIR), auto_reload=False)
     env.filters['to_barcode'] = to_barcode
-    template = env.get_template(template_name)
-    html_out = template.render(template_vars)
-    pdf = makepdf(html_out)
-    Path(outfile).write_bytes(pdf)
-    return outfile
+    return env.get_template(INVOICE_TEMPLATE_NAME)
+
+def render_invoice_pdf(invoice_data):
+    """Render the invoice context and return the PDF as bytes"""
+    html_out = get_invoice_template().render(invoice_data)
+    return makepdf(html_out)
+
+def render_invoice_pdfs(contexts, processes=None):
+    """
+    Render the invoices across a process pool
+
+    Args:
+        contexts (list): template context of the invoices
+        processes (int, optional): number of render processes,
+            defaults to `settings.INVOICE_PDF_RENDER_PROCESSES`
+
+    Yields:
+        tuple: (invoice id, PDF bytes) in the order of the contexts
+    """
+    processes = min(processes or settings.INVOICE_PDF_RENDER_PROCESSES, len(contexts))
+    # Compile before forking so every render process inherits the template
+    get_invoice_template()
+    if processes <= 1:
+        for context in contexts:
+            yield context["id"], render_invoice_pdf(context)
+        return
+    # billiard (unlike multiprocessing) can start a pool inside a celery prefork worker
+    with billiard.Pool(processes=processes) as pool:
+        chunksize = max(1, len(contexts) // (processes * 4))
+        pdfs = pool.imap(render_invoice_pdf, contexts, chunksize=chunksize)
+        for context, pdf in zip(contexts, pdfs):
+            yield context["id"], pdf
+
+def merge_invoice_pdfs(pdfs, repeat):
+    """
+    Merge the PDFs in memory
+
+    Args:
+        pdfs (list): PDF bytes of the invoices
+        repeat (int): number of copies of each invoice
+
+    Returns:
+        tuple: (merged PDF bytes, page count)
+    """
+    merger = PdfMerger()
+    for pdf in pdfs:
+        for _ in range(repeat):
+            merger.append(io.BytesIO(pdf))
+    output = io.BytesIO()
+    merger.write(output)
+    merger.close()
+    page_count = len(PdfReader(output).pages)
+    return output.getvalue(), page_count
 
 def get_queryset(invoice_ids):
+    # The stock of an item is rendered from its catalog projection, see `pharmacy.catalog`
     order_items = StockIOLog.objects.filter(
         status=Status.DISTRIBUTOR_ORDER,
-    ).select_related(
-        'stock__product__form',
-        'stock__product__compartment',
+    ).only(
+        'id',
+        'stock',
+        'quantity',
+        'rate',
+        'discount_total',
+        'round_discount',
+        'discount_rate',
+        'purchase_id',
     )
     order_filters = {
         "status": Status.DISTRIBUTOR_ORDER,
@@ -177,9 +244,21 @@ def get_queryset(invoice_ids):
 
 def serialize_data(queryset):
     from ecommerce.serializers.order_invoice_group import OrderInvoiceGroupModelSerializer
+    from pharmacy.catalog import preload_stock_catalog
+
+    invoice_groups = list(queryset)
+    # The stocks of all the invoices are read from the catalog at once
+    context = {}
+    preload_stock_catalog(context, [
+        item.stock_id
+        for invoice_group in invoice_groups
+        for order in invoice_group.orders.all()
+        for item in order.stock_io_logs.all()
+    ])
     return OrderInvoiceGroupModelSerializer.DetailsForPDF(
-        queryset,
-        many=True
+        invoice_groups,
+        many=True,
+        context=context
     ).data
 
 def prepare_person_data(person_data):
@@ -322,60 +401,32 @@ def prepare_invoice_data(invoice_data):
     )
     return invoice_data
 
-def store_invoice_pdf_group(file, invoice_ids, repeat, delivery_date, area):
-
-    with open(file, 'rb') as fi:
-        outfile = File(fi, name=os.path.basename(fi.name))
-        pdf_reader = PdfReader(fi)
-        page_count = len(pdf_reader.pages)
-        InvoicePdfGroup.objects.get_or_create(
-            defaults={"content": outfile},
-            status=Status.ACTIVE,
-            repeat=repeat,
-            page_count=page_count,
-            invoice_count=len(invoice_ids),
-            delivery_date=delivery_date,
-            invoice_groups=invoice_ids,
-            area_id=area
-        )
-        if Path(file).is_file():
-            os.remove(file)
-
-def merge_pdf(invoice_ids, outfile_name, repeat, delivery_date, area):
-    # source = os.path.join(settings.REPO_DIR, "projectile")
-    # dest = os.path.join(settings.REPO_DIR, "assets")
-    merger = PdfMerger()
-    output_file = outfile_name
-
-    for invoice_id in invoice_ids:
-        pdf = f"{invoice_id}.pdf"
-        if Path(pdf).is_file():
-            for _ in range(repeat):
-                merger.append(pdf)
-
-    merger.write(output_file)
-    merger.close()
-
-    store_invoice_pdf_group(
-        output_file,
-        invoice_ids,
-        repeat,
-        delivery_date,
-        area
+def store_invoice_pdf_group(content, name, page_count, invoice_ids, repeat, delivery_date, area):
+    InvoicePdfGroup.objects.get_or_create(
+        defaults={"content": ContentFile(content, name=name)},
+        status=Status.ACTIVE,
+        repeat=repeat,
+        page_count=page_count,
+        invoice_count=len(invoice_ids),
+        delivery_date=delivery_date,
+        invoice_groups=invoice_ids,
+        area_id=area
     )
 
-def store_file(file, invoice_id, entry_by_id=None):
-    with open(file, 'rb') as fi:
-        outfile = File(fi, name=os.path.basename(fi.name))
-        obj, created = InvoiceGroupPdf.objects.get_or_create(
-            defaults={"content": outfile, "invoice_group_id": invoice_id, "entry_by_id": entry_by_id},
-            # content=outfile,
-            status=Status.ACTIVE,
-            invoice_group_id=invoice_id,
-            entry_by_id=entry_by_id
-        )
+def store_file(content, invoice_id, entry_by_id=None):
+    InvoiceGroupPdf.objects.get_or_create(
+        defaults={
+            "content": ContentFile(content, name=f"{invoice_id}.pdf"),
+            "invoice_group_id": invoice_id,
+            "entry_by_id": entry_by_id
+        },
+        status=Status.ACTIVE,
+        invoice_group_id=invoice_id,
+        entry_by_id=entry_by_id
+    )
 
-def prepare_invoice_group_context(invoice_ids, delivery_date, area):
+def prepare_invoice_contexts(invoice_ids):
+    """Return the template context of every valid invoice group in the delivery order"""
     org_fields_to_be_fetched = [
         "name",
         "email",
@@ -397,40 +448,47 @@ def prepare_invoice_group_context(invoice_ids, delivery_date, area):
         "-pk"
     )
     serialized_data = serialize_data(queryset=invoice_qs)
-    # destination where the temp files will be created
-    dest = os.path.join(settings.REPO_DIR, "assets")
-    valid_invoice_id_list = []
+    contexts = []
     for data in serialized_data:
-        invoice_id = data.get("id")
-        valid_invoice_id_list.append(invoice_id)
-        context = {
+        contexts.append({
             "organization": organization_info,
             "header_title": "Invoice",
             "timestamp": get_invoice_stamp(
                 data.get("date"),
                 data.get("delivery_date")
             ),
-            "barcode": create_barcode_image(invoice_id),
+            "barcode": create_barcode_image(data.get("id")),
             **prepare_invoice_data(data)
-        }
-        file = create_pdf(invoice_data=context)
+        })
+    return contexts
+
+def prepare_invoice_group_context(invoice_ids, delivery_date, area):
+    contexts = prepare_invoice_contexts(invoice_ids)
+    if not contexts:
+        return
+    valid_invoice_id_list = []
+    pdfs = []
+    for invoice_id, pdf in render_invoice_pdfs(contexts):
         store_file(
-            file,
+            pdf,
             invoice_id,
             entry_by_id=None
         )
+        valid_invoice_id_list.append(invoice_id)
+        pdfs.append(pdf)
     # Create a new pdf with merging all pdfs and store it
     repeat = 2
     out_file_name = f"{delivery_date}:{valid_invoice_id_list[0]}-{valid_invoice_id_list[-1]}.pdf"
-    merge_pdf(valid_invoice_id_list, out_file_name, repeat, delivery_date, area)
-    # Remove Pdfs and barcodes
-    for invoice_id in valid_invoice_id_list:
-        pdf = f"{invoice_id}.pdf"
-        if Path(pdf).is_file():
-            os.remove(pdf)
-
-        if Path(f"{dest}/{invoice_id}.png").is_file():
-            os.remove(f"{dest}/{invoice_id}.png")
+    content, page_count = merge_invoice_pdfs(pdfs, repeat)
+    store_invoice_pdf_group(
+        content,
+        out_file_name,
+        page_count,
+        valid_invoice_id_list,
+        repeat,
+        delivery_date,
+        area
+    )
 
 @app.task(autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=5, max_retries=10)
 def create_invoice_pdf_lazy(invoice_ids, delivery_date, area):
@@ -455,11 +513,6 @@ def create_invoice_pdf_chunk_lazy(invoice_ids, delivery_date):
         )
         index = new_index
 
-def get_area_key_for_invoice(invoice_id):
-    invoice = OrderInvoiceGroup.objects.get(id=invoice_id)
-    area = invoice.order_by_organization.area.id
-    return area
-
 def create_invoice_pdf_on_invoice_group_create_lazy(invoice_ids, delivery_date):
     # This method will first the re order invoice not create pdf yet and merge the ids with new group for creating invoice pdf
     invoice_pdf_group = InvoicePdfGroup.objects.filter(
@@ -492,14 +545,11 @@ def create_invoice_pdf_on_invoice_group_create_lazy(invoice_ids, delivery_date):
         "order_by_organization__delivery_thana",
         "order_by_organization__delivery_sub_area",
         "-pk",
-    ).values_list("pk", flat=True)
-
-    final_invoice_id_list = list(sorted_invoice_ids)
+    ).values_list("pk", "order_by_organization__area_id")
 
     # Grouping invoice IDs by area
     invoices_by_area = defaultdict(list)
-    for invoice_id in final_invoice_id_list:
-        area_key = get_area_key_for_invoice(invoice_id)
+    for invoice_id, area_key in sorted_invoice_ids:
         invoices_by_area[area_key].append(invoice_id)
 
     # Processing each area separately
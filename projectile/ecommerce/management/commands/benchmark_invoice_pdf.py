@@ -0,0 +1,111 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import barcode
+from barcode.writer import ImageWriter
+from jinja2 import Environment, FileSystemLoader
+from PyPDF2 import PdfMerger
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from common.enums import Status
+from ecommerce.invoice_pdf_helpers import (
+    INVOICE_TEMPLATE_NAME,
+    makepdf,
+    merge_invoice_pdfs,
+    prepare_invoice_contexts,
+    render_invoice_pdfs,
+    to_barcode,
+)
+from ecommerce.models import OrderInvoiceGroup
+
+
+def legacy_render_and_merge(contexts, directory, repeat):
+    """The file based rendering previously used for invoice groups, kept for comparison"""
+    files = []
+    for context in contexts:
+        invoice_id = context["id"]
+        code128 = barcode.get('code128', f"* G-{invoice_id} *", writer=ImageWriter())
+        context = {**context, "barcode": code128.save(os.path.join(directory, str(invoice_id)))}
+        env = Environment(loader=FileSystemLoader(settings.BASE_DIR))
+        env.filters['to_barcode'] = to_barcode
+        template = env.get_template(INVOICE_TEMPLATE_NAME)
+        outfile = os.path.join(directory, f"{invoice_id}.pdf")
+        Path(outfile).write_bytes(makepdf(template.render(context)))
+        files.append(outfile)
+    merger = PdfMerger()
+    for file in files:
+        for _ in range(repeat):
+            merger.append(file)
+    merger.write(os.path.join(directory, "merged.pdf"))
+    merger.close()
+
+
+def pipeline_render_and_merge(contexts, processes, repeat):
+    pdfs = [pdf for _invoice_id, pdf in render_invoice_pdfs(contexts, processes=processes)]
+    merge_invoice_pdfs(pdfs, repeat)
+
+
+class Command(BaseCommand):
+    help = "Benchmark rendering and merging invoice group PDFs against the previous file based rendering"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delivery-date',
+            dest='delivery_date',
+            help='Render the invoice groups of this delivery date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--limit',
+            dest='limit',
+            type=int,
+            default=200,
+            help='Number of invoice groups to render',
+        )
+        parser.add_argument(
+            '--processes',
+            dest='processes',
+            type=int,
+            default=settings.INVOICE_PDF_RENDER_PROCESSES,
+            help='Number of render processes of the pipeline',
+        )
+        parser.add_argument(
+            '--skip-legacy',
+            dest='skip_legacy',
+            action='store_true',
+            help='Only run the pipeline',
+        )
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(
+            f"{label:<24} {count} invoices in {elapsed:.2f}s "
+            f"({count / elapsed:.1f} invoices/sec, ~{elapsed / count * 2000 / 60:.1f} min for 2000)"
+        )
+
+    def handle(self, *args, **options):
+        repeat = 2
+        invoice_groups = OrderInvoiceGroup.objects.filter(
+            status=Status.ACTIVE,
+        ).order_by('-pk')
+        if options['delivery_date']:
+            invoice_groups = invoice_groups.filter(delivery_date=options['delivery_date'])
+        invoice_ids = list(invoice_groups.values_list('pk', flat=True)[:options['limit']])
+
+        start = time.perf_counter()
+        contexts = prepare_invoice_contexts(invoice_ids)
+        if not contexts:
+            self.stdout.write("No invoice group found to render")
+            return
+        self.report("prepare context", len(contexts), time.perf_counter() - start)
+
+        if not options['skip_legacy']:
+            with tempfile.TemporaryDirectory() as directory:
+                start = time.perf_counter()
+                legacy_render_and_merge(contexts, directory, repeat)
+                self.report("file based", len(contexts), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        pipeline_render_and_merge(contexts, options['processes'], repeat)
+        self.report(f"pipeline ({options['processes']} proc)", len(contexts), time.perf_counter() - start)
@@ -8,7 +8,7 @@ from tabulate import tabulate
 
 from django.db import models
 from django.utils.translation import gettext as _
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.db.models import Sum, Case, When, F, FloatField, Count, IntegerField, DecimalField, Q
 from django.db.models.functions import Coalesce, Cast
 from django.contrib.postgres.aggregates import ArrayAgg, JSONBAgg
@@ -37,6 +37,7 @@ from .signals import (
     pre_save_short_return_log,
     post_save_invoice_group_delivery_sheet,
     post_save_short_return_log,
+    refresh_sales_cube_of_short_return_item,
     store_old_instance_value,
 )
 
@@ -1065,6 +1066,8 @@ class TopSheetSubTopSheet(CreatedAtUpdatedAtBaseModelWithOrganization):
 
 pre_save.connect(store_old_instance_value, sender=OrderInvoiceGroup)
 pre_save.connect(pre_save_short_return_item, sender=ShortReturnItem)
+post_save.connect(refresh_sales_cube_of_short_return_item, sender=ShortReturnItem)
+post_delete.connect(refresh_sales_cube_of_short_return_item, sender=ShortReturnItem)
 pre_save.connect(pre_save_short_return_log, sender=ShortReturnLog)
 post_save.connect(post_save_short_return_log, sender=ShortReturnLog)
 post_save.connect(post_save_order_invoice_group, sender=OrderInvoiceGroup)
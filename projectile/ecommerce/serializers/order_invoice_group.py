@@ -23,10 +23,7 @@ from common.enums import Status
 from common.helpers import (
     custom_elastic_rebuild
 )
-from common.cache_keys import (
-    CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX,
-    CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX,
-)
+from common.cache_helpers import expire_customer_non_group_order_cache
 from common.healthos_helpers import HealthOSHelper, CustomerHelper
 from pharmacy.utils import (
     delete_order_list_from_cache,
@@ -57,6 +54,7 @@ from ecommerce.helpers import send_delayed_delivery_message_to_mm
 from ecommerce.utils import (
     is_last_batch_invoice_group,
 )
+from stats.sales_cube import request_sales_cube_refresh
 from ..models import OrderInvoiceGroup, ShortReturnLog, ShortReturnItem
 
 logger = logging.getLogger(__name__)
@@ -94,8 +92,9 @@ class OrderInvoiceGroupModelSerializerBase:
         class Meta:
             model = OrderInvoiceGroup
 
-        def delete_customer_non_group_order_amount_cache(self, keys):
-            cache.delete_many(keys)
+        def delete_customer_non_group_order_amount_cache(self, organization_ids):
+            for organization_id in set(organization_ids):
+                expire_customer_non_group_order_cache(organization_id)
 
         def populate_es_index(self, invoice_pk_list):
             _chunk_size = 30
@@ -158,7 +157,7 @@ class OrderInvoiceGroupModelSerializerBase:
                 orders = list(orders)
 
                 data_list = []
-                customer_non_group_order_amount_cache_keys = []
+                customer_organization_ids = []
                 invoice_group_pk_list = []
                 invoice_group_date_list = []
                 express_delivery_stock_id = os.environ.get('EXPRESS_DELIVERY_STOCK_ID', None)
@@ -166,10 +165,7 @@ class OrderInvoiceGroupModelSerializerBase:
                 new_delivery_date = get_next_valid_delivery_date(str(_delivery_date))
                 for order in orders:
                     # total order amount for a specific delivery cache and coupon already added cache needed to be expired
-                    customer_non_group_order_amount_cache_keys.extend([
-                        f"{CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX}_{order.get('organization')}_{_delivery_date}",
-                        f"{CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX}_{order.get('organization')}_{_delivery_date}"
-                    ])
+                    customer_organization_ids.append(order.get('organization'))
                     # Organization id for customer
                     customer_organization_id = order.get('organization')
                     # Calculate additional_dynamic_discount_percentage for invoice
@@ -210,6 +206,11 @@ class OrderInvoiceGroupModelSerializerBase:
                                     purchases_to_be_updated,
                                     ["updated_by", "updated_at", "tentative_delivery_date", "is_delayed"]
                                 )
+                                # The bulk update sends no signal, the cube rows move to the new date here
+                                request_sales_cube_refresh(
+                                    order_ids=list(purchases_ids),
+                                    customer_dates=[(_delivery_date, order.get('organization'))]
+                                )
                                 # new_delivery_date = str(_delivery_date + timedelta(days=1))
                                 organization_orders_str = ", ".join(list(map(lambda order: f"#{order}", purchases_ids)))
                                 title = "Delivery Date Updated"
@@ -311,7 +312,7 @@ class OrderInvoiceGroupModelSerializerBase:
                 self.populate_es_index(invoice_group_pk_list)
                 # delete customer non group order amount cache
                 self.delete_customer_non_group_order_amount_cache(
-                    customer_non_group_order_amount_cache_keys
+                    customer_organization_ids
                 )
                 return data_list
 
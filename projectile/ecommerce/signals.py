@@ -53,6 +53,13 @@ def pre_save_short_return_item(sender, instance, **kwargs):
             instance.stock.save(update_fields=['ecom_stock', 'orderable_stock',])
 
 
+def refresh_sales_cube_of_short_return_item(sender, instance, **kwargs):
+    # Roll up again the short / return quantities of the order line in the sales cube
+    from stats.sales_cube import request_sales_cube_refresh
+
+    request_sales_cube_refresh(stock_io_ids=[instance.stock_io_id])
+
+
 @transaction.atomic
 def pre_save_short_return_log(sender, instance, **kwargs):
     if not instance._state.adding:
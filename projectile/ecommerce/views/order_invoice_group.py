@@ -51,7 +51,7 @@ from common.utils import (
 )
 from common.enums import Status
 from common.cache_helpers import delete_qs_count_cache
-from common.pagination import CachedCountPageNumberPagination
+from common.pagination import CachedCountPageNumberPagination, CachedCountKeysetPagination
 from core.tasks import update_organization_responsible_employee_from_organization_list
 
 from core.views.common_view import(
@@ -138,7 +138,8 @@ class OrderInvoiceGroupListCreate(ListCreateAPICustomView):
         return (CheckAnyPermission(),)
 
     filterset_class = OrderInvoiceGroupListFilter
-    pagination_class = CachedCountPageNumberPagination
+    pagination_class = CachedCountKeysetPagination
+    keyset_ordering = ('-pk',)
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
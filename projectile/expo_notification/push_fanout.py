@@ -0,0 +1,304 @@
+"""Batched and concurrent push notification fan out
+
+Push tokens are streamed from the database and grouped into provider sized batches
+(Expo accepts 100 messages per request, OneSignal 2000 `include_player_ids` per
+notification). Up to `PUSH_NOTIFICATION_CONCURRENCY` batches are sent at the same time over
+one pooled `aiohttp` session; the `PushNotification` rows and the deactivation of invalid
+tokens are written in bulk after every batch.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+
+import aiohttp
+from django.conf import settings
+from exponent_server_sdk import PushClient, PushMessage
+
+from .models import PushNotification, PushToken
+
+logger = logging.getLogger(__name__)
+
+EXPO_BATCH_SIZE = PushClient.DEFAULT_MAX_MESSAGE_COUNT
+ONESIGNAL_BATCH_SIZE = 2000
+PUSH_TOKEN_ITERATOR_CHUNK_SIZE = 2000
+PUSH_REQUEST_TIMEOUT = 30
+ONESIGNAL_NOT_SUBSCRIBED_ERROR = "All included players are not subscribed"
+EXPO_DEVICE_NOT_REGISTERED_ERROR = "DeviceNotRegistered"
+
+
+class PushNotificationMessage:
+    """Content of a push notification, shared by every batch of a fan out"""
+
+    def __init__(self, title="", body="", data=None, url=None, image="", large_icon=None,
+                 notification_id=None, entry_by_id=None):
+        self.title = title
+        self.body = body
+        self.data = None if data == "" else data
+        self.url = url
+        self.image = image
+        self.large_icon = large_icon
+        self.notification_id = notification_id
+        self.entry_by_id = entry_by_id
+
+    def get_onesignal_payload(self, player_ids):
+        payload = {
+            'app_id': os.environ.get('ONESIGNAL_APP_ID', None),
+            'contents': {'en': self.body},
+            'headings': {'en': self.title},
+            'data': self.data,
+            'big_picture': self.image,
+            'include_player_ids': player_ids,
+        }
+        if self.url is not None:
+            payload['url'] = self.url
+        if self.large_icon is not None:
+            payload['large_icon'] = self.large_icon
+        return payload
+
+    def get_expo_payload(self, token):
+        return PushMessage(
+            to=token,
+            data=self.data,
+            title=self.title,
+            body=self.body,
+            sound="default"
+        ).get_payload()
+
+    def get_push_notification(self, push_token, response):
+        return PushNotification(
+            token_id=push_token.id,
+            user_id=push_token.user_id,
+            notification_id=self.notification_id,
+            body=self.body,
+            data=self.data or {},
+            title=self.title,
+            url=self.url,
+            response=response,
+            entry_by_id=self.entry_by_id
+        )
+
+
+class PushBatchResult:
+
+    def __init__(self, push_tokens):
+        self.push_tokens = push_tokens
+        # (push token, provider response) for every token a notification was sent to
+        self.responses = []
+        self.invalid_push_token_ids = []
+        self.failed = False
+
+
+class PushFanOutStats:
+
+    def __init__(self):
+        self.tokens = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.sent = 0
+        self.deactivated = 0
+        self.started_at = time.perf_counter()
+        self.elapsed = 0
+
+    @property
+    def throughput(self):
+        return self.tokens / self.elapsed if self.elapsed else 0
+
+    def as_dict(self):
+        return {
+            'tokens': self.tokens,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'sent': self.sent,
+            'deactivated': self.deactivated,
+            'elapsed': round(self.elapsed, 3),
+            'throughput': round(self.throughput, 2),
+        }
+
+
+def iter_push_token_batches(push_tokens):
+    """
+    Stream the push tokens and group them into provider sized batches
+
+    Args:
+        push_tokens (QuerySet): push tokens to send the notification to
+
+    Yields:
+        tuple: (send coroutine function, list of push tokens)
+    """
+    expo_batch = []
+    onesignal_batch = []
+    push_tokens = push_tokens.only(
+        'id', 'user_id', 'token', 'player_id'
+    ).iterator(chunk_size=PUSH_TOKEN_ITERATOR_CHUNK_SIZE)
+    for push_token in push_tokens:
+        if push_token.player_id is not None:
+            onesignal_batch.append(push_token)
+            if len(onesignal_batch) == ONESIGNAL_BATCH_SIZE:
+                yield send_onesignal_batch, onesignal_batch
+                onesignal_batch = []
+        else:
+            expo_batch.append(push_token)
+            if len(expo_batch) == EXPO_BATCH_SIZE:
+                yield send_expo_batch, expo_batch
+                expo_batch = []
+    if onesignal_batch:
+        yield send_onesignal_batch, onesignal_batch
+    if expo_batch:
+        yield send_expo_batch, expo_batch
+
+
+async def send_onesignal_batch(session, message, push_tokens):
+    result = PushBatchResult(push_tokens)
+    push_tokens_by_player_id = {}
+    for push_token in push_tokens:
+        push_tokens_by_player_id.setdefault(push_token.player_id, []).append(push_token)
+    headers = {
+        'Authorization': 'Basic {}'.format(os.environ.get('ONESIGNAL_REST_API_KEY', None))
+    }
+    payload = message.get_onesignal_payload(list(push_tokens_by_player_id.keys()))
+    async with session.post(settings.ONESIGNAL_API_URL, json=payload, headers=headers) as response:
+        response_data = await response.json(content_type=None)
+        if not isinstance(response_data, dict):
+            response.raise_for_status()
+            raise ValueError("Invalid onesignal response: {}".format(response_data))
+
+    errors = response_data.get('errors', None)
+    if errors:
+        invalid_player_ids = []
+        if isinstance(errors, dict):
+            invalid_player_ids = errors.get('invalid_player_ids', None) or []
+        elif ONESIGNAL_NOT_SUBSCRIBED_ERROR in errors:
+            invalid_player_ids = push_tokens_by_player_id.keys()
+        for player_id in invalid_player_ids:
+            result.invalid_push_token_ids.extend(
+                push_token.id for push_token in push_tokens_by_player_id.get(player_id, [])
+            )
+    if response.status >= 300 and not result.invalid_push_token_ids:
+        response.raise_for_status()
+
+    response_body = json.dumps(response_data)
+    result.responses = [(push_token, response_body) for push_token in push_tokens]
+    return result
+
+
+async def send_expo_batch(session, message, push_tokens):
+    result = PushBatchResult(push_tokens)
+    payloads = []
+    valid_push_tokens = []
+    for push_token in push_tokens:
+        try:
+            payloads.append(message.get_expo_payload(push_token.token))
+            valid_push_tokens.append(push_token)
+        except ValueError:
+            # Not an expo push token, expo would reject the whole request
+            result.invalid_push_token_ids.append(push_token.id)
+    if not payloads:
+        return result
+
+    async with session.post(settings.EXPO_PUSH_API_URL, json=payloads) as response:
+        response_data = await response.json(content_type=None)
+        if not isinstance(response_data, dict) or 'data' not in response_data:
+            response.raise_for_status()
+            raise ValueError("Invalid expo push response: {}".format(response_data))
+
+    # Expo returns the push tickets in the order of the messages
+    for push_token, push_ticket in zip(valid_push_tokens, response_data['data']):
+        result.responses.append((push_token, json.dumps(push_ticket)))
+        details = push_ticket.get('details', None) or {}
+        if details.get('error', None) == EXPO_DEVICE_NOT_REGISTERED_ERROR:
+            result.invalid_push_token_ids.append(push_token.id)
+    return result
+
+
+async def send_batch(session, send, message, push_tokens):
+    try:
+        return await send(session, message, push_tokens)
+    except Exception as exception:
+        logger.warning(
+            "Unable to send push notification batch of {} tokens, Exception: {}".format(
+                len(push_tokens), str(exception)
+            )
+        )
+        result = PushBatchResult(push_tokens)
+        result.failed = True
+        return result
+
+
+async def send_batches(session, message, batches):
+    return await asyncio.gather(*[
+        send_batch(session, send, message, push_tokens)
+        for send, push_tokens in batches
+    ])
+
+
+async def create_session(concurrency):
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency),
+        timeout=aiohttp.ClientTimeout(total=PUSH_REQUEST_TIMEOUT),
+    )
+
+
+def save_batch_result(message, result):
+    """Log the sent notifications and deactivate the invalid push tokens of a batch"""
+    PushNotification.objects.bulk_create([
+        message.get_push_notification(push_token, response)
+        for push_token, response in result.responses
+    ])
+    if result.invalid_push_token_ids:
+        PushToken.objects.filter(
+            pk__in=result.invalid_push_token_ids
+        ).update(active=False)
+
+
+def fan_out_push_notification(push_tokens, message, concurrency=None):
+    """
+    Send a push notification to every push token in batches
+
+    Args:
+        push_tokens (QuerySet): push tokens to send the notification to
+        message (PushNotificationMessage): content of the notification
+        concurrency (int, optional): number of batches sent at the same time,
+            defaults to `settings.PUSH_NOTIFICATION_CONCURRENCY`
+
+    Returns:
+        PushFanOutStats: number of tokens, batches, deactivated tokens and throughput
+    """
+    concurrency = concurrency or settings.PUSH_NOTIFICATION_CONCURRENCY
+    stats = PushFanOutStats()
+    # The ORM is synchronous, so the event loop only runs while a group of batches is sent
+    loop = asyncio.new_event_loop()
+    session = loop.run_until_complete(create_session(concurrency))
+
+    def send_and_save(batches):
+        for result in loop.run_until_complete(send_batches(session, message, batches)):
+            save_batch_result(message, result)
+            stats.tokens += len(result.push_tokens)
+            stats.batches += 1
+            stats.failed_batches += int(result.failed)
+            stats.sent += len(result.responses)
+            stats.deactivated += len(result.invalid_push_token_ids)
+
+    try:
+        batches = []
+        for batch in iter_push_token_batches(push_tokens):
+            batches.append(batch)
+            if len(batches) == concurrency:
+                send_and_save(batches)
+                batches = []
+        if batches:
+            send_and_save(batches)
+    finally:
+        loop.run_until_complete(session.close())
+        loop.close()
+
+    stats.elapsed = time.perf_counter() - stats.started_at
+    logger.info(
+        "Sent push notification to {} tokens in {} batches ({} failed, {} tokens deactivated) "
+        "in {:.2f}s, {:.0f} tokens/sec".format(
+            stats.tokens, stats.batches, stats.failed_batches,
+            stats.deactivated, stats.elapsed, stats.throughput
+        )
+    )
+    return stats
@@ -0,0 +1,121 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test.utils import override_settings
+
+from common.enums import Status
+from common.test_case import OmisTestCase
+
+from ..models import PushNotification, PushToken
+from ..push_fanout import EXPO_BATCH_SIZE
+from ..tasks import send_push_notification_to_mobile_app_by_org
+
+DEAD_TOKEN_PREFIX = "dead"
+
+
+class StubPushProviderHandler(BaseHTTPRequestHandler):
+    """Answer like the Expo and OneSignal push APIs, tokens starting with `dead` are not registered"""
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append((self.path, payload))
+        if self.path == "/expo" and self.server.fail_expo:
+            self.send_error(500)
+            return
+        if self.path == "/expo":
+            response = {"data": [
+                {"status": "error", "details": {"error": "DeviceNotRegistered"}}
+                if message["to"].startswith(f"ExponentPushToken[{DEAD_TOKEN_PREFIX}")
+                else {"status": "ok", "id": message["to"]}
+                for message in payload
+            ]}
+        else:
+            invalid_player_ids = [
+                player_id for player_id in payload["include_player_ids"]
+                if player_id.startswith(DEAD_TOKEN_PREFIX)
+            ]
+            response = {"id": "notification", "recipients": len(payload["include_player_ids"])}
+            if invalid_player_ids:
+                response["errors"] = {"invalid_player_ids": invalid_player_ids}
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PushNotificationFanOutTest(OmisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubPushProviderHandler)
+        self.server.requests = []
+        self.server.fail_expo = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        url = "http://127.0.0.1:{}".format(self.server.server_port)
+        provider_settings = override_settings(
+            EXPO_PUSH_API_URL=f"{url}/expo",
+            ONESIGNAL_API_URL=f"{url}/onesignal",
+            PUSH_NOTIFICATION_CONCURRENCY=2,
+        )
+        provider_settings.enable()
+        self.addCleanup(provider_settings.disable)
+
+    def create_push_tokens(self, expo_tokens=0, dead_expo_tokens=0, player_ids=0, dead_player_ids=0):
+        push_tokens = []
+        for index in range(expo_tokens + dead_expo_tokens):
+            prefix = DEAD_TOKEN_PREFIX if index < dead_expo_tokens else "live"
+            push_tokens.append(PushToken(
+                user=self.user,
+                token=f"ExponentPushToken[{prefix}-{index}]",
+                active=True,
+                status=Status.ACTIVE,
+            ))
+        for index in range(player_ids + dead_player_ids):
+            prefix = DEAD_TOKEN_PREFIX if index < dead_player_ids else "live"
+            push_tokens.append(PushToken(
+                user=self.user,
+                player_id=f"{prefix}-{index}",
+                active=True,
+                status=Status.ACTIVE,
+            ))
+        return PushToken.objects.bulk_create(push_tokens)
+
+    def test_fan_out_in_provider_batches(self):
+        self.create_push_tokens(expo_tokens=248, dead_expo_tokens=2, player_ids=4, dead_player_ids=1)
+
+        send_push_notification_to_mobile_app_by_org(title="Offer", body="Offer body")
+
+        expo_requests = [payload for path, payload in self.server.requests if path == "/expo"]
+        onesignal_requests = [payload for path, payload in self.server.requests if path == "/onesignal"]
+        self.assertEqual([len(payload) for payload in expo_requests], [EXPO_BATCH_SIZE, EXPO_BATCH_SIZE, 50])
+        self.assertEqual(len(onesignal_requests), 1)
+        self.assertEqual(len(onesignal_requests[0]["include_player_ids"]), 5)
+
+        self.assertEqual(PushNotification.objects.filter(title="Offer").count(), 255)
+        # Tokens reported as not registered are deactivated
+        self.assertEqual(
+            set(PushToken.objects.filter(active=False).values_list('token', 'player_id')),
+            {
+                ("ExponentPushToken[dead-0]", None),
+                ("ExponentPushToken[dead-1]", None),
+                (None, "dead-0"),
+            }
+        )
+
+    def test_failed_batch_does_not_stop_fan_out(self):
+        self.create_push_tokens(expo_tokens=10, player_ids=3)
+        self.server.fail_expo = True
+
+        send_push_notification_to_mobile_app_by_org(title="Offer", body="Offer body")
+
+        # Only the onesignal batch is logged, no token is deactivated
+        self.assertEqual(PushNotification.objects.filter(title="Offer").count(), 3)
+        self.assertFalse(PushToken.objects.filter(active=False).exists())
@@ -0,0 +1,97 @@
+import time
+from datetime import datetime, timedelta
+
+from pytz import timezone
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.expressions import RawSQL
+
+from pharmacy.models import OrderTracking, Purchase
+from notebookapi.notebooks.pharmacies import get_dropped_pharmacy_rows, rebuild_pharmacy_order_dates
+
+
+def legacy_dropped_pharmacy_rows(date_from, drop_date, date_till):
+    """The order tracking query previously run by `get_dropped_pharmacies`, kept for comparison"""
+    active_pharmacy_id = list(set(OrderTracking.objects.filter(
+        date__range=[drop_date, date_till],
+    ).values_list(
+        'order__organization_id', flat=True
+    )))
+    return OrderTracking.objects.filter(
+        date__range=[date_from, date_till],
+    ).exclude(
+        order__organization_id__in=active_pharmacy_id
+    ).values(
+        'order__organization_id',
+        'order__organization__name',
+        'order__organization__primary_mobile',
+        'order__organization__address',
+        'order__organization__delivery_thana',
+        'order__organization__primary_responsible_person__first_name',
+        'order__organization__primary_responsible_person__last_name',
+    ).annotate(
+        last_order=Max('order__tentative_delivery_date'),
+        count_order=Count('order__tentative_delivery_date', distinct=True)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the dropped pharmacy query on the order trackings and on the pharmacy order dates, "
+        "over synthetic order trackings of the existing orders rolled back at the end"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trackings', dest='trackings', type=int, default=2000000)
+        parser.add_argument('--orders', dest='orders', type=int, default=50000)
+        parser.add_argument('--days', dest='days', type=int, default=365)
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=10000)
+
+    def measure(self, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        return result, time.perf_counter() - start
+
+    def create_trackings(self, options):
+        order_ids = list(
+            Purchase.objects.order_by('-pk').values_list('pk', flat=True)[:options['orders']]
+        )
+        last_tracking_id = OrderTracking.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        for offset in range(0, options['trackings'], options['batch_size']):
+            size = min(options['batch_size'], options['trackings'] - offset)
+            OrderTracking.objects.bulk_create([
+                OrderTracking(order_id=order_ids[(offset + index) % len(order_ids)])
+                for index in range(size)
+            ])
+        # `date` is set on creation, spread the synthetic trackings over the days
+        OrderTracking.objects.filter(pk__gt=last_tracking_id).update(
+            date=RawSQL("NOW() - RANDOM() * INTERVAL %s", [f"{options['days']} days"])
+        )
+
+    def handle(self, *args, **options):
+        today = datetime.now(timezone('Asia/Dhaka'))
+        date_from = (today - timedelta(120)).replace(hour=0, minute=0, second=0, microsecond=0)
+        drop_date = (today - timedelta(7)).replace(hour=0, minute=0, second=0, microsecond=0)
+        date_till = today.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+        with transaction.atomic():
+            _, create_elapsed = self.measure(self.create_trackings, options)
+            rows, rebuild_elapsed = self.measure(rebuild_pharmacy_order_dates)
+            legacy, legacy_elapsed = self.measure(
+                lambda: list(legacy_dropped_pharmacy_rows(date_from, drop_date, date_till))
+            )
+            dropped, dropped_elapsed = self.measure(
+                lambda: list(get_dropped_pharmacy_rows(date_from, drop_date, date_till))
+            )
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{options['trackings']} synthetic trackings created in {create_elapsed:.2f} s, "
+            f"{rows} pharmacy order dates rebuilt in {rebuild_elapsed:.2f} s"
+        )
+        self.stdout.write(
+            f"order trackings {legacy_elapsed * 1000:.1f} ms ({len(legacy)} pharmacies), "
+            f"pharmacy order dates {dropped_elapsed * 1000:.1f} ms ({len(dropped)} pharmacies)"
+        )
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notebookapi.notebooks.pharmacies import REBUILD_BATCH_SIZE, rebuild_pharmacy_order_dates
+
+
+class Command(BaseCommand):
+    help = 'Roll up all the order trackings into the pharmacy order dates read by the dropped pharmacy list'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            type=int,
+            default=REBUILD_BATCH_SIZE,
+            help='Number of rows read and created per batch',
+        )
+
+    def handle(self, *args, **options):
+        started_at = time.perf_counter()
+        count = rebuild_pharmacy_order_dates(options['batch_size'])
+        elapsed = time.perf_counter() - started_at
+        self.stdout.write(self.style.SUCCESS(f"Created {count} pharmacy order dates in {elapsed:.2f} s"))
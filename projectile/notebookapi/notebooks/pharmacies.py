@@ -1,151 +1,239 @@
-from datetime import datetime, timedelta, time
+"""Dropped pharmacies, the pharmacies ordering in a window and not in the last days
+
+The order trackings are kept rolled up in `stats.PharmacyOrderDate`, the latest tracking
+time of the orders of a pharmacy per delivery date. A pharmacy is dropped when it has a
+row tracked in the window and none tracked since the drop date, so the dropped pharmacies
+are read with an anti join on the rolled up rows instead of the order trackings.
+"""
+from datetime import datetime, timedelta
 
 from pytz import timezone
 
-from django.db.models import Max, Count
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef
 
 import pandas as pd
 
+from common.cache_keys import DROPPED_PHARMACIES_CACHE_KEY_PREFIX
 from pharmacy.models import OrderTracking
+from stats.models import PharmacyOrderDate
+
+DEFAULT_DAYS_AGO = 120
+DEFAULT_DROP_DAYS = 7
+REBUILD_BATCH_SIZE = 5000
+
+DELIVERY_THANA_AREAS = {
+    'ADABOR': 302602,
+    'BADDA': 302604,
+    'BANGSHAL': 302605,
+    'BIMAN_BANDAR': 302606,
+    'BANANI': 302607,
+    'CANTONMENT': 302608,
+    'CHAK_BAZAR': 302609,
+    'DAKSHINKHAN': 302610,
+    'DARUS_SALAM': 302611,
+    'DEMRA': 302612,
+    'DHAMRAI': 302614,
+    'DHANMONDI': 302616,
+    'DOHAR': 302618,
+    'BHASAN_TEK': 302621,
+    'BHATARA': 302622,
+    'GENDARIA': 302624,
+    'GULSHAN': 302626,
+    'HAZARIBAGH': 302628,
+    'JATRABARI': 302629,
+    'KAFRUL': 302630,
+    'KADAMTALI': 302632,
+    'KALABAGAN': 302633,
+    'KAMRANGIR_CHAR': 302634,
+    'KHILGAON': 302636,
+    'KHILKHET': 302637,
+    'KERANIGANJ': 302638,
+    'KOTWALI': 302640,
+    'LALBAGH': 302642,
+    'MIRPUR': 302648,
+    'MOHAMMADPUR': 302650,
+    'MOTIJHEEL': 302654,
+    'MUGDA_PARA': 302657,
+    'NAWABGANJ': 302662,
+    'NEW_MARKET': 302663,
+    'PALLABI': 302664,
+    'PALTAN': 302665,
+    'RAMNA': 302666,
+    'RAMPURA': 302667,
+    'SABUJBAGH': 302668,
+    'RUPNAGAR': 302670,
+    'SAVAR': 302672,
+    'SHAHJAHANPUR': 302673,
+    'SHAH_ALI': 302674,
+    'SHAHBAGH': 302675,
+    'SHYAMPUR': 302676,
+    'SHER_E_BANGLA_NAGAR': 302680,
+    'SUTRAPUR': 302688,
+    'TEJGAON': 302690,
+    'TEJGAON_IND_AREA': 302692,
+    'TURAG': 302693,
+    'UTTARA_PASCHIM': 302694,
+    'UTTARA_PURBA': 302695,
+    'UTTAR_KHAN': 302696,
+    'WARI': 302698,
+    'OTHER1': 888888,
+    'OTHER2': 999999,
+}
+
+
+def record_pharmacy_order_tracking(organization_id, delivery_date, tracked_at):
+    """
+    Roll up an order tracking of a pharmacy
+
+    Args:
+        organization_id (int): pharmacy of the order
+        delivery_date (date): tentative delivery date of the order
+        tracked_at (datetime): time of the tracking
+    """
+    pharmacy_order_date, created = PharmacyOrderDate.objects.get_or_create(
+        organization_id=organization_id,
+        delivery_date=delivery_date,
+        defaults={'last_tracked_at': tracked_at},
+    )
+    if not created and pharmacy_order_date.last_tracked_at < tracked_at:
+        PharmacyOrderDate.objects.filter(
+            pk=pharmacy_order_date.pk,
+            last_tracked_at__lt=tracked_at,
+        ).update(last_tracked_at=tracked_at)
+
+
+def rebuild_pharmacy_order_dates(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Roll up all the order trackings again, the rows of the orders moved to another
+    delivery date are only removed by a rebuild
+
+    Returns:
+        int: number of rows
+    """
+    from common import models as common_models
+
+    rows = OrderTracking.objects.order_by().values(
+        'order__organization_id',
+        'order__tentative_delivery_date',
+    ).annotate(
+        last_tracked_at=Max('date'),
+    ).values_list(
+        'order__organization_id',
+        'order__tentative_delivery_date',
+        'last_tracked_at',
+    )
+    count = 0
+    batch = []
+    with transaction.atomic():
+        PharmacyOrderDate.objects.all().delete()
+        for organization_id, delivery_date, last_tracked_at in rows.iterator(chunk_size=batch_size):
+            batch.append(PharmacyOrderDate(
+                organization_id=organization_id,
+                delivery_date=delivery_date,
+                last_tracked_at=last_tracked_at,
+                # Set by `CreatedAtUpdatedAtBaseModel.save`, which bulk create skips
+                user_ip=common_models.USER_IP_ADDRESS,
+            ))
+            if len(batch) >= batch_size:
+                PharmacyOrderDate.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        PharmacyOrderDate.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def get_dropped_pharmacy_rows(date_from, drop_date, date_till):
+    """
+    Pharmacies tracked from `date_from` and not from `drop_date`, with the latest delivery
+    date and the number of delivery dates of the window
+    """
+    tracked_from_drop_date = PharmacyOrderDate.objects.filter(
+        organization_id=OuterRef('organization_id'),
+        last_tracked_at__gte=drop_date,
+    )
+    return PharmacyOrderDate.objects.filter(
+        last_tracked_at__range=[date_from, date_till],
+    ).filter(
+        ~Exists(tracked_from_drop_date)
+    ).order_by().values(
+        'organization_id',
+        'organization__name',
+        'organization__primary_mobile',
+        'organization__address',
+        'organization__delivery_thana',
+        'organization__primary_responsible_person__first_name',
+        'organization__primary_responsible_person__last_name',
+    ).annotate(
+        last_order=Max('delivery_date'),
+        count_order=Count('delivery_date', distinct=True)
+    )
 
 
 def get_dropped_pharmacies(days_ago=None, drop_days=None):
     if days_ago is None:
-        days_ago = 120
+        days_ago = DEFAULT_DAYS_AGO
 
     if drop_days is None:
-        drop_days = 7
+        drop_days = DEFAULT_DROP_DAYS
+
+    today = datetime.now(timezone('Asia/Dhaka'))
+    cache_key = f"{DROPPED_PHARMACIES_CACHE_KEY_PREFIX}{today.date()}_{days_ago}_{drop_days}"
+    json_data = cache.get(cache_key)
+    if json_data is not None:
+        return json_data
 
     date_from = (
-        datetime.now(
-            timezone('Asia/Dhaka')
-        ) - timedelta(days_ago)
+        today - timedelta(days_ago)
     ).replace(
         hour=0, minute=0, second=0, microsecond=0,
     )
 
     drop_date = (
-        datetime.now(
-            timezone('Asia/Dhaka')
-        ) - timedelta(drop_days)
+        today - timedelta(drop_days)
     ).replace(
         hour=0, minute=0, second=0, microsecond=0,
-    ).date()
+    )
 
-    date_till = (
-        datetime.now(
-            timezone('Asia/Dhaka')
-        )
-    ).replace(
+    date_till = today.replace(
         hour=23, minute=59, second=59, microsecond=999999,
     )
 
-    active_pharmacy_id = list(set(OrderTracking.objects.filter(
-        date__range=[drop_date, date_till],
-    ).values_list(
-        'order__organization_id', flat=True
-    )))
-
-    area = {
-        'ADABOR': 302602,
-        'BADDA': 302604,
-        'BANGSHAL': 302605,
-        'BIMAN_BANDAR': 302606,
-        'BANANI': 302607,
-        'CANTONMENT': 302608,
-        'CHAK_BAZAR': 302609,
-        'DAKSHINKHAN': 302610,
-        'DARUS_SALAM': 302611,
-        'DEMRA': 302612,
-        'DHAMRAI': 302614,
-        'DHANMONDI': 302616,
-        'DOHAR': 302618,
-        'BHASAN_TEK': 302621,
-        'BHATARA': 302622,
-        'GENDARIA': 302624,
-        'GULSHAN': 302626,
-        'HAZARIBAGH': 302628,
-        'JATRABARI': 302629,
-        'KAFRUL': 302630,
-        'KADAMTALI': 302632,
-        'KALABAGAN': 302633,
-        'KAMRANGIR_CHAR': 302634,
-        'KHILGAON': 302636,
-        'KHILKHET': 302637,
-        'KERANIGANJ': 302638,
-        'KOTWALI': 302640,
-        'LALBAGH': 302642,
-        'MIRPUR': 302648,
-        'MOHAMMADPUR': 302650,
-        'MOTIJHEEL': 302654,
-        'MUGDA_PARA': 302657,
-        'NAWABGANJ': 302662,
-        'NEW_MARKET': 302663,
-        'PALLABI': 302664,
-        'PALTAN': 302665,
-        'RAMNA': 302666,
-        'RAMPURA': 302667,
-        'SABUJBAGH': 302668,
-        'RUPNAGAR': 302670,
-        'SAVAR': 302672,
-        'SHAHJAHANPUR': 302673,
-        'SHAH_ALI': 302674,
-        'SHAHBAGH': 302675,
-        'SHYAMPUR': 302676,
-        'SHER_E_BANGLA_NAGAR': 302680,
-        'SUTRAPUR': 302688,
-        'TEJGAON': 302690,
-        'TEJGAON_IND_AREA': 302692,
-        'TURAG': 302693,
-        'UTTARA_PASCHIM': 302694,
-        'UTTARA_PURBA': 302695,
-        'UTTAR_KHAN': 302696,
-        'WARI': 302698,
-        'OTHER1': 888888,
-        'OTHER2': 999999,
-    }
-
-    order_trackings = OrderTracking.objects.filter(
-        date__range=[date_from, date_till],
-    ).exclude(
-        order__organization_id__in=active_pharmacy_id
-    ).select_related(
-        'order',
-    ).values(
-        'order__organization_id',
-        'order__organization__name',
-        'order__organization__primary_mobile',
-        'order__organization__address',
-        'order__organization__delivery_thana',
-        'order__organization__primary_responsible_person__first_name',
-        'order__organization__primary_responsible_person__last_name',
-    ).annotate(
-        last_order=Max('order__tentative_delivery_date'),
-        count_order=Count('order__tentative_delivery_date', distinct=True)
+    data = pd.DataFrame(
+        list(get_dropped_pharmacy_rows(date_from, drop_date, date_till)),
+        columns=[
+            'organization_id',
+            'organization__name',
+            'organization__primary_mobile',
+            'organization__address',
+            'organization__delivery_thana',
+            'organization__primary_responsible_person__first_name',
+            'organization__primary_responsible_person__last_name',
+            'last_order',
+            'count_order',
+        ]
     )
 
-    data = pd.DataFrame(order_trackings)
-
-    for item in area:
-        data.loc[data['order__organization__delivery_thana'] ==
-                 area[item], 'order__organization__delivery_thana'] = item
+    area_names = {code: name for name, code in DELIVERY_THANA_AREAS.items()}
+    data['organization__delivery_thana'] = data['organization__delivery_thana'].replace(area_names)
 
     data.rename(
         columns={
-            'order__organization_id': 'organization_id',
-            'order__organization__name': 'pharmacy_name',
-            'order__organization__primary_mobile': 'phone',
-            'order__organization__address': 'address',
-            'order__organization__delivery_thana': 'area',
-            'order__organization__primary_responsible_person__first_name': 'first_name',
-            'order__organization__primary_responsible_person__last_name': 'last_name'
+            'organization__name': 'pharmacy_name',
+            'organization__primary_mobile': 'phone',
+            'organization__address': 'address',
+            'organization__delivery_thana': 'area',
+            'organization__primary_responsible_person__first_name': 'first_name',
+            'organization__primary_responsible_person__last_name': 'last_name'
         },
         inplace=True
     )
 
     data['responsible_person'] = data['first_name'] + " " + data['last_name']
 
-    data.drop(['first_name', 'last_name'], axis=1)
-
     json_data = data.to_json(orient='records')
+    cache.set(cache_key, json_data, settings.DROPPED_PHARMACIES_CACHE_TIMEOUT)
     return json_data
@@ -1,6 +1,6 @@
-
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from validator_collection import checkers
 
 from ..notebooks.pharmacies import get_dropped_pharmacies
 
@@ -9,5 +9,8 @@ class DroppedPharmacyList(APIView):
     def get(self, request):
         days_ago = request.GET.get('days_ago', None)
         drop_days = request.GET.get('drop_days', None)
-        data = get_dropped_pharmacies(days_ago=days_ago, drop_days=drop_days)
+        data = get_dropped_pharmacies(
+            days_ago=int(days_ago) if checkers.is_integer(days_ago) else None,
+            drop_days=int(drop_days) if checkers.is_integer(drop_days) else None,
+        )
         return Response(data)
@@ -0,0 +1,30 @@
+import json
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from common.test_case import OmisTestCase
+from core.tests import OrganizationFactory
+
+from ..notebooks.pharmacies import get_dropped_pharmacies, record_pharmacy_order_tracking
+
+
+class DroppedPharmacyTest(OmisTestCase):
+
+    def setUp(self):
+        super(DroppedPharmacyTest, self).setUp()
+        cache.clear()
+
+    def test_pharmacy_tracked_since_drop_date_is_not_dropped(self):
+        now = timezone.now()
+        dropped, active = OrganizationFactory(), OrganizationFactory()
+        record_pharmacy_order_tracking(dropped.id, date(2024, 1, 1), now - timedelta(days=30))
+        record_pharmacy_order_tracking(dropped.id, date(2024, 1, 2), now - timedelta(days=20))
+        record_pharmacy_order_tracking(active.id, date(2024, 1, 1), now - timedelta(days=30))
+        record_pharmacy_order_tracking(active.id, date(2024, 1, 1), now - timedelta(days=1))
+
+        data = json.loads(get_dropped_pharmacies(days_ago=60, drop_days=7))
+
+        self.assertEqual([item['organization_id'] for item in data], [dropped.id])
+        self.assertEqual(data[0]['count_order'], 2)
@@ -1,13 +1,10 @@
 from datetime import datetime
 import time, os, logging
-import pandas as pd
 from copy import deepcopy
-from dotmap import DotMap
 from django.db.models.functions import Coalesce
 from django.db.models import Sum, Q
 
 from common.enums import Status
-from common.utils import get_item_from_list_of_dict
 from common.healthos_helpers import HealthOSHelper, CustomerHelper
 from core.enums import AllowOrderFrom
 from pharmacy.enums import StockIOType
@@ -16,10 +13,11 @@ from pharmacy.utils import (
     get_or_create_cart_instance,
     get_delivery_date_for_product,
     get_cart_group_id, calculate_queueing_quantity_based_on_various_criteria,
-    get_product_dynamic_discount_rate,
 )
+from pharmacy.pricing import PricingContext
 
 from pharmacy.models import Stock, StockIOLog, Product, Purchase, DistributorOrderGroup
+from pharmacy.cart_merge import CartLine, CartProduct, CartStock, index_records, merge_cart_items
 
 logger = logging.getLogger(__name__)
 
@@ -147,7 +145,8 @@ def update_cart(
     new_cart_items = None,
     cart = True,
     order_id = None,
-    clear_cart = True):
+    clear_cart = True,
+    pricing_context = None):
     """_summary_
 
     Args:
@@ -157,6 +156,7 @@ def update_cart(
         cart (bool, optional): define if it's a cart or a reorder. Defaults to True.
         order_id (int, optional): the order id, required for re order
         clear_cart (bool, optional): Define if the existing cart will be cleared for re order not just append with exiting items
+        pricing_context (PricingContext, optional): discount factors of the organization, e.g. the one of the request
     """
     DATE_FORMAT = "%Y-%m-%d"
     _date_now = datetime.strptime(
@@ -220,104 +220,60 @@ def update_cart(
 
     if not cart and order_id:
         if clear_cart:
-            aggregated_cart_items = list(StockIOLog.objects.filter(
-                status=Status.DISTRIBUTOR_ORDER,
-                purchase__id=order_id
-            ).values('stock_id').order_by().annotate(
-                total_quantity = Coalesce(Sum('quantity'), 0.00)
-            ))
+            aggregated_cart_items = [
+                CartLine(item['stock_id'], item['total_quantity'])
+                for item in StockIOLog.objects.filter(
+                    status=Status.DISTRIBUTOR_ORDER,
+                    purchase__id=order_id
+                ).values('stock_id').order_by().annotate(
+                    total_quantity = Coalesce(Sum('quantity'), 0.00)
+                )
+            ]
 
         else:
             cart_instance_id_list.append(order_id)
-            aggregated_cart_items = list(StockIOLog.objects.filter(
-                status=Status.DISTRIBUTOR_ORDER,
-                purchase__id__in=cart_instance_id_list
-            ).values('stock_id').order_by().annotate(
-                total_quantity = Coalesce(Sum('quantity'), 0.00)
-            ))
+            aggregated_cart_items = [
+                CartLine(item['stock_id'], item['total_quantity'])
+                for item in StockIOLog.objects.filter(
+                    status=Status.DISTRIBUTOR_ORDER,
+                    purchase__id__in=cart_instance_id_list
+                ).values('stock_id').order_by().annotate(
+                    total_quantity = Coalesce(Sum('quantity'), 0.00)
+                )
+            ]
     else:
-        # Get the aggregated qty for all cart items(Both regular and pre order)
+        # Get the existing qty for all cart items(Both regular and pre order)
         # Finally merge new items and existing items
-        aggregated_cart_items = list(StockIOLog.objects.filter(
+        existing_cart_items = StockIOLog.objects.filter(
             organization__id=org_id,
             status=Status.DISTRIBUTOR_ORDER,
             purchase__id__in=cart_instance_id_list
-        ).values("stock_id", "quantity").order_by())
-        data_df = pd.DataFrame(aggregated_cart_items)
-        new_items_df = pd.DataFrame(new_cart_items, columns=["stock", "quantity"])
-        new_items_df.rename(columns={"stock": "stock_id", "quantity": "total_quantity"}, inplace=True)
-        if not data_df.empty:
-            # Remove Delivery Coupon as we will add it later based on order amount and min order maount
-            # data_df = data_df.drop(data_df[data_df["stock_id"] == heathos_helper.get_delivery_coupon_stock_id()].index, axis=0)
-            data_df = data_df.groupby(["stock_id"], as_index=False).sum()
-            data_df = data_df.rename(columns={"quantity": "total_quantity",})
-        if not new_items_df.empty and not data_df.empty:
-            final_df = pd.merge(data_df, new_items_df, on='stock_id', how='outer', suffixes=('_df1', '_df2'))
-            final_df['total_quantity_df2'].fillna(final_df['total_quantity_df1'], inplace=True)
-            final_df.drop(['total_quantity_df1'], axis=1, inplace=True)
-            final_df.rename(columns={"total_quantity_df2": "total_quantity"}, inplace=True)
-            # Find changes of qty
-            final_df['change'] = final_df["total_quantity"] - data_df["total_quantity"]
-            final_df['change'].fillna(final_df["total_quantity"], inplace=True)
-            aggregated_cart_items =  final_df.to_dict("records")
-        elif not new_items_df.empty and data_df.empty:
-            # As no existing items available to new items qty will be the change
-            new_items_df['change'] = new_items_df["total_quantity"]
-            aggregated_cart_items =  new_items_df.to_dict("records")
-        elif new_items_df.empty and not data_df.empty:
-            # As no new items added there will be no change
-            data_df['change'] = 0
-            aggregated_cart_items =  data_df.to_dict("records")
-        else:
-            aggregated_cart_items = []
+        ).values("stock_id", "quantity").order_by()
+        aggregated_cart_items = merge_cart_items(existing_cart_items, new_cart_items)
     # For the property 'change', negative value = decrease, positive = increase, 0 = no change
-    stock_id_list = list(map(lambda item: item['stock_id'], aggregated_cart_items))
-    stocks_queryset_list = list(Stock.objects.filter(pk__in=stock_id_list).only(
-        'id',
-        'product_id',
-        'orderable_stock',
-    ).values(
-        'id',
-        'product_id',
-        'orderable_stock',
-    ).order_by())
-    product_id_list = list(map(lambda item: item['product_id'], stocks_queryset_list))
-    product_queryset_list = list(Product.objects.filter(pk__in=product_id_list).only(
-        'id',
-        'order_mode',
-        'is_queueing_item',
-        'trading_price',
-        'discount_rate',
-        'primary_unit_id',
-        'secondary_unit_id',
-        'conversion_factor',
-        'order_limit_per_day',
-        'order_limit_per_day_mirpur',
-        'order_limit_per_day_uttara',
-        'minimum_order_quantity',
-    ).values(
-        'id',
-        'order_mode',
-        'is_queueing_item',
-        'trading_price',
-        'discount_rate',
-        'primary_unit_id',
-        'secondary_unit_id',
-        'conversion_factor',
-        'order_limit_per_day',
-        'order_limit_per_day_mirpur',
-        'order_limit_per_day_uttara',
-        'minimum_order_quantity',
-    ))
+    stock_id_list = [item.stock_id for item in aggregated_cart_items]
+    stocks_by_id = index_records(
+        Stock.objects.filter(pk__in=stock_id_list).values(*CartStock.FIELDS).order_by(),
+        CartStock
+    )
+    product_id_list = [stock.product_id for stock in stocks_by_id.values()]
+    products_by_id = index_records(
+        Product.objects.filter(pk__in=product_id_list).values(*CartProduct.FIELDS).order_by(),
+        CartProduct
+    )
+    if pricing_context is None:
+        pricing_context = PricingContext(org_id)
     # Get customer cumulative dynamic discount
     # customer_cumulative_discount_factor = float(customer_helper.get_cumulative_discount_factor())
     # Prepare payload based on current stock, order mode, delivery hub etc.
     for item in aggregated_cart_items:
-        stock = DotMap(get_item_from_list_of_dict(stocks_queryset_list, 'id', item['stock_id']))
-        product = DotMap(get_item_from_list_of_dict(product_queryset_list, 'id', stock.product_id))
+        stock = stocks_by_id.get(item['stock_id'])
+        # Stock removed from the catalog in the meantime, nothing to order
+        if stock is None:
+            continue
+        product = products_by_id[stock.product_id]
         # Get dynamic discount rate
-        final_discount_rate = float(get_product_dynamic_discount_rate(
-            user_org_id=org_id,
+        final_discount_rate = float(pricing_context.get_dynamic_discount_rate(
             trading_price=product.trading_price,
             discount_rate=product.discount_rate,
             stock_id=item['stock_id']
@@ -615,9 +571,8 @@ def update_cart(
         batch_size=10
     )
     # Get current dynamic discount factor
-    dynamic_discount_factor = customer_helper.get_organization_and_area_discount()
-    org_discount_factor = dynamic_discount_factor.get("organization_discount_factor", 0.00)
-    area_discount_factor = dynamic_discount_factor.get("area_discount_factor", 0.00)
+    org_discount_factor = pricing_context.organization_discount_factor
+    area_discount_factor = pricing_context.area_discount_factor
     # Get delivery date for regular order cart instance
     regular_tentative_delivery_date = get_delivery_date_for_product(is_queueing_item=False)
     regular_dynamic_discount_amount = regular_cart_grand_total_considering_base_discount - regular_cart_grand_total
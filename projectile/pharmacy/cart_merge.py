@@ -0,0 +1,163 @@
+"""Plain python cart merge engine used by `pharmacy.cart_helpers.update_cart`
+
+Every add to cart request merges the items already available in the cart with the
+newly posted items. Doing this with pandas DataFrames and linear list lookups was
+O(n^2) per request, so the merge and the stock / product lookups are done here with
+dict indexes and slotted records instead.
+"""
+
+
+class CartLine:
+    """A single aggregated cart line.
+
+    Exposes `get` and item access so it can be passed anywhere an aggregated cart
+    item dict was used before (e.g. `calculate_total_quantity_based_on_various_criteria`).
+    For the property `change`, negative value = decrease, positive = increase, 0 = no change
+    """
+    __slots__ = ('stock_id', 'total_quantity', 'change',)
+
+    def __init__(self, stock_id, total_quantity, change=0):
+        self.stock_id = stock_id
+        self.total_quantity = total_quantity
+        self.change = change
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __eq__(self, other):
+        if not isinstance(other, CartLine):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f"CartLine(stock_id={self.stock_id}, total_quantity={self.total_quantity}, change={self.change})"
+
+    def as_dict(self):
+        return {
+            'stock_id': self.stock_id,
+            'total_quantity': self.total_quantity,
+            'change': self.change,
+        }
+
+
+class CartStock:
+    """Stock fields required for preparing cart items"""
+    __slots__ = ('id', 'product_id', 'orderable_stock',)
+
+    FIELDS = __slots__
+
+    def __init__(self, id, product_id, orderable_stock):
+        self.id = id
+        self.product_id = product_id
+        self.orderable_stock = orderable_stock
+
+
+class CartProduct:
+    """Product fields required for preparing cart items"""
+    __slots__ = (
+        'id',
+        'order_mode',
+        'is_queueing_item',
+        'trading_price',
+        'discount_rate',
+        'primary_unit_id',
+        'secondary_unit_id',
+        'conversion_factor',
+        'order_limit_per_day',
+        'order_limit_per_day_mirpur',
+        'order_limit_per_day_uttara',
+        'minimum_order_quantity',
+    )
+
+    FIELDS = __slots__
+
+    def __init__(self, **kwargs):
+        for field in self.__slots__:
+            setattr(self, field, kwargs.get(field))
+
+
+def index_records(rows, record_class, key='id'):
+    """Build a dict index of slotted records from a list of `values()` dicts
+
+    Args:
+        rows (iterable): dicts containing (at least) `record_class.FIELDS`
+        record_class (class): one of `CartStock` or `CartProduct`
+        key (str, optional): the key used for indexing. Defaults to 'id'.
+
+    Returns:
+        dict: {row[key]: record_class instance}
+    """
+    return {
+        row[key]: record_class(**{field: row.get(field) for field in record_class.FIELDS})
+        for row in rows
+    }
+
+
+def aggregate_quantity_by_stock(items, quantity_key='quantity'):
+    """Sum the quantity of the given items per stock
+
+    Args:
+        items (iterable): dicts with `stock_id` and `quantity_key`
+
+    Returns:
+        dict: {stock_id: total quantity}
+    """
+    totals = {}
+    for item in items:
+        stock_id = item['stock_id']
+        totals[stock_id] = totals.get(stock_id, 0) + (item.get(quantity_key) or 0)
+    return totals
+
+
+def merge_cart_items(existing_items, new_items=None):
+    """Merge existing cart items with newly posted items
+
+    A stock present in `new_items` replaces the total quantity of that stock in the cart,
+    stocks only available in the cart keep their existing (summed) quantity.
+
+    Args:
+        existing_items (list): existing cart io logs as dicts of `stock_id` and `quantity`
+        new_items (list, optional): posted items as dicts of `stock` and `quantity`
+
+    Returns:
+        list: list of `CartLine`, existing stocks ordered by stock id followed by
+            the new stocks in the posted order
+    """
+    existing_totals = aggregate_quantity_by_stock(existing_items)
+    new_totals = {}
+    for item in new_items or []:
+        new_totals[item['stock']] = item.get('quantity')
+
+    if not existing_totals:
+        # As no existing items available new items qty will be the change
+        return [
+            CartLine(stock_id, quantity, quantity)
+            for stock_id, quantity in new_totals.items()
+            if quantity is not None
+        ]
+
+    if not new_totals:
+        # As no new items added there will be no change
+        return [
+            CartLine(stock_id, existing_totals[stock_id], 0)
+            for stock_id in sorted(existing_totals)
+        ]
+
+    cart_lines = []
+    # Existing stocks first (ordered by stock id) then the stocks only available in new items
+    for stock_id in sorted(existing_totals):
+        existing_quantity = existing_totals[stock_id]
+        total_quantity = new_totals.get(stock_id)
+        if total_quantity is None:
+            total_quantity = existing_quantity
+        cart_lines.append(CartLine(stock_id, total_quantity, total_quantity - existing_quantity))
+    for stock_id, total_quantity in new_totals.items():
+        if stock_id not in existing_totals and total_quantity is not None:
+            cart_lines.append(CartLine(stock_id, total_quantity, total_quantity))
+    return cart_lines
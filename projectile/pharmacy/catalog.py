@@ -0,0 +1,158 @@
+"""Catalog read model of the stocks, the product / stock display fields of a stock
+
+The cart, order detail and invoice responses render the product of every io log with
+the same nested serializers. Instead of joining the stock, product, company, form,
+subgroup, generic, category, unit and compartment tables for every io log of every
+request, the rendering of a stock is kept in cache as a projection:
+
+    {"cart": <StockForCartGetSerializer data>, "invoice": <StockForInvoicePDFSerializer data>}
+
+The io logs are fetched without their stock and joined to the projections in memory,
+all the projections of a response are read with one `get_many`. Missing projections
+are built in bulk with one query and written back with one `set_many`.
+
+A projection is removed with the other cache keys of its stock (`Stock.get_cache_keys`),
+so a save of the stock or of its product rebuilds it on the next read. The key carries
+`CATALOG_PROJECTION_VERSION`, bump it whenever the shape of a projection changes so the
+projections of the previous release are not read.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from common.cache_keys import STOCK_CATALOG_CACHE_KEY_PREFIX
+
+CATALOG_PROJECTION_VERSION = 1
+CART_PROJECTION = "cart"
+INVOICE_PROJECTION = "invoice"
+# Stock catalog loaded for a serializer, kept in its (root) context
+STOCK_CATALOG_CONTEXT_KEY = "stock_catalog"
+
+
+def get_stock_catalog_cache_key(stock_id):
+    return f"{STOCK_CATALOG_CACHE_KEY_PREFIX}v{CATALOG_PROJECTION_VERSION}_{str(stock_id).zfill(12)}"
+
+
+def build_stock_catalog(stock_ids):
+    """
+    Build the projections of the stocks from the database
+
+    Args:
+        stock_ids (iterable): id of the stocks
+
+    Returns:
+        dict: {stock id: projection}, stocks that don't exist are left out
+    """
+    from pharmacy.custom_serializer.stock import (
+        StockForCartGetSerializer,
+        StockForInvoicePDFSerializer,
+    )
+    from pharmacy.models import Stock
+
+    stocks = Stock.objects.filter(
+        pk__in=list(stock_ids)
+    ).select_related(
+        'product__manufacturing_company',
+        'product__form',
+        'product__subgroup__product_group',
+        'product__generic',
+        'product__primary_unit',
+        'product__secondary_unit',
+        'product__category',
+        'product__compartment',
+    )
+    catalog = {}
+    for stock in stocks:
+        # Rendered without a request, the image urls are made absolute on read
+        catalog[stock.id] = {
+            CART_PROJECTION: StockForCartGetSerializer(stock).data,
+            INVOICE_PROJECTION: StockForInvoicePDFSerializer(stock).data,
+        }
+    return catalog
+
+
+def get_stock_catalog(stock_ids):
+    """
+    Read the projections of the stocks, building the missing ones
+
+    Args:
+        stock_ids (iterable): id of the stocks
+
+    Returns:
+        dict: {stock id: projection}
+    """
+    keys = {stock_id: get_stock_catalog_cache_key(stock_id) for stock_id in set(stock_ids)}
+    if not keys:
+        return {}
+    cached = cache.get_many(list(keys.values()))
+    catalog = {
+        stock_id: cached[key]
+        for stock_id, key in keys.items()
+        if key in cached
+    }
+    missing_stock_ids = keys.keys() - catalog.keys()
+    if missing_stock_ids:
+        built = build_stock_catalog(missing_stock_ids)
+        cache.set_many(
+            {keys[stock_id]: projection for stock_id, projection in built.items()},
+            settings.STOCK_CATALOG_CACHE_TIMEOUT
+        )
+        catalog.update(built)
+    return catalog
+
+
+def preload_stock_catalog(context, stock_ids):
+    """
+    Load the projections of the stocks into a serializer context
+
+    Only the stocks not loaded into the context yet are read, so the nested serializers
+    of a response share the single read of their root.
+
+    Args:
+        context (dict): serializer context
+        stock_ids (iterable): id of the stocks
+
+    Returns:
+        dict: {stock id: projection} of all the stocks loaded into the context
+    """
+    catalog = context.setdefault(STOCK_CATALOG_CONTEXT_KEY, {})
+    missing_stock_ids = {
+        stock_id for stock_id in stock_ids
+        if stock_id is not None and stock_id not in catalog
+    }
+    if missing_stock_ids:
+        catalog.update(get_stock_catalog(missing_stock_ids))
+    return catalog
+
+
+def render_stock_catalog(context, stock_id, projection):
+    """
+    Render a stock from its projection, as the serializer of the projection would
+
+    Args:
+        context (dict): serializer context, its request makes the image urls absolute
+        stock_id (int): id of the stock
+        projection (str): CART_PROJECTION or INVOICE_PROJECTION
+
+    Returns:
+        dict: the rendered stock, None for a stock that doesn't exist
+    """
+    from common.healthos_helpers import HealthOSHelper
+
+    entry = preload_stock_catalog(context, [stock_id]).get(stock_id)
+    if entry is None:
+        return None
+    data = dict(entry[projection])
+    if projection != CART_PROJECTION:
+        return data
+    data['is_delivery_coupon'] = stock_id == HealthOSHelper.get_delivery_coupon_stock_id()
+    request = context.get('request', None)
+    product = data.get('product')
+    if request is not None and product and product.get('image'):
+        data['product'] = dict(
+            product,
+            image={
+                size: request.build_absolute_uri(url)
+                for size, url in product['image'].items()
+            }
+        )
+    return data
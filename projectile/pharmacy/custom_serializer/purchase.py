@@ -49,8 +49,11 @@ from .stock_io_log import (
     StockIOLogForInvoicePDFSerializer,
 )
 from .order_tracking import OrderTrackingModelSerializer
+from .stock import StockCatalogSerializerMixin
 from ..utils import get_tentative_delivery_date, get_cart_group_id, get_or_create_cart_instance
 from pharmacy.tasks import apply_additional_discount_on_order
+from pharmacy.stock_ledger import bulk_create_stock_io_logs
+from pharmacy.pricing import PricingContext
 from pharmacy.custom_serializer.stock_io_log import StockIOLogForCartGetSerializer
 
 class PurchaseMeta(ListSerializer.Meta):
@@ -195,11 +198,14 @@ class DistributorOrderCartPostSerializer(serializers.ModelSerializer):
         return existing_log
 
 
-class DistributorOrderCartSerializer(serializers.ModelSerializer):
+class DistributorOrderCartSerializer(StockCatalogSerializerMixin, serializers.ModelSerializer):
     stock_io_logs = StockIOLogForCartGetSerializer(many=True)
     distributor = OrganizationModelSerializer.Lite(read_only=True)
     # order_status = OrderTrackingModelSerializer.List(many=True, read_only=True)
 
+    def get_catalog_stock_ids(self, instance):
+        return [item.stock_id for item in instance.stock_io_logs.all()]
+
     class Meta:
         model = Purchase
         fields = (
@@ -236,10 +242,17 @@ class DistributorOrderCartSerializer(serializers.ModelSerializer):
         )
 
 
-class DistributorOrderCartGetSerializer(serializers.ModelSerializer):
+class DistributorOrderCartGetSerializer(StockCatalogSerializerMixin, serializers.ModelSerializer):
     order_groups = DistributorOrderCartSerializer(many=True)
     organization = OrganizationModelSerializer.LiteWithMinOrderAmount()
 
+    def get_catalog_stock_ids(self, instance):
+        return [
+            item.stock_id
+            for order in instance.order_groups.all()
+            for item in order.stock_io_logs.all()
+        ]
+
     class Meta:
         model = DistributorOrderGroup
         fields = (
@@ -449,11 +462,11 @@ class DistributorOrderGroupPostSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def create(self, validated_data):
         request = self.context.get("request")
-        custom_helper = CustomerHelper(request.user.organization_id)
         # Get org and area discount factor
-        dynamic_discount_factor = custom_helper.get_organization_and_area_discount()
-        org_discount_factor = dynamic_discount_factor.get("organization_discount_factor", 0.00)
-        area_discount_factor = dynamic_discount_factor.get("area_discount_factor", 0.00)
+        pricing_context = PricingContext.for_request(request)
+        custom_helper = pricing_context.customer_helper
+        org_discount_factor = pricing_context.organization_discount_factor
+        area_discount_factor = pricing_context.area_discount_factor
 
         DATE_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
         DATE_FORMAT = '%Y-%m-%d'
@@ -566,6 +579,7 @@ class DistributorOrderGroupPostSerializer(serializers.ModelSerializer):
                 order_discount = 0
                 order_grand_total = 0
                 order_round_discount = 0
+                order_io_logs = []
                 for item in reversed(order_items):
                     item['date'] = _date_now
                     primary_unit = item.get('primary_unit', None)
@@ -577,16 +591,17 @@ class DistributorOrderGroupPostSerializer(serializers.ModelSerializer):
                     if not secondary_unit:
                         # item['secondary_unit_id'] = item.get('stock').product.secondary_unit_id
                         item['secondary_unit_id'] = 174
-                    order_item = StockIOLog.objects.create(
+                    order_io_logs.append(StockIOLog(
                         purchase_id=order_instance.id,
                         status=order_instance.status,
                         organization_id=request.user.organization_id,
                         entry_by_id=request.user.id,
                         **item
-                    )
-                    # order_item.save()
+                    ))
                     order_amount += float(format(item.get('rate', 0) * item.get('quantity', 0), '.3f'))
                     order_discount += float(format(item.get('discount_total', 0), '.3f'))
+                # Validate the ecom stock of all items with one locked read of the stocks
+                bulk_create_stock_io_logs(order_io_logs)
 
                 order_instance.amount = order_amount
                 order_instance.discount = order_discount
@@ -781,9 +796,12 @@ class OrderStockIOForInvoiceGroupSerializer(serializers.ModelSerializer):
             'stock_io_logs',
         )
 
-class OrderStockIOForInvoiceGroupPDFSerializer(serializers.ModelSerializer):
+class OrderStockIOForInvoiceGroupPDFSerializer(StockCatalogSerializerMixin, serializers.ModelSerializer):
     stock_io_logs = StockIOLogForInvoicePDFSerializer(many=True)
 
+    def get_catalog_stock_ids(self, instance):
+        return [item.stock_id for item in instance.stock_io_logs.all()]
+
 
     class Meta:
         model = Purchase
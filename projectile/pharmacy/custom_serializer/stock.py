@@ -4,6 +4,7 @@ from common.custom_serializer.cu_base_organization_wise_serializer import(
 )
 
 from core.custom_serializer.organization import OrganizationModelSerializer
+from ..catalog import preload_stock_catalog, render_stock_catalog
 from ..models import Stock
 from ..serializers import (
     StorePointSerializer,
@@ -233,3 +234,36 @@ class StockForInvoicePDFSerializer(serializers.ModelSerializer):
             'id',
             'product',
         )
+
+
+#pylint: disable=W0223
+class StockCatalogField(serializers.Field):
+    """
+    Stock of an io log rendered from its catalog projection, see `pharmacy.catalog`
+
+    Args:
+        projection (str): CART_PROJECTION or INVOICE_PROJECTION
+    """
+
+    def __init__(self, projection, **kwargs):
+        self.projection = projection
+        kwargs.setdefault('source', 'stock_id')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return render_stock_catalog(self.context, value, self.projection)
+
+
+class StockCatalogSerializerMixin:
+    """
+    Load the catalog projections of all the stocks of an instance with one cache read
+    before rendering it, the `StockCatalogField`s of its io logs read them from the context
+    """
+
+    def get_catalog_stock_ids(self, instance):
+        raise NotImplementedError
+
+    def to_representation(self, instance):
+        preload_stock_catalog(self.context, self.get_catalog_stock_ids(instance))
+        return super().to_representation(instance)
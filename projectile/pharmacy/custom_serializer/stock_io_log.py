@@ -15,10 +15,8 @@ from ..utils import (
 from ..models import StockIOLog, Stock
 from ..enums import StockIOType
 from pharmacy.serializers import StockIOLogSerializer, UnitSerializer
-from pharmacy.custom_serializer.stock import (
-    StockForCartGetSerializer,
-    StockForInvoicePDFSerializer,
-)
+from pharmacy.catalog import CART_PROJECTION, INVOICE_PROJECTION
+from pharmacy.custom_serializer.stock import StockCatalogField
 
 #pylint: disable=W0223
 class StockIoLogReportSerializer(serializers.Serializer):
@@ -273,7 +271,7 @@ class StockIOLogForCartPostSerializer(serializers.ModelSerializer):
         )
 
 class StockIOLogForCartGetSerializer(StockIOLogSerializer):
-    stock = StockForCartGetSerializer()
+    stock = StockCatalogField(CART_PROJECTION)
     primary_unit = UnitSerializer()
     secondary_unit = UnitSerializer()
 
@@ -300,7 +298,7 @@ class StockIOLogForCartGetSerializer(StockIOLogSerializer):
 
 
 class StockIOLogForInvoicePDFSerializer(StockIOLogSerializer):
-    stock = StockForInvoicePDFSerializer()
+    stock = StockCatalogField(INVOICE_PROJECTION)
 
     class Meta:
         model = StockIOLog
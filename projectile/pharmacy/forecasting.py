@@ -0,0 +1,87 @@
+"""Vectorized sales velocity helpers for the purchase prediction reports
+
+The io logs are pivoted once into a stock x day matrix, the sales of the trailing
+windows (last day, 3 days, 7 days or any N days) are read from a cumulative sum of
+the matrix instead of scanning the whole data set for every stock and date.
+"""
+import pandas as pd
+
+
+def build_stock_day_matrix(data, dates, stocks=None, stock_key='stock_id', date_key='date', value_key='quantity'):
+    """
+    Pivot the io logs into a stock x day matrix of the summed quantity
+
+    Args:
+        data (DataFrame): io logs with the stock, date and quantity columns
+        dates (list): dates of the matrix columns, in this order
+        stocks (list, optional): stocks of the matrix rows, in this order, defaults to the
+            stocks of the data
+        stock_key (str): name of the stock column
+        date_key (str): name of the date column
+        value_key (str): name of the quantity column
+
+    Returns:
+        DataFrame: one row per stock and one column per date, 0 for the days without sale
+    """
+    if stocks is None:
+        stocks = data[stock_key].unique()
+    matrix = data[data[date_key].isin(dates)].groupby(
+        [stock_key, date_key]
+    )[value_key].sum().unstack(date_key)
+    return matrix.reindex(index=stocks, columns=dates).fillna(0)
+
+
+def trailing_window_sums(matrix, windows):
+    """
+    Sum the last N columns (days) of a stock x day matrix for every window
+
+    Args:
+        matrix (DataFrame): stock x day matrix (see `build_stock_day_matrix`)
+        windows (dict): window name to number of trailing days
+
+    Returns:
+        DataFrame: one column per window, indexed like the matrix
+    """
+    values = matrix.to_numpy(dtype=float)
+    # suffix_sums[:, i] is the sum of the columns from i to the end
+    suffix_sums = values[:, ::-1].cumsum(axis=1)[:, ::-1]
+    number_of_days = values.shape[1]
+    sums = {}
+    for name, days in windows.items():
+        days = min(max(days, 0), number_of_days)
+        if days == 0:
+            sums[name] = 0
+        else:
+            sums[name] = suffix_sums[:, number_of_days - days]
+    return pd.DataFrame(sums, index=matrix.index)
+
+
+def lookup_stock_values(stock_ids, data, value_key, keys=('stock__id', 'ID'), default=0):
+    """
+    Find the value of every stock in another data set (e.g. an uploaded stock file)
+
+    The first row of the first key column containing the stock is used, stocks not found
+    in any of the key columns get the default.
+
+    Args:
+        stock_ids (Series): stock ids to look up
+        data (DataFrame): data set to look up the values from
+        value_key (str): name of the value column
+        keys (tuple): names of the stock id columns, in order of priority
+        default: value for the stocks not found
+
+    Returns:
+        Series: values indexed like `stock_ids`
+    """
+    values = pd.Series(default, index=stock_ids.index, dtype=object)
+    found = pd.Series(False, index=stock_ids.index)
+    if value_key not in data.columns:
+        return values
+    for key in keys:
+        if key not in data.columns:
+            continue
+        lookup = data.drop_duplicates(subset=[key]).set_index(key)[value_key]
+        matched = ~found & stock_ids.isin(lookup.index)
+        values[matched] = stock_ids[matched].map(lookup)
+        found |= matched
+    return pd.to_numeric(values, errors='ignore')
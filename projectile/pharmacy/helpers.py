@@ -27,6 +27,7 @@ from common.enums import Status
 from common.helpers import custom_elastic_rebuild
 from core.enums import PriceType, PersonGroupType
 from pharmacy.models import Product, Stock, StockIOLog, Sales, Purchase, PurchaseRequisition
+from pharmacy.stock_ledger import bulk_create_stock_io_logs
 from pharmacy.enums import (
     SalesType,
     StockIOType,
@@ -308,6 +309,7 @@ def create_requisition_for_procure(
     requisition_instance = Purchase.objects.create(**data)
     # custom_elastic_rebuild('pharmacy.models.Purchase', {'id': requisition_instance.id})
 
+    io_logs = []
     for item in procure_items:
         io_item = {
             "date": _datetime_now.date(),
@@ -324,7 +326,8 @@ def create_requisition_for_procure(
             "organization_id": organization_id,
             "purchase": requisition_instance,
         }
-        StockIOLog.objects.create(**io_item)
+        io_logs.append(StockIOLog(**io_item))
+    bulk_create_stock_io_logs(io_logs)
     return requisition_instance
 
 
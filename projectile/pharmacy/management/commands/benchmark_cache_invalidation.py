@@ -0,0 +1,68 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from common.cache_invalidation import (
+    batch_cache_invalidation,
+    get_cache_invalidation_stats,
+    reset_cache_invalidation_stats,
+)
+from common.cache_keys import STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX
+from common.enums import Status
+from common.tasks import cache_expire_list
+from pharmacy.models import Product, Stock
+
+
+def legacy_expire_product_cache(product):
+    """The previous `Product.expire_cache`, a stock query and a task per product, kept for comparison"""
+    stock_key_list = []
+    stocks = Stock.objects.filter(
+        product_id=product.id,
+        status=Status.ACTIVE
+    ).values_list('id', flat=True)
+    for stock_id in stocks:
+        stock_key_list.append('stock_instance_{}'.format(str(stock_id).zfill(12)))
+        stock_key_list.append(f'{STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX}_{str(stock_id).zfill(12)}')
+    cache_expire_list.apply_async((stock_key_list, ), countdown=5)
+
+
+class Command(BaseCommand):
+    help = "Compare expiring the cache of products with a task per product and with the coalescing buffer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', dest='products', type=int, default=1000)
+
+    def measure(self, function, *args):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            function(*args)
+            elapsed = time.perf_counter() - start
+        return elapsed, len(queries)
+
+    def expire_legacy(self, products):
+        for product in products:
+            legacy_expire_product_cache(product)
+
+    def expire_coalesced(self, products):
+        with transaction.atomic(), batch_cache_invalidation():
+            for product in products:
+                product.expire_cache()
+
+    def handle(self, *args, **options):
+        products = list(Product.objects.filter(
+            status=Status.ACTIVE,
+            organization_id=int(os.environ.get('DISTRIBUTOR_ORG_ID', 303)),
+        ).only('id', 'is_global', 'organization_id').order_by('-pk')[:options['products']])
+
+        legacy_elapsed, legacy_queries = self.measure(self.expire_legacy, products)
+        reset_cache_invalidation_stats()
+        coalesced_elapsed, coalesced_queries = self.measure(self.expire_coalesced, products)
+        stats = get_cache_invalidation_stats()
+        self.stdout.write(
+            f"{len(products)} products: per product {legacy_elapsed:.3f} s / {legacy_queries} queries / "
+            f"{len(products)} tasks, coalesced {coalesced_elapsed:.3f} s / {coalesced_queries} queries / "
+            f"{stats['tasks']} tasks ({stats['tasks_saved']} tasks and {stats['keys_saved']} keys saved)"
+        )
@@ -0,0 +1,214 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.enums import Status
+from pharmacy.catalog import get_stock_catalog_cache_key, preload_stock_catalog
+from pharmacy.custom_serializer.stock import StockForCartGetSerializer
+from pharmacy.custom_serializer.stock_io_log import StockIOLogForCartGetSerializer
+from pharmacy.models import StockIOLog
+from pharmacy.view.purchase import get_catalog_order_items
+
+
+class LegacyStockIOLogForCartGetSerializer(StockIOLogForCartGetSerializer):
+    """The cart item serializer rendering the stock from the joined tables, kept for comparison"""
+    stock = StockForCartGetSerializer()
+
+
+def legacy_get_cart_items(pks):
+    """The io logs of the previous `DistributorOrderCartListCreate.get_queryset`, kept for comparison"""
+    return StockIOLog.objects.filter(
+        pk__in=pks,
+        status=Status.DISTRIBUTOR_ORDER,
+    ).select_related(
+        'primary_unit',
+        'secondary_unit',
+        'stock__store_point',
+        'stock__product__manufacturing_company',
+        'stock__product__form',
+        'stock__product__subgroup__product_group',
+        'stock__product__generic',
+        'stock__product__primary_unit',
+        'stock__product__secondary_unit',
+        'stock__product__category',
+        'stock__product__compartment',
+    ).only(
+        'id',
+        'alias',
+        'status',
+        'stock',
+        'quantity',
+        'rate',
+        'batch',
+        'base_discount',
+        'date',
+        'primary_unit__id',
+        'primary_unit__alias',
+        'primary_unit__name',
+        'primary_unit__description',
+        'secondary_unit__id',
+        'secondary_unit__alias',
+        'secondary_unit__name',
+        'secondary_unit__description',
+        'discount_rate',
+        'discount_total',
+        'round_discount',
+        'vat_rate',
+        'vat_total',
+        'tax_total',
+        'tax_rate',
+        'purchase_id',
+        'stock__id',
+        'stock__alias',
+        'stock__stock',
+        'stock__demand',
+        'stock__auto_adjustment',
+        'stock__minimum_stock',
+        'stock__rack',
+        'stock__tracked',
+        'stock__purchase_rate',
+        'stock__calculated_price',
+        'stock__order_rate',
+        'stock__discount_margin',
+        'stock__orderable_stock',
+        'stock__store_point__id',
+        'stock__store_point__alias',
+        'stock__store_point__name',
+        'stock__store_point__phone',
+        'stock__store_point__address',
+        'stock__store_point__type',
+        'stock__store_point__populate_global_product',
+        'stock__store_point__auto_adjustment',
+        'stock__store_point__created_at',
+        'stock__store_point__updated_at',
+        'stock__product__id',
+        'stock__product__code',
+        'stock__product__species',
+        'stock__product__alias',
+        'stock__product__name',
+        'stock__product__strength',
+        'stock__product__full_name',
+        'stock__product__description',
+        'stock__product__trading_price',
+        'stock__product__purchase_price',
+        'stock__product__status',
+        'stock__product__is_salesable',
+        'stock__product__is_service',
+        'stock__product__is_global',
+        'stock__product__conversion_factor',
+        'stock__product__category',
+        'stock__product__is_printable',
+        'stock__product__image',
+        'stock__product__unit_type',
+        'stock__product__order_limit_per_day',
+        'stock__product__discount_rate',
+        'stock__product__is_queueing_item',
+        'stock__product__manufacturing_company__id',
+        'stock__product__manufacturing_company__alias',
+        'stock__product__manufacturing_company__name',
+        'stock__product__manufacturing_company__description',
+        'stock__product__manufacturing_company__is_global',
+        'stock__product__form__id',
+        'stock__product__form__alias',
+        'stock__product__form__name',
+        'stock__product__form__description',
+        'stock__product__form__is_global',
+        'stock__product__subgroup__id',
+        'stock__product__subgroup__alias',
+        'stock__product__subgroup__name',
+        'stock__product__subgroup__description',
+        'stock__product__subgroup__is_global',
+        'stock__product__subgroup__product_group__id',
+        'stock__product__subgroup__product_group__alias',
+        'stock__product__subgroup__product_group__name',
+        'stock__product__subgroup__product_group__description',
+        'stock__product__subgroup__product_group__is_global',
+        'stock__product__subgroup__product_group__type',
+        'stock__product__generic__id',
+        'stock__product__generic__alias',
+        'stock__product__generic__name',
+        'stock__product__generic__description',
+        'stock__product__generic__is_global',
+        'stock__product__category__id',
+        'stock__product__category__alias',
+        'stock__product__category__name',
+        'stock__product__category__description',
+        'stock__product__category__is_global',
+        'stock__product__primary_unit__id',
+        'stock__product__primary_unit__alias',
+        'stock__product__primary_unit__name',
+        'stock__product__primary_unit__description',
+        'stock__product__secondary_unit__id',
+        'stock__product__secondary_unit__alias',
+    )
+
+
+def legacy_serialize_cart(pks, request):
+    return LegacyStockIOLogForCartGetSerializer(
+        legacy_get_cart_items(pks),
+        many=True,
+        context={'request': request}
+    ).data
+
+
+def serialize_cart(pks, request):
+    items = list(get_catalog_order_items(pk__in=pks))
+    context = {'request': request}
+    preload_stock_catalog(context, [item.stock_id for item in items])
+    return StockIOLogForCartGetSerializer(items, many=True, context=context).data
+
+
+class Command(BaseCommand):
+    help = "Compare the cart items rendered from the joined stock tables and from the stock catalog"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines',
+            dest='lines',
+            type=int,
+            action='append',
+            help='Items of the cart, can be used multiple times',
+        )
+        parser.add_argument('--repeat', dest='repeat', type=int, default=5)
+
+    def get_cart(self, lines):
+        return list(StockIOLog.objects.filter(
+            status=Status.DISTRIBUTOR_ORDER,
+        ).values_list('pk', flat=True).order_by('-pk')[:lines])
+
+    def measure(self, serialize, pks, request, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                data = serialize(pks, request)
+            timings.append(time.perf_counter() - start)
+        sql_time = sum(float(query['time']) for query in queries)
+        return min(timings) * 1000, len(queries), sql_time * 1000, data
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/'))
+        repeat = options['repeat']
+        for lines in options['lines'] or [50, 300]:
+            pks = self.get_cart(lines)
+            stock_ids = StockIOLog.objects.filter(pk__in=pks).values_list('stock_id', flat=True)
+            cache.delete_many([get_stock_catalog_cache_key(stock_id) for stock_id in stock_ids])
+
+            legacy_elapsed, legacy_queries, legacy_sql, legacy_data = self.measure(
+                legacy_serialize_cart, pks, request, repeat
+            )
+            cold_elapsed, cold_queries, cold_sql, _ = self.measure(serialize_cart, pks, request, 1)
+            elapsed, queries, sql, data = self.measure(serialize_cart, pks, request, repeat)
+
+            matches = sorted(legacy_data, key=lambda item: item['id']) == sorted(data, key=lambda item: item['id'])
+            self.stdout.write(
+                f"{len(pks):>4} lines  joined {legacy_elapsed:8.2f} ms ({legacy_queries} queries, {legacy_sql:.2f} ms sql)   "
+                f"catalog cold {cold_elapsed:8.2f} ms ({cold_queries} queries, {cold_sql:.2f} ms sql)   "
+                f"catalog warm {elapsed:8.2f} ms ({queries} queries, {sql:.2f} ms sql)   "
+                f"same response: {matches}"
+            )
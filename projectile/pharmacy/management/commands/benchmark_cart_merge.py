@@ -0,0 +1,110 @@
+import random
+import timeit
+from functools import partial
+
+import pandas as pd
+from dotmap import DotMap
+from django.core.management.base import BaseCommand
+
+from common.utils import get_item_from_list_of_dict
+from pharmacy.cart_merge import CartProduct, CartStock, index_records, merge_cart_items
+
+
+def legacy_merge_cart_items(existing_items, new_items):
+    """The pandas based merge previously used in `update_cart`, kept for comparison"""
+    data_df = pd.DataFrame(existing_items)
+    new_items_df = pd.DataFrame(new_items, columns=["stock", "quantity"])
+    new_items_df.rename(columns={"stock": "stock_id", "quantity": "total_quantity"}, inplace=True)
+    if not data_df.empty:
+        data_df = data_df.groupby(["stock_id"], as_index=False).sum()
+        data_df = data_df.rename(columns={"quantity": "total_quantity",})
+    if not new_items_df.empty and not data_df.empty:
+        final_df = pd.merge(data_df, new_items_df, on='stock_id', how='outer', suffixes=('_df1', '_df2'))
+        final_df['total_quantity_df2'].fillna(final_df['total_quantity_df1'], inplace=True)
+        final_df.drop(['total_quantity_df1'], axis=1, inplace=True)
+        final_df.rename(columns={"total_quantity_df2": "total_quantity"}, inplace=True)
+        final_df['change'] = final_df["total_quantity"] - data_df["total_quantity"]
+        final_df['change'].fillna(final_df["total_quantity"], inplace=True)
+        return final_df.to_dict("records")
+    elif not new_items_df.empty and data_df.empty:
+        new_items_df['change'] = new_items_df["total_quantity"]
+        return new_items_df.to_dict("records")
+    elif new_items_df.empty and not data_df.empty:
+        data_df['change'] = 0
+        return data_df.to_dict("records")
+    return []
+
+
+def legacy_prepare(existing_items, new_items, stocks, products):
+    aggregated_cart_items = legacy_merge_cart_items(existing_items, new_items)
+    prepared_items = []
+    for item in aggregated_cart_items:
+        stock = DotMap(get_item_from_list_of_dict(stocks, 'id', item['stock_id']))
+        product = DotMap(get_item_from_list_of_dict(products, 'id', stock.product_id))
+        prepared_items.append((stock, product))
+    return prepared_items
+
+
+def indexed_prepare(existing_items, new_items, stocks, products):
+    aggregated_cart_items = merge_cart_items(existing_items, new_items)
+    stocks_by_id = index_records(stocks, CartStock)
+    products_by_id = index_records(products, CartProduct)
+    prepared_items = []
+    for item in aggregated_cart_items:
+        stock = stocks_by_id.get(item.stock_id)
+        prepared_items.append((stock, products_by_id[stock.product_id]))
+    return prepared_items
+
+
+def generate_cart(size):
+    stock_ids = random.sample(range(1, size * 10 + 1), size)
+    existing_items = [
+        {'stock_id': stock_id, 'quantity': float(random.randint(1, 10))}
+        for stock_id in stock_ids
+    ]
+    # A new item and an updated item, like an add to cart request
+    new_items = [
+        {'stock': size * 10 + 1, 'quantity': 2},
+        {'stock': stock_ids[0], 'quantity': 5},
+    ]
+    stocks = [
+        {'id': stock_id, 'product_id': stock_id, 'orderable_stock': 100.0}
+        for stock_id in stock_ids + [size * 10 + 1]
+    ]
+    products = [
+        {field: 1 for field in CartProduct.FIELDS} | {'id': stock['id']}
+        for stock in stocks
+    ]
+    return existing_items, new_items, stocks, products
+
+
+class Command(BaseCommand):
+    help = "Benchmark the cart merge of `update_cart` against the previous pandas implementation"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            dest='sizes',
+            default='1,10,50,100,200,500',
+            help='Comma separated cart sizes',
+        )
+        parser.add_argument(
+            '--repeat',
+            dest='repeat',
+            type=int,
+            default=50,
+            help='Number of runs for each cart size',
+        )
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        repeat = options['repeat']
+        self.stdout.write(f"{'size':>6} {'pandas (ms)':>12} {'indexed (ms)':>13} {'speedup':>8}")
+        for size in map(int, options['sizes'].split(',')):
+            data = generate_cart(size)
+            legacy_time = timeit.timeit(partial(legacy_prepare, *data), number=repeat) / repeat
+            indexed_time = timeit.timeit(partial(indexed_prepare, *data), number=repeat) / repeat
+            self.stdout.write(
+                f"{size:>6} {legacy_time * 1000:>12.3f} {indexed_time * 1000:>13.3f} "
+                f"{legacy_time / indexed_time:>7.1f}x"
+            )
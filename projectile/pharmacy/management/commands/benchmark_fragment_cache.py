@@ -0,0 +1,127 @@
+import os
+import pickle
+import time
+
+import orjson
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.cache_helpers import RedisCommandCounter
+from common.cache_keys import STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX
+from common.enums import Status
+from common.fragment_cache import (
+    expire_model_fragments,
+    get_fragment_cache_stats,
+    get_fragment_key,
+    get_or_build_fragments,
+    reset_fragment_cache_stats,
+)
+from pharmacy.custom_serializer.stock import DistributorSalesableStock
+from pharmacy.models import Stock
+
+LEGACY_BASE_KEY = f"benchmark_legacy_{STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX}"
+BASE_KEY = f"benchmark_{STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX}"
+
+
+def serialize_distributor_stocks(pks, request):
+    queryset = Stock().get_queryset_for_cache(pks, request=request, is_distributor_stock=True)
+    serializer = DistributorSalesableStock.ListForSuperAdmin(
+        queryset,
+        many=True,
+        context={'request': request}
+    )
+    return {item["id"]: item for item in serializer.data}
+
+
+def legacy_get_distributor_stocks(pks, request):
+    """
+    The previous `StockProductBaseView.get_from_cache`, kept for comparison: the misses
+    were written by a `bulk_cache_write` task 5 seconds later, so every request of the page
+    in the meantime missed too. Returns the page and the json payload of the task.
+    """
+    cache_key_list = [get_fragment_key(LEGACY_BASE_KEY, pk) for pk in pks]
+    cached_data = cache.get_many(cache_key_list)
+    task_payload = b""
+    if len(cached_data) < 20:
+        missing_pks = [pk for pk, key in zip(pks, cache_key_list) if key not in cached_data]
+        if missing_pks:
+            new_cached_data = {
+                get_fragment_key(LEGACY_BASE_KEY, pk): data
+                for pk, data in serialize_distributor_stocks(missing_pks, request).items()
+            }
+            task_payload = orjson.dumps(new_cached_data, default=str)
+            cached_data.update(new_cached_data)
+    return [cached_data[key] for key in cache_key_list if key in cached_data], task_payload
+
+
+class Command(BaseCommand):
+    help = "Compare the distributor stock list served by the delayed celery cache write and by the fragment cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', dest='pages', type=int, default=5)
+        parser.add_argument('--page-size', dest='page_size', type=int, default=20)
+        parser.add_argument(
+            '--repeat',
+            dest='repeat',
+            type=int,
+            default=5,
+            help='Requests of every page within the 5 seconds the celery write used to wait',
+        )
+
+    def get_pages(self, page_size, pages):
+        pks = list(Stock.objects.filter(
+            status=Status.ACTIVE,
+            organization_id=int(os.environ.get('DISTRIBUTOR_ORG_ID', 303)),
+        ).values_list('pk', flat=True).order_by('-pk')[:page_size * pages])
+        return [pks[index:index + page_size] for index in range(0, len(pks), page_size)]
+
+    def run_legacy(self, pages, request, repeat):
+        cache.delete_many([get_fragment_key(LEGACY_BASE_KEY, pk) for page in pages for pk in page])
+        broker_bytes = 0
+        responses = []
+        start = time.perf_counter()
+        for page in pages:
+            for _ in range(repeat):
+                response, task_payload = legacy_get_distributor_stocks(page, request)
+                # Published to and delivered from the broker
+                broker_bytes += 2 * len(task_payload)
+            responses.append(response)
+        elapsed = time.perf_counter() - start
+        pickled_bytes = sum(len(pickle.dumps(item)) for response in responses for item in response)
+        return elapsed, broker_bytes, pickled_bytes
+
+    def run_fragment_cache(self, pages, request, repeat):
+        expire_model_fragments(Stock)
+        reset_fragment_cache_stats()
+        start = time.perf_counter()
+        with RedisCommandCounter() as counter:
+            for page in pages:
+                for _ in range(repeat):
+                    get_or_build_fragments(
+                        Stock,
+                        BASE_KEY,
+                        page,
+                        lambda pks: serialize_distributor_stocks(pks, request)
+                    )
+        elapsed = time.perf_counter() - start
+        return elapsed, counter.count, get_fragment_cache_stats().get(BASE_KEY, {})
+
+    def handle(self, *args, **options):
+        pages = self.get_pages(options['page_size'], options['pages'])
+        request = Request(APIRequestFactory().get('/'))
+        repeat = options['repeat']
+        requests = len(pages) * repeat
+
+        legacy_elapsed, broker_bytes, pickled_bytes = self.run_legacy(pages, request, repeat)
+        elapsed, redis_commands, stats = self.run_fragment_cache(pages, request, repeat)
+
+        self.stdout.write(
+            f"{requests} requests of {len(pages)} pages: celery write {legacy_elapsed:.3f} s "
+            f"({broker_bytes} bytes through the broker), fragment cache {elapsed:.3f} s "
+            f"({redis_commands} redis commands, hit ratio {stats.get('hit_ratio', 0)})"
+        )
+        self.stdout.write(
+            f"cached pages: pickled {pickled_bytes} bytes, orjson {stats.get('bytes_written', 0)} bytes"
+        )
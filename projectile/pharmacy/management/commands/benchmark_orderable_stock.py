@@ -0,0 +1,49 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from common.enums import Status
+from pharmacy.models import Stock
+
+
+def legacy_orderable_stocks(stocks):
+    """The per stock aggregate previously run in the orderable stock loops, kept for comparison"""
+    return {stock.id: stock.get_current_orderable_stock() for stock in stocks}
+
+
+class Command(BaseCommand):
+    help = "Compare computing the orderable stock per stock and with the grouped Stock.get_orderable_stocks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stocks', dest='stocks', type=int, default=500)
+
+    def measure(self, function, *args):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = function(*args)
+            elapsed = time.perf_counter() - start
+        return result, elapsed, len(queries)
+
+    def handle(self, *args, **options):
+        stocks = list(Stock.objects.filter(
+            status=Status.ACTIVE,
+            organization_id=int(os.environ.get('DISTRIBUTOR_ORG_ID', 303)),
+        ).only('id', 'ecom_stock').order_by('-pk')[:options['stocks']])
+
+        legacy, legacy_elapsed, legacy_queries = self.measure(legacy_orderable_stocks, stocks)
+        bulk, bulk_elapsed, bulk_queries = self.measure(
+            Stock.get_orderable_stocks,
+            [stock.id for stock in stocks],
+            {stock.id: stock.ecom_stock for stock in stocks},
+        )
+        mismatches = [
+            stock_id for stock_id, orderable_stock in legacy.items()
+            if bulk[stock_id]['orderable_stock'] != orderable_stock
+        ]
+        self.stdout.write(
+            f"{len(stocks)} stocks: per stock {legacy_elapsed:.3f} s / {legacy_queries} queries, "
+            f"grouped {bulk_elapsed:.3f} s / {bulk_queries} queries, {len(mismatches)} mismatches"
+        )
@@ -0,0 +1,81 @@
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from pharmacy.forecasting import build_stock_day_matrix, trailing_window_sums
+
+
+def legacy_find_number(stock_id, dates, data_set):
+    """The per stock and date scan previously used by `PurchasePrediction`, kept for comparison"""
+    data = []
+    for date in dates:
+        data.append(data_set.loc[(data_set['date'] == date) & (data_set['stock_id'] == stock_id), 'quantity'].sum())
+    return sum(data)
+
+
+def legacy_prediction(stocks, dates, data):
+    for item in stocks:
+        ld = legacy_find_number(item, dates[6:], data)
+        three_d = legacy_find_number(item, dates[4:], data)
+        seven_d = legacy_find_number(item, dates, data)
+        legacy_find_number(item, dates, data)  # history
+        ld + three_d / 3 + seven_d / 7
+
+
+def vectorized_prediction(stocks, dates, data):
+    history = build_stock_day_matrix(data, dates, stocks=stocks)
+    windows = trailing_window_sums(history, {
+        'last_day': len(dates[6:]),
+        '3d': len(dates[4:]),
+        '7d': len(dates),
+    })
+    windows['last_day'] + windows['3d'] / 3 + windows['7d'] / 7
+
+
+def generate_io_logs(number_of_stocks, number_of_days, rows_per_stock):
+    rng = np.random.default_rng(42)
+    today = datetime.date.today()
+    size = number_of_stocks * rows_per_stock
+    stock_ids = rng.integers(1, number_of_stocks + 1, size=size)
+    return pd.DataFrame({
+        'stock_id': stock_ids,
+        'product': [f"Product {stock_id}" for stock_id in stock_ids],
+        'quantity': rng.integers(1, 10, size=size).astype(float),
+        'date': [today - datetime.timedelta(days=int(day)) for day in rng.integers(0, number_of_days + 1, size=size)],
+    })
+
+
+class Command(BaseCommand):
+    help = "Benchmark the purchase prediction sales velocity against the previous per stock scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stocks', dest='stocks', type=int, default=10000)
+        parser.add_argument('--days', dest='days', type=int, default=15)
+        parser.add_argument('--rows-per-stock', dest='rows_per_stock', type=int, default=10)
+        parser.add_argument(
+            '--legacy-sample',
+            dest='legacy_sample',
+            type=int,
+            default=200,
+            help='Number of stocks timed with the previous implementation, extrapolated to all stocks',
+        )
+
+    def handle(self, *args, **options):
+        data = generate_io_logs(options['stocks'], options['days'], options['rows_per_stock'])
+        dates = data['date'].sort_index(ascending=False).unique()[8:-1]
+        stocks = list(set(data['stock_id'].unique()))
+        self.stdout.write(f"{len(data)} io logs, {len(stocks)} stocks, {len(dates)} dates")
+
+        sample = stocks[:options['legacy_sample']]
+        start = time.perf_counter()
+        legacy_prediction(sample, dates, data)
+        legacy_time = (time.perf_counter() - start) / len(sample) * len(stocks)
+        self.stdout.write(f"per stock scans (extrapolated): {legacy_time:.2f}s")
+
+        start = time.perf_counter()
+        vectorized_prediction(stocks, dates, data)
+        vectorized_time = time.perf_counter() - start
+        self.stdout.write(f"vectorized: {vectorized_time:.3f}s ({legacy_time / vectorized_time:.0f}x)")
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from common.enums import Status
+from common.keyword_search import search_by_keyword
+from pharmacy.models import Stock
+
+TRIGRAM_INDEX_NAME = "pharmacy_stock_product_full_name_trgm"
+
+
+def legacy_filter_by_keyword(queryset, keyword):
+    """The previous keyword filter of the stock lists, a chained LIKE per word, kept for comparison"""
+    keyword = " ".join(keyword.split())
+    for each_keyword in keyword.split(" "):
+        queryset = queryset.filter(
+            product_full_name__contains=each_keyword.lower()
+        )
+    return queryset
+
+
+class Command(BaseCommand):
+    help = "Compare the chained LIKE keyword filter of the stock lists with the trigram indexed search"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keyword',
+            dest='keywords',
+            action='append',
+            help='Keyword to search, can be used multiple times',
+        )
+        parser.add_argument('--page-size', dest='page_size', type=int, default=20)
+        parser.add_argument('--repeat', dest='repeat', type=int, default=5)
+
+    def measure(self, queryset, repeat, without_index=False):
+        timings = []
+        for _ in range(repeat):
+            with transaction.atomic():
+                if without_index and connection.vendor == "postgresql":
+                    # As before the migration, the trigram index is only read by a bitmap scan
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL enable_bitmapscan = off")
+                start = time.perf_counter()
+                list(queryset)
+                timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    def uses_index(self, queryset):
+        if connection.vendor != "postgresql":
+            return False
+        return TRIGRAM_INDEX_NAME in queryset.explain()
+
+    def handle(self, *args, **options):
+        keywords = options['keywords'] or ['napa', 'napa extra', 'sec 20 cap', 'ace plus']
+        page_size = options['page_size']
+        repeat = options['repeat']
+        base_queryset = Stock.objects.filter(status=Status.ACTIVE)
+        self.stdout.write(f"{base_queryset.count()} stocks on {connection.vendor}")
+
+        for keyword in keywords:
+            legacy = legacy_filter_by_keyword(base_queryset, keyword).values_list('pk', flat=True)
+            indexed = search_by_keyword(
+                base_queryset, 'product_full_name', keyword
+            ).values_list('pk', flat=True)
+            ranked = search_by_keyword(
+                base_queryset, 'product_full_name', keyword, rank=True
+            ).values_list('pk', flat=True)
+
+            legacy_elapsed = self.measure(legacy[:page_size], repeat, without_index=True)
+            indexed_elapsed = self.measure(indexed[:page_size], repeat)
+            ranked_elapsed = self.measure(ranked[:page_size], repeat)
+            self.stdout.write(
+                f"{keyword!r:<16} chained LIKE {legacy_elapsed:8.2f} ms   "
+                f"trigram {indexed_elapsed:8.2f} ms (index used: {self.uses_index(indexed[:page_size])})   "
+                f"ranked {ranked_elapsed:8.2f} ms"
+            )
@@ -0,0 +1,98 @@
+import datetime
+import io
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from common.enums import Status
+from pharmacy import stock_snapshot
+from pharmacy.models import Stock
+from pharmacy.stock_snapshot import get_ecommerce_stock_changes, get_stock_snapshot
+
+
+def legacy_last_stock(stock_id, csv_content):
+    """The per stock csv read previously done by `Stock.get_last_stock_info_from_file`, kept for comparison"""
+    stock_df = pd.read_csv(io.StringIO(csv_content))
+    item_in_file = stock_df.loc[stock_df['ID'] == int(stock_id)].to_dict(orient='records')
+    return item_in_file[0].get('STOCK', 0) if item_in_file else 0
+
+
+def generate_stock_csv(number_of_rows):
+    rng = np.random.default_rng(42)
+    stock_df = pd.DataFrame({
+        'ID': np.arange(1, number_of_rows + 1),
+        'NAME': [f"Product {index}" for index in range(number_of_rows)],
+        'STOCK': rng.integers(0, 500, size=number_of_rows),
+    })
+    return stock_df.to_csv(index=False)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the parsed stock file snapshot against reading the csv for every stock"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', dest='rows', type=int, default=10000)
+        parser.add_argument(
+            '--legacy-sample',
+            dest='legacy_sample',
+            type=int,
+            default=100,
+            help='Number of stocks looked up the legacy way, the total is extrapolated',
+        )
+        parser.add_argument(
+            '--db-stocks',
+            dest='db_stocks',
+            type=int,
+            default=0,
+            help='Also compare the per stock and grouped stock change queries for this many stocks',
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        csv_content = generate_stock_csv(rows)
+        sample = min(options['legacy_sample'], rows)
+
+        start = time.perf_counter()
+        for stock_id in range(1, sample + 1):
+            legacy_last_stock(stock_id, csv_content)
+        legacy_elapsed = (time.perf_counter() - start) * rows / sample
+
+        with tempfile.TemporaryDirectory() as snapshot_dir, override_settings(STOCK_SNAPSHOT_DIR=snapshot_dir):
+            stock_snapshot._loaded_snapshots.clear()
+            stock_file = SimpleNamespace(
+                pk=0,
+                created_at=datetime.datetime.now(datetime.timezone.utc),
+                content=io.StringIO(csv_content),
+            )
+            start = time.perf_counter()
+            snapshot = get_stock_snapshot(stock_file)
+            snapshot.get_stocks(range(1, rows + 1))
+            snapshot_elapsed = time.perf_counter() - start
+            stock_snapshot._loaded_snapshots.clear()
+
+        self.stdout.write(
+            f"{rows} rows: per stock csv read {legacy_elapsed:.2f} s (extrapolated from {sample}), "
+            f"snapshot {snapshot_elapsed * 1000:.2f} ms"
+        )
+
+        if options['db_stocks']:
+            stock_ids = list(
+                Stock.objects.filter(status=Status.ACTIVE).values_list('id', flat=True)[:options['db_stocks']]
+            )
+            file_upload_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=7)
+            start = time.perf_counter()
+            for stock_id in stock_ids:
+                get_ecommerce_stock_changes([stock_id], file_upload_date)
+            per_stock_elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            get_ecommerce_stock_changes(stock_ids, file_upload_date)
+            grouped_elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{len(stock_ids)} stocks: per stock changes {per_stock_elapsed:.2f} s, "
+                f"grouped changes {grouped_elapsed:.2f} s"
+            )
@@ -2,14 +2,14 @@ import logging
 from tqdm import tqdm
 
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
 
 from common.enums import Status
-from common.cache_keys import STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX
+from common.fragment_cache import expire_model_fragments
 
 from core.models import  Organization
 
 from pharmacy.models import Stock, Product
+from pharmacy.stock_snapshot import get_calculated_stocks_for_ecommerce, get_latest_stock_snapshot
 from pharmacy.utils import get_is_queueing_item_value
 
 logger = logging.getLogger(__name__)
@@ -36,7 +36,6 @@ class Command(BaseCommand):
         total_update_count = 0
         stock_instances = []
         product_instances = []
-        stock_cache_key_list = []
 
 
         stocks = Stock.objects.filter(
@@ -44,8 +43,16 @@ class Command(BaseCommand):
             organization__id=healthos_org_instance.id,
             store_point__status=Status.ACTIVE
         ).only('id', 'ecom_stock', 'orderable_stock', 'product__name')
+        # The stock file is read once, the stock changes are aggregated per chunk of stocks
+        snapshot = get_latest_stock_snapshot()
+        stock_ids = list(stocks.values_list('id', flat=True))
+        calculated_stocks = {}
+        for index in range(0, len(stock_ids), 1000):
+            calculated_stocks.update(
+                get_calculated_stocks_for_ecommerce(stock_ids[index:index + 1000], snapshot)
+            )
         for stock in tqdm(stocks):
-            calculated_stock = stock.get_calculated_stock_for_ecommerce()
+            calculated_stock = calculated_stocks.get(stock.id, 0)
             current_orderable_stock = stock.get_current_orderable_stock(calculated_stock)
             if stock.ecom_stock != calculated_stock or stock.orderable_stock != current_orderable_stock:
                 logger.info(
@@ -72,15 +79,10 @@ class Command(BaseCommand):
                 logger.info(
                     f"Set product is queueing item to {is_queueing_item_value} for stock {stock.id}."
                 )
-            stock_key_list = [
-                # f"stock_instance_{str(stock).zfill(12)}",
-                f"{STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX}_{str(stock.id).zfill(12)}"
-            ]
-            stock_cache_key_list.extend(stock_key_list)
         Stock.objects.bulk_update(stock_instances, ['orderable_stock', 'ecom_stock'], batch_size=1000)
         Product.objects.bulk_update(product_instances, ['is_queueing_item',], batch_size=1000)
-        # Expire stock cache
-        cache.delete_many(stock_cache_key_list)
+        # Expire the cached distributor stocks
+        expire_model_fragments(Stock)
 
 
         logger.info(
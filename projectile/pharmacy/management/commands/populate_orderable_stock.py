@@ -2,6 +2,7 @@ import logging
 
 from tqdm import tqdm
 from django.core.management.base import BaseCommand
+from common.cache_invalidation import batch_cache_invalidation
 from common.enums import Status
 from common.helpers import is_allowed_to_update_queueing_item_value
 from core.models import Organization
@@ -31,24 +32,25 @@ def populate_orderable_stock():
         store_point__status=Status.ACTIVE,
     )
     stop_inventory_signal()
-    for stock in tqdm(stocks):
-        current_orderable_stock = stock.current_orderable_stock
-        if current_orderable_stock != stock.orderable_stock:
-            stock.orderable_stock = current_orderable_stock
-            update_count += 1
-            stock.save(update_fields=['orderable_stock'])
-        # Update Next Day Flag
-        if stock.orderable_stock <= 0 and is_allowed_to_update_queueing_item_value(settings, stock.product):
-            Product.objects.filter(
-                pk=stock.product_id,
-                is_queueing_item=False
-            ).update(is_queueing_item=True)
-        else:
-            Product.objects.filter(
-                pk=stock.product_id,
-                is_queueing_item=True
-            ).update(is_queueing_item=False)
-        stock.expire_cache()
+    with batch_cache_invalidation():
+        for stock in tqdm(stocks):
+            current_orderable_stock = stock.current_orderable_stock
+            if current_orderable_stock != stock.orderable_stock:
+                stock.orderable_stock = current_orderable_stock
+                update_count += 1
+                stock.save(update_fields=['orderable_stock'])
+            # Update Next Day Flag
+            if stock.orderable_stock <= 0 and is_allowed_to_update_queueing_item_value(settings, stock.product):
+                Product.objects.filter(
+                    pk=stock.product_id,
+                    is_queueing_item=False
+                ).update(is_queueing_item=True)
+            else:
+                Product.objects.filter(
+                    pk=stock.product_id,
+                    is_queueing_item=True
+                ).update(is_queueing_item=False)
+            stock.expire_cache()
     logger.info(f"Total {update_count} stock updated.")
     start_inventory_signal()
 
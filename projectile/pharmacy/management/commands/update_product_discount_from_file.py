@@ -4,10 +4,10 @@ from datetime import datetime
 
 from tqdm import tqdm
 import pandas as pd
-from django.core.cache import cache
 from django.apps import apps
 from django.core.management.base import BaseCommand
 from projectile.settings import REPO_DIR
+from common.fragment_cache import expire_model_fragments
 from pharmacy.models import Stock, Product, ProductChangesLogs
 from search.utils import update_stock_es_doc
 
@@ -34,7 +34,6 @@ class Command(BaseCommand):
         update_count = 0
         products_to_be_updated = []
         product_changes_log_data = []
-        stock_key_list = []
         for stock in tqdm(stock_qs):
             product_discount_rate = round(get_data(stock_data, stock.id, "NEW_DISCOUNT"), 2)
             product = Product.objects.only("discount_rate", "image").get(pk=stock.product_id)
@@ -42,7 +41,6 @@ class Command(BaseCommand):
             if product_discount_rate and product_discount_rate != current_discount:
                 product.discount_rate = product_discount_rate
                 products_to_be_updated.append(product)
-                stock_key_list.append('stock_instance_distributor_{}'.format(str(stock.id).zfill(12)))
                 product_changes_log_data.append(
                     ProductChangesLogs(
                         product_id=stock.product_id,
@@ -62,6 +60,6 @@ class Command(BaseCommand):
             ProductChangesLogs.objects.bulk_create(product_changes_log_data)
             # Update stock document
             update_stock_es_doc(queryset=stock_qs)
-            # Delete cache
-            cache.delete_many(stock_key_list)
+            # Expire the cached distributor stocks
+            expire_model_fragments(Stock)
         logger.info(f"Done !!!, {update_count} Products Updated.")
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+TRIGRAM_INDEX_NAME = "pharmacy_stock_product_full_name_trgm"
+
+
+def create_trigram_index(apps, schema_editor):
+    # pg_trgm is postgres only, the keyword search falls back to a plain LIKE elsewhere
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Built concurrently so the stock table stays writable meanwhile
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {TRIGRAM_INDEX_NAME} "
+        "ON pharmacy_stock USING gin (product_full_name gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {TRIGRAM_INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('pharmacy', '0178_recheck_top_sheet_recheckproduct_invoice_group_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
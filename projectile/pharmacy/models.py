@@ -19,6 +19,7 @@ from django.db.models.aggregates import Sum, Count, Avg
 from django.db.models.functions import Coalesce, Cast
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.conf import settings
 
 from common.validators import admin_validate_unique_name_with_org, positive_non_zero
 from common.helpers import custom_elastic_rebuild
@@ -32,11 +33,11 @@ from common.models import (
 )
 from common.cache_keys import (
     STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX,
-    CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX,
-    CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX,
 )
+from common.cache_helpers import expire_customer_non_group_order_cache
 from common.utils import DistinctSum, Round
-from common.tasks import cache_expire_list, cache_expire
+from common.cache_invalidation import expire_cache_keys, expire_cache_keys_deferred
+from common.fragment_cache import expire_model_fragments
 from common.fields import TimestampImageField, JSONTextField, TimestampVersatileImageField
 from core.enums import (
     PersonGroupType,
@@ -49,6 +50,7 @@ from core.models import Organization, PersonOrganization
 from core.models import Person, Department
 from ecommerce.enums import ShortReturnLogType, FailedDeliveryReason
 
+from .catalog import get_stock_catalog_cache_key
 from .signals import (
     post_delete_stock_io_log,
     post_save_purchase,
@@ -64,6 +66,7 @@ from .signals import (
     post_save_order_tracking,
     post_save_stock_reminder,
     post_save_logo_image,
+    refresh_sales_cube_of_stock_io_log,
 )
 from .enums import (
     StorePointType,
@@ -414,31 +417,26 @@ class Product(NameSlugDescriptionBaseOrganizationWiseModel):
     #     ).get_cumulative_discount_factor()
 
 
+    @staticmethod
+    def get_stock_cache_keys(product_ids):
+        stock_ids = list(Stock.objects.filter(
+            product_id__in=product_ids,
+            status=Status.ACTIVE
+        ).values_list('id', flat=True))
+        if len(stock_ids) < settings.CACHE_INVALIDATION_TASK_MAX_KEYS:
+            return Stock.get_cache_keys(stock_ids)
+        # Products changed in bulk, all the stock fragments are dropped at once
+        expire_model_fragments(Stock)
+        return Stock.get_cache_keys(stock_ids, fragments=False)
+
     def expire_cache(self):
         import os
         from common.enums import PublishStatus
-        stock_key_list = []
-        stocks = Stock.objects.filter(
-            product_id=self.id,
-            status=Status.ACTIVE
-        ).values_list('id', flat=True)
-
-        for stock_id in stocks:
-            stock_key_list.append('stock_instance_{}'.format(str(stock_id).zfill(12)))
-            stock_key_list.append(f'{STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX}_{str(stock_id).zfill(12)}')
 
+        # The stocks of all the products changed in the transaction are found with one query
+        expire_cache_keys_deferred(Product.get_stock_cache_keys, [self.id])
         if self.is_global == PublishStatus.PRIVATE and self.organization_id == int(os.environ.get('DISTRIBUTOR_ORG_ID', 303)):
-            stock_key_list.append('manufacturing_company_published')
-        cache_expire_list.apply_async(
-            (stock_key_list, ),
-            countdown=5,
-            retry=True, retry_policy={
-                'max_retries': 10,
-                'interval_start': 0,
-                'interval_step': 0.2,
-                'interval_max': 0.2,
-            }
-        )
+            expire_cache_keys(['manufacturing_company_published'])
 
 
 
@@ -1111,32 +1109,28 @@ class Stock(CreatedAtUpdatedAtBaseModelWithOrganization):
         )
         return io_logs.first()['total_qty'] if io_logs else 0.00
 
-    def expire_cache(self):
-        # cache_expire.apply_async(
-        #     ('stock_instance_{}'.format(str(self.id).zfill(12)),),
-        #     countdown=5,
-        #     retry=True, retry_policy={
-        #         'max_retries': 10,
-        #         'interval_start': 0,
-        #         'interval_step': 0.2,
-        #         'interval_max': 0.2,
-        #     }
-        # )
-        stock_key_list = [
-            "stock_instance_{}".format(str(self.id).zfill(12)),
-            f"{STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX}_{str(self.id).zfill(12)}"
-        ]
+    @staticmethod
+    def get_cache_keys(stock_ids, fragments=True):
+        """
+        Args:
+            stock_ids (list): ids of the stocks
+            fragments (bool, optional): include the keys of the distributor stock fragments,
+                not needed once they are expired with `expire_model_fragments`
+        """
+        stock_key_list = []
+        for stock_id in stock_ids:
+            stock_key_list.extend([
+                "stock_instance_{}".format(str(stock_id).zfill(12)),
+                get_stock_catalog_cache_key(stock_id),
+            ])
+            if fragments:
+                stock_key_list.append(
+                    f"{STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX}_{str(stock_id).zfill(12)}"
+                )
+        return stock_key_list
 
-        cache_expire_list.apply_async(
-            (stock_key_list, ),
-            countdown=5,
-            retry=True, retry_policy={
-                "max_retries": 10,
-                "interval_start": 0,
-                "interval_step": 0.2,
-                "interval_max": 0.2,
-            }
-        )
+    def expire_cache(self):
+        expire_cache_keys(Stock.get_cache_keys([self.id]))
 
     def update_avg_purchase_rate(self):
         """[summary]
@@ -1315,8 +1309,19 @@ class Stock(CreatedAtUpdatedAtBaseModelWithOrganization):
     def avg_purchase_rate_last_30_days(self):
         return self.get_avg_purchase_rate_by_days(30)
 
-    def get_current_orderable_stock(self, current_stock = None):
-        io_logs = self.stocks_io.filter(
+    @staticmethod
+    def get_pending_order_quantities(stock_ids):
+        """
+        Quantity of the pending e-commerce orders of many stocks with a single grouped query,
+        the quantity the orderable stock keeps aside from the ecom stock
+
+        Args:
+            stock_ids (list): stock ids
+
+        Returns:
+            dict: stock id to pending order quantity, stocks without pending orders are missing
+        """
+        pending_orders = StockIOLog.objects.filter(
             ((Q(purchase__current_order_status__in=[
                 OrderTrackingStatus.PENDING,
                 OrderTrackingStatus.ACCEPTED,
@@ -1328,19 +1333,99 @@ class Stock(CreatedAtUpdatedAtBaseModelWithOrganization):
                 OrderTrackingStatus.PENDING,
                 OrderTrackingStatus.READY_TO_DELIVER,
             ]))),
+            stock_id__in=stock_ids,
             status=Status.DISTRIBUTOR_ORDER,
             purchase__status=Status.DISTRIBUTOR_ORDER,
             purchase__distributor_order_type=DistributorOrderType.ORDER,
             purchase__purchase_type=PurchaseType.VENDOR_ORDER,
-            # purchase__current_order_status__in=[
-            #     OrderTrackingStatus.PENDING,
-            #     OrderTrackingStatus.ACCEPTED,
-            #     OrderTrackingStatus.READY_TO_DELIVER,
-            # ]
-        ).only("quantity").aggregate(total_qty=Coalesce(Sum(F('quantity')), 0.00))
+        ).values('stock_id').order_by('stock_id').annotate(total_qty=Sum(F('quantity')))
+        return {item['stock_id']: item['total_qty'] or 0 for item in pending_orders}
+
+    @classmethod
+    def get_orderable_stocks(cls, stock_ids, current_stocks=None):
+        """
+        Pending order quantity and orderable stock of many stocks
+
+        Args:
+            stock_ids (list): stock ids
+            current_stocks (dict): stock id to the ecom stock to compute from, the saved ecom stock otherwise
+
+        Returns:
+            dict: stock id to `pending_order_quantity` and `orderable_stock`
+        """
+        stock_ids = list(stock_ids)
+        current_stocks = dict(current_stocks or {})
+        missing_stock_ids = [stock_id for stock_id in stock_ids if stock_id not in current_stocks]
+        if missing_stock_ids:
+            current_stocks.update(
+                cls.objects.filter(pk__in=missing_stock_ids).values_list('id', 'ecom_stock')
+            )
+        pending_order_quantities = cls.get_pending_order_quantities(stock_ids)
+        orderable_stocks = {}
+        for stock_id in stock_ids:
+            if stock_id not in current_stocks:
+                continue
+            pending_order_quantity = pending_order_quantities.get(stock_id, 0)
+            orderable_stocks[stock_id] = {
+                'pending_order_quantity': pending_order_quantity,
+                'orderable_stock': current_stocks[stock_id] - pending_order_quantity,
+            }
+        return orderable_stocks
+
+    @classmethod
+    def bulk_update_orderable_stock(cls, stock_ids, setting=None):
+        """
+        Recompute and save the orderable stock of many stocks and the `is_queueing_item`
+        of their products, with the same number of queries for any number of stocks
+
+        Args:
+            stock_ids (list): stock ids
+            setting (Settings): distributor settings, read from cache when not given
+
+        Returns:
+            tuple: stocks with a changed orderable stock, products with a changed `is_queueing_item`
+        """
+        from common.utils import get_healthos_settings
+        from .utils import get_is_queueing_item_value
+
+        stocks = list(cls.objects.filter(pk__in=stock_ids).select_related('product').only(
+            'id',
+            'ecom_stock',
+            'orderable_stock',
+            'product__order_mode',
+            'product__is_queueing_item',
+        ))
+        if not stocks:
+            return [], []
+        if setting is None:
+            setting = get_healthos_settings()
+        pending_order_quantities = cls.get_pending_order_quantities([stock.id for stock in stocks])
+        changed_stocks = []
+        changed_products = {}
+        for stock in stocks:
+            current_orderable_stock = stock.ecom_stock - pending_order_quantities.get(stock.id, 0)
+            if stock.orderable_stock != current_orderable_stock:
+                stock.orderable_stock = current_orderable_stock
+                changed_stocks.append(stock)
+            product = stock.product
+            is_queueing_item_value = get_is_queueing_item_value(
+                stock.orderable_stock,
+                product.order_mode,
+                setting
+            )
+            if is_queueing_item_value != product.is_queueing_item:
+                product.is_queueing_item = is_queueing_item_value
+                changed_products[product.id] = product
+        changed_products = list(changed_products.values())
+        cls.objects.bulk_update(changed_stocks, ['orderable_stock',], batch_size=500)
+        Product.objects.bulk_update(changed_products, ['is_queueing_item',], batch_size=500)
+        return changed_stocks, changed_products
+
+    def get_current_orderable_stock(self, current_stock = None):
+        pending_order_quantity = Stock.get_pending_order_quantities([self.id]).get(self.id, 0)
         if current_stock is not None:
-            return current_stock - io_logs.get('total_qty')
-        return self.ecom_stock - io_logs.get('total_qty')
+            return current_stock - pending_order_quantity
+        return self.ecom_stock - pending_order_quantity
 
     @property
     def current_orderable_stock(self, current_stock = None):
@@ -1351,105 +1436,24 @@ class Stock(CreatedAtUpdatedAtBaseModelWithOrganization):
         self.save(update_fields=['orderable_stock'])
 
     def get_last_stock_info_from_file(self):
-        from core.models import ScriptFileStorage
+        from .stock_snapshot import get_latest_stock_snapshot
 
-        last_stock = 0
-        file_upload_date = None
-        files = ScriptFileStorage.objects.filter(
-            status=Status.ACTIVE,
-            file_purpose=FilePurposes.DISTRIBUTOR_STOCK,
-            set_stock_from_file=True
-        ).only('created_at', 'content').order_by('-pk')
-
-        if files.exists():
-            last_instance = files.first()
-            stock_df =  pd.read_csv(last_instance.content)
-            item_in_file = stock_df.loc[stock_df['ID'] == int(self.id)].to_dict(orient='records')
-            last_stock = item_in_file[0].get('STOCK', 0) if item_in_file else 0
-            file_upload_date = last_instance.created_at
-            current_tz = django_timezone.get_current_timezone()
-            to_local = file_upload_date.astimezone(current_tz)
+        snapshot = get_latest_stock_snapshot()
+        if snapshot is None:
+            return {
+                "stock": 0,
+                "file_upload_date": None
+            }
         return {
-            "stock": float(last_stock) if checkers.is_numeric(last_stock) else 0,
-            "file_upload_date": str(to_local)
+            "stock": snapshot.get_stock(self.id),
+            "file_upload_date": snapshot.local_file_upload_date
         }
 
     # Get current stock for e-commerce calculations all logs
     def get_calculated_stock_for_ecommerce(self):
-        from core.models import ScriptFileStorage
-        from ecommerce.models import ShortReturnItem
-
-        stock_info = self.get_last_stock_info_from_file()
-        file_upload_date = stock_info.get('file_upload_date')
-        last_stock = stock_info.get('stock', 0)
-
-        requisition_filters = {
-            'status': Status.DRAFT,
-            'purchase__purchase_date__gt': file_upload_date,
-            'purchase__status': Status.DRAFT,
-            'purchase__purchase_type': PurchaseType.REQUISITION
-        }
-
-        requisitions = self.stocks_io.filter(
-            **requisition_filters
-        ).aggregate(
-            total_quantity=Coalesce(Sum(
-                'quantity',
-                output_field=FloatField()
-            ), 0.00)
-        )
-
-        order_filters = {
-            'status': Status.DISTRIBUTOR_ORDER,
-            'purchase__order_status__date__gt': file_upload_date,
-            'purchase__order_status__order_status': OrderTrackingStatus.ON_THE_WAY,
-            'purchase__status': Status.DISTRIBUTOR_ORDER,
-            'purchase__purchase_type': PurchaseType.VENDOR_ORDER,
-            'purchase__distributor_order_type': DistributorOrderType.ORDER,
-            'purchase__current_order_status__in': [
-                OrderTrackingStatus.ON_THE_WAY,
-                OrderTrackingStatus.DELIVERED,
-                OrderTrackingStatus.COMPLETED,
-                OrderTrackingStatus.PARITAL_DELIVERED,
-                OrderTrackingStatus.FULL_RETURNED,
-                OrderTrackingStatus.PORTER_DELIVERED,
-                OrderTrackingStatus.PORTER_FULL_RETURN,
-                OrderTrackingStatus.PORTER_PARTIAL_DELIVERED,
-                OrderTrackingStatus.PORTER_FAILED_DELIVERED,
-            ]
-        }
-        orders = self.stocks_io.filter(
-            **order_filters
-        ).aggregate(
-            total_quantity=Coalesce(Sum(
-                'quantity',
-                output_field=FloatField()
-            ), 0.00),
-        )
+        from .stock_snapshot import get_calculated_stocks_for_ecommerce
 
-        short_return_filters = {
-            'short_return_log__date__gt': file_upload_date,
-        }
-        short_return_items = self.stocks_short_return.filter(
-            **short_return_filters
-        ).exclude(
-            status=Status.INACTIVE,
-        ).exclude(
-            short_return_log__invoice_group__current_order_status__in=[
-                OrderTrackingStatus.REJECTED,
-                OrderTrackingStatus.CANCELLED
-            ]
-        ).aggregate(
-            total_quantity = Coalesce(
-                Sum(
-                    'quantity',
-                    output_field=FloatField()
-                ), 0.00
-            )
-        )
-
-        current_stock = last_stock + requisitions.get('total_quantity', 0) + float(short_return_items.get('total_quantity', 0)) - orders.get('total_quantity', 0)
-        return current_stock
+        return get_calculated_stocks_for_ecommerce([self.id])[self.id]
 
     def get_stock_change_history(self):
         stock_info = self.get_last_stock_info_from_file()
@@ -2858,40 +2862,29 @@ class Purchase(CreatedAtUpdatedAtBaseModelWithOrganization):
         return queryset
 
     def expire_cache(self, celery=True):
-        # get the cache keys for non group order amount
-        customer_non_group_order_amount_key_pattern = f"{CUSTOMER_ORG_NON_GROUP_ORDER_GRAND_TOTAL_CACHE_KEY_PREFIX}_{self.organization_id}*"
-        customer_delivery_coupon_key_pattern = f"{CUSTOMER_ORG_DELIVERY_COUPON_AVAILABILITY_CACHE_KEY_PREFIX}_{self.organization_id}*"
-        keys_for_order_amount_total_of_delivery_date = cache.keys(customer_non_group_order_amount_key_pattern)
-        keys_for_delivery_coupon_availability_of_delivery_date = cache.keys(customer_delivery_coupon_key_pattern)
+        # expire non group order amount and delivery coupon availability of all delivery dates
+        expire_customer_non_group_order_cache(self.organization_id)
         key_list = [
             'purchase_distributor_order_{}'.format(str(self.id).zfill(12)),
         ]
-        # Merge all the keys
-        key_list.extend(keys_for_order_amount_total_of_delivery_date)
-        key_list.extend(keys_for_delivery_coupon_availability_of_delivery_date)
 
         if not celery:
             cache.delete_many(key_list)
         else:
-            cache_expire_list.apply_async(
-                (key_list, ),
-                countdown=5,
-                retry=True, retry_policy={
-                    'max_retries': 10,
-                    'interval_start': 0,
-                    'interval_step': 0.2,
-                    'interval_max': 0.2,
-                }
-            )
+            expire_cache_keys(key_list)
 
     # Update orderable stock on placing or cancel or rejected order
     def update_related_stocks_orderable_stock(self):
-        stocks = Stock.objects.filter(
+        from search.stock_indexer import request_stock_document_update
+
+        stock_ids = list(Stock.objects.filter(
             stocks_io__purchase__id=self.pk,
             store_point__status=Status.ACTIVE,
-        ).only('id', 'orderable_stock', 'stock')
-        for stock in stocks:
-            stock.save(update_fields=['orderable_stock', 'stock',])
+        ).values_list('id', flat=True).distinct())
+        changed_stocks, changed_products = Stock.bulk_update_orderable_stock(stock_ids)
+        if changed_stocks or changed_products:
+            request_stock_document_update({"pk__in": stock_ids})
+        expire_cache_keys(Stock.get_cache_keys(stock_ids))
 
     # Apply additional discount
     def apply_additional_discount(self, discount, percentage=True):
@@ -2927,13 +2920,14 @@ class Purchase(CreatedAtUpdatedAtBaseModelWithOrganization):
             )
 
     def update_ecommerce_stock_on_order_or_order_status_change(self):
+        from common.utils import get_healthos_settings
         from ecommerce.models import ShortReturnItem
-        from .utils import get_is_queueing_item_value, get_item_from_list_of_dict
+        from .utils import get_is_queueing_item_value
         from pharmacy.helpers import (
             stop_inventory_signal,
             start_inventory_signal,
         )
-        from search.tasks import update_stock_document_lazy
+        from search.stock_indexer import request_stock_document_update
         from .tasks import fix_stock_on_mismatch_and_send_log_to_mm
 
         stock_instances = []
@@ -2994,44 +2988,46 @@ class Purchase(CreatedAtUpdatedAtBaseModelWithOrganization):
         )
 
         stop_inventory_signal()
-        stock_id_list_for_es_doc_update = []
+        stock_id_list_for_es_doc_update = [item['stock_id'] for item in aggregated_stock]
+        stocks = Stock.objects.select_related('product').only(
+            'ecom_stock',
+            'orderable_stock',
+            'product__order_mode',
+            'product__is_queueing_item',
+        ).in_bulk(stock_id_list_for_es_doc_update)
+        # Pending orders of all the stocks of the order with a single grouped query
+        if should_update_orderable_stock or should_update_orderable_stock_and_ecom_stock_increase:
+            pending_order_quantities = Stock.get_pending_order_quantities(stock_id_list_for_es_doc_update)
+        else:
+            pending_order_quantities = {}
+        short_return_quantities = {
+            short_return_item['stock_id']: short_return_item['total_quantity']
+            for short_return_item in short_return_items
+        }
+        setting = get_healthos_settings()
+        orderable_stock_instances = []
         for item in aggregated_stock:
             stock_id = item.get('stock_id')
-            stock_id_list_for_es_doc_update.append(stock_id)
-            stock = Stock.objects.only(
-                'ecom_stock',
-                'orderable_stock',
-                'product_id',
-            ).get(pk=item['stock_id'])
+            stock = stocks[stock_id]
             if should_update_orderable_stock:
-                current_orderable_stock = stock.get_current_orderable_stock()
+                current_orderable_stock = stock.ecom_stock - pending_order_quantities.get(stock_id, 0)
                 if stock.orderable_stock != current_orderable_stock:
                     stock.orderable_stock = current_orderable_stock
-                    # stock.save(update_fields=['orderable_stock'])
-                    Stock.objects.bulk_update([stock], ['orderable_stock',], batch_size=10)
-                    # stock_instances.append(stock)
+                    orderable_stock_instances.append(stock)
             elif should_update_orderable_stock_and_ecom_stock_decrease:
-                total_short_return = get_item_from_list_of_dict(
-                    list(short_return_items), 'stock_id', item.get('stock_id')
-                ).get('total_quantity', 0)
+                total_short_return = short_return_quantities.get(stock_id, 0)
                 stock.ecom_stock -= item.get('total_quantity', 0) - float(total_short_return)
                 stock.orderable_stock -= item.get('total_quantity', 0) - float(total_short_return)
-                # stock.orderable_stock = stock.get_current_orderable_stock(stock.ecom_stock)
-                # stock.save(update_fields=['orderable_stock', 'ecom_stock',])
-                Stock.objects.bulk_update([stock], ['orderable_stock', 'ecom_stock',], batch_size=10)
-                # stock_instances.append(stock)
+                stock_instances.append(stock)
             elif should_update_orderable_stock_and_ecom_stock_increase:
-                total_short_return = get_item_from_list_of_dict(
-                    list(short_return_items), 'stock_id', item.get('stock_id')
-                ).get('total_quantity', 0)
+                total_short_return = short_return_quantities.get(stock_id, 0)
                 stock.ecom_stock += item.get('total_quantity', 0) - float(total_short_return)
-                stock.orderable_stock = stock.get_current_orderable_stock(stock.ecom_stock)
-                # stock.save(update_fields=['orderable_stock', 'ecom_stock',])
-                Stock.objects.bulk_update([stock], ['orderable_stock', 'ecom_stock',], batch_size=10)
+                stock.orderable_stock = stock.ecom_stock - pending_order_quantities.get(stock_id, 0)
+                stock_instances.append(stock)
 
             # Check if product is_queueing_item should change or not
-            product = Product.objects.only('order_mode', 'is_queueing_item').get(pk=stock.product_id)
-            is_queueing_item_value = get_is_queueing_item_value(stock.orderable_stock, product.order_mode)
+            product = stock.product
+            is_queueing_item_value = get_is_queueing_item_value(stock.orderable_stock, product.order_mode, setting)
             if is_queueing_item_value != product.is_queueing_item:
                 product.is_queueing_item = is_queueing_item_value
                 product_instances.append(product)
@@ -3053,34 +3049,15 @@ class Purchase(CreatedAtUpdatedAtBaseModelWithOrganization):
             #             'interval_max': 0.2,
             #         }
             #     )
-        # Stock.objects.bulk_update(stock_instances, ['ecom_stock', 'orderable_stock',], batch_size=1000)
+        Stock.objects.bulk_update(orderable_stock_instances, ['orderable_stock',], batch_size=1000)
+        Stock.objects.bulk_update(stock_instances, ['ecom_stock', 'orderable_stock',], batch_size=1000)
         Product.objects.bulk_update(product_instances, ['is_queueing_item',], batch_size=1000)
         start_inventory_signal()
         # Expire stock cache
-        cache_expire_list.apply_async(
-            (stock_cache_key_list, ),
-            countdown=5,
-            retry=True, retry_policy={
-                'max_retries': 10,
-                'interval_start': 0,
-                'interval_step': 0.2,
-                'interval_max': 0.2,
-            }
-        )
+        expire_cache_keys(stock_cache_key_list)
         # update ES doc
         filters = {"pk__in": stock_id_list_for_es_doc_update}
-        update_stock_document_lazy.apply_async(
-            (
-                filters,
-            ),
-            countdown=1,
-            retry=True, retry_policy={
-                'max_retries': 10,
-                'interval_start': 0,
-                'interval_step': 0.2,
-                'interval_max': 0.2,
-            }
-        )
+        request_stock_document_update(filters)
 
     def get_supplier_rate(self, stock_id):
         from common.enums import Status
@@ -3771,6 +3748,8 @@ class RecheckProduct(CreatedAtUpdatedAtBaseModel):
 pre_save.connect(pre_save_stock_io_log, sender=StockIOLog)
 # post_save.connect(post_save_stock_io_log, sender=StockIOLog)
 post_delete.connect(post_delete_stock_io_log, sender=StockIOLog)
+post_save.connect(refresh_sales_cube_of_stock_io_log, sender=StockIOLog)
+post_delete.connect(refresh_sales_cube_of_stock_io_log, sender=StockIOLog)
 post_save.connect(post_save_purchase, sender=Purchase)
 pre_save.connect(pre_save_product, sender=Product, dispatch_uid='pre_save_product')
 post_save.connect(post_save_product, sender=Product)
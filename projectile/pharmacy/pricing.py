@@ -0,0 +1,130 @@
+"""Customer pricing values resolved once per request
+
+The organization / area discount factors, the cumulative discount factor and the delivery
+coupon stock of a customer are read once into a `PricingContext`. The products of a
+page, cart or order are then priced from it, without creating a `CustomerHelper` and
+reading the same factors from cache again for every product.
+"""
+import os
+from decimal import Decimal
+
+from django.utils.functional import cached_property
+
+
+def get_delivery_coupon_stock_id():
+    return os.environ.get("EXPRESS_DELIVERY_STOCK_ID", None)
+
+
+def calculate_dynamic_discount_rate(trading_price, discount_rate, org_discount_factor, area_discount_factor):
+    """
+    Discount rate of a product after the base, organization and area discounts
+
+    Args:
+        trading_price (float): product MRP
+        discount_rate (float): product discount rate
+        org_discount_factor (Decimal): organization discount factor
+        area_discount_factor (Decimal): area discount factor
+
+    Returns:
+        Decimal: discount rate rounded to 3 decimal places, 0.00 for a product without price
+    """
+    # Return if trading price is 0
+    if not trading_price:
+        return 0.00
+
+    product_mrp = Decimal(trading_price)
+    base_discount = Decimal(discount_rate)
+
+    price = product_mrp - (base_discount * product_mrp) / 100
+    price = price - (org_discount_factor * price) / 100
+    price = price - (area_discount_factor * price) / 100
+    final_discount_amount = product_mrp - price
+    return round((final_discount_amount / product_mrp) * 100, 3)
+
+
+class PricingContext:
+    """Discount factors of a customer organization"""
+
+    def __init__(self, organization_id):
+        from common.healthos_helpers import CustomerHelper
+
+        self.organization_id = organization_id
+        self.customer_helper = CustomerHelper(organization_id)
+        self.coupon_stock_id = get_delivery_coupon_stock_id()
+        self._is_order_enabled = None
+
+    # The factors are read on first use, a request without products reads nothing
+    @cached_property
+    def organization_and_area_discount(self):
+        return self.customer_helper.get_organization_and_area_discount()
+
+    @cached_property
+    def cumulative_discount_factor(self):
+        return self.customer_helper.get_cumulative_discount_factor()
+
+    @classmethod
+    def for_request(cls, request):
+        """The pricing context of the request user organization, created once per request"""
+        context = getattr(request, "_pricing_context", None)
+        if context is None or context.organization_id != request.user.organization_id:
+            context = cls(request.user.organization_id)
+            request._pricing_context = context
+        return context
+
+    @property
+    def organization_discount_factor(self):
+        return self.organization_and_area_discount.get("organization_discount_factor", 0.00)
+
+    @property
+    def area_discount_factor(self):
+        return self.organization_and_area_discount.get("area_discount_factor", 0.00)
+
+    @property
+    def is_order_enabled(self):
+        from pharmacy.utils import get_organization_order_closing_and_reopening_time
+
+        if self._is_order_enabled is None:
+            order_closing_date, order_reopening_date = get_organization_order_closing_and_reopening_time()
+            self._is_order_enabled = not order_closing_date and not order_reopening_date
+        return self._is_order_enabled
+
+    def is_coupon(self, stock_id):
+        return str(stock_id) == self.coupon_stock_id
+
+    def get_discount_rate_factor(self, stock_id):
+        """Cumulative discount factor of the customer, 0.00 for the delivery coupon"""
+        if self.is_coupon(stock_id):
+            return 0.00
+        return self.cumulative_discount_factor
+
+    def get_dynamic_discount_rate(self, trading_price, discount_rate, stock_id):
+        """Same as `pharmacy.utils.get_product_dynamic_discount_rate` with the factors of the context"""
+        if self.is_coupon(stock_id):
+            return 0.00
+        return calculate_dynamic_discount_rate(
+            trading_price,
+            discount_rate,
+            self.organization_discount_factor,
+            self.area_discount_factor
+        )
+
+    def decorate_products(self, items):
+        """
+        Add the customer discount of every stock to serialized stocks, in place
+
+        Args:
+            items (list): serialized stocks with `id` and `product` (`trading_price`, `discount_rate`)
+
+        Returns:
+            list: the items
+        """
+        for item in items:
+            product = item["product"]
+            product["discount_rate_factor"] = self.get_discount_rate_factor(item["id"])
+            product["dynamic_discount_rate"] = self.get_dynamic_discount_rate(
+                trading_price=product["trading_price"],
+                discount_rate=product["discount_rate"],
+                stock_id=item["id"]
+            )
+            product["dynamic_discount_factors"] = dict(self.organization_and_area_discount)
+        return items
@@ -43,7 +43,7 @@ from core.models import (
     Organization,
 )
 from expo_notification.tasks import send_push_notification_to_mobile_app
-from search.tasks import update_stock_document_lazy
+from search.stock_indexer import request_stock_document_update
 from .enums import (
     StockIOType,
     PurchaseType,
@@ -897,18 +897,7 @@ def post_save_product(sender, instance, created, **kwargs):
 
     instance.expire_cache()
     filters = {"product_id": instance.id}
-    update_stock_document_lazy.apply_async(
-        (
-            filters,
-        ),
-        countdown=1,
-        retry=True, retry_policy={
-            'max_retries': 10,
-            'interval_start': 0,
-            'interval_step': 0.2,
-            'interval_max': 0.2,
-        }
-    )
+    request_stock_document_update(filters)
 
 @transaction.atomic
 def pre_stock_adjustment(sender, instance, **kwargs):
@@ -1131,18 +1120,7 @@ def pre_save_stock(sender, instance, **kwargs):
         # Update ES document
         if should_update_es_doc:
             filters = {"pk": instance.id}
-            update_stock_document_lazy.apply_async(
-                (
-                    filters,
-                ),
-                countdown=1,
-                retry=True, retry_policy={
-                    'max_retries': 10,
-                    'interval_start': 0,
-                    'interval_step': 0.2,
-                    'interval_max': 0.2,
-                }
-            )
+            request_stock_document_update(filters)
 
     instance.expire_cache()
 
@@ -1179,6 +1157,8 @@ def post_save_order_tracking(sender, instance, created, **kwargs):
         update_ecommerce_stock_on_order_or_order_status_change_lazy,
     )
     from pharmacy.models import DistributorOrderGroup, Purchase
+    from notebookapi.notebooks.pharmacies import record_pharmacy_order_tracking
+    from stats.sales_cube import request_sales_cube_refresh
 
     _instance = instance
     order_fields = [
@@ -1483,6 +1463,24 @@ def post_save_order_tracking(sender, instance, created, **kwargs):
             countdown=5
         )
 
+    if created:
+        record_pharmacy_order_tracking(
+            _order.organization_id,
+            _order.tentative_delivery_date,
+            _instance.date
+        )
+
+    # Roll up again the sales cube rows of the customer on the delivery date
+    request_sales_cube_refresh(order_ids=[_order.id])
+
+
+def refresh_sales_cube_of_stock_io_log(sender, instance, **kwargs):
+    # Roll up again the sales cube rows of the order of a changed order line
+    from stats.sales_cube import request_sales_cube_refresh
+
+    if instance.purchase_id:
+        request_sales_cube_refresh(order_ids=[instance.purchase_id])
+
 
 def post_save_stock_reminder(sender, instance, created, **kwargs):
     # Expire organization wise product stock reminder cache
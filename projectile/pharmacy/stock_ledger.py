@@ -0,0 +1,298 @@
+"""Bulk stock ledger for new stock io logs
+
+`pre_save_stock_io_log` adjusts the stock of every io log on its own: it reads the purchase
+again, refreshes the stock, saves it and runs `pre_save_stock`, several queries per line.
+`bulk_create_stock_io_logs` applies the same rules to a batch of new io logs with one
+`SELECT ... FOR UPDATE` over the affected stocks, a single bulk update of the changed stocks
+and a bulk create of the io logs.
+"""
+import os
+
+from django.db import IntegrityError, transaction
+
+from common.enums import Status
+from common.utils import get_healthos_settings
+from core.enums import AllowOrderFrom
+from pharmacy.enums import DistributorOrderType, PurchaseType
+
+STOCK_CHANGED_ERROR = "Stock Changed, Please try again."
+# Fields the per row signal saves for every new io log that is not an e-commerce order
+STOCK_LEDGER_FIELDS = [
+    'stock', 'demand', 'sales_rate', 'purchase_rate',
+    'order_rate', 'local_count', 'latest_sale_unit', 'latest_purchase_unit',
+]
+
+
+def get_distributor_org_id():
+    return int(os.environ.get('DISTRIBUTOR_ORG_ID', 303))
+
+
+def get_order_mode(setting, product_order_mode):
+    """Same as `Stock.get_product_order_mode` with the product order mode already fetched"""
+    if setting.overwrite_order_mode_by_product:
+        return product_order_mode
+    if setting.allow_order_from == AllowOrderFrom.STOCK_AND_OPEN:
+        return product_order_mode
+    return setting.allow_order_from
+
+
+class StockLedger:
+    """Apply the stock changes of a batch of new io logs (see `bulk_create_stock_io_logs`)"""
+
+    def __init__(self, io_logs):
+        from pharmacy.models import Purchase, Sales, Stock
+
+        self.io_logs = io_logs
+        self.distributor_org_id = get_distributor_org_id()
+        purchase_ids = {io_log.purchase_id for io_log in io_logs if io_log.purchase_id}
+        self.purchases = Purchase.objects.only(
+            'purchase_type',
+            'distributor_order_type',
+            'status',
+            'is_queueing_order',
+            'invoice_group_id',
+            'is_sales_return',
+            'round_discount',
+            'amount',
+        ).in_bulk(purchase_ids)
+        sales_ids = {io_log.sales_id for io_log in io_logs if io_log.sales_id}
+        self.sales = Sales.objects.only(
+            'is_purchase_return',
+            'round_discount',
+            'amount',
+        ).in_bulk(sales_ids)
+        stock_ids = sorted({io_log.stock_id for io_log in io_logs})
+        self.stocks = {
+            stock.id: stock
+            for stock in Stock.objects.select_for_update().filter(pk__in=stock_ids).order_by('pk')
+        }
+        # Values before the batch, the per row signal validates orders against the saved stock
+        self.previous_stocks = {
+            stock.id: (stock.orderable_stock, stock.ecom_stock)
+            for stock in self.stocks.values()
+        }
+        self.setting = None
+        self.product_order_modes = None
+        self.changed_stock_fields = {}
+
+    def get_setting(self):
+        if self.setting is None:
+            self.setting = get_healthos_settings()
+        return self.setting
+
+    def get_product_order_mode(self, stock):
+        from pharmacy.models import Product
+
+        if self.product_order_modes is None:
+            self.product_order_modes = dict(Product.objects.filter(
+                pk__in={stock.product_id for stock in self.stocks.values()}
+            ).values_list('id', 'order_mode'))
+        try:
+            return get_order_mode(self.get_setting(), self.product_order_modes.get(stock.product_id))
+        except Exception:
+            return 0
+
+    def mark_changed(self, stock, fields):
+        self.changed_stock_fields.setdefault(stock.id, set()).update(fields)
+
+    def apply(self, io_log):
+        from pharmacy.signals import get_quantity_from_conversion_factor
+
+        stock = self.stocks[io_log.stock_id]
+        # Share the locked instance like `instance.stock` in the signal
+        io_log.stock = stock
+        purchase = self.purchases.get(io_log.purchase_id)
+        is_distributor_org = io_log.organization_id == self.distributor_org_id
+        distributor_requisition = False
+        invoice_group_id = None
+        is_regular_order = False
+        if is_distributor_org and purchase:
+            distributor_requisition = purchase.purchase_type == PurchaseType.REQUISITION
+        elif purchase:
+            is_regular_order = (
+                purchase.purchase_type == PurchaseType.VENDOR_ORDER and
+                purchase.distributor_order_type == DistributorOrderType.ORDER and
+                purchase.status == Status.DISTRIBUTOR_ORDER and
+                purchase.is_queueing_order == False
+            )
+            invoice_group_id = purchase.invoice_group_id
+
+        if io_log.batch and not io_log.batch.isupper():
+            io_log.batch = io_log.batch.upper()
+
+        io_log.calculated_price = stock.calculated_price
+        io_log.calculated_price_organization_wise = stock.calculated_price_organization_wise
+
+        # Validate ecom stock qty for regular order
+        if io_log.status == Status.DISTRIBUTOR_ORDER and is_regular_order and not invoice_group_id:
+            orderable_stock, _ecom_stock = self.previous_stocks[stock.id]
+            if orderable_stock < io_log.quantity and self.get_product_order_mode(stock) == AllowOrderFrom.STOCK:
+                raise IntegrityError(STOCK_CHANGED_ERROR)
+        if io_log.status not in [Status.INACTIVE, Status.DISTRIBUTOR_ORDER]:
+            io_log.quantity = get_quantity_from_conversion_factor(io_log)
+
+        # Update ecommerce stock for requisition
+        if distributor_requisition and io_log.status == Status.DRAFT:
+            stock.ecom_stock += io_log.quantity
+            self.mark_changed(stock, ['ecom_stock', 'orderable_stock'])
+
+        if io_log.status == Status.ACTIVE:
+            sales = self.sales.get(io_log.sales_id)
+            if sales is not None and not sales.is_purchase_return:
+                if io_log.secondary_unit_flag:
+                    stock.latest_sale_unit_id = io_log.secondary_unit_id
+                    if io_log.rate > 0:
+                        stock.sales_rate = io_log.rate / io_log.conversion_factor
+                else:
+                    stock.latest_sale_unit_id = io_log.primary_unit_id
+                    if io_log.rate > 0:
+                        stock.sales_rate = io_log.rate
+                if sales.round_discount != 0:
+                    try:
+                        io_log.round_discount = float(
+                            sales.round_discount * io_log.quantity * stock.sales_rate
+                        ) / sales.amount
+                    except ZeroDivisionError:
+                        raise IntegrityError("SALES_AMOUNT_IS_NOT_VALID")
+
+            if purchase is not None and not purchase.is_sales_return:
+                if io_log.secondary_unit_flag:
+                    stock.latest_purchase_unit_id = io_log.secondary_unit_id
+                    if io_log.rate > 0:
+                        stock.purchase_rate = io_log.rate / io_log.conversion_factor
+                else:
+                    stock.latest_purchase_unit_id = io_log.primary_unit_id
+                    if io_log.rate > 0:
+                        stock.purchase_rate = io_log.rate
+                if purchase.round_discount != 0:
+                    io_log.round_discount = float(
+                        purchase.round_discount * io_log.quantity * stock.purchase_rate
+                    ) / purchase.amount
+
+        if io_log.status == Status.PURCHASE_ORDER:
+            if io_log.purchase_id is not None and io_log.rate > 0:
+                if io_log.secondary_unit_flag:
+                    stock.order_rate = io_log.rate / io_log.conversion_factor
+                else:
+                    stock.order_rate = io_log.rate
+
+        stock.local_count += 1
+        # Ignore update for E-Commerce Order / Cart
+        if io_log.status != Status.DISTRIBUTOR_ORDER:
+            self.mark_changed(stock, STOCK_LEDGER_FIELDS)
+
+    def save_stocks(self):
+        """Bulk update the changed stocks and run the work of `pre_save_stock` once for all of them"""
+        from pharmacy.models import Product, Stock
+        from pharmacy.utils import get_is_queueing_item_value
+
+        if not self.changed_stock_fields:
+            return []
+        stocks = [self.stocks[stock_id] for stock_id in sorted(self.changed_stock_fields)]
+        fields = set().union(*self.changed_stock_fields.values())
+
+        # Orderable stock of the distributor is derived from the ecom stock on every save
+        distributor_stocks = [
+            stock for stock in stocks if stock.organization_id == self.distributor_org_id
+        ]
+        pending_quantities = Stock.get_pending_order_quantities([stock.id for stock in distributor_stocks])
+        for stock in distributor_stocks:
+            stock.orderable_stock = stock.ecom_stock - pending_quantities.get(stock.id, 0)
+        if distributor_stocks:
+            fields.add('orderable_stock')
+
+        Stock.objects.bulk_update(stocks, sorted(fields))
+
+        es_stock_ids = []
+        products = Product.objects.only('order_mode', 'is_queueing_item').in_bulk(
+            {stock.product_id for stock in distributor_stocks}
+        )
+        queueing_products = []
+        for stock in distributor_stocks:
+            orderable_stock, _ecom_stock = self.previous_stocks[stock.id]
+            should_update_es_doc = stock.orderable_stock != orderable_stock
+            product = products.get(stock.product_id)
+            if product is not None:
+                is_queueing_item_value = get_is_queueing_item_value(
+                    stock.orderable_stock, product.order_mode, self.get_setting()
+                )
+                if is_queueing_item_value != product.is_queueing_item:
+                    should_update_es_doc = True
+                    product.is_queueing_item = is_queueing_item_value
+                    queueing_products.append(product)
+            if should_update_es_doc:
+                es_stock_ids.append(stock.id)
+        if queueing_products:
+            Product.objects.bulk_update(queueing_products, ['is_queueing_item'])
+
+        restocked_stocks = []
+        for stock in stocks:
+            _orderable_stock, ecom_stock = self.previous_stocks[stock.id]
+            if stock.ecom_stock > ecom_stock and stock.ecom_stock > 0 and stock.is_salesable == True:
+                restocked_stocks.append(stock)
+                if stock.id not in es_stock_ids:
+                    es_stock_ids.append(stock.id)
+
+        transaction.on_commit(
+            lambda: self.run_post_save_tasks(stocks, restocked_stocks, es_stock_ids)
+        )
+        return stocks
+
+    def run_post_save_tasks(self, stocks, restocked_stocks, es_stock_ids):
+        from common.cache_invalidation import expire_cache_keys
+        from pharmacy.models import Stock
+        from search.stock_indexer import request_stock_document_update
+        from pharmacy.helpers import get_product_short_name
+        from pharmacy.tasks import remind_orgs_on_product_re_stock
+        from pharmacy.utils import calculate_product_price
+
+        retry_policy = {
+            'max_retries': 10,
+            'interval_start': 0,
+            'interval_step': 0.2,
+            'interval_max': 0.2,
+        }
+        for stock in restocked_stocks:
+            remind_orgs_on_product_re_stock.apply_async(
+                (
+                    stock.id,
+                    get_product_short_name(stock.product),
+                    calculate_product_price(stock.product.trading_price, stock.product.discount_rate),
+                ),
+                countdown=2,
+                retry=True, retry_policy=retry_policy
+            )
+        if es_stock_ids:
+            request_stock_document_update({"pk__in": es_stock_ids})
+        expire_cache_keys(Stock.get_cache_keys([stock.id for stock in stocks]))
+
+
+def bulk_create_stock_io_logs(io_logs, batch_size=500):
+    """
+    Create new stock io logs and apply their stock changes in bulk
+
+    Follows the rules of `pharmacy.signals.pre_save_stock_io_log` for new io logs: the
+    ecom stock is validated for regular e-commerce orders ("Stock Changed" error),
+    requisitions of the distributor increase the ecom stock, sales / purchase / purchase
+    order rates and the local count are updated.
+
+    Args:
+        io_logs (list): unsaved `StockIOLog` instances
+        batch_size (int): batch size of the bulk create
+
+    Returns:
+        list: the created io logs
+    """
+    from common import models as common_models
+    from pharmacy.models import StockIOLog
+
+    if not io_logs:
+        return []
+    with transaction.atomic():
+        ledger = StockLedger(io_logs)
+        for io_log in io_logs:
+            ledger.apply(io_log)
+            # Set by `CreatedAtUpdatedAtBaseModel.save`, which bulk create skips
+            io_log.user_ip = common_models.USER_IP_ADDRESS
+        ledger.save_stocks()
+        return StockIOLog.objects.bulk_create(io_logs, batch_size=batch_size)
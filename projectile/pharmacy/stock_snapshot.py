@@ -0,0 +1,305 @@
+"""Parsed index of the distributor stock files
+
+A DISTRIBUTOR_STOCK `ScriptFileStorage` csv is parsed once into a NumPy array of its
+(ID, STOCK) rows. The array is saved as `<file id>.npy` in `STOCK_SNAPSHOT_DIR` and loaded
+memory mapped afterwards, so the chunked e-commerce stock tasks and the stock
+reconciliation read the rows of a file from it instead of downloading and parsing the
+csv again for every chunk or every stock.
+
+The requisitions, orders and short returns after the file upload are aggregated for a
+whole chunk of stocks with grouped queries (`get_calculated_stocks_for_ecommerce`).
+"""
+import logging
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from django.conf import settings
+from django.db.models import FloatField, Sum
+from django.utils import timezone
+
+from common.enums import Status
+from core.enums import FilePurposes
+from pharmacy.enums import (
+    DistributorOrderType,
+    OrderTrackingStatus,
+    PurchaseType,
+)
+
+logger = logging.getLogger(__name__)
+
+STOCK_SNAPSHOT_DTYPE = np.dtype([('id', 'f8'), ('stock', 'f8')])
+# Parsed snapshots kept in memory by a worker process, an upload replaces the previous one
+MAX_LOADED_SNAPSHOTS = 2
+
+_loaded_snapshots = {}
+
+
+class StockSnapshot:
+    """(ID, STOCK) rows of a stock file, in file order, with a sorted index of the ids"""
+
+    def __init__(self, file_id, file_upload_date, rows):
+        self.file_id = file_id
+        self.file_upload_date = file_upload_date
+        self.rows = rows
+        # The first row of an id wins, as the per stock lookup of the csv did
+        positions = np.flatnonzero(~np.isnan(rows['id']))
+        self.ids, first_positions = np.unique(rows['id'][positions], return_index=True)
+        self.positions = positions[first_positions]
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def local_file_upload_date(self):
+        return str(self.file_upload_date.astimezone(timezone.get_current_timezone()))
+
+    def get_stocks(self, stock_ids):
+        """
+        Stock quantity of every stock in the file
+
+        Args:
+            stock_ids (list): stock ids
+
+        Returns:
+            dict: stock id to quantity, 0 for a stock missing from the file or without a numeric quantity
+        """
+        stock_ids = list(stock_ids)
+        if not stock_ids or not len(self.ids):
+            return {stock_id: 0 for stock_id in stock_ids}
+        lookup = np.asarray(stock_ids, dtype='f8')
+        indexes = np.minimum(np.searchsorted(self.ids, lookup), len(self.ids) - 1)
+        found = self.ids[indexes] == lookup
+        quantities = np.where(found, self.rows['stock'][self.positions[indexes]], 0)
+        quantities = np.nan_to_num(quantities)
+        return dict(zip(stock_ids, quantities.tolist()))
+
+    def get_stock(self, stock_id):
+        return self.get_stocks([stock_id])[stock_id]
+
+    def get_rows(self, lower_limit=None, upper_limit=None):
+        """
+        Rows of `rows[lower_limit:upper_limit]` with a numeric ID and STOCK
+
+        Returns:
+            list: (stock id, quantity) tuples in file order
+        """
+        rows = self.rows[lower_limit:upper_limit]
+        rows = rows[~np.isnan(rows['id']) & ~np.isnan(rows['stock'])]
+        return [(int(stock_id), quantity) for stock_id, quantity in rows.tolist()]
+
+
+def parse_stock_file(content):
+    """
+    Read the ID and STOCK columns of a stock csv
+
+    Args:
+        content (File): the csv file
+
+    Returns:
+        numpy.ndarray: rows of `STOCK_SNAPSHOT_DTYPE`, NaN for a missing or non numeric value
+    """
+    stock_df = pd.read_csv(content)
+    rows = np.full(len(stock_df), np.nan, dtype=STOCK_SNAPSHOT_DTYPE)
+    for column, field in (('ID', 'id'), ('STOCK', 'stock')):
+        if column in stock_df:
+            rows[field] = pd.to_numeric(stock_df[column], errors='coerce').to_numpy(dtype='f8')
+    return rows
+
+
+def get_stock_snapshot_path(file_id):
+    return os.path.join(settings.STOCK_SNAPSHOT_DIR, f"{file_id}.npy")
+
+
+def load_stock_snapshot_rows(path):
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # An empty array can not be memory mapped
+        return np.load(path)
+
+
+def remove_superseded_stock_snapshots(file_id):
+    """
+    Delete the saved snapshots of the files uploaded before `file_id`
+
+    A worker which still maps one keeps reading it until it is closed, a later read of an
+    old file parses the csv again.
+    """
+    for file_name in os.listdir(settings.STOCK_SNAPSHOT_DIR):
+        name, extension = os.path.splitext(file_name)
+        if extension != '.npy' or not name.isdigit() or int(name) >= file_id:
+            continue
+        try:
+            os.remove(os.path.join(settings.STOCK_SNAPSHOT_DIR, file_name))
+        except FileNotFoundError:
+            # Removed by another worker meanwhile
+            continue
+        logger.info(f"Removed superseded stock snapshot of file {name}")
+
+
+def save_stock_snapshot(stock_file):
+    """Parse a stock file and save its rows for the other workers of the host"""
+    rows = parse_stock_file(stock_file.content)
+    path = get_stock_snapshot_path(stock_file.pk)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written aside and renamed, a reader never sees a partial file
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'wb') as temp_file:
+        np.save(temp_file, rows)
+    os.replace(temp_path, path)
+    logger.info(f"Saved stock snapshot of file {stock_file.pk} with {len(rows)} rows")
+    remove_superseded_stock_snapshots(stock_file.pk)
+    return load_stock_snapshot_rows(path)
+
+
+def get_stock_snapshot(stock_file):
+    """
+    Parsed rows of a stock file, the csv is read once per host
+
+    Args:
+        stock_file (ScriptFileStorage): a DISTRIBUTOR_STOCK file with `created_at` and `content`
+
+    Returns:
+        StockSnapshot: the snapshot of the file
+    """
+    snapshot = _loaded_snapshots.get(stock_file.pk)
+    if snapshot is not None:
+        return snapshot
+
+    path = get_stock_snapshot_path(stock_file.pk)
+    try:
+        rows = load_stock_snapshot_rows(path)
+    except (OSError, EOFError):
+        rows = save_stock_snapshot(stock_file)
+    snapshot = StockSnapshot(stock_file.pk, stock_file.created_at, rows)
+    if len(_loaded_snapshots) >= MAX_LOADED_SNAPSHOTS:
+        _loaded_snapshots.clear()
+    _loaded_snapshots[stock_file.pk] = snapshot
+    return snapshot
+
+
+def get_latest_stock_file():
+    from core.models import ScriptFileStorage
+
+    return ScriptFileStorage.objects.filter(
+        status=Status.ACTIVE,
+        file_purpose=FilePurposes.DISTRIBUTOR_STOCK,
+        set_stock_from_file=True
+    ).only('created_at', 'content').order_by('-pk').first()
+
+
+def get_latest_stock_snapshot():
+    """Snapshot of the latest distributor stock file, None without any file"""
+    stock_file = get_latest_stock_file()
+    if stock_file is None:
+        return None
+    return get_stock_snapshot(stock_file)
+
+
+def get_quantity_by_stock(queryset):
+    quantities = queryset.values('stock_id').order_by('stock_id').annotate(
+        total_quantity=Sum('quantity', output_field=FloatField())
+    )
+    return {item['stock_id']: float(item['total_quantity'] or 0) for item in quantities}
+
+
+def get_ecommerce_stock_changes(stock_ids, file_upload_date=None):
+    """
+    Stock changes of e-commerce stocks after a stock file upload
+
+    Same filters as `Stock.get_calculated_stock_for_ecommerce` used per stock: draft
+    requisitions add, delivered type orders subtract and active short / return items add.
+
+    Args:
+        stock_ids (list): stock ids
+        file_upload_date (datetime): upload date of the stock file, every change counts without it
+
+    Returns:
+        dict: stock id to the net quantity change
+    """
+    from ecommerce.models import ShortReturnItem
+    from pharmacy.models import StockIOLog
+
+    date_filters = {} if file_upload_date is None else {
+        'requisition': {'purchase__purchase_date__gt': file_upload_date},
+        'order': {'purchase__order_status__date__gt': file_upload_date},
+        'short_return': {'short_return_log__date__gt': file_upload_date},
+    }
+    requisitions = get_quantity_by_stock(
+        StockIOLog.objects.filter(
+            stock_id__in=stock_ids,
+            status=Status.DRAFT,
+            purchase__status=Status.DRAFT,
+            purchase__purchase_type=PurchaseType.REQUISITION,
+            **date_filters.get('requisition', {})
+        )
+    )
+    orders = get_quantity_by_stock(
+        StockIOLog.objects.filter(
+            stock_id__in=stock_ids,
+            status=Status.DISTRIBUTOR_ORDER,
+            purchase__order_status__order_status=OrderTrackingStatus.ON_THE_WAY,
+            purchase__status=Status.DISTRIBUTOR_ORDER,
+            purchase__purchase_type=PurchaseType.VENDOR_ORDER,
+            purchase__distributor_order_type=DistributorOrderType.ORDER,
+            purchase__current_order_status__in=[
+                OrderTrackingStatus.ON_THE_WAY,
+                OrderTrackingStatus.DELIVERED,
+                OrderTrackingStatus.COMPLETED,
+                OrderTrackingStatus.PARITAL_DELIVERED,
+                OrderTrackingStatus.FULL_RETURNED,
+                OrderTrackingStatus.PORTER_DELIVERED,
+                OrderTrackingStatus.PORTER_FULL_RETURN,
+                OrderTrackingStatus.PORTER_PARTIAL_DELIVERED,
+                OrderTrackingStatus.PORTER_FAILED_DELIVERED,
+            ],
+            **date_filters.get('order', {})
+        )
+    )
+    short_returns = get_quantity_by_stock(
+        ShortReturnItem.objects.filter(
+            stock_id__in=stock_ids,
+            **date_filters.get('short_return', {})
+        ).exclude(
+            status=Status.INACTIVE,
+        ).exclude(
+            short_return_log__invoice_group__current_order_status__in=[
+                OrderTrackingStatus.REJECTED,
+                OrderTrackingStatus.CANCELLED
+            ]
+        )
+    )
+    return {
+        stock_id: requisitions.get(stock_id, 0) + short_returns.get(stock_id, 0) - orders.get(stock_id, 0)
+        for stock_id in stock_ids
+    }
+
+
+def get_calculated_stocks_for_ecommerce(stock_ids, snapshot=None):
+    """
+    Calculated e-commerce stock of a chunk of stocks, the latest stock file quantity
+    with the stock changes after its upload
+
+    Args:
+        stock_ids (list): stock ids
+        snapshot (StockSnapshot): snapshot of the latest stock file, read when not given
+
+    Returns:
+        dict: stock id to calculated stock
+    """
+    stock_ids = list(stock_ids)
+    if snapshot is None:
+        snapshot = get_latest_stock_snapshot()
+    if snapshot is None:
+        last_stocks = {stock_id: 0 for stock_id in stock_ids}
+        changes = get_ecommerce_stock_changes(stock_ids)
+    else:
+        last_stocks = snapshot.get_stocks(stock_ids)
+        changes = get_ecommerce_stock_changes(stock_ids, snapshot.file_upload_date)
+    return {
+        stock_id: last_stocks[stock_id] + changes[stock_id]
+        for stock_id in stock_ids
+    }
@@ -3,11 +3,8 @@ from __future__ import absolute_import, unicode_literals
 
 import logging, os
 import time
-import math
 from datetime import date
-import pandas as pd
 from dotmap import DotMap
-from validator_collection import checkers
 
 from django.db.models import (
     F,
@@ -28,8 +25,9 @@ from common.cache_keys import (
     STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX,
 )
 from common.helpers import send_log_alert_to_slack_or_mattermost
+from common.cache_invalidation import expire_cache_keys
 from common.utils import Round
-from search.tasks import update_stock_document_lazy
+from search.stock_indexer import request_stock_document_update
 from search.utils import update_stock_es_doc
 
 from .models import StockIOLog, Stock, StorePoint, Product, Purchase
@@ -145,75 +143,89 @@ def check_and_fix_current_stock_lazy(stock_id):
         )
 
 
+def expire_stock_cache(stock_ids):
+    """Same as `Stock.expire_cache` for many stocks"""
+    expire_cache_keys(Stock.get_cache_keys(stock_ids))
+
+
 @app.task(autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=5, max_retries=10)
 def adjust_stock_from_file_ecommerce(file_name, file_instance_pk, lower_limit, upper_limit, store_point_pk):
+    from common import models as common_models
     from common.helpers import is_allowed_to_update_queueing_item_value
     from core.models import ScriptFileStorage
     from .helpers import stop_inventory_signal, start_inventory_signal
+    from .stock_snapshot import get_calculated_stocks_for_ecommerce, get_stock_snapshot
 
     time.sleep(1)
     stop_inventory_signal()
     try:
-        stock_file = ScriptFileStorage.objects.get(pk=file_instance_pk)
-        stock_df =  pd.read_csv(stock_file.content)
-        data_df = stock_df[lower_limit:upper_limit]
+        stock_file = ScriptFileStorage.objects.only('created_at', 'content').get(pk=file_instance_pk)
+        rows = get_stock_snapshot(stock_file).get_rows(lower_limit, upper_limit)
         store_point = StorePoint.objects.get(pk=store_point_pk)
         base_stock_adjustment = store_point.get_base_stock_adjustment()
         distributor_settings = store_point.organization.get_settings()
 
-        for index, item in data_df.iterrows():
-            requesting_stock_qty = item['STOCK']
-            stock_id = item['ID']
-
-            if not math.isnan(requesting_stock_qty) and not math.isnan(stock_id):
-
-                stock = Stock.objects.only(
-                    'id',
-                    'stock',
-                    'orderable_stock'
-                ).get(pk=stock_id)
-                calculated_stock = stock.get_calculated_stock_for_ecommerce()
-
-                adjustable_stock = 0
-
-                if calculated_stock > requesting_stock_qty:
-                    adjustable_stock = calculated_stock - requesting_stock_qty
-                    io_type = StockIOType.OUT
-                elif calculated_stock < requesting_stock_qty:
-                    adjustable_stock = requesting_stock_qty - calculated_stock
-                    io_type = StockIOType.INPUT
-
-                if adjustable_stock > 0:
-                    payload = {
-                        'stock_id': stock_id,
-                        'quantity': adjustable_stock,
-                        'batch': 'N/A',
-                        'date': date.today(),
-                        'type': io_type,
-                        'adjustment': base_stock_adjustment,
-                        'primary_unit_id': stock.product.primary_unit_id,
-                        'secondary_unit_id': stock.product.secondary_unit_id,
-                        'organization_id': stock.organization_id
-                    }
-                    adjustment_io = StockIOLog.objects.create(**payload)
-                    adjustment_io.save()
-                if stock.stock != requesting_stock_qty:
-                    stock.stock = requesting_stock_qty
-                    stock.orderable_stock = stock.get_current_orderable_stock(requesting_stock_qty)
-                    stock.save(update_fields=['stock', 'orderable_stock'])
-                    stock.refresh_from_db()
-                # Update product queueing status
-                if stock.orderable_stock <= 0 and is_allowed_to_update_queueing_item_value(distributor_settings, stock.product):
-                    Product.objects.filter(
-                        pk=stock.product_id,
-                        is_queueing_item=False
-                    ).update(is_queueing_item=True)
-                else:
-                    Product.objects.filter(
-                        pk=stock.product_id,
-                        is_queueing_item=True
-                    ).update(is_queueing_item=False)
-                stock.expire_cache()
+        stock_ids = [stock_id for stock_id, _ in rows]
+        stocks = Stock.objects.select_related('product').in_bulk(stock_ids)
+        calculated_stocks = get_calculated_stocks_for_ecommerce(stocks.keys())
+        pending_order_quantities = Stock.get_pending_order_quantities(stocks.keys())
+        adjustment_ios = []
+        changed_stocks = {}
+        # The last row of a product decides, as it did when every row updated the product
+        is_queueing_items = {}
+
+        for stock_id, requesting_stock_qty in rows:
+            stock = stocks.get(stock_id)
+            if stock is None:
+                continue
+            calculated_stock = calculated_stocks[stock_id]
+
+            adjustable_stock = 0
+
+            if calculated_stock > requesting_stock_qty:
+                adjustable_stock = calculated_stock - requesting_stock_qty
+                io_type = StockIOType.OUT
+            elif calculated_stock < requesting_stock_qty:
+                adjustable_stock = requesting_stock_qty - calculated_stock
+                io_type = StockIOType.INPUT
+
+            if adjustable_stock > 0:
+                adjustment_ios.append(StockIOLog(
+                    stock_id=stock_id,
+                    quantity=adjustable_stock,
+                    batch='N/A',
+                    date=date.today(),
+                    type=io_type,
+                    adjustment=base_stock_adjustment,
+                    primary_unit_id=stock.product.primary_unit_id,
+                    secondary_unit_id=stock.product.secondary_unit_id,
+                    organization_id=stock.organization_id,
+                    # Set by `CreatedAtUpdatedAtBaseModel.save`, which bulk create skips
+                    user_ip=common_models.USER_IP_ADDRESS,
+                ))
+                # A later row of the same stock adjusts from this row's quantity
+                calculated_stocks[stock_id] = requesting_stock_qty
+            if stock.stock != requesting_stock_qty:
+                stock.stock = requesting_stock_qty
+                stock.orderable_stock = requesting_stock_qty - pending_order_quantities.get(stock_id, 0)
+                changed_stocks[stock_id] = stock
+            # Update product queueing status
+            is_queueing_items[stock.product_id] = (
+                stock.orderable_stock <= 0 and
+                is_allowed_to_update_queueing_item_value(distributor_settings, stock.product)
+            )
+
+        StockIOLog.objects.bulk_create(adjustment_ios, batch_size=500)
+        Stock.objects.bulk_update(changed_stocks.values(), ['stock', 'orderable_stock'], batch_size=500)
+        Product.objects.filter(
+            pk__in=[product_id for product_id, value in is_queueing_items.items() if value],
+            is_queueing_item=False
+        ).update(is_queueing_item=True)
+        Product.objects.filter(
+            pk__in=[product_id for product_id, value in is_queueing_items.items() if not value],
+            is_queueing_item=True
+        ).update(is_queueing_item=False)
+        expire_stock_cache(stocks.keys())
         logger.info(f"Successfully populated stock for file {file_name}")
     except Exception as exception:
         logger.info(
@@ -225,43 +237,25 @@ def adjust_stock_from_file_ecommerce(file_name, file_instance_pk, lower_limit, u
 @app.task(bind=True, max_retries=10)
 def update_product_queueing_item_value(self, stock_id_list, settings):
     try:
-        stock_instances = []
-        product_instances = []
-        stock_cache_key_list = []
-
-        stocks = Stock.objects.filter(
-            pk__in=stock_id_list
-        ).only('id', 'ecom_stock', 'orderable_stock',)
-        for stock in stocks:
-            current_orderable_stock = stock.current_orderable_stock
-            if stock.orderable_stock != current_orderable_stock:
-                stock.orderable_stock = current_orderable_stock
-                stock_instances.append(stock)
-                logger.info(
-                    f"Updated orderable stock for stock {stock.id}."
-                )
-            # Check if product is_queueing_item should change or not
-            product = Product.objects.only('order_mode', 'is_queueing_item').get(pk=stock.product_id)
-            is_queueing_item_value = get_is_queueing_item_value(
-                stock.orderable_stock,
-                product.order_mode,
-                DotMap(settings)
+        changed_stocks, changed_products = Stock.bulk_update_orderable_stock(
+            stock_id_list,
+            DotMap(settings)
+        )
+        for stock in changed_stocks:
+            logger.info(
+                f"Updated orderable stock for stock {stock.id}."
             )
-            if is_queueing_item_value != product.is_queueing_item:
-                product.is_queueing_item = is_queueing_item_value
-                product_instances.append(product)
-                logger.info(
-                    f"Set product is queueing item to {is_queueing_item_value} for stock {stock.id}."
-                )
-            stock_key_list = [
-                # f"stock_instance_{str(stock).zfill(12)}",
-                f"{STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX}_{str(stock.id).zfill(12)}"
-            ]
-            stock_cache_key_list.extend(stock_key_list)
-        Stock.objects.bulk_update(stock_instances, ['orderable_stock',], batch_size=500)
-        Product.objects.bulk_update(product_instances, ['is_queueing_item',], batch_size=500)
+        for product in changed_products:
+            logger.info(
+                f"Set product is queueing item to {product.is_queueing_item} for product {product.id}."
+            )
+        stock_cache_key_list = [
+            f"{STOCK_INSTANCE_DISTRIBUTOR_CACHE_KEY_PREFIX}_{str(stock_id).zfill(12)}"
+            for stock_id in stock_id_list
+        ]
         # Expire stock cache
         cache.delete_many(stock_cache_key_list)
+        stocks = Stock.objects.filter(pk__in=stock_id_list)
         filters = {"pk__in": stock_id_list}
         update_stock_es_doc(queryset=stocks)
         # update_stock_document_lazy.apply_async(
@@ -282,75 +276,68 @@ def update_product_queueing_item_value(self, stock_id_list, settings):
 
 @app.task(autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=5, max_retries=10)
 def set_ecom_stock_from_file_lazy(file_name, file_instance_pk, lower_limit, upper_limit):
+    from common.utils import get_healthos_settings
     from core.models import ScriptFileStorage
     from .helpers import stop_inventory_signal, start_inventory_signal
+    from .stock_snapshot import get_stock_snapshot
 
     stop_inventory_signal()
     try:
-        stock_file = ScriptFileStorage.objects.only('content').get(pk=file_instance_pk)
-        stock_df =  pd.read_csv(stock_file.content)
-        data_df = stock_df[lower_limit:upper_limit]
-
-        for index, item in data_df.iterrows():
-            requesting_stock_qty = item.get('STOCK', '')
-            stock_id = item.get('ID', '')
-
-            try:
-                if stock_id and requesting_stock_qty:
-                    requesting_stock_qty = int(float(requesting_stock_qty))
-                    stock_id = int(float(stock_id))
-                if not math.isnan(requesting_stock_qty) and not math.isnan(stock_id):
-                    stock = Stock.objects.only(
-                        'id',
-                        'stock',
-                        'orderable_stock'
-                    ).get(pk=stock_id)
-                    current_orderable_stock = stock.get_current_orderable_stock(requesting_stock_qty)
-                    if stock.ecom_stock != requesting_stock_qty or stock.orderable_stock != current_orderable_stock:
-                        logger.info(
-                            "{} PREV QTY : {} CURRENT QTY : {}".format(
-                                stock.product.name.ljust(40),
-                                str(stock.ecom_stock).ljust(10),
-                                str(requesting_stock_qty).ljust(10)
-                            )
-                        )
-                        stock.ecom_stock = requesting_stock_qty
-                        stock.orderable_stock = current_orderable_stock
-                        stock.save(update_fields=['ecom_stock', 'orderable_stock'])
-                    # Check if product is_queueing_item should change or not
-                    product = Product.objects.only('order_mode', 'is_queueing_item').get(pk=stock.product_id)
-                    is_queueing_item_value = get_is_queueing_item_value(
-                        stock.orderable_stock,
-                        product.order_mode,
+        stock_file = ScriptFileStorage.objects.only('created_at', 'content').get(pk=file_instance_pk)
+        rows = get_stock_snapshot(stock_file).get_rows(lower_limit, upper_limit)
+        stock_ids = [stock_id for stock_id, _ in rows]
+        stocks = Stock.objects.select_related('product').only(
+            'id',
+            'ecom_stock',
+            'orderable_stock',
+            'product__name',
+            'product__order_mode',
+            'product__is_queueing_item',
+        ).in_bulk(stock_ids)
+        pending_order_quantities = Stock.get_pending_order_quantities(stocks.keys())
+        setting = get_healthos_settings()
+        changed_stocks = {}
+        changed_products = {}
+
+        for stock_id, requesting_stock_qty in rows:
+            stock = stocks.get(stock_id)
+            if stock is None:
+                logger.info(f"Unable to populate stocks for stock {stock_id}, Stock does not exist")
+                continue
+            requesting_stock_qty = int(requesting_stock_qty)
+            current_orderable_stock = requesting_stock_qty - pending_order_quantities.get(stock_id, 0)
+            if stock.ecom_stock != requesting_stock_qty or stock.orderable_stock != current_orderable_stock:
+                logger.info(
+                    "{} PREV QTY : {} CURRENT QTY : {}".format(
+                        stock.product.name.ljust(40),
+                        str(stock.ecom_stock).ljust(10),
+                        str(requesting_stock_qty).ljust(10)
                     )
-                    if is_queueing_item_value != product.is_queueing_item:
-                        product.is_queueing_item = is_queueing_item_value
-                        product.save(update_fields=['is_queueing_item'])
-                        logger.info(
-                            f"Set product is queueing item to {is_queueing_item_value} for stock {stock.id}."
-                        )
-                    stock.expire_cache()
-            except  Exception as exception:
+                )
+                stock.ecom_stock = requesting_stock_qty
+                stock.orderable_stock = current_orderable_stock
+                changed_stocks[stock_id] = stock
+            # Check if product is_queueing_item should change or not
+            product = stock.product
+            is_queueing_item_value = get_is_queueing_item_value(
+                stock.orderable_stock,
+                product.order_mode,
+                setting
+            )
+            if is_queueing_item_value != product.is_queueing_item:
+                product.is_queueing_item = is_queueing_item_value
+                changed_products[product.id] = product
                 logger.info(
-                    f"Unable to populate stocks for stock {stock_id}, Exception: {str(exception)}"
+                    f"Set product is queueing item to {is_queueing_item_value} for stock {stock.id}."
                 )
 
+        Stock.objects.bulk_update(changed_stocks.values(), ['ecom_stock', 'orderable_stock'], batch_size=500)
+        Product.objects.bulk_update(changed_products.values(), ['is_queueing_item'], batch_size=500)
+        expire_stock_cache(stocks.keys())
+
         logger.info(f"Successfully populated stock for file {file_name}")
-        stock_id_list = data_df.ID.values.tolist()
-        stock_id_list = filter(checkers.is_numeric, stock_id_list)
-        filters = {"pk__in": list(stock_id_list)}
-        update_stock_document_lazy.apply_async(
-            (
-                filters,
-            ),
-            countdown=1,
-            retry=True, retry_policy={
-                'max_retries': 10,
-                'interval_start': 0,
-                'interval_step': 0.2,
-                'interval_max': 0.2,
-            }
-        )
+        filters = {"pk__in": stock_ids}
+        request_stock_document_update(filters)
     except Exception as exception:
         logger.info(
             f"Unable to populate stocks for file {file_name}, Exception: {str(exception)}"
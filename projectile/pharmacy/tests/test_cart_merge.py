@@ -0,0 +1,127 @@
+from django.test import SimpleTestCase
+
+from ..cart_merge import (
+    CartLine,
+    CartProduct,
+    CartStock,
+    index_records,
+    merge_cart_items,
+)
+
+
+# (existing cart io logs, posted items, output of the previous pandas based merge)
+GOLDEN_CART_MERGE_CORPUS = [
+    ([], [], []),
+    (
+        [],
+        [{'stock': 7, 'quantity': 3}],
+        [{'stock_id': 7, 'total_quantity': 3, 'change': 3}],
+    ),
+    (
+        [],
+        [{'stock': 9, 'quantity': 2}, {'stock': 4, 'quantity': 1}],
+        [
+            {'stock_id': 9, 'total_quantity': 2, 'change': 2},
+            {'stock_id': 4, 'total_quantity': 1, 'change': 1},
+        ],
+    ),
+    (
+        [{'stock_id': 5, 'quantity': 2.0}],
+        [],
+        [{'stock_id': 5, 'total_quantity': 2.0, 'change': 0}],
+    ),
+    (
+        [
+            {'stock_id': 5, 'quantity': 2.0},
+            {'stock_id': 3, 'quantity': 1.0},
+            {'stock_id': 5, 'quantity': 1.0},
+        ],
+        [],
+        [
+            {'stock_id': 3, 'total_quantity': 1.0, 'change': 0},
+            {'stock_id': 5, 'total_quantity': 3.0, 'change': 0},
+        ],
+    ),
+    (
+        [{'stock_id': 5, 'quantity': 2.0}],
+        [{'stock': 5, 'quantity': 4}],
+        [{'stock_id': 5, 'total_quantity': 4, 'change': 2.0}],
+    ),
+    (
+        [{'stock_id': 5, 'quantity': 6.0}],
+        [{'stock': 5, 'quantity': 2}],
+        [{'stock_id': 5, 'total_quantity': 2, 'change': -4.0}],
+    ),
+    (
+        [{'stock_id': 1, 'quantity': 5.0}, {'stock_id': 3, 'quantity': 2.0}],
+        [{'stock': 3, 'quantity': 1}],
+        [
+            {'stock_id': 1, 'total_quantity': 5.0, 'change': 0.0},
+            {'stock_id': 3, 'total_quantity': 1.0, 'change': -1.0},
+        ],
+    ),
+    (
+        [{'stock_id': 1, 'quantity': 5.0}, {'stock_id': 3, 'quantity': 2.0}],
+        [{'stock': 8, 'quantity': 4}],
+        [
+            {'stock_id': 1, 'total_quantity': 5.0, 'change': 0.0},
+            {'stock_id': 3, 'total_quantity': 2.0, 'change': 0.0},
+            {'stock_id': 8, 'total_quantity': 4.0, 'change': 4.0},
+        ],
+    ),
+    (
+        [{'stock_id': 1, 'quantity': 5.0}, {'stock_id': 3, 'quantity': 2.0}],
+        [{'stock': 2, 'quantity': 4}],
+        [
+            {'stock_id': 1, 'total_quantity': 5.0, 'change': 0.0},
+            {'stock_id': 3, 'total_quantity': 2.0, 'change': 0.0},
+            {'stock_id': 2, 'total_quantity': 4.0, 'change': 4.0},
+        ],
+    ),
+    (
+        [{'stock_id': 2, 'quantity': 5.0}, {'stock_id': 2, 'quantity': 5.0}],
+        [{'stock': 2, 'quantity': 0}],
+        [{'stock_id': 2, 'total_quantity': 0, 'change': -10.0}],
+    ),
+]
+
+
+class CartMergeTest(SimpleTestCase):
+
+    def test_merge_cart_items_matches_golden_corpus(self):
+        for existing_items, new_items, expected in GOLDEN_CART_MERGE_CORPUS:
+            with self.subTest(existing_items=existing_items, new_items=new_items):
+                cart_lines = merge_cart_items(existing_items, new_items)
+                self.assertEqual(
+                    [line.as_dict() for line in cart_lines],
+                    expected
+                )
+
+    def test_cart_line_behaves_like_aggregated_item_dict(self):
+        line = CartLine(10, 3, -2)
+        self.assertEqual(line['stock_id'], 10)
+        self.assertEqual(line.get('total_quantity', 0), 3)
+        self.assertEqual(line.get('change', 0), -2)
+        self.assertIsNone(line.get('unknown'))
+        with self.assertRaises(KeyError):
+            line['unknown']
+
+    def test_index_records(self):
+        stocks = index_records(
+            [
+                {'id': 1, 'product_id': 11, 'orderable_stock': 5.0},
+                {'id': 2, 'product_id': 12, 'orderable_stock': 0.0},
+            ],
+            CartStock
+        )
+        self.assertEqual(set(stocks.keys()), {1, 2})
+        self.assertEqual(stocks[2].product_id, 12)
+        self.assertEqual(stocks[1].orderable_stock, 5.0)
+
+        products = index_records(
+            [{'id': 11, 'trading_price': 100.0, 'minimum_order_quantity': 3}],
+            CartProduct
+        )
+        self.assertEqual(products[11].minimum_order_quantity, 3)
+        # Fields not fetched are set as None
+        self.assertIsNone(products[11].order_mode)
@@ -0,0 +1,69 @@
+import datetime
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from ..forecasting import (
+    build_stock_day_matrix,
+    lookup_stock_values,
+    trailing_window_sums,
+)
+
+DAY = datetime.date(2023, 10, 25)
+
+
+def get_date(days):
+    return DAY - datetime.timedelta(days=days)
+
+
+class SalesVelocityTest(SimpleTestCase):
+
+    def setUp(self):
+        self.data = pd.DataFrame([
+            {'stock_id': 1, 'date': get_date(0), 'quantity': 2.0},
+            {'stock_id': 1, 'date': get_date(0), 'quantity': 3.0},
+            {'stock_id': 1, 'date': get_date(2), 'quantity': 1.0},
+            {'stock_id': 2, 'date': get_date(1), 'quantity': 4.0},
+            # Out of the requested dates
+            {'stock_id': 2, 'date': get_date(9), 'quantity': 10.0},
+            {'stock_id': 3, 'date': get_date(9), 'quantity': 7.0},
+        ])
+        self.dates = [get_date(2), get_date(1), get_date(0)]
+
+    def test_build_stock_day_matrix(self):
+        matrix = build_stock_day_matrix(self.data, self.dates, stocks=[3, 2, 1])
+        self.assertEqual(list(matrix.index), [3, 2, 1])
+        self.assertEqual(list(matrix.columns), self.dates)
+        self.assertEqual(
+            matrix.to_numpy().tolist(),
+            [[0.0, 0.0, 0.0], [0.0, 4.0, 0.0], [1.0, 0.0, 5.0]]
+        )
+
+    def test_trailing_window_sums(self):
+        matrix = build_stock_day_matrix(self.data, self.dates, stocks=[1, 2, 3])
+        sums = trailing_window_sums(matrix, {'last_day': 1, '2d': 2, 'all': 3, 'none': 0, 'more': 10})
+        self.assertEqual(sums['last_day'].tolist(), [5.0, 0.0, 0.0])
+        self.assertEqual(sums['2d'].tolist(), [5.0, 4.0, 0.0])
+        self.assertEqual(sums['all'].tolist(), [6.0, 4.0, 0.0])
+        self.assertEqual(sums['none'].tolist(), [0, 0, 0])
+        self.assertEqual(sums['more'].tolist(), [6.0, 4.0, 0.0])
+
+    def test_lookup_stock_values(self):
+        stock_file = pd.DataFrame({'ID': [1, 2, 2], 'PREV_STOCK': [10, 20, 30]})
+        orders = pd.DataFrame({'stock__id': [3, 1], 'stock_qty': [5, 6]})
+        stock_ids = pd.Series([1, 2, 3, 4])
+
+        # First match of the `ID` column, 0 if not found
+        self.assertEqual(
+            lookup_stock_values(stock_ids, stock_file, 'PREV_STOCK').tolist(),
+            [10, 20, 0, 0]
+        )
+        self.assertEqual(
+            lookup_stock_values(stock_ids, orders, 'stock_qty').tolist(),
+            [6, 0, 5, 0]
+        )
+        # Data without the value column
+        self.assertEqual(
+            lookup_stock_values(stock_ids, pd.DataFrame([]), 'stock_qty').tolist(),
+            [0, 0, 0, 0]
+        )
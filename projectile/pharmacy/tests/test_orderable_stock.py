@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from common.enums import Status
+from common.test_case import OmisTestCase
+from core.enums import AllowOrderFrom
+from pharmacy.enums import DistributorOrderType, OrderTrackingStatus, PurchaseType, StockIOType
+from pharmacy.models import Product, Stock, StockIOLog
+
+from . import PurchaseFactory, StockFactory, UnitFactory
+
+STOCK_ONLY_SETTING = SimpleNamespace(
+    overwrite_order_mode_by_product=False,
+    allow_order_from=AllowOrderFrom.STOCK,
+)
+
+
+class BulkOrderableStockTest(OmisTestCase):
+
+    def setUp(self):
+        super(BulkOrderableStockTest, self).setUp()
+        self.unit = UnitFactory()
+
+    def create_stocks(self, count):
+        stocks = [StockFactory(ecom_stock=10, orderable_stock=10) for _ in range(count)]
+        order = PurchaseFactory(
+            organization=stocks[0].organization,
+            status=Status.DISTRIBUTOR_ORDER,
+            purchase_type=PurchaseType.VENDOR_ORDER,
+            distributor_order_type=DistributorOrderType.ORDER,
+            current_order_status=OrderTrackingStatus.PENDING,
+            is_delayed=False,
+        )
+        StockIOLog.objects.bulk_create([
+            StockIOLog(
+                stock_id=stock.id,
+                organization_id=stock.organization_id,
+                purchase_id=order.id,
+                quantity=index + 1,
+                rate=1,
+                batch="N/A",
+                type=StockIOType.OUT,
+                status=Status.DISTRIBUTOR_ORDER,
+                primary_unit_id=self.unit.id,
+                secondary_unit_id=self.unit.id,
+            )
+            for index, stock in enumerate(stocks)
+        ])
+        return stocks
+
+    def test_orderable_stocks_match_per_stock_value(self):
+        stocks = self.create_stocks(3)
+        orderable_stocks = Stock.get_orderable_stocks([stock.id for stock in stocks])
+
+        for index, stock in enumerate(stocks):
+            self.assertEqual(orderable_stocks[stock.id]['pending_order_quantity'], index + 1)
+            self.assertEqual(
+                orderable_stocks[stock.id]['orderable_stock'],
+                Stock.objects.get(pk=stock.id).get_current_orderable_stock()
+            )
+        self.assertEqual(
+            Stock.get_orderable_stocks([stocks[0].id], {stocks[0].id: 4})[stocks[0].id]['orderable_stock'],
+            3
+        )
+
+    def test_bulk_update_takes_constant_queries(self):
+        stocks = self.create_stocks(2) + self.create_stocks(8)
+        with CaptureQueriesContext(connection) as small_update:
+            Stock.bulk_update_orderable_stock([stock.id for stock in stocks[:2]], STOCK_ONLY_SETTING)
+        Stock.objects.filter(pk__in=[stock.id for stock in stocks]).update(orderable_stock=10)
+        with CaptureQueriesContext(connection) as large_update:
+            changed_stocks, _ = Stock.bulk_update_orderable_stock(
+                [stock.id for stock in stocks], STOCK_ONLY_SETTING
+            )
+
+        self.assertEqual(len(small_update), len(large_update))
+        self.assertEqual(len(changed_stocks), len(stocks))
+        self.assertEqual(Stock.objects.get(pk=stocks[-1].id).orderable_stock, 2)
+        self.assertFalse(
+            Product.objects.filter(
+                pk__in=[stock.product_id for stock in stocks[:2]],
+                is_queueing_item=True
+            ).exists()
+        )
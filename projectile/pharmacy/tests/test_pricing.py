@@ -0,0 +1,46 @@
+import os
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..pricing import PricingContext, calculate_dynamic_discount_rate
+
+
+def get_pricing_context(organization_discount_factor, area_discount_factor, cumulative_discount_factor):
+    context = PricingContext(organization_id=1)
+    context.organization_and_area_discount = {
+        "organization_discount_factor": Decimal(organization_discount_factor),
+        "area_discount_factor": Decimal(area_discount_factor),
+    }
+    context.cumulative_discount_factor = Decimal(cumulative_discount_factor)
+    return context
+
+
+class PricingContextTest(SimpleTestCase):
+
+    def test_dynamic_discount_rate(self):
+        self.assertEqual(
+            calculate_dynamic_discount_rate(100, 10, Decimal("2.5"), Decimal("1")),
+            Decimal("13.128")
+        )
+        self.assertEqual(calculate_dynamic_discount_rate(0, 10, Decimal(1), Decimal(1)), 0.00)
+        self.assertEqual(calculate_dynamic_discount_rate(250.5, 0, Decimal(0), Decimal(0)), Decimal("0.000"))
+
+    @mock.patch.dict(os.environ, {"EXPRESS_DELIVERY_STOCK_ID": "99"})
+    def test_decorate_products(self):
+        context = get_pricing_context("2.5", "1", "3.5")
+        items = context.decorate_products([
+            {"id": 5, "product": {"trading_price": 100, "discount_rate": 10}},
+            {"id": 99, "product": {"trading_price": 40, "discount_rate": 0}},
+        ])
+
+        self.assertEqual(items[0]["product"]["discount_rate_factor"], Decimal("3.5"))
+        self.assertEqual(items[0]["product"]["dynamic_discount_rate"], Decimal("13.128"))
+        self.assertEqual(
+            items[0]["product"]["dynamic_discount_factors"],
+            {"organization_discount_factor": Decimal("2.5"), "area_discount_factor": Decimal("1")}
+        )
+        # Delivery coupon
+        self.assertEqual(items[1]["product"]["discount_rate_factor"], 0.00)
+        self.assertEqual(items[1]["product"]["dynamic_discount_rate"], 0.00)
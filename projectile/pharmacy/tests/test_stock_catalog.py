@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.enums import Status
+from pharmacy.catalog import (
+    CATALOG_PROJECTION_VERSION,
+    get_stock_catalog,
+    get_stock_catalog_cache_key,
+)
+from pharmacy.custom_serializer.purchase import DistributorOrderCartSerializer
+from pharmacy.custom_serializer.stock import (
+    StockForCartGetSerializer,
+    StockForInvoicePDFSerializer,
+)
+from pharmacy.custom_serializer.stock_io_log import (
+    StockIOLogForCartGetSerializer,
+    StockIOLogForInvoicePDFSerializer,
+)
+from pharmacy.models import Purchase, Stock
+from pharmacy.view.purchase import get_catalog_order_items
+
+from ..tests import PurchaseFactory, StockIOLogFactory
+
+
+class StockCatalogCacheKeyTest(SimpleTestCase):
+
+    def test_versioned_key(self):
+        self.assertIn(f"v{CATALOG_PROJECTION_VERSION}_", get_stock_catalog_cache_key(5))
+
+    def test_expired_with_the_stock(self):
+        self.assertIn(get_stock_catalog_cache_key(5), Stock.get_cache_keys([5]))
+
+
+class StockCatalogTest(TestCase):
+
+    def setUp(self):
+        self.purchase = PurchaseFactory()
+        self.items = StockIOLogFactory.create_batch(
+            3,
+            purchase=self.purchase,
+            status=Status.DISTRIBUTOR_ORDER,
+        )
+        self.stock_ids = [item.stock_id for item in self.items]
+        cache.delete_many([get_stock_catalog_cache_key(stock_id) for stock_id in self.stock_ids])
+
+    def get_purchase(self):
+        return Purchase.objects.prefetch_related(
+            Prefetch('stock_io_logs', queryset=get_catalog_order_items())
+        ).get(pk=self.purchase.pk)
+
+    def test_rendered_as_the_nested_serializers(self):
+        context = {'request': Request(APIRequestFactory().get('/'))}
+
+        for item in get_catalog_order_items(purchase=self.purchase):
+            stock = Stock.objects.get(pk=item.stock_id)
+            self.assertEqual(
+                StockIOLogForCartGetSerializer(item, context=context).data['stock'],
+                StockForCartGetSerializer(stock, context=context).data
+            )
+            self.assertEqual(
+                StockIOLogForInvoicePDFSerializer(item).data['stock'],
+                StockForInvoicePDFSerializer(stock).data
+            )
+
+    def test_missing_projections_built_with_one_query(self):
+        with self.assertNumQueries(1):
+            catalog = get_stock_catalog(self.stock_ids)
+        self.assertEqual(set(catalog), set(self.stock_ids))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_stock_catalog(self.stock_ids), catalog)
+
+    def test_order_rendered_with_one_catalog_read(self):
+        # Warm the catalog
+        DistributorOrderCartSerializer(self.get_purchase()).data
+        purchase = self.get_purchase()
+
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as cache_get_many, \
+                CaptureQueriesContext(connection) as queries:
+            data = DistributorOrderCartSerializer(purchase).data
+
+        self.assertEqual(cache_get_many.call_count, 1)
+        self.assertFalse([query for query in queries if 'pharmacy_product' in query['sql']])
+        self.assertEqual(
+            sorted(item['stock']['id'] for item in data['stock_io_logs']),
+            sorted(self.stock_ids)
+        )
@@ -0,0 +1,47 @@
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase
+
+from common.keyword_search import get_keyword_q, normalize_keyword, search_by_keyword
+from pharmacy.models import Stock
+
+from ..tests import StockFactory
+
+
+class KeywordQueryTest(SimpleTestCase):
+
+    def test_normalize_keyword(self):
+        self.assertEqual(normalize_keyword("  Napa   Extra \t500 "), "napa extra 500")
+        self.assertEqual(normalize_keyword(None), "")
+
+    def test_every_word_contained(self):
+        self.assertEqual(
+            get_keyword_q("product_full_name", "Napa  Extra"),
+            Q(product_full_name__contains="napa") & Q(product_full_name__contains="extra")
+        )
+        self.assertFalse(get_keyword_q("product_full_name", "  "))
+
+
+class StockKeywordSearchTest(TestCase):
+
+    def setUp(self):
+        names = ["napa extra 500mg tab", "napa", "ace plus tab", "extra napa syrup"]
+        self.stocks = {}
+        for name in names:
+            stock = StockFactory()
+            Stock.objects.filter(pk=stock.pk).update(product_full_name=name)
+            self.stocks[name] = stock.pk
+
+    def test_search_by_keyword(self):
+        queryset = search_by_keyword(Stock.objects.all(), "product_full_name", " Napa  EXTRA ")
+
+        self.assertEqual(
+            set(queryset.values_list("pk", flat=True)),
+            {self.stocks["napa extra 500mg tab"], self.stocks["extra napa syrup"]}
+        )
+
+    def test_ranked_by_similarity(self):
+        queryset = search_by_keyword(Stock.objects.all(), "product_full_name", "napa", rank=True)
+
+        pks = list(queryset.values_list("pk", flat=True))
+        self.assertEqual(len(pks), 3)
+        self.assertEqual(pks[0], self.stocks["napa"])
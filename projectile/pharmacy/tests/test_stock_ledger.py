@@ -0,0 +1,148 @@
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import IntegrityError
+
+from common.enums import Status
+from common.test_case import OmisTestCase
+from core.enums import AllowOrderFrom
+from core.tests import OrganizationFactory
+from pharmacy.enums import DistributorOrderType, OrderTrackingStatus, PurchaseType, StockIOType
+from pharmacy.models import Stock, StockIOLog
+
+from ..stock_ledger import bulk_create_stock_io_logs
+from . import PurchaseFactory, StockFactory, UnitFactory
+
+STOCK_ONLY_SETTING = SimpleNamespace(
+    overwrite_order_mode_by_product=False,
+    allow_order_from=AllowOrderFrom.STOCK,
+)
+
+
+class StockLedgerTest(OmisTestCase):
+
+    def setUp(self):
+        super(StockLedgerTest, self).setUp()
+        self.unit = UnitFactory()
+
+    def get_io_log(self, stock, purchase, quantity, rate, status=Status.ACTIVE):
+        return StockIOLog(
+            stock_id=stock.id,
+            organization_id=stock.organization_id,
+            purchase_id=purchase.id,
+            sales=None,
+            quantity=quantity,
+            rate=rate,
+            batch="b-{}".format(rate),
+            type=StockIOType.INPUT,
+            status=status,
+            primary_unit_id=self.unit.id,
+            secondary_unit_id=self.unit.id,
+            conversion_factor=1,
+            secondary_unit_flag=False,
+        )
+
+    def get_stock_values(self, stock):
+        return Stock.objects.values(
+            'purchase_rate', 'latest_purchase_unit_id', 'local_count'
+        ).get(pk=stock.pk)
+
+    @mock.patch('pharmacy.signals.get_healthos_settings', return_value=STOCK_ONLY_SETTING)
+    def test_bulk_ledger_matches_per_row_signal(self, _get_healthos_settings):
+        stocks = [StockFactory(local_count=0) for _ in range(2)]
+        bulk_stocks = [
+            StockFactory(organization=stock.organization, local_count=0) for stock in stocks
+        ]
+        purchase = PurchaseFactory(is_sales_return=False, round_discount=0, status=Status.ACTIVE)
+        lines = [(0, 4, 12), (1, 2, 30), (0, 1, 15)]
+
+        for index, quantity, rate in lines:
+            self.get_io_log(stocks[index], purchase, quantity, rate).save()
+        io_logs = bulk_create_stock_io_logs([
+            self.get_io_log(bulk_stocks[index], purchase, quantity, rate)
+            for index, quantity, rate in lines
+        ])
+
+        self.assertEqual(len(io_logs), len(lines))
+        self.assertTrue(all(io_log.batch.isupper() for io_log in io_logs))
+        for stock, bulk_stock in zip(stocks, bulk_stocks):
+            self.assertEqual(self.get_stock_values(stock), self.get_stock_values(bulk_stock))
+        self.assertEqual(self.get_stock_values(bulk_stocks[0])['local_count'], 2)
+        self.assertEqual(self.get_stock_values(bulk_stocks[0])['purchase_rate'], 15)
+
+    @mock.patch('pharmacy.signals.request_stock_document_update')
+    def test_bulk_ledger_matches_per_row_signal_for_distributor_requisition(
+            self, _request_stock_document_update):
+        distributor = OrganizationFactory()
+        # Not salesable, the restock reminder of both paths starts a celery task
+        stocks = [
+            StockFactory(organization=distributor, ecom_stock=5, is_salesable=False)
+            for _ in range(2)
+        ]
+        bulk_stocks = [
+            StockFactory(organization=distributor, ecom_stock=5, is_salesable=False)
+            for _ in stocks
+        ]
+        pending_order = PurchaseFactory(
+            organization=distributor,
+            status=Status.DISTRIBUTOR_ORDER,
+            purchase_type=PurchaseType.VENDOR_ORDER,
+            distributor_order_type=DistributorOrderType.ORDER,
+            current_order_status=OrderTrackingStatus.PENDING,
+            is_delayed=False,
+        )
+        # The orderable stock keeps the pending orders aside
+        StockIOLog.objects.bulk_create([
+            self.get_io_log(stock, pending_order, 3, 10, Status.DISTRIBUTOR_ORDER)
+            for stock in (stocks[0], bulk_stocks[0])
+        ])
+        requisition = PurchaseFactory(
+            organization=distributor,
+            status=Status.DRAFT,
+            purchase_type=PurchaseType.REQUISITION,
+            is_sales_return=False,
+        )
+        lines = [(0, 4, 12), (1, 2, 30), (0, 1, 15)]
+
+        with mock.patch.dict(os.environ, {'DISTRIBUTOR_ORG_ID': str(distributor.id)}):
+            for index, quantity, rate in lines:
+                self.get_io_log(stocks[index], requisition, quantity, rate, Status.DRAFT).save()
+            bulk_create_stock_io_logs([
+                self.get_io_log(bulk_stocks[index], requisition, quantity, rate, Status.DRAFT)
+                for index, quantity, rate in lines
+            ])
+
+        fields = ['ecom_stock', 'orderable_stock', 'local_count', 'product__is_queueing_item']
+        for stock, bulk_stock in zip(stocks, bulk_stocks):
+            self.assertEqual(
+                Stock.objects.values(*fields).get(pk=stock.pk),
+                Stock.objects.values(*fields).get(pk=bulk_stock.pk),
+            )
+        bulk_stock = Stock.objects.get(pk=bulk_stocks[0].pk)
+        self.assertEqual(bulk_stock.ecom_stock, 10)
+        self.assertEqual(bulk_stock.orderable_stock, 7)
+
+    @mock.patch('pharmacy.stock_ledger.get_healthos_settings', return_value=STOCK_ONLY_SETTING)
+    def test_order_validated_against_orderable_stock(self, _get_healthos_settings):
+        stock = StockFactory(orderable_stock=5)
+        order = PurchaseFactory(
+            organization=stock.organization,
+            status=Status.DISTRIBUTOR_ORDER,
+            purchase_type=PurchaseType.VENDOR_ORDER,
+            distributor_order_type=DistributorOrderType.ORDER,
+            is_queueing_order=False,
+        )
+
+        io_logs = bulk_create_stock_io_logs([
+            self.get_io_log(stock, order, 3, 10, Status.DISTRIBUTOR_ORDER),
+            self.get_io_log(stock, order, 5, 10, Status.DISTRIBUTOR_ORDER),
+        ])
+        self.assertEqual(len(io_logs), 2)
+
+        with self.assertRaisesMessage(IntegrityError, "Stock Changed, Please try again."):
+            bulk_create_stock_io_logs([
+                self.get_io_log(stock, order, 2, 10, Status.DISTRIBUTOR_ORDER),
+                self.get_io_log(stock, order, 6, 10, Status.DISTRIBUTOR_ORDER),
+            ])
+        self.assertEqual(StockIOLog.objects.filter(purchase=order).count(), 2)
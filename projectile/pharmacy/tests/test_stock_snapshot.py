@@ -0,0 +1,308 @@
+import datetime
+import io
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from django.core.cache import cache
+from django.db.models import FloatField, Sum
+from django.db.models.functions import Coalesce
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from common.enums import Status
+from common.test_case import OmisTestCase
+from core.enums import AllowOrderFrom
+from core.models import OrganizationSetting
+from core.tests import PersonOrganizationFactory, ScriptFileStorageFactory
+from ecommerce.enums import ShortReturnLogType
+from ecommerce.models import OrderInvoiceGroup, ShortReturnItem, ShortReturnLog
+from pharmacy import stock_snapshot
+from pharmacy.enums import DistributorOrderType, OrderTrackingStatus, PurchaseType, StockIOType
+from pharmacy.models import OrderTracking, Product, StockIOLog
+from pharmacy.stock_snapshot import (
+    StockSnapshot,
+    get_ecommerce_stock_changes,
+    get_stock_snapshot,
+    get_stock_snapshot_path,
+    parse_stock_file,
+    save_stock_snapshot,
+)
+from pharmacy.tasks import adjust_stock_from_file_ecommerce
+
+from . import PurchaseFactory, StockFactory, StorePointFactory, UnitFactory
+
+STOCK_CSV = "ID,NAME,STOCK\n7,Napa,10\n3,Ace,2.5\n7,Napa dup,99\n,Blank,4\n9,Seclo,n/a\n12,Fexo,0\n"
+
+
+class StockSnapshotTest(SimpleTestCase):
+
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(STOCK_SNAPSHOT_DIR=self.snapshot_dir)
+        self.settings_override.enable()
+        stock_snapshot._loaded_snapshots.clear()
+
+    def tearDown(self):
+        stock_snapshot._loaded_snapshots.clear()
+        self.settings_override.disable()
+        shutil.rmtree(self.snapshot_dir)
+
+    def get_stock_file(self, pk=1):
+        return SimpleNamespace(
+            pk=pk,
+            created_at=datetime.datetime(2024, 1, 31, 6, 0, tzinfo=datetime.timezone.utc),
+            content=io.StringIO(STOCK_CSV),
+        )
+
+    def test_parse_keeps_file_order(self):
+        rows = parse_stock_file(io.StringIO(STOCK_CSV))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows['id'][:3].tolist(), [7, 3, 7])
+
+    def test_lookup_uses_first_row_of_a_stock(self):
+        snapshot = get_stock_snapshot(self.get_stock_file())
+        self.assertEqual(
+            snapshot.get_stocks([7, 3, 9, 12, 404]),
+            {7: 10, 3: 2.5, 9: 0, 12: 0, 404: 0}
+        )
+
+    def test_rows_of_a_chunk(self):
+        snapshot = get_stock_snapshot(self.get_stock_file())
+        self.assertEqual(snapshot.get_rows(0, 3), [(7, 10), (3, 2.5), (7, 99)])
+        # Rows without a numeric id or stock are skipped
+        self.assertEqual(snapshot.get_rows(3, 6), [(12, 0)])
+
+    def test_file_is_parsed_once(self):
+        stock_file = self.get_stock_file(pk=2)
+        get_stock_snapshot(stock_file)
+        stock_snapshot._loaded_snapshots.clear()
+
+        # Loaded from the saved snapshot, the content is not read again
+        stock_file.content = None
+        snapshot = get_stock_snapshot(stock_file)
+        self.assertEqual(len(snapshot), 6)
+        self.assertEqual(snapshot.get_stock(3), 2.5)
+        self.assertTrue(get_stock_snapshot_path(2).startswith(self.snapshot_dir))
+
+    def test_superseded_snapshots_removed(self):
+        for pk in (3, 4):
+            get_stock_snapshot(self.get_stock_file(pk=pk))
+        other_file = os.path.join(self.snapshot_dir, "notes.npy")
+        open(other_file, 'wb').close()
+
+        save_stock_snapshot(self.get_stock_file(pk=5))
+
+        self.assertEqual(
+            sorted(os.listdir(self.snapshot_dir)),
+            ["5.npy", "notes.npy"]
+        )
+        # An older file is parsed again when it is still read
+        self.assertEqual(get_stock_snapshot(self.get_stock_file(pk=3)).get_stock(7), 10)
+
+
+class EcommerceStockChangesTest(OmisTestCase):
+
+    def setUp(self):
+        super(EcommerceStockChangesTest, self).setUp()
+        self.unit = UnitFactory()
+        self.stocks = [StockFactory() for _ in range(3)]
+        self.employee = PersonOrganizationFactory()
+        self.file_upload_date = timezone.now() - datetime.timedelta(days=1)
+
+    def add_io_logs(self, purchase, status, quantities):
+        return StockIOLog.objects.bulk_create([
+            StockIOLog(
+                stock_id=stock.id,
+                organization_id=purchase.organization_id,
+                purchase_id=purchase.id,
+                quantity=quantity,
+                rate=10,
+                batch="N/A",
+                type=StockIOType.INPUT,
+                status=status,
+                primary_unit_id=self.unit.id,
+                secondary_unit_id=self.unit.id,
+            )
+            for stock, quantity in zip(self.stocks, quantities)
+        ])
+
+    def add_requisition(self, purchase_date, quantities):
+        requisition = PurchaseFactory(
+            status=Status.DRAFT,
+            purchase_type=PurchaseType.REQUISITION,
+            purchase_date=purchase_date,
+        )
+        self.add_io_logs(requisition, Status.DRAFT, quantities)
+
+    def add_order(self, tracked_at, current_order_status, quantities):
+        order = PurchaseFactory(
+            status=Status.DISTRIBUTOR_ORDER,
+            purchase_type=PurchaseType.VENDOR_ORDER,
+            distributor_order_type=DistributorOrderType.ORDER,
+            current_order_status=current_order_status,
+        )
+        # The signals of the trackings update the order
+        tracking = OrderTracking.objects.bulk_create([
+            OrderTracking(order=order, order_status=OrderTrackingStatus.ON_THE_WAY)
+        ])[0]
+        OrderTracking.objects.filter(pk=tracking.pk).update(date=tracked_at)
+        return self.add_io_logs(order, Status.DISTRIBUTOR_ORDER, quantities)
+
+    def add_short_return(self, io_logs, logged_at, quantities, status=Status.ACTIVE,
+                         invoice_group_status=OrderTrackingStatus.DELIVERED):
+        order = io_logs[0].purchase
+        invoice_group = OrderInvoiceGroup.objects.bulk_create([
+            OrderInvoiceGroup(
+                organization_id=order.organization_id,
+                order_by_organization_id=order.organization_id,
+                date=logged_at,
+                current_order_status=invoice_group_status,
+            )
+        ])[0]
+        short_return_log = ShortReturnLog.objects.bulk_create([
+            ShortReturnLog(
+                organization_id=order.organization_id,
+                date=logged_at,
+                received_by=self.employee,
+                order_by_organization_id=order.organization_id,
+                order=order,
+                invoice_group=invoice_group,
+                type=ShortReturnLogType.RETURN,
+            )
+        ])[0]
+        ShortReturnItem.objects.bulk_create([
+            ShortReturnItem(
+                organization_id=order.organization_id,
+                type=ShortReturnLogType.RETURN,
+                stock_id=io_log.stock_id,
+                stock_io=io_log,
+                short_return_log=short_return_log,
+                product_name="product",
+                unit_name="unit",
+                batch="N/A",
+                quantity=quantity,
+                status=status,
+            )
+            for io_log, quantity in zip(io_logs, quantities)
+        ])
+
+    def get_per_stock_change(self, stock, file_upload_date):
+        # The per stock aggregates of `Stock.get_calculated_stock_for_ecommerce` before the snapshot
+        requisitions = stock.stocks_io.filter(
+            status=Status.DRAFT,
+            purchase__purchase_date__gt=file_upload_date,
+            purchase__status=Status.DRAFT,
+            purchase__purchase_type=PurchaseType.REQUISITION,
+        ).aggregate(total_quantity=Coalesce(Sum('quantity', output_field=FloatField()), 0.00))
+        orders = stock.stocks_io.filter(
+            status=Status.DISTRIBUTOR_ORDER,
+            purchase__order_status__date__gt=file_upload_date,
+            purchase__order_status__order_status=OrderTrackingStatus.ON_THE_WAY,
+            purchase__status=Status.DISTRIBUTOR_ORDER,
+            purchase__purchase_type=PurchaseType.VENDOR_ORDER,
+            purchase__distributor_order_type=DistributorOrderType.ORDER,
+            purchase__current_order_status__in=[
+                OrderTrackingStatus.ON_THE_WAY,
+                OrderTrackingStatus.DELIVERED,
+                OrderTrackingStatus.COMPLETED,
+                OrderTrackingStatus.PARITAL_DELIVERED,
+                OrderTrackingStatus.FULL_RETURNED,
+                OrderTrackingStatus.PORTER_DELIVERED,
+                OrderTrackingStatus.PORTER_FULL_RETURN,
+                OrderTrackingStatus.PORTER_PARTIAL_DELIVERED,
+                OrderTrackingStatus.PORTER_FAILED_DELIVERED,
+            ],
+        ).aggregate(total_quantity=Coalesce(Sum('quantity', output_field=FloatField()), 0.00))
+        short_return_items = stock.stocks_short_return.filter(
+            short_return_log__date__gt=file_upload_date,
+        ).exclude(
+            status=Status.INACTIVE,
+        ).exclude(
+            short_return_log__invoice_group__current_order_status__in=[
+                OrderTrackingStatus.REJECTED,
+                OrderTrackingStatus.CANCELLED
+            ]
+        ).aggregate(total_quantity=Coalesce(Sum('quantity', output_field=FloatField()), 0.00))
+        return (
+            requisitions['total_quantity'] + float(short_return_items['total_quantity']) -
+            orders['total_quantity']
+        )
+
+    def test_grouped_changes_match_per_stock_baseline(self):
+        before_upload = self.file_upload_date - datetime.timedelta(hours=1)
+        now = timezone.now()
+        self.add_requisition(now, [10, 4, 0])
+        self.add_requisition(before_upload, [100, 100, 100])
+        io_logs = self.add_order(now, OrderTrackingStatus.DELIVERED, [3, 0, 7])
+        self.add_order(before_upload, OrderTrackingStatus.DELIVERED, [50, 50, 50])
+        self.add_order(now, OrderTrackingStatus.PENDING, [50, 50, 50])
+        self.add_short_return(io_logs, now, [1, 2, 0])
+        self.add_short_return(io_logs, now, [20, 20, 20], status=Status.INACTIVE)
+        self.add_short_return(
+            io_logs, now, [20, 20, 20], invoice_group_status=OrderTrackingStatus.CANCELLED
+        )
+        self.add_short_return(io_logs, before_upload, [20, 20, 20])
+        stock_ids = [stock.id for stock in self.stocks]
+
+        changes = get_ecommerce_stock_changes(stock_ids, self.file_upload_date)
+
+        self.assertEqual(
+            changes,
+            {
+                stock.id: self.get_per_stock_change(stock, self.file_upload_date)
+                for stock in self.stocks
+            }
+        )
+        self.assertEqual([changes[stock_id] for stock_id in stock_ids], [8, 6, -7])
+
+
+class AdjustStockFromFileTest(OmisTestCase):
+
+    def setUp(self):
+        super(AdjustStockFromFileTest, self).setUp()
+        self.store_point = StorePointFactory()
+        self.stock = StockFactory(
+            organization=self.store_point.organization,
+            store_point=self.store_point,
+            stock=0,
+        )
+        OrganizationSetting.objects.filter(
+            organization=self.store_point.organization
+        ).update(allow_order_from=AllowOrderFrom.STOCK)
+        cache.delete(self.store_point.organization.get_key())
+        self.stock_file = ScriptFileStorageFactory()
+
+    def adjust_stock(self, rows):
+        snapshot = StockSnapshot(
+            self.stock_file.pk,
+            self.stock_file.created_at,
+            np.array(rows, dtype=stock_snapshot.STOCK_SNAPSHOT_DTYPE),
+        )
+        with mock.patch('pharmacy.stock_snapshot.get_stock_snapshot', return_value=snapshot), \
+                mock.patch('pharmacy.tasks.time.sleep'):
+            adjust_stock_from_file_ecommerce(
+                "stock.csv", self.stock_file.pk, 0, len(rows), self.store_point.pk
+            )
+
+    def test_rows_of_a_stock_applied_in_order(self):
+        self.adjust_stock([(self.stock.id, 5), (self.stock.id, 2)])
+
+        self.assertEqual(
+            list(StockIOLog.objects.filter(stock=self.stock).order_by('pk').values_list(
+                'type', 'quantity'
+            )),
+            [(StockIOType.INPUT, 5), (StockIOType.OUT, 3)]
+        )
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.stock, 2)
+
+    def test_last_row_decides_queueing(self):
+        self.adjust_stock([(self.stock.id, 5), (self.stock.id, 0)])
+
+        # Out of stock by the last row
+        self.assertTrue(Product.objects.get(pk=self.stock.product_id).is_queueing_item)
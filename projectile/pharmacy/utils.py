@@ -27,6 +27,7 @@ from common.utils import (
     convert_utc_to_local,
     get_date_obj_from_date_str,
 )
+from common.cache_invalidation import batch_cache_invalidation
 from common.cache_keys import CART_GROUP_CACHE_KEY
 from core.models import Organization
 from core.enums import AllowOrderFrom
@@ -736,47 +737,48 @@ def set_ecom_stock_from_file(stock_file_instance, lower_limit, upper_limit):
         stock_df = pd.read_csv(stock_file.content)
         data_df = stock_df[lower_limit:upper_limit]
 
-        for index, item in data_df.iterrows():
-            requesting_stock_qty = item.get('STOCK')
-            stock_id = item.get('ID')
-
-            if not math.isnan(requesting_stock_qty) and not math.isnan(stock_id):
-                try:
-                    stock = Stock.objects.only(
-                        'id',
-                        'stock',
-                        'orderable_stock'
-                    ).get(pk=stock_id)
-                    current_orderable_stock = stock.get_current_orderable_stock(requesting_stock_qty)
-                    if stock.ecom_stock != requesting_stock_qty or stock.orderable_stock != current_orderable_stock:
-                        logger.info(
-                            "{} PREV Q : {} CALCULATED QTY : {}".format(
-                                stock.product.name.ljust(40),
-                                str(stock.ecom_stock).ljust(10),
-                                str(requesting_stock_qty).ljust(10)
+        with batch_cache_invalidation():
+            for index, item in data_df.iterrows():
+                requesting_stock_qty = item.get('STOCK')
+                stock_id = item.get('ID')
+
+                if not math.isnan(requesting_stock_qty) and not math.isnan(stock_id):
+                    try:
+                        stock = Stock.objects.only(
+                            'id',
+                            'stock',
+                            'orderable_stock'
+                        ).get(pk=stock_id)
+                        current_orderable_stock = stock.get_current_orderable_stock(requesting_stock_qty)
+                        if stock.ecom_stock != requesting_stock_qty or stock.orderable_stock != current_orderable_stock:
+                            logger.info(
+                                "{} PREV Q : {} CALCULATED QTY : {}".format(
+                                    stock.product.name.ljust(40),
+                                    str(stock.ecom_stock).ljust(10),
+                                    str(requesting_stock_qty).ljust(10)
+                                )
                             )
+                            stock.ecom_stock = requesting_stock_qty
+                            stock.orderable_stock = current_orderable_stock
+                            stock.save(update_fields=['ecom_stock', 'orderable_stock'])
+                        # Check if product is_queueing_item should change or not
+                        product = Product.objects.only('order_mode', 'is_queueing_item').get(pk=stock.product_id)
+                        is_queueing_item_value = get_is_queueing_item_value(
+                            stock.orderable_stock,
+                            product.order_mode,
                         )
-                        stock.ecom_stock = requesting_stock_qty
-                        stock.orderable_stock = current_orderable_stock
-                        stock.save(update_fields=['ecom_stock', 'orderable_stock'])
-                    # Check if product is_queueing_item should change or not
-                    product = Product.objects.only('order_mode', 'is_queueing_item').get(pk=stock.product_id)
-                    is_queueing_item_value = get_is_queueing_item_value(
-                        stock.orderable_stock,
-                        product.order_mode,
-                    )
-                    if is_queueing_item_value != product.is_queueing_item:
-                        product.is_queueing_item = is_queueing_item_value
-                        product.save(update_fields=['is_queueing_item'])
+                        if is_queueing_item_value != product.is_queueing_item:
+                            product.is_queueing_item = is_queueing_item_value
+                            product.save(update_fields=['is_queueing_item'])
+                            logger.info(
+                                f"Set product is queueing item to {is_queueing_item_value} for stock {stock.id}."
+                            )
+                        stock.expire_cache()
+                    except Stock.DoesNotExist:
                         logger.info(
-                            f"Set product is queueing item to {is_queueing_item_value} for stock {stock.id}."
+                            f"Unable to populate stocks for stock {stock.id}, Exception: {str(exception)}"
                         )
-                    stock.expire_cache()
-                except Stock.DoesNotExist:
-                    logger.info(
-                        f"Unable to populate stocks for stock {stock.id}, Exception: {str(exception)}"
-                    )
-                    pass
+                        pass
         logger.info(f"Successfully populated stock for file {file_name}")
     except Exception as exception:
         logger.info(
@@ -1522,34 +1524,26 @@ def get_product_dynamic_discount_rate(user_org_id, trading_price, discount_rate,
         decimal: _description_
     """
     from common.healthos_helpers import CustomerHelper
-    from decimal import Decimal
+    from pharmacy.pricing import calculate_dynamic_discount_rate, get_delivery_coupon_stock_id
 
     # Return if trading price is 0
     if not trading_price:
         return 0.00
 
-
     dynamic_discount_factor = CustomerHelper(
         organization_id=user_org_id
     ).get_organization_and_area_discount()
 
-    product_mrp = Decimal(trading_price)
-    base_discount = Decimal(discount_rate)
-
-
-    org_discount_factor = dynamic_discount_factor.get("organization_discount_factor", 0.00)
-    area_discount_factor = dynamic_discount_factor.get("area_discount_factor", 0.00)
-
-    price = product_mrp - (base_discount * product_mrp) / 100
-    price = price - (org_discount_factor * price) / 100
-    price = price - (area_discount_factor * price) / 100
-    final_discount_amount = product_mrp - price
-    dynamic_discount_rate = round((final_discount_amount / product_mrp) * 100, 3)
+    dynamic_discount_rate = calculate_dynamic_discount_rate(
+        trading_price,
+        discount_rate,
+        dynamic_discount_factor.get("organization_discount_factor", 0.00),
+        dynamic_discount_factor.get("area_discount_factor", 0.00)
+    )
 
-    coupon = os.environ.get("EXPRESS_DELIVERY_STOCK_ID", None)
     # Check if the provided data's ID matches the coupon ID
     # If the coupon matches, remove the discount factor by returning 0.00
-    if str(stock_id) == coupon:
+    if str(stock_id) == get_delivery_coupon_stock_id():
         return 0.00
     else:
         return dynamic_discount_rate
@@ -1,6 +1,3 @@
-import os
-import glob
-from pathlib import Path
 import json
 import csv
 import math
@@ -14,8 +11,8 @@ from pytz import timezone
 from django.db.models import (
     Sum,
 )
-from django.core.files import File
-from django.http import HttpResponse
+from django.core.files.base import ContentFile
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
@@ -38,6 +35,11 @@ from core.enums import FilePurposes
 
 from pharmacy.enums import DistributorOrderType, PurchaseType, OrderTrackingStatus, OrderTrackingStatus
 from pharmacy.models import StockIOLog, Purchase, Stock, Product, StockIOLog, OrderTracking
+from pharmacy.forecasting import (
+    build_stock_day_matrix,
+    lookup_stock_values,
+    trailing_window_sums,
+)
 
 
 def some_time_ago(date):
@@ -45,20 +47,11 @@ def some_time_ago(date):
     end = start - timedelta(15)
     return end
 
-def find_name(stock_id, data_set):
-    return(str(data_set[data_set['stock_id']==stock_id]['product'].iloc[0]))
-
-def find_history(stock_id, dates, data_set):
-    data = []
-    for date in dates:
-        data.append(data_set.loc[(data_set['date'] == date) & (data_set['stock_id'] == stock_id), 'quantity'].sum())
-    return str(data)
+class Echo:
+    """An object that implements just the write method of the file-like interface"""
 
-def find_number(stock_id, dates, data_set):
-    data = []
-    for date in dates:
-        data.append(data_set.loc[(data_set['date'] == date) & (data_set['stock_id'] == stock_id), 'quantity'].sum())
-    return sum(data)
+    def write(self, value):
+        return value
 
 def get_startdt_and_enddt_and_date(date):
     start = date.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -299,39 +292,36 @@ class PurchasePrediction(APIView):
 
         dates = data['date'].sort_index( ascending=False).unique()[8:-1]
 
-        dates_ld = dates[6:]
-        dates_3d = dates[4:]
-        dates_7d = dates
-
-
         products = list(set(data['stock_id'].unique()))
 
-        response = HttpResponse(content_type='text/csv')
+        history = build_stock_day_matrix(data, dates, stocks=products)
+        windows = trailing_window_sums(history, {
+            'last_day': len(dates[6:]),
+            '3d': len(dates[4:]),
+            '7d': len(dates),
+        })
+        windows['predicted'] = windows['last_day'] + windows['3d'] / 3 + windows['7d'] / 7
+        names = data.drop_duplicates(subset=['stock_id']).set_index('stock_id')['product']
+
+        def rows():
+            writer = csv.writer(Echo())
+            yield writer.writerow(['id', 'product name', 'history_7_days', 'last_day', '3d', '7d', 'predicted'])
+            for item, history_row, window_row in zip(
+                    products, history.to_numpy().tolist(), windows.itertuples(index=False)):
+                yield writer.writerow(
+                    [
+                        item,
+                        str(names[item]),
+                        str(history_row),
+                        *window_row,
+                    ]
+                )
+
+        response = StreamingHttpResponse(rows(), content_type='text/csv')
         file_name = "purchase_prediction_{}.csv".format(
             datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
         )
         response['Content-Disposition'] = 'attachment; filename="{}"'.format(file_name)
-
-        writer = csv.writer(response)
-        writer.writerow(['id', 'product name', 'history_7_days', 'last_day', '3d', '7d', 'predicted'])
-
-        for item in products:
-            ld = find_number(item, dates_ld, data)
-            three_d = find_number(item, dates_3d, data)
-            seven_d = find_number(item, dates_7d, data)
-            pre = (ld + three_d / 3 + seven_d/7)
-            writer.writerow(
-                [
-                    item,
-                    find_name(item, data),
-                    find_history(item, dates, data),
-                    ld,
-                    three_d,
-                    seven_d,
-                    pre
-                ]
-            )
-
         return response
 
 def get_sales_return_ds(tf, users_id ):
@@ -722,35 +712,18 @@ class DistributorOrderPurchasePrediction(APIView):
     )
     permission_classes = (CheckAnyPermission, )
 
-    def store_file(self, file, data, prediction_on):
-        data_list = []
-        with open(file, 'rb') as fi:
-            outfile = File(fi, name=os.path.basename(fi.name))
-            file_storage = ScriptFileStorage.objects.create(
-                content=outfile,
-                file_purpose=FilePurposes.PURCHASE_PREDICTION,
-                entry_by_id=self.request.user.id,
-                data=data,
-                prediction_on=prediction_on
-            )
-            file_storage.save()
-            file_list = glob.glob('purchase_prediction*.csv')
-            for removeable_file in file_list:
-                if Path(removeable_file).is_file():
-                    os.remove(removeable_file)
+    def store_file(self, content, file_name, data, prediction_on):
+        ScriptFileStorage.objects.create(
+            content=ContentFile(content, name=file_name),
+            file_purpose=FilePurposes.PURCHASE_PREDICTION,
+            entry_by_id=self.request.user.id,
+            data=data,
+            prediction_on=prediction_on
+        )
 
 
     def post(self, request):
 
-        def get_data(df, stock_id, key ):
-            try:
-                return df.loc[(df.stock__id == stock_id)][key].values[0]
-            except:
-                try:
-                    return df.loc[(df.ID == stock_id)][key].values[0]
-                except:
-                    return 0
-
         stock_file=request.data.get('stock_file', '')
         prev_days = int(request.data.get('past', 7))
         predict_days = int(request.data.get('future', 4))
@@ -825,13 +798,16 @@ class DistributorOrderPurchasePrediction(APIView):
         old_order_pd['stock'] = 0
         old_order_pd['d1_short'] = 0
         old_order_pd[short_label] = 0
-        for i, row in new_order_pd.iterrows():
-            id = new_order_pd.at[i,'stock__id']
-            new_order_pd.at[i,'stock_qty'] = get_data(last_stock_pd,id,'PREV_STOCK')
-        for i, row in old_order_pd.iterrows():
-            id = old_order_pd.at[i,'stock__id']
-            old_order_pd.at[i,'stock'] = get_data(new_order_pd,id,'stock_qty')
-            old_order_pd.at[i,'new_order'] = get_data(new_order_pd,id,'new_order')
+        if not new_order_pd.empty:
+            new_order_pd['stock_qty'] = lookup_stock_values(
+                new_order_pd['stock__id'], last_stock_pd, 'PREV_STOCK'
+            )
+        old_order_pd['stock'] = lookup_stock_values(
+            old_order_pd['stock__id'], new_order_pd, 'stock_qty'
+        )
+        old_order_pd['new_order'] = lookup_stock_values(
+            old_order_pd['stock__id'], new_order_pd, 'new_order'
+        )
         old_order_pd['d1_short'] = old_order_pd['stock'] - old_order_pd['new_order']
         old_order_pd[short_label] = old_order_pd['stock'] - old_order_pd[pred_days_label]
         old_order_pd = old_order_pd[old_order_pd[short_label]<0].reset_index(drop=True)
@@ -841,7 +817,6 @@ class DistributorOrderPurchasePrediction(APIView):
             datetime.now().strftime("%Y_%m_%d_%H_%M_%S"),
             stock_file_name
         )
-        file = old_order_pd.to_csv(file_name, encoding='utf-8', index=False)
         data = {
             'prev_days': prev_days,
             'predict_days': predict_days,
@@ -850,7 +825,8 @@ class DistributorOrderPurchasePrediction(APIView):
         }
         # Store generated file in remove original
         if not old_order_pd.empty:
-           self.store_file(file_name, data, last_stock_obj)
+            content = old_order_pd.to_csv(index=False).encode('utf-8')
+            self.store_file(content, file_name, data, last_stock_obj)
         return Response(
             json.loads(old_order_pd.to_json(orient="records", date_format='iso', date_unit='s')),
             status=status.HTTP_200_OK
@@ -40,7 +40,7 @@ from common.tasks import (
     send_same_sms_to_multiple_receivers,
     send_message_to_slack_or_mattermost_channel_lazy
 )
-from common.pagination import CachedCountPageNumberPagination
+from common.pagination import CachedCountPageNumberPagination, CachedCountKeysetPagination
 
 from core.permissions import (
     CheckAnyPermission,
@@ -99,9 +99,57 @@ from ..utils import (
 )
 from ..cart_helpers import update_cart, re_order
 from ..cart_helpers_v2 import update_cart_v2
+from ..pricing import PricingContext
 
 logger = logging.getLogger(__name__)
 
+
+def get_catalog_order_items(**filters):
+    """
+    Io logs of the carts / orders without their stock, for the serializers rendering
+    the stock from its catalog projection (see `pharmacy.catalog`)
+
+    Args:
+        **filters: filters of the io logs, in addition to the order status
+
+    Returns:
+        QuerySet: the io logs with their units
+    """
+    return StockIOLog.objects.filter(
+        status=Status.DISTRIBUTOR_ORDER,
+        **filters
+    ).select_related(
+        'primary_unit',
+        'secondary_unit',
+    ).only(
+        'id',
+        'alias',
+        'status',
+        'stock',
+        'quantity',
+        'rate',
+        'batch',
+        'base_discount',
+        'date',
+        'discount_rate',
+        'discount_total',
+        'round_discount',
+        'vat_rate',
+        'vat_total',
+        'tax_total',
+        'tax_rate',
+        'purchase_id',
+        'primary_unit__id',
+        'primary_unit__alias',
+        'primary_unit__name',
+        'primary_unit__description',
+        'secondary_unit__id',
+        'secondary_unit__alias',
+        'secondary_unit__name',
+        'secondary_unit__description',
+    )
+
+
 class DistributorOrderCartListCreate(ListCreateAPICustomView):
 
     available_permission_classes = (
@@ -118,153 +166,8 @@ class DistributorOrderCartListCreate(ListCreateAPICustomView):
 
     def get_queryset(self):
         # order_statuses = OrderTracking.objects.only('id')
-        cart_items = StockIOLog.objects.filter(
-            status=Status.DISTRIBUTOR_ORDER,
+        cart_items = get_catalog_order_items(
             organization=self.request.user.organization_id
-        ).select_related(
-            'primary_unit',
-            'secondary_unit',
-            'stock__store_point',
-            'stock__product__manufacturing_company',
-            'stock__product__form',
-            'stock__product__subgroup__product_group',
-            'stock__product__generic',
-            'stock__product__primary_unit',
-            'stock__product__secondary_unit',
-            'stock__product__category',
-            'stock__product__compartment',
-        ).only(
-            'id',
-            'alias',
-            'status',
-            'stock',
-            'quantity',
-            'rate',
-            'batch',
-            'base_discount',
-            # 'expire_date',
-            'date',
-            # 'type',
-            'primary_unit__id',
-            'primary_unit__alias',
-            'primary_unit__name',
-            'primary_unit__description',
-            # 'primary_unit__created_at',
-            # 'primary_unit__updated_at',
-            'secondary_unit__id',
-            'secondary_unit__alias',
-            'secondary_unit__name',
-            'secondary_unit__description',
-            # 'secondary_unit__created_at',
-            # 'secondary_unit__updated_at',
-            'discount_rate',
-            'discount_total',
-            'round_discount',
-            'vat_rate',
-            'vat_total',
-            'tax_total',
-            'tax_rate',
-            # 'conversion_factor',
-            # 'secondary_unit_flag',
-            # 'data_entry_status',
-            'purchase_id',
-            'purchase__organization_id',
-            'purchase__distributor__id',
-            'purchase__distributor__alias',
-            'purchase__distributor__name',
-            'purchase__distributor__address',
-            'purchase__distributor__delivery_sub_area',
-            'purchase__distributor__delivery_thana',
-            'purchase__distributor__primary_mobile',
-            'purchase__distributor__status',
-                'stock__id',
-                'stock__alias',
-                'stock__stock',
-                'stock__demand',
-                'stock__auto_adjustment',
-                'stock__minimum_stock',
-                'stock__rack',
-                'stock__tracked',
-                'stock__purchase_rate',
-                'stock__calculated_price',
-                'stock__order_rate',
-                'stock__discount_margin',
-                'stock__orderable_stock',
-                    'stock__store_point__id',
-                    'stock__store_point__alias',
-                    'stock__store_point__name',
-                    'stock__store_point__phone',
-                    'stock__store_point__address',
-                    'stock__store_point__type',
-                    'stock__store_point__populate_global_product',
-                    'stock__store_point__auto_adjustment',
-                    'stock__store_point__created_at',
-                    'stock__store_point__updated_at',
-                    'stock__product__id',
-                    'stock__product__code',
-                    'stock__product__species',
-                    'stock__product__alias',
-                    'stock__product__name',
-                    'stock__product__strength',
-                    'stock__product__full_name',
-                    'stock__product__description',
-                    'stock__product__trading_price',
-                    'stock__product__purchase_price',
-                    'stock__product__status',
-                    'stock__product__is_salesable',
-                    'stock__product__is_service',
-                    'stock__product__is_global',
-                    'stock__product__conversion_factor',
-                    'stock__product__category',
-                    'stock__product__is_printable',
-                    'stock__product__image',
-                    'stock__product__unit_type',
-                    'stock__product__order_limit_per_day',
-                    'stock__product__discount_rate',
-                    'stock__product__is_queueing_item',
-                        'stock__product__manufacturing_company__id',
-                        'stock__product__manufacturing_company__alias',
-                        'stock__product__manufacturing_company__name',
-                        'stock__product__manufacturing_company__description',
-                        'stock__product__manufacturing_company__is_global',
-                        'stock__product__form__id',
-                        'stock__product__form__alias',
-                        'stock__product__form__name',
-                        'stock__product__form__description',
-                        'stock__product__form__is_global',
-                        'stock__product__subgroup__id',
-                        'stock__product__subgroup__alias',
-                        'stock__product__subgroup__name',
-                        'stock__product__subgroup__description',
-                        'stock__product__subgroup__is_global',
-                            'stock__product__subgroup__product_group__id',
-                            'stock__product__subgroup__product_group__alias',
-                            'stock__product__subgroup__product_group__name',
-                            'stock__product__subgroup__product_group__description',
-                            'stock__product__subgroup__product_group__is_global',
-                            'stock__product__subgroup__product_group__type',
-                        'stock__product__generic__id',
-                        'stock__product__generic__alias',
-                        'stock__product__generic__name',
-                        'stock__product__generic__description',
-                        'stock__product__generic__is_global',
-                        'stock__product__category__id',
-                        'stock__product__category__alias',
-                        'stock__product__category__name',
-                        'stock__product__category__description',
-                        'stock__product__category__is_global',
-                        'stock__product__primary_unit__id',
-                        'stock__product__primary_unit__alias',
-                        'stock__product__primary_unit__name',
-                        'stock__product__primary_unit__description',
-                        'stock__product__secondary_unit__id',
-                        'stock__product__secondary_unit__alias',
-                        'stock__product__secondary_unit__name',
-                        'stock__product__secondary_unit__description',
-                        'stock__product__compartment__id',
-                        'stock__product__compartment__alias',
-                        'stock__product__compartment__name',
-                        'stock__product__compartment__priority',
         )
         cart_queryset = Purchase.objects.prefetch_related(
             Prefetch('stock_io_logs', queryset=cart_items),
@@ -346,7 +249,11 @@ class DistributorOrderCartListCreate(ListCreateAPICustomView):
             ).filter(
                 alias=stock_io_alias,
             ).update(status=Status.INACTIVE)
-            update_cart(self.request.user.organization_id, self.request.user.id)
+            update_cart(
+                self.request.user.organization_id,
+                self.request.user.id,
+                pricing_context=PricingContext.for_request(self.request)
+            )
             response = DistributorOrderCartGetSerializer(self.get_queryset().first(), context={'request': self.request})
             return Response(response.data, status=status.HTTP_200_OK)
         except Exception as exception:
@@ -377,7 +284,11 @@ class DistributorOrderCartListCreate(ListCreateAPICustomView):
                 if is_order_disabled:
                     self.request.user.organization.clear_cart()
                     return Response({}, status=status.HTTP_200_OK)
-                update_cart(request.user.organization_id, self.request.user.id)
+                update_cart(
+                    request.user.organization_id,
+                    self.request.user.id,
+                    pricing_context=PricingContext.for_request(request)
+                )
                 response = DistributorOrderCartGetSerializer(self.get_queryset().first(), context={'request': self.request})
                 return Response(response.data, status=status.HTTP_200_OK)
 
@@ -396,7 +307,8 @@ class DistributorOrderCartListCreate(ListCreateAPICustomView):
                 update_cart(
                     request.user.organization_id,
                     self.request.user.id,
-                    stock_io_logs
+                    stock_io_logs,
+                    pricing_context=PricingContext.for_request(request)
                 )
                 # Populate es index
                 # custom_elastic_rebuild('pharmacy.models.Purchase', {'id': cart.id})
@@ -884,7 +796,10 @@ class DistributorOrderDetails(RetrieveUpdateAPIView):
             return queryset
 
         cart_queryset = Purchase.objects.prefetch_related(
-            Prefetch('stock_io_logs', queryset=order_items),
+            Prefetch(
+                'stock_io_logs',
+                queryset=get_catalog_order_items().order_by('stock__product_full_name')
+            ),
             Prefetch('order_status')
         ).select_related(
             'distributor',
@@ -1000,7 +915,8 @@ class DistributorOrderListCreate(ListCreateAPICustomView):
     )
     permission_classes = (CheckAnyPermission, )
     filterset_class = DistributorOrderListFilter
-    pagination_class = CachedCountPageNumberPagination
+    pagination_class = CachedCountKeysetPagination
+    keyset_ordering = ('-pk',)
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -55,6 +55,7 @@ from core.enums import PriceType
 from core.models import PersonOrganization
 from account.models import Transaction, Accounts
 from account.enums import TransactionFor
+from stats.sales_cube import get_sales_cube
 from ..custom_serializer.stock import (
     ProductWiseDistributorOrderDiscountSummarySerializer,
     MismatchedStockWithIOSerializer,
@@ -291,6 +292,10 @@ class DistributorOrderProductSummary(generics.ListAPIView):
         )
         order_count = DistributorOrderProductSummaryFilter(request.GET, order_count).qs
 
+        io_logs = self.get_product_summary_from_sales_cube(current_order_status)
+        if io_logs is not None:
+            return self.get_response(order_count, io_logs)
+
         io_logs = StockIOLog.objects.filter(**filters).order_by()
         io_logs = DistributorOrderProductSummaryIOFilter(request.GET, io_logs).qs
         io_logs = io_logs.values('stock').annotate(
@@ -308,7 +313,48 @@ class DistributorOrderProductSummary(generics.ListAPIView):
             'stock__product__full_name',
             'stock__product__manufacturing_company__name'
         )
+        return self.get_response(order_count, io_logs)
+
+    def get_product_summary_from_sales_cube(self, current_order_status):
+        """Product summary from the daily sales cube, None unless the only filter is
+        a delivery date range covered by the cube"""
+        params = self.request.query_params
+        allowed_params = {
+            'tentative_delivery_date_0',
+            'tentative_delivery_date_1',
+            'current_order_status',
+        }
+        if set(key for key, value in params.items() if value) - allowed_params:
+            return None
+        try:
+            start_date = datetime.strptime(params.get('tentative_delivery_date_0', ''), '%Y-%m-%d').date()
+            end_date = datetime.strptime(params.get('tentative_delivery_date_1', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return None
+        sales_cube = get_sales_cube(start_date, end_date)
+        if sales_cube is None:
+            return None
+        return sales_cube.filter(
+            distributor_id=self.request.user.organization_id,
+            order_status__in=current_order_status,
+        ).order_by().values('stock').annotate(
+            total_quantity=Coalesce(Sum(F('quantity')), 0.00),
+            order_count=Coalesce(Sum(F('line_count')), 0),
+            product_name=F('stock__product__full_name'),
+            company_name=F('stock__product__manufacturing_company__name'),
+            # Secondary unit lines are summed apart, as the order lines query does
+            product_unit_name=Case(
+                When(secondary_unit_flag=True, then=(
+                    F('stock__product__secondary_unit__name'))),
+                default=F('stock__product__primary_unit__name'),
+            ),
+            minimum_stock=F('stock__minimum_stock')
+        ).order_by(
+            'stock__product__full_name',
+            'stock__product__manufacturing_company__name'
+        )
 
+    def get_response(self, order_count, product_summary):
         DATE_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
         _datetime_now = datetime.strptime(
             time.strftime(DATE_TIME_FORMAT, time.localtime()), DATE_TIME_FORMAT)
@@ -317,7 +363,7 @@ class DistributorOrderProductSummary(generics.ListAPIView):
             {
                 "current_date": _datetime_now,
                 "order_count": order_count.count(),
-                "product_summary": io_logs,
+                "product_summary": product_summary,
             }
         )
 
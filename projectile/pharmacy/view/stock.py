@@ -1,7 +1,6 @@
 import os
 
 from datetime import datetime, timedelta, time, timezone as DTTZ
-from django.core.cache import cache
 from django.db.models import Prefetch, Q, Value, BooleanField
 from django.db.models import Sum, F, Count, Case, When, Subquery
 from django.db.models.functions import Coalesce
@@ -33,9 +32,9 @@ from common.utils import (
 )
 from common.enums import Status
 from common.helpers import pk_extractor, to_boolean
+from common.keyword_search import normalize_keyword, search_by_keyword
 from common.healthos_helpers import HealthOSHelper
-from common.healthos_helpers import CustomerHelper
-from common.tasks import bulk_cache_write
+from common.fragment_cache import get_or_build_fragments
 from common.pagination import (
     FasterPageNumberPaginationWithDefaultCount,
     FasterPageNumberPagination,
@@ -55,9 +54,8 @@ from pharmacy.utils import (
     get_sorting_value,
     get_delivery_date_for_product,
     get_organization_order_closing_and_reopening_time,
-    remove_discount_factor_for_coupon,
-    get_product_dynamic_discount_rate
 )
+from pharmacy.pricing import PricingContext
 
 class StockProductBaseView(object):
     available_permission_classes = (
@@ -97,17 +95,7 @@ class StockProductBaseView(object):
             queryset = filter_queryset
 
         elif keyword:
-            keyword = " ".join(keyword.split())
-            keywords = keyword.split(" ")
-            if len(keywords) == 1:
-                queryset = queryset.filter(
-                    product_full_name__contains=keyword.lower()
-                )
-            elif len(keywords) > 1:
-                for each_keyword in keywords:
-                    queryset = queryset.filter(
-                        product_full_name__contains=each_keyword.lower()
-                    )
+            queryset = search_by_keyword(queryset, 'product_full_name', keyword)
         queryset = filter_global_product_based_on_settings(self, queryset)
         return queryset
 
@@ -146,6 +134,8 @@ class StockProductBaseView(object):
         response = []
         order_closing_date, order_reopening_date = get_organization_order_closing_and_reopening_time()
         is_order_enabled = not order_closing_date and not order_reopening_date
+        # Discount factors of the customer, read once for the whole page
+        pricing_context = PricingContext.for_request(request)
         # discount_rate_factor = CustomerHelper(
         #     request.user.organization_id
         # ).get_cumulative_discount_factor()
@@ -163,61 +153,25 @@ class StockProductBaseView(object):
             # finding every items pk
             objects_pk = pk_extractor(page)
 
-            cache_key_list = ["{}_{}".format(base_key, str(
-                item).zfill(12)) for item in objects_pk]
-
-            cached_data = cache.get_many(cache_key_list)
-
-            if len(cached_data) < 20:
-
-                missing_key_data = []
-                for index, item in enumerate(cache_key_list):
-                    if item not in cached_data:
-                        missing_key_data.append(objects_pk[index])
-                if missing_key_data:
-                    missing_data_queryset = \
-                        self.get_serializer().Meta.model().get_queryset_for_cache(
-                            missing_key_data,
-                            request=request,
-                            is_distributor_stock=is_distributor_stock
-                        )
-
-                    new_cached_data = {}
-                    missing_serialized_data = self.get_serializer_class()(
-                        missing_data_queryset,
-                        many=True,
-                        context={'request': request}
-                    )
-                    for missing_item in missing_serialized_data.data:
-                        data = dict(missing_item)
-                        stock_id = data.get("id")
-                        missing_key = f"{base_key}_{str(stock_id).zfill(12)}"
-                        new_cached_data.update({missing_key: missing_item})
-
-                    # for each_missing_item in missing_data_queryset:
-                    #     missing_key = "{}_{}".format(
-                    #         base_key, str(each_missing_item.id).zfill(12))
-                    #     serializer = self.get_serializer_class()(
-                    #         'json',
-                    #         [each_missing_item],
-                    #         many=True,
-                    #         context={'request': request}
-                    #     )
-                    #     serializer.is_valid()
-                    #     new_cached_data.update({missing_key: serializer.data[0]})
-
-                    bulk_cache_write.apply_async(
-                        (new_cached_data,),
-                        countdown=5,
-                        retry=True, retry_policy={
-                            'max_retries': 10,
-                            'interval_start': 0,
-                            'interval_step': 0.2,
-                            'interval_max': 0.2,
-                        }
-                    )
+            model = self.get_serializer().Meta.model
+
+            def serialize_missing(missing_pks):
+                missing_data_queryset = model().get_queryset_for_cache(
+                    missing_pks,
+                    request=request,
+                    is_distributor_stock=is_distributor_stock
+                )
+                missing_serialized_data = self.get_serializer_class()(
+                    missing_data_queryset,
+                    many=True,
+                    context={'request': request}
+                )
+                return {
+                    missing_item["id"]: missing_item
+                    for missing_item in missing_serialized_data.data
+                }
 
-                    cached_data.update(new_cached_data)
+            fragments = get_or_build_fragments(model, base_key, objects_pk, serialize_missing)
             # for index, item in enumerate(objects_pk):
             #     key = "{}_{}".format(base_key, str(item).zfill(12))
             #     # inject log_price based on sales and purchase
@@ -234,68 +188,42 @@ class StockProductBaseView(object):
             #     response.append(cached_data[key])
             # Perform log_price and avg_purchase_rate related operations
             if not is_distributor_stock and sales_able:
-                for index, item in enumerate(objects_pk):
-                    key = "{}_{}".format(base_key, str(item).zfill(12))
+                for fragment in fragments:
                     try:
-                        is_queueing_item = cached_data[key]['product']['is_queueing_item']
+                        is_queueing_item = fragment['product']['is_queueing_item']
                     except:
                         is_queueing_item = True
-                    cached_data[key]['delivery_date'] = get_delivery_date_for_product(
+                    fragment['delivery_date'] = get_delivery_date_for_product(
                         is_queueing_item
                     )
-                    cached_data[key]['is_order_enabled'] = is_order_enabled
-                    log_price = cached_data[key]['log_price']
+                    fragment['is_order_enabled'] = is_order_enabled
+                    log_price = fragment['log_price']
                     # Inject log_price for sales
-                    cached_data[key]['log_price'] = cached_data[key].get(
+                    fragment['log_price'] = fragment.get(
                         'sales_log_price', log_price)
 
-                    cached_data[key]["product"]['discount_rate_factor'] = remove_discount_factor_for_coupon(
-                        request = request,
-                        data = cached_data[key]
-                    )
-                    cached_data[key]["product"]["dynamic_discount_rate"] = get_product_dynamic_discount_rate(
-                        user_org_id=request.user.organization_id,
-                        stock_id=cached_data[key]["id"],
-                        trading_price=cached_data[key]["product"]["trading_price"],
-                        discount_rate=cached_data[key]["product"]["discount_rate"]
-                    )
-                    cached_data[key]["product"]["dynamic_discount_factors"] = CustomerHelper(
-                        organization_id=request.user.organization_id
-                    ).get_organization_and_area_discount()
+                    pricing_context.decorate_products([fragment])
 
-                    response.append(cached_data[key])
+                    response.append(fragment)
             elif not is_distributor_stock and not sales_able:
-                for index, item in enumerate(objects_pk):
-                    key = "{}_{}".format(base_key, str(item).zfill(12))
+                for fragment in fragments:
                     try:
-                        is_queueing_item = cached_data[key]['product']['is_queueing_item']
+                        is_queueing_item = fragment['product']['is_queueing_item']
                     except:
                         is_queueing_item = True
 
-                    cached_data[key]['delivery_date'] = get_delivery_date_for_product(
+                    fragment['delivery_date'] = get_delivery_date_for_product(
                         is_queueing_item
                     )
-                    cached_data[key]['is_order_enabled'] = is_order_enabled
-                    log_price = cached_data[key]['log_price']
+                    fragment['is_order_enabled'] = is_order_enabled
+                    log_price = fragment['log_price']
                     # Inject log_price for Purchase / Order
-                    cached_data[key]['log_price'] = cached_data[key].get(
+                    fragment['log_price'] = fragment.get(
                         'purchase_log_price', log_price)
 
-                    cached_data[key]["product"]['discount_rate_factor'] = remove_discount_factor_for_coupon(
-                        request = request,
-                        data = cached_data[key]
-                    )
-                    cached_data[key]["product"]["dynamic_discount_rate"] = get_product_dynamic_discount_rate(
-                        user_org_id=request.user.organization_id,
-                        stock_id=cached_data[key]["id"],
-                        trading_price=cached_data[key]["product"]["trading_price"],
-                        discount_rate=cached_data[key]["product"]["discount_rate"]
-                    )
-                    cached_data[key]["product"]["dynamic_discount_factors"] = CustomerHelper(
-                        organization_id=request.user.organization_id
-                    ).get_organization_and_area_discount()
+                    pricing_context.decorate_products([fragment])
 
-                    response.append(cached_data[key])
+                    response.append(fragment)
             # elif is_distributor_stock and not request.user.is_superuser:
             #     for index, item in enumerate(objects_pk):
             #         key = "{}_{}".format(base_key, str(item).zfill(12))
@@ -303,32 +231,19 @@ class StockProductBaseView(object):
             #         cached_data[key].pop('avg_purchase_rate_days', '')
             #         response.append(cached_data[key])
             else:
-                for index, item in enumerate(objects_pk):
-                    key = "{}_{}".format(base_key, str(item).zfill(12))
+                for fragment in fragments:
                     try:
-                        is_queueing_item = cached_data[key]['product']['is_queueing_item']
+                        is_queueing_item = fragment['product']['is_queueing_item']
                     except:
                         is_queueing_item = True
-                    cached_data[key]['delivery_date'] = get_delivery_date_for_product(
+                    fragment['delivery_date'] = get_delivery_date_for_product(
                         is_queueing_item
                     )
-                    cached_data[key]['is_order_enabled'] = is_order_enabled
+                    fragment['is_order_enabled'] = is_order_enabled
 
-                    cached_data[key]["product"]['discount_rate_factor'] = remove_discount_factor_for_coupon(
-                        request = request,
-                        data = cached_data[key]
-                    )
-                    cached_data[key]["product"]["dynamic_discount_rate"] = get_product_dynamic_discount_rate(
-                        user_org_id=request.user.organization_id,
-                        stock_id=cached_data[key]["id"],
-                        trading_price=cached_data[key]["product"]["trading_price"],
-                        discount_rate=cached_data[key]["product"]["discount_rate"]
-                    )
-                    cached_data[key]["product"]["dynamic_discount_factors"] = CustomerHelper(
-                        organization_id=request.user.organization_id
-                    ).get_organization_and_area_discount()
+                    pricing_context.decorate_products([fragment])
 
-                    response.append(cached_data[key])
+                    response.append(fragment)
 
         return self.get_paginated_response(response)
 
@@ -748,25 +663,17 @@ class DistributorSalesAbleStockProductList(ListAPICustomView, StockProductBaseVi
             )
 
         if keyword:
-            keyword = " ".join(keyword.split())
-            keywords = keyword.split(" ")
-            # with product_full_name it can be product__manufacturing_company__name too
-            filters = Q(
-                product__full_name__icontains=keyword.lower()
-            ) | Q(
-                product__generic__name__icontains=keyword.lower()
-            ) | Q(
-                product__manufacturing_company__name__icontains=keyword.lower()
-            )
-            if len(keywords) == 1:
-                queryset = queryset.filter(
-                    filters
+            keyword = normalize_keyword(keyword)
+            # The product name is matched on the normalized stock column served by its trigram index
+            queryset = queryset.filter(
+                Q(
+                    product_full_name__contains=keyword
+                ) | Q(
+                    product__generic__name__icontains=keyword
+                ) | Q(
+                    product__manufacturing_company__name__icontains=keyword
                 )
-            elif len(keywords) > 1:
-                for each_keyword in keywords:
-                    queryset = queryset.filter(
-                        filters
-                    )
+            )
         elif starts_with:
             queryset = queryset.filter(product_full_name__startswith=starts_with.lower())
 
@@ -896,30 +803,13 @@ class DistributorSalesAbleStockProductListV2(ListAPICustomView, StockProductBase
             )
 
         if keyword:
-            keyword = " ".join(keyword.split())
-            keywords = keyword.split(" ")
-            # with product_full_name it can be product__manufacturing_company__name too
-            filters = Q(
-                product__full_name__icontains=keyword.lower()
-            ) | Q(
-                product__generic__name__icontains=keyword.lower()
-            ) | Q(
-                product__manufacturing_company__name__icontains=keyword.lower()
-            )
-            if len(keywords) == 1:
+            # The product name is matched on the normalized stock column served by its trigram index
+            for each_keyword in normalize_keyword(keyword).split(" "):
                 queryset = queryset.filter(
-                    filters
+                    Q(product_full_name__contains=each_keyword) |
+                    Q(product__generic__name__icontains=each_keyword) |
+                    Q(product__manufacturing_company__name__icontains=each_keyword)
                 )
-            elif len(keywords) > 1:
-                for each_keyword in keywords:
-                    # queryset = queryset.filter(
-                    #     filters
-                    # )
-                    queryset = queryset.filter(
-                        Q(product__full_name__icontains=each_keyword.lower()) |
-                        Q(product__generic__name__icontains=each_keyword.lower()) |
-                        Q(product__manufacturing_company__name__icontains=each_keyword.lower())
-                    )
         elif starts_with:
             queryset = queryset.filter(product_full_name__startswith=starts_with.lower())
 
@@ -1174,19 +1064,7 @@ class DistributorStockDetails(RetrieveAPIView):
         serializer = self.get_serializer(instance)
         data = serializer.data
         # if stock is coupon then discount rate factor is 0.00
-        data["product"]["discount_rate_factor"] = remove_discount_factor_for_coupon(
-            request = request,
-            data = data
-        )
-        data["product"]["dynamic_discount_rate"]= get_product_dynamic_discount_rate(
-            user_org_id=request.user.organization_id,
-            stock_id=data["id"],
-            trading_price=data["product"]["trading_price"],
-            discount_rate=data["product"]["discount_rate"]
-        )
-        data["product"]["dynamic_discount_factors"] = CustomerHelper(
-            organization_id=request.user.organization_id
-        ).get_organization_and_area_discount()
+        PricingContext.for_request(request).decorate_products([data])
         return Response(data)
 
 
@@ -40,7 +40,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import APIException
 
-from common.pagination import CachedCountPageNumberPagination
+from common.pagination import CachedCountPageNumberPagination, KeysetPagination
 from common import helpers
 from common.utils import (
     create_cache_key_name,
@@ -1960,6 +1960,8 @@ class PurchaseList(ListCreateAPICustomView):
 
     available_permission_classes = ()
     filterset_class = PurchaseListFilter
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-pk',)
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -4,6 +4,7 @@ from common.enums import Status
 from common.tasks import send_message_to_slack_or_mattermost_channel_lazy
 from pharmacy.enums import StockIOType, PurchaseOrderStatus
 from pharmacy.models import Purchase, StockIOLog, PurchaseRequisition
+from pharmacy.stock_ledger import bulk_create_stock_io_logs
 
 
 def send_procure_alert_to_slack(message):
@@ -41,6 +42,7 @@ def create_requisition_for_procure_group(
     }
     requisition_instance = Purchase.objects.create(**data)
 
+    io_logs = []
     for item in procure_items:
         io_item = {
             "date": _datetime_now.date(),
@@ -58,7 +60,8 @@ def create_requisition_for_procure_group(
             "purchase": requisition_instance,
             "rate": float(item.get('rate')),
         }
-        StockIOLog.objects.create(**io_item)
+        io_logs.append(StockIOLog(**io_item))
+    bulk_create_stock_io_logs(io_logs)
 
     return requisition_instance
 
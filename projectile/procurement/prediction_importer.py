@@ -0,0 +1,354 @@
+"""Bulk importer of the purchase prediction files
+
+A PURCHASE_PREDICTION `ScriptFileStorage` workbook is read once into a `PredictionSheet`,
+its columns as lists of numbers (None for a blank or invalid cell) or texts. The stocks,
+assigned employees and suppliers of all the rows are then found with a few bulk lookups
+and the `PredictionItem` / `PredictionItemSupplier` rows are created with `bulk_create`
+in batches of `PREDICTION_IMPORT_BATCH_SIZE` rows.
+
+A row which can't be imported (no or unknown stock, invalid value) is reported in the
+`PredictionImportResult` with its row number and the reason, the other rows are imported.
+A row already imported into the prediction (same index) is skipped, so an import can be
+run again for the same file.
+"""
+import logging
+import math
+import re
+import time
+from datetime import date
+
+import pandas as pd
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from common.enums import Status
+
+from .enums import RecommendationPriority
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_IMPORT_BATCH_SIZE = 500
+
+PREDICTION_FILE_COLUMNS = [
+    'ID', 'MRP', 'SP', 'AVG', 'L_RATE', 'H_RATE', 'KIND', 'STATUS', 'OSTOCK', 'SELL', 'PUR',
+    'SHORT', 'RET', 'NSTOCK', 'PRED', 'NORDER', 'D3',
+    'SUPPLIER_S1', 'QTY_S1', 'RATE_S1',
+    'SUPPLIER_S2', 'QTY_S2', 'RATE_S2',
+    'SUPPLIER_S3', 'QTY_S3', 'RATE_S3',
+]
+# Read as texts, every other column is read as numbers
+TEXT_COLUMNS = ('STATUS', 'TEAM', 'KIND')
+# Prediction item field to the column of its value, 0 when blank
+NUMERIC_FIELDS = {
+    'mrp': 'MRP',
+    'sale_price': 'SP',
+    'avg_purchase_rate': 'AVG',
+    'lowest_purchase_rate': 'L_RATE',
+    'highest_purchase_rate': 'H_RATE',
+    'sold_quantity': 'SELL',
+    'purchase_quantity': 'PUR',
+    'short_quantity': 'SHORT',
+    'return_quantity': 'RET',
+    'new_stock': 'NSTOCK',
+    'prediction': 'PRED',
+    'new_order': 'NORDER',
+    'suggested_purchase_quantity': 'D3',
+    'suggested_min_purchase_quantity': 'D1',
+    'real_avg': 'RAVG',
+    'sale_avg_3d': '3D',
+    'worst_rate': 'WRATE',
+}
+# Prediction item field to the column of its text and the field length
+TEXT_FIELDS = {
+    'product_visibility_in_catelog': ('STATUS', 24),
+    'team': ('TEAM', 24),
+}
+SUPPLIER_COLUMN_PATTERN = re.compile(r"^SUPPLIER_S(\d+)$")
+
+
+class PredictionSheet:
+    """Columns of a prediction file, parsed once"""
+
+    def __init__(self, length, numbers, texts):
+        self.length = length
+        self.numbers = numbers
+        self.texts = texts
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def columns(self):
+        return set(self.numbers) | set(self.texts)
+
+    def get_missing_columns(self):
+        return sorted(set(PREDICTION_FILE_COLUMNS) - self.columns)
+
+    def get_supplier_slots(self):
+        """
+        Supplier columns of the file, a `SUPPLIER_S<n>` column with its `QTY_S<n>` and `RATE_S<n>`
+
+        Returns:
+            list: (supplier column, quantity column, rate column, priority) tuples
+        """
+        slots = []
+        for column in sorted(self.numbers):
+            match = SUPPLIER_COLUMN_PATTERN.match(column)
+            if match:
+                slot = int(match.group(1))
+                priority = slot if slot <= RecommendationPriority.LOW else RecommendationPriority.OTHER
+                slots.append((column, f"QTY_S{slot}", f"RATE_S{slot}", priority))
+        return slots
+
+    def get_number(self, column, row, default=0):
+        values = self.numbers.get(column)
+        if values is None or values[row] is None:
+            return default
+        return values[row]
+
+    def get_id(self, column, row):
+        value = self.get_number(column, row, None)
+        if value is None or not float(value).is_integer():
+            return None
+        return int(value)
+
+    def get_text(self, column, row):
+        values = self.texts.get(column)
+        return None if values is None else values[row]
+
+
+def parse_prediction_file(content):
+    """
+    Read the columns of a prediction workbook
+
+    Args:
+        content (File): the excel file
+
+    Returns:
+        PredictionSheet: the columns of the file
+    """
+    data_frame = pd.read_excel(content)
+    numbers = {}
+    texts = {}
+    for column in data_frame.columns:
+        name = str(column).strip()
+        if name in TEXT_COLUMNS:
+            texts[name] = [
+                None if pd.isna(value) else str(value).strip()
+                for value in data_frame[column].tolist()
+            ]
+        else:
+            values = pd.to_numeric(data_frame[column], errors='coerce').tolist()
+            numbers[name] = [value if math.isfinite(value) else None for value in values]
+    return PredictionSheet(len(data_frame), numbers, texts)
+
+
+class PredictionImportResult:
+
+    def __init__(self, file_id):
+        self.file_id = file_id
+        self.items = 0
+        self.suppliers = 0
+        self.skipped = 0
+        self.errors = []
+        self.elapsed = 0
+
+    def add_error(self, row, message):
+        self.errors.append((row, message))
+
+    def __str__(self):
+        return (
+            f"file {self.file_id}: {self.items} items and {self.suppliers} suppliers in "
+            f"{self.elapsed:.2f} s, {self.skipped} rows already imported, {len(self.errors)} errors"
+        )
+
+    def get_error_report(self, limit=20):
+        lines = [
+            f"Row {row}: {message}" if row is not None else message
+            for row, message in self.errors[:limit]
+        ]
+        if len(self.errors) > limit:
+            lines.append(f"... and {len(self.errors) - limit} more")
+        return "\n".join(lines)
+
+
+def get_stocks(stock_ids):
+    from pharmacy.models import Stock
+
+    return Stock.objects.select_related(
+        'product__form',
+        'product__manufacturing_company',
+    ).only(
+        'id',
+        'product__name',
+        'product__strength',
+        'product__form_id',
+        'product__form__name',
+        'product__manufacturing_company__name',
+    ).in_bulk(stock_ids)
+
+
+def get_existing_person_organization_ids(person_organization_ids):
+    from core.models import PersonOrganization
+
+    return set(PersonOrganization.objects.filter(
+        pk__in=person_organization_ids
+    ).values_list('pk', flat=True))
+
+
+def get_prediction_item(sheet, row, stock, purchase_prediction, stock_file, assign_to_id):
+    from common import models as common_models
+    from pharmacy.helpers import get_product_short_name
+    from procurement.models import PredictionItem
+
+    data = {
+        field: sheet.get_number(column, row)
+        for field, column in NUMERIC_FIELDS.items()
+    }
+    for field, (column, max_length) in TEXT_FIELDS.items():
+        text = sheet.get_text(column, row)
+        if text is not None and len(text) > max_length:
+            raise ValueError(f"{column} `{text}` is longer than {max_length} characters")
+        data[field] = text
+    avg_purchase_rate = data['avg_purchase_rate']
+    data['margin'] = 0 if not avg_purchase_rate else (
+        (data['sale_price'] - avg_purchase_rate) * 100 / avg_purchase_rate
+    )
+    return PredictionItem(
+        date=date.today(),
+        stock_id=stock.id,
+        purchase_prediction=purchase_prediction,
+        organization_id=purchase_prediction.organization_id,
+        entry_by_id=stock_file.entry_by_id,
+        product_name=get_product_short_name(stock.product),
+        company_name=stock.product.manufacturing_company.name,
+        assign_to_id=assign_to_id,
+        has_min_purchase_quantity=data['suggested_min_purchase_quantity'] > 0,
+        index=row,
+        # Set by `CreatedAtUpdatedAtBaseModel.save`, which bulk create skips
+        user_ip=common_models.USER_IP_ADDRESS,
+        **data
+    )
+
+
+def create_prediction_items(items, item_suppliers, batch_size):
+    """Create a batch of items and their suppliers, `item_suppliers` are in the order of the items"""
+    from procurement.models import PredictionItem, PredictionItemSupplier
+
+    with transaction.atomic():
+        PredictionItem.objects.bulk_create(items, batch_size=batch_size)
+        suppliers = []
+        for item, item_supplier_list in zip(items, item_suppliers):
+            for supplier in item_supplier_list:
+                supplier.prediction_item_id = item.id
+                suppliers.append(supplier)
+        PredictionItemSupplier.objects.bulk_create(suppliers, batch_size=batch_size)
+    return len(suppliers)
+
+
+def import_purchase_prediction_file(
+        stock_file,
+        organization_id,
+        lower_limit=None,
+        upper_limit=None,
+        batch_size=PREDICTION_IMPORT_BATCH_SIZE):
+    """
+    Create the prediction items of a prediction file
+
+    Args:
+        stock_file (ScriptFileStorage): a PURCHASE_PREDICTION file
+        organization_id (int): distributor organization of the prediction
+        lower_limit (int, optional): first row to import
+        upper_limit (int, optional): row to stop before
+        batch_size (int): rows created per batch
+
+    Returns:
+        PredictionImportResult: number of rows created and the rows which could not be imported
+    """
+    from common import models as common_models
+    from procurement.models import PredictionItem, PredictionItemSupplier, PurchasePrediction
+
+    result = PredictionImportResult(stock_file.pk)
+    started_at = time.perf_counter()
+    sheet = parse_prediction_file(stock_file.content)
+    missing_columns = sheet.get_missing_columns()
+    if missing_columns:
+        result.add_error(None, f"The file must have columns: {', '.join(missing_columns)}")
+        return result
+
+    purchase_prediction, _ = PurchasePrediction.objects.get_or_create(
+        defaults={'date': timezone.now(), 'is_locked': False},
+        prediction_file_id=stock_file.pk,
+        organization_id=organization_id,
+        entry_by_id=stock_file.entry_by_id,
+        label=stock_file.purpose,
+    )
+    rows = range(len(sheet))[lower_limit:upper_limit]
+    supplier_slots = sheet.get_supplier_slots()
+    imported_rows = set(PredictionItem.objects.filter(
+        status=Status.ACTIVE,
+        purchase_prediction=purchase_prediction,
+        index__in=list(rows),
+    ).values_list('index', flat=True))
+    stocks = get_stocks({sheet.get_id('ID', row) for row in rows} - {None})
+    person_organization_ids = get_existing_person_organization_ids({
+        sheet.get_id(column, row)
+        for row in rows
+        for column in ['EMP_ID'] + [slot[0] for slot in supplier_slots]
+    } - {None})
+
+    for batch_start in range(0, len(rows), batch_size):
+        batch_rows = rows[batch_start:batch_start + batch_size]
+        items = []
+        item_suppliers = []
+        for row in batch_rows:
+            if row in imported_rows:
+                result.skipped += 1
+                continue
+            stock_id = sheet.get_id('ID', row)
+            stock = stocks.get(stock_id)
+            if stock is None:
+                result.add_error(row, f"Stock `{sheet.get_number('ID', row, '')}` does not exist")
+                continue
+            assign_to_id = sheet.get_id('EMP_ID', row)
+            if assign_to_id is not None and assign_to_id not in person_organization_ids:
+                result.add_error(row, f"Employee {assign_to_id} does not exist, the item is not assigned")
+                assign_to_id = None
+            try:
+                item = get_prediction_item(sheet, row, stock, purchase_prediction, stock_file, assign_to_id)
+            except ValueError as exception:
+                result.add_error(row, str(exception))
+                continue
+            suppliers = []
+            for supplier_column, quantity_column, rate_column, priority in supplier_slots:
+                supplier_id = sheet.get_id(supplier_column, row)
+                if supplier_id is None:
+                    continue
+                if supplier_id not in person_organization_ids:
+                    result.add_error(row, f"Supplier {supplier_id} of {supplier_column} does not exist")
+                    continue
+                suppliers.append(PredictionItemSupplier(
+                    organization_id=organization_id,
+                    entry_by_id=stock_file.entry_by_id,
+                    supplier_id=supplier_id,
+                    rate=sheet.get_number(rate_column, row),
+                    quantity=sheet.get_number(quantity_column, row),
+                    priority=priority,
+                    user_ip=common_models.USER_IP_ADDRESS,
+                ))
+            items.append(item)
+            item_suppliers.append(suppliers)
+        if not items:
+            continue
+        try:
+            result.suppliers += create_prediction_items(items, item_suppliers, batch_size)
+            result.items += len(items)
+        except DatabaseError as exception:
+            result.add_error(
+                None,
+                f"Rows {batch_rows.start} to {batch_rows.stop - 1} not imported: {exception}"
+            )
+    result.elapsed = time.perf_counter() - started_at
+    logger.info(f"Imported purchase prediction {result}")
+    return result
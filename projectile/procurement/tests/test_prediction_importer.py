@@ -0,0 +1,86 @@
+import io
+
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+
+from core.tests import PersonOrganizationFactory, ScriptFileStorageFactory
+from pharmacy.tests import StockFactory
+from procurement.enums import RecommendationPriority
+from procurement.models import PredictionItem, PredictionItemSupplier
+from procurement.prediction_importer import (
+    PREDICTION_FILE_COLUMNS,
+    import_purchase_prediction_file,
+    parse_prediction_file,
+)
+
+
+def get_prediction_workbook(rows):
+    data_frame = pd.DataFrame(
+        [{column: row.get(column) for column in PREDICTION_FILE_COLUMNS + ['EMP_ID', 'D1']} for row in rows]
+    )
+    content = io.BytesIO()
+    data_frame.to_excel(content, index=False)
+    return content.getvalue()
+
+
+class PredictionSheetTest(SimpleTestCase):
+
+    def test_parse_columns(self):
+        sheet = parse_prediction_file(io.BytesIO(get_prediction_workbook([
+            {'ID': 7, 'MRP': '12.5', 'STATUS': 'VISIBLE', 'SUPPLIER_S1': 3},
+            {'ID': 'x', 'MRP': None},
+        ])))
+
+        self.assertEqual(len(sheet), 2)
+        self.assertEqual(sheet.get_missing_columns(), [])
+        self.assertEqual(sheet.get_id('ID', 0), 7)
+        self.assertIsNone(sheet.get_id('ID', 1))
+        self.assertEqual(sheet.get_number('MRP', 0), 12.5)
+        self.assertEqual(sheet.get_number('MRP', 1), 0)
+        self.assertEqual(sheet.get_number('WRATE', 0), 0)
+        self.assertEqual(sheet.get_text('STATUS', 0), 'VISIBLE')
+        self.assertIsNone(sheet.get_text('STATUS', 1))
+        self.assertEqual(
+            [slot[3] for slot in sheet.get_supplier_slots()],
+            [RecommendationPriority.HIGH, RecommendationPriority.MEDIUM, RecommendationPriority.LOW]
+        )
+
+
+class PredictionImporterTest(TestCase):
+
+    def test_import_reports_row_errors(self):
+        stock = StockFactory()
+        supplier = PersonOrganizationFactory()
+        employee = PersonOrganizationFactory()
+        stock_file = ScriptFileStorageFactory(
+            content__data=get_prediction_workbook([
+                {
+                    'ID': stock.id, 'MRP': 20, 'SP': 18, 'AVG': 15, 'D1': 2, 'EMP_ID': employee.id,
+                    'SUPPLIER_S1': supplier.id, 'QTY_S1': 10, 'RATE_S1': 14,
+                    'SUPPLIER_S2': supplier.id + 1000, 'QTY_S2': 5, 'RATE_S2': 13,
+                },
+                {'ID': stock.id + 1000},
+                {'ID': None},
+                {'ID': stock.id, 'STATUS': 'X' * 30},
+            ]),
+            content__filename='prediction.xlsx',
+        )
+
+        result = import_purchase_prediction_file(stock_file, stock.organization_id)
+
+        self.assertEqual(result.items, 1)
+        self.assertEqual(result.suppliers, 1)
+        self.assertEqual([row for row, _ in result.errors], [0, 1, 2, 3])
+        item = PredictionItem.objects.get(index=0)
+        self.assertEqual(item.assign_to_id, employee.id)
+        self.assertEqual(float(item.margin), 20)
+        self.assertTrue(item.has_min_purchase_quantity)
+        item_supplier = PredictionItemSupplier.objects.get(prediction_item=item)
+        self.assertEqual(item_supplier.supplier_id, supplier.id)
+        self.assertEqual(item_supplier.priority, RecommendationPriority.HIGH)
+
+        # Imported rows are skipped by a second run
+        result = import_purchase_prediction_file(stock_file, stock.organization_id)
+        self.assertEqual(result.items, 0)
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(PredictionItem.objects.count(), 1)
@@ -0,0 +1,8 @@
+def check(request):
+    """
+    :param request: HttpRequest object
+    :return: dict, hit ratio and bytes of the list fragment caches of the serving worker
+    """
+    from common.fragment_cache import get_fragment_cache_stats
+
+    return get_fragment_cache_stats()
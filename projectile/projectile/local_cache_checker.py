@@ -0,0 +1,8 @@
+def check(request):
+    """
+    :param request: HttpRequest object
+    :return: dict, hit / miss counters of the local (L1) caches of the serving worker
+    """
+    from common.local_cache import get_local_cache_stats
+
+    return get_local_cache_stats()
@@ -14,6 +14,7 @@ import datetime
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 import os
 import sys
+import tempfile
 # Parse database configuration from environment variable DATABASE_URL
 import dj_database_url
 from corsheaders.defaults import default_headers
@@ -182,7 +183,7 @@ MIDDLEWARE = (
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     # 'reversion.middleware.RevisionMiddleware',
-    # 'core.middleware.LogSQLMiddleware',
+    'core.middleware.SQLProfilerMiddleware',
     'core.middleware.RequestInformationMiddleware',
     'common.middleware.CustomElasticController',
     'common.middleware.SerialCacheExpire',
@@ -457,6 +458,15 @@ CACHES = {
 if TEST_MODE:
     CACHES["default"]["KEY_PREFIX"] = os.environ.get("USER", "test")
 
+# Per process cache in front of redis for hot singletons, see common.local_cache
+LOCAL_CACHE_ENABLED = str(os.environ.get("LOCAL_CACHE_ENABLED", not TEST_MODE)).upper() == "TRUE"
+# Most keys expired by one cache_expire_list task, see common.cache_invalidation
+CACHE_INVALIDATION_TASK_MAX_KEYS = int(os.environ.get("CACHE_INVALIDATION_TASK_MAX_KEYS", 5000))
+# Lifetime of the serialized list items, see common.fragment_cache
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get("FRAGMENT_CACHE_TIMEOUT", CACHES["default"]["TIMEOUT"]))
+# Lifetime of the stock display projections, see pharmacy.catalog
+STOCK_CATALOG_CACHE_TIMEOUT = int(os.environ.get("STOCK_CATALOG_CACHE_TIMEOUT", CACHES["default"]["TIMEOUT"]))
+
 
 # EMAIL SETTINGS
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -507,6 +517,17 @@ SILKY_PYTHON_PROFILER_RESULT_PATH = MEDIA_DIR
 # INFOBIP SMS GATEWAY SETTINGS
 INFOBIP_API_KEY = os.environ.get('INFOBIP_API_KEY', '')
 
+# PUSH NOTIFICATION PROVIDER SETTINGS
+EXPO_PUSH_API_URL = os.environ.get('EXPO_PUSH_API_URL', 'https://exp.host/--/api/v2/push/send')
+ONESIGNAL_API_URL = os.environ.get('ONESIGNAL_API_URL', 'https://onesignal.com/api/v1/notifications')
+# Number of provider batches sent at the same time by a push notification fan out
+PUSH_NOTIFICATION_CONCURRENCY = int(os.environ.get('PUSH_NOTIFICATION_CONCURRENCY', 8))
+
+# Number of processes rendering the invoice PDFs of a delivery batch
+INVOICE_PDF_RENDER_PROCESSES = int(
+    os.environ.get('INVOICE_PDF_RENDER_PROCESSES', min(4, os.cpu_count() or 1))
+)
+
 # CRONJOBS ARE WRITTEN HERE (NOT CELERY BEAT)
 CRONJOBS = [
     (
@@ -530,6 +551,8 @@ HEARTBEAT = {
         'projectile.elasticsearch_checker',
         'projectile.celery_checker',
         'projectile.redis_checker',
+        'projectile.local_cache_checker',
+        'projectile.fragment_cache_checker',
     ],
     'auth': {
         'username': 'omis',
@@ -643,6 +666,41 @@ ELASTICSEARCH_DSL_PARALLEL_CACHE_PREFIX = "elastic_search_record"
 # ELASTICSEARCH_DSL_AUTO_REFRESH = False
 # ELASTICSEARCH_DSL_AUTOSYNC = False
 
+# Stock es documents are updated from a queue of changed stocks, see search.stock_indexer
+# The queue is drained by the `drain_stock_document_queue` command, only enable the indexer
+# where bin/drain_stock_document_queue.sh runs from cron
+STOCK_DOCUMENT_INDEXER_ENABLED = str(
+    os.environ.get("STOCK_DOCUMENT_INDEXER_ENABLED", False)
+).upper() == "TRUE"
+# Seconds between two drains of the queue, the staleness bound of the stock documents
+STOCK_DOCUMENT_INDEXER_INTERVAL = int(os.environ.get("STOCK_DOCUMENT_INDEXER_INTERVAL", 5))
+STOCK_DOCUMENT_INDEXER_BATCH_SIZE = int(os.environ.get("STOCK_DOCUMENT_INDEXER_BATCH_SIZE", 1000))
+# Log a warning when a stock waited longer than this in the queue
+STOCK_DOCUMENT_INDEXER_MAX_STALENESS = int(os.environ.get("STOCK_DOCUMENT_INDEXER_MAX_STALENESS", 30))
+
+# Delivery dates rolled up into the sales cube by the daily refresh, see stats.sales_cube
+# (`stats_refresh_sales_cube --recent`, run from cron by bin/stats_refresh_sales_cube.sh)
+SALES_CUBE_REFRESH_PAST_DAYS = int(os.environ.get("SALES_CUBE_REFRESH_PAST_DAYS", 7))
+SALES_CUBE_REFRESH_FUTURE_DAYS = int(os.environ.get("SALES_CUBE_REFRESH_FUTURE_DAYS", 3))
+
+# Per view SQL query counts, see core.sql_profiler. Off until the overhead measured by
+# `benchmark_sql_profiler` on production data is known, enable it with a small sample rate
+SQL_PROFILER_ENABLED = str(
+    os.environ.get("SQL_PROFILER_ENABLED", False)
+).upper() == "TRUE"
+# Share of the requests profiled
+SQL_PROFILER_SAMPLE_RATE = float(os.environ.get("SQL_PROFILER_SAMPLE_RATE", 0.05))
+# Seconds between two flushes of the profiles of a process to redis
+SQL_PROFILER_FLUSH_INTERVAL = int(os.environ.get("SQL_PROFILER_FLUSH_INTERVAL", 30))
+
+# Seconds a dropped pharmacy list is cached for, see notebookapi.notebooks.pharmacies
+DROPPED_PHARMACIES_CACHE_TIMEOUT = int(os.environ.get("DROPPED_PHARMACIES_CACHE_TIMEOUT", 10 * 60))
+
+# Parsed distributor stock files, see pharmacy.stock_snapshot
+STOCK_SNAPSHOT_DIR = os.environ.get(
+    "STOCK_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "stock_snapshots")
+)
+
 # Spectacular settings
 SPECTACULAR_SETTINGS = {
     "TITLE": "E-Commerce API",
@@ -28,6 +28,15 @@ DEFAULTS = {
     "DISALLOWED_PARAMS": ("format",),
     # Perform a SSL Cert Verification on URI requests are being proxied to
     "VERIFY_SSL": True,
+    # Keep-alive connections kept per upstream host and the number of hosts pooled
+    "POOL_MAXSIZE": 20,
+    "POOL_CONNECTIONS": 10,
+    # Size of the upstream body chunks streamed to the client
+    "STREAM_CHUNK_SIZE": 64 * 1024,
+    # Bytes of a json body searched for the pagination links to rewrite
+    "LINK_REWRITE_MAX_HEAD": 64 * 1024,
+    # Seconds a token refresh may hold the refresh lock and a request may wait for it
+    "TOKEN_REFRESH_LOCK_TIMEOUT": 30,
 }
 
 
@@ -1,7 +1,9 @@
 from django.core.cache import cache
+from redis.exceptions import LockError
 
 REPORTER_PROXY_ACCESS_TOKEN_KEY = "reporter_proxy_access_token"
 REPORTER_PROXY_REFRESH_TOKEN_KEY = "reporter_proxy_refresh_token"
+REPORTER_PROXY_TOKEN_REFRESH_LOCK_KEY = "reporter_proxy_token_refresh_lock"
 
 
 def set_token(access_token, refresh_token=""):
@@ -16,3 +18,32 @@ def get_access_token():
 
 def get_refresh_token():
     return cache.get(REPORTER_PROXY_REFRESH_TOKEN_KEY)
+
+
+def refresh_token_once(stale_access_token, refresh, timeout):
+    """
+    Refresh the tokens unless another request already replaced the stale access token,
+    concurrent requests finding the same expired token refresh it once
+
+    Args:
+        stale_access_token (str): access token rejected by the upstream
+        refresh (callable): refreshes and stores the tokens
+        timeout (int): seconds the lock is held for and waited for
+
+    Returns:
+        bool: True when this request refreshed the tokens
+    """
+    refreshed = False
+    try:
+        with cache.lock(
+            REPORTER_PROXY_TOKEN_REFRESH_LOCK_KEY,
+            timeout=timeout,
+            blocking_timeout=timeout,
+        ):
+            if get_access_token() == stale_access_token:
+                refresh()
+                refreshed = True
+    except LockError:
+        # Waited too long for another refresh, or the lock expired during this one
+        pass
+    return refreshed
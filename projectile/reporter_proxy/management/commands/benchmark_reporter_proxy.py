@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from reporter_proxy.session import get_proxy_session
+from reporter_proxy.streaming import iter_upstream_body, rewrite_pagination_links
+
+CHUNK_SIZE = 64 * 1024
+
+
+def rewrite_url(url):
+    return f"http://proxy/?{url.split('?', 1)[1]}" if url else None
+
+
+def legacy_proxy_body(url):
+    """The buffered fetch, parse and render previously done by `ReporterProxyView`, kept for comparison"""
+    response = requests.request("GET", url)
+    body = json.loads(response.content)
+    body["next"] = rewrite_url(body.get("next"))
+    body["previous"] = rewrite_url(body.get("previous"))
+    return len(json.dumps(body).encode("utf-8"))
+
+
+def streaming_proxy_body(url):
+    response = get_proxy_session().request("GET", url, stream=True)
+    size = 0
+    for chunk in rewrite_pagination_links(
+        iter_upstream_body(response, CHUNK_SIZE), rewrite_url, CHUNK_SIZE
+    ):
+        size += len(chunk)
+    return size
+
+
+def create_stub_handler(size):
+    row = json.dumps({"id": 1, "name": "x" * 100}).encode("utf-8")
+    rows_per_chunk = max(CHUNK_SIZE // (len(row) + 1), 1)
+    rows_chunk = b",".join([row] * rows_per_chunk)
+    head = b'{"count": 1, "next": "http://upstream/api/v1/report?page=2", "previous": null, "results": ['
+
+    class StubUpstreamHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            chunks = max(size // len(rows_chunk), 1)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header(
+                "Content-Length",
+                str(len(head) + chunks * len(rows_chunk) + (chunks - 1) + len(b"]}"))
+            )
+            self.end_headers()
+            self.wfile.write(head)
+            for index in range(chunks):
+                if index:
+                    self.wfile.write(b",")
+                self.wfile.write(rows_chunk)
+            self.wfile.write(b"]}")
+
+        def log_message(self, *args):
+            pass
+
+    return StubUpstreamHandler
+
+
+class Command(BaseCommand):
+    help = "Compare the buffered and the streaming proxy against a local stub upstream"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', dest='size_mb', type=int, default=100)
+        parser.add_argument('--requests', dest='requests', type=int, default=3)
+
+    def measure(self, function, url, count):
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(count):
+            size = function(url)
+        elapsed = (time.perf_counter() - start) / count
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return size, elapsed, peak
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), create_stub_handler(options['size_mb'] * 1024 * 1024)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/report"
+        try:
+            for name, function in (("buffered", legacy_proxy_body), ("streaming", streaming_proxy_body)):
+                size, elapsed, peak = self.measure(function, url, options['requests'])
+                self.stdout.write(
+                    f"{name}: {size / 1024 / 1024:.1f} MB body in {elapsed:.2f} s per request, "
+                    f"peak memory {peak / 1024 / 1024:.1f} MB"
+                )
+        finally:
+            server.shutdown()
@@ -0,0 +1,46 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+from requests import sessions
+from requests.adapters import HTTPAdapter
+
+from reporter_proxy.adapters import StreamingHTTPAdapter
+from reporter_proxy.config import api_proxy_configs
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(adapter_class):
+    session = sessions.Session()
+    # The session is shared by the requests of all the users, the cookies set by the
+    # upstream for a user must not be sent with the requests of the next ones
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = adapter_class(
+        pool_connections=api_proxy_configs.POOL_CONNECTIONS,
+        pool_maxsize=api_proxy_configs.POOL_MAXSIZE,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_proxy_session(streaming_upload=False):
+    """
+    Session shared by the proxy requests of the process, its adapter keeps the upstream
+    connections alive between requests
+
+    Args:
+        streaming_upload (bool): session sending the body with `StreamingHTTPAdapter`
+
+    Returns:
+        requests.Session: pooled session
+    """
+    adapter_class = StreamingHTTPAdapter if streaming_upload else HTTPAdapter
+    session = _sessions.get(adapter_class)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(adapter_class)
+            if session is None:
+                session = _sessions[adapter_class] = create_session(adapter_class)
+    return session
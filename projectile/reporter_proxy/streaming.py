@@ -0,0 +1,55 @@
+import json
+import re
+
+PAGINATION_LINK_PATTERN = re.compile(rb'"(next|previous)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+RESULTS_KEY = b'"results"'
+
+
+def iter_upstream_body(response, chunk_size):
+    """
+    Chunks of an upstream response body, the response is closed and its connection
+    released to the pool once the body is read or the client goes away
+    """
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk:
+                yield chunk
+    finally:
+        response.close()
+
+
+def rewrite_links_in_head(head, rewrite_url):
+    def replace(match):
+        url = json.loads(b'"' + match.group(2) + b'"')
+        rewritten = rewrite_url(url)
+        return b'"' + match.group(1) + b'": ' + json.dumps(rewritten).encode("utf-8")
+
+    return PAGINATION_LINK_PATTERN.sub(replace, head)
+
+
+def rewrite_pagination_links(chunks, rewrite_url, max_head):
+    """
+    Rewrite the `next` and `previous` links of a paginated json body while streaming it
+
+    Only the head of the body, up to the `results` key or `max_head` bytes, is held and
+    searched for the links, the rest of the body is passed through as it is read.
+
+    Args:
+        chunks (iterable): body chunks
+        rewrite_url (callable): returns the link to send for an upstream link
+        max_head (int): bytes searched for the links
+
+    Yields:
+        bytes: body chunks
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if RESULTS_KEY in head or len(head) >= max_head:
+            break
+    results_at = head.find(RESULTS_KEY)
+    if results_at == -1:
+        results_at = len(head)
+    yield rewrite_links_in_head(head[:results_at], rewrite_url) + head[results_at:]
+    yield from chunks
@@ -0,0 +1,33 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from requests import Response
+from requests.adapters import HTTPAdapter
+
+from reporter_proxy.session import create_session
+
+
+class ProxySessionTest(SimpleTestCase):
+
+    def get_response(self, request, **kwargs):
+        response = Response()
+        response.status_code = 200
+        response.request = request
+        response.url = request.url
+        response.headers["Set-Cookie"] = "sessionid=first-user; Path=/"
+        response.raw = mock.MagicMock()
+        response.raw._original_response.msg.get_all.return_value = [
+            "sessionid=first-user; Path=/"
+        ]
+        return response
+
+    def test_upstream_cookies_not_kept_between_requests(self):
+        session = create_session(HTTPAdapter)
+
+        with mock.patch.object(HTTPAdapter, "send", autospec=True) as send:
+            send.side_effect = lambda adapter, request, **kwargs: self.get_response(request)
+            session.get("http://reporter/api/v1/users")
+            session.get("http://reporter/api/v1/users")
+
+        self.assertEqual(len(session.cookies), 0)
+        self.assertNotIn("Cookie", send.call_args.args[1].headers)
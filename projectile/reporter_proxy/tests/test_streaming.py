@@ -0,0 +1,37 @@
+import json
+
+from django.test import SimpleTestCase
+
+from reporter_proxy.streaming import rewrite_pagination_links
+
+
+def rewrite_url(url):
+    if not url:
+        return None
+    return "http://proxy/?" + url.split("?", 1)[1]
+
+
+class RewritePaginationLinksTest(SimpleTestCase):
+
+    def stream(self, body, chunk_size, max_head=1024):
+        chunks = [body[index:index + chunk_size] for index in range(0, len(body), chunk_size)]
+        return b"".join(rewrite_pagination_links(chunks, rewrite_url, max_head))
+
+    def test_links_split_across_chunks_are_rewritten(self):
+        body = json.dumps({
+            "count": 3,
+            "next": "http://reporter/api/v1/users?page=2",
+            "previous": None,
+            "results": [{"next": "http://reporter/kept?as=is"}] * 3,
+        }).encode("utf-8")
+
+        for chunk_size in (1, 7, len(body)):
+            data = json.loads(self.stream(body, chunk_size))
+            self.assertEqual(data["next"], "http://proxy/?page=2")
+            self.assertIsNone(data["previous"])
+            self.assertEqual(data["results"][0]["next"], "http://reporter/kept?as=is")
+
+    def test_body_without_links_is_passed_through(self):
+        body = json.dumps([{"id": index} for index in range(100)]).encode("utf-8")
+
+        self.assertEqual(self.stream(body, 10, max_head=64), body)
@@ -5,19 +5,22 @@ import os
 
 import requests
 import six
-from django.http import HttpResponse
-from requests import sessions
+from django.http import StreamingHttpResponse
 from requests.exceptions import ConnectionError, SSLError, Timeout
-from rest_framework.exceptions import UnsupportedMediaType
 from rest_framework.response import Response
 from rest_framework.utils.mediatypes import media_type_matches
 from rest_framework.views import APIView
-from six import BytesIO as StringIO
 
-from reporter_proxy.adapters import StreamingHTTPAdapter
 from reporter_proxy.config import api_proxy_configs
 from reporter_proxy.utils import StreamingMultipart, generate_boundary
-from reporter_proxy.helpers import get_access_token, get_refresh_token, set_token
+from reporter_proxy.helpers import (
+    get_access_token,
+    get_refresh_token,
+    refresh_token_once,
+    set_token,
+)
+from reporter_proxy.session import get_proxy_session
+from reporter_proxy.streaming import iter_upstream_body, rewrite_pagination_links
 
 
 class BaseProxyView(APIView):
@@ -27,6 +30,8 @@ class BaseProxyView(APIView):
     return_raw = False
     return_raw_error = False
     verify_ssl = None
+    # Set once the tokens were refreshed for the request, a request is retried once
+    token_refreshed = False
 
 
 class ReporterProxyView(BaseProxyView):
@@ -127,41 +132,15 @@ class ReporterProxyView(BaseProxyView):
             return request.build_absolute_uri(f"{matching_str}{matching_result}")
         return request.build_absolute_uri(f"{matching_str}")
 
-    def parse_proxy_response(self, response):
-        """
-        Modified version of rest_framework.request.Request._parse(self)
-        """
-        parsers = self.get_parsers()
-        stream = StringIO(response._content)
-        content_type = response.headers.get("content-type", None)
-
-        if stream is None or content_type is None:
-            return {}
-
-        parser = None
-        for item in parsers:
-            if media_type_matches(item.media_type, content_type):
-                parser = item
-
-        if not parser:
-            raise UnsupportedMediaType(content_type)
-
-        parsed = parser.parse(stream, content_type)
-
-        # Parser classes may return the raw data, or a
-        # DataAndFiles object. Return only data.
-        try:
-            return parsed.data
-        except AttributeError:
-            return parsed
-
     def is_valid_access_token(self):
         base_url = os.environ.get("REPORTER_BASE_URL", "")
         api_url = f"{base_url}/api/v1/token/verify"
         payload = {
             "token": get_access_token(),
         }
-        response = requests.post(api_url, json=payload)
+        response = get_proxy_session().post(
+            api_url, json=payload, timeout=self.proxy_settings.TIMEOUT
+        )
         return response.status_code == 200
 
     def refresh_token(self):
@@ -171,7 +150,9 @@ class ReporterProxyView(BaseProxyView):
             payload = {
                 "refresh": get_refresh_token(),
             }
-            response = requests.post(api_url, json=payload)
+            response = get_proxy_session().post(
+                api_url, json=payload, timeout=self.proxy_settings.TIMEOUT
+            )
             response_data = response.json()
             access_token = response_data.get("access", "")
             refresh_token = response_data.get("refresh", "")
@@ -179,34 +160,48 @@ class ReporterProxyView(BaseProxyView):
         except:
             pass
 
+    def create_streaming_response(self, response, body):
+        streaming_response = StreamingHttpResponse(
+            body,
+            status=response.status_code,
+            content_type=response.headers.get("content-type"),
+        )
+        content_disposition = response.headers.get("content-disposition")
+        if content_disposition:
+            streaming_response["Content-Disposition"] = content_disposition
+        return streaming_response
+
     def create_response(self, response, request):
+        """
+        Stream the upstream response body to the client as it is read, the pagination links
+        of a json body are rewritten on the way
+        """
         status = response.status_code
+        body = iter_upstream_body(response, self.proxy_settings.STREAM_CHUNK_SIZE)
         if (self.return_raw or self.proxy_settings.RETURN_RAW) or (
             status >= 400
             and (self.return_raw_error or self.proxy_settings.RETURN_RAW_ERROR)
         ):
-            return HttpResponse(
-                response.text,
-                status=response.status_code,
-                content_type=response.headers.get("content-type"),
-            )
+            return self.create_streaming_response(response, body)
 
         if status >= 400:
-            body = {
-                "code": status,
-                "error": response.reason,
-            }
-        else:
-            body = self.parse_proxy_response(response)
-            try:
-                _next = body.get("next", "")
-                _previous = body.get("previous", "")
-                body["next"] = self.generate_prev_next_url(request, _next)
-                body["previous"] = self.generate_prev_next_url(request, _previous)
-            except:
-                pass
+            response.close()
+            return Response(
+                {
+                    "code": status,
+                    "error": response.reason,
+                },
+                status
+            )
 
-        return Response(body, status)
+        content_type = response.headers.get("content-type", "")
+        if media_type_matches("application/json", content_type):
+            body = rewrite_pagination_links(
+                body,
+                lambda url: self.generate_prev_next_url(request, url),
+                self.proxy_settings.LINK_REWRITE_MAX_HEAD,
+            )
+        return self.create_streaming_response(response, body)
 
     def create_error_response(self, body, status):
         return Response(body, status)
@@ -220,6 +215,8 @@ class ReporterProxyView(BaseProxyView):
         verify_ssl = self.get_verify_ssl(request)
         cookies = self.get_cookies(request)
 
+        access_token = get_access_token()
+
         try:
             if files:
                 """
@@ -235,11 +232,7 @@ class ReporterProxyView(BaseProxyView):
 
                 body = StreamingMultipart(data, files, boundary)
 
-                session = sessions.Session()
-                session.mount("http://", StreamingHTTPAdapter())
-                session.mount("https://", StreamingHTTPAdapter())
-
-                response = session.request(
+                response = get_proxy_session(streaming_upload=True).request(
                     request.method,
                     url,
                     params=params,
@@ -248,9 +241,10 @@ class ReporterProxyView(BaseProxyView):
                     timeout=self.proxy_settings.TIMEOUT,
                     verify=verify_ssl,
                     cookies=cookies,
+                    stream=True,
                 )
             else:
-                response = requests.request(
+                response = get_proxy_session().request(
                     request.method,
                     url,
                     params=params,
@@ -260,6 +254,7 @@ class ReporterProxyView(BaseProxyView):
                     timeout=self.proxy_settings.TIMEOUT,
                     verify=verify_ssl,
                     cookies=cookies,
+                    stream=True,
                 )
         except (ConnectionError, SSLError):
             status = requests.status_codes.codes.bad_gateway
@@ -282,10 +277,18 @@ class ReporterProxyView(BaseProxyView):
         _status = response.status_code
         if (
             _status == 403
+            and not self.token_refreshed
             and not self.is_valid_access_token()
             and get_refresh_token() is not None
         ):
-            self.refresh_token()
+            response.close()
+            # Concurrent requests rejected with the same token wait for a single refresh
+            refresh_token_once(
+                access_token,
+                self.refresh_token,
+                self.proxy_settings.TOKEN_REFRESH_LOCK_TIMEOUT,
+            )
+            self.token_refreshed = True
             return self.proxy(request, *args, **kwargs)
         return self.create_response(response, request)
 
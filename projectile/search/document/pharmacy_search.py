@@ -45,7 +45,7 @@ from pharmacy.enums import PurchaseType, DistributorOrderType
 from ..indexes import get_index
 from ..fields import CustomDateField
 from search.analyzer import html_strip, autocomplete_analyzer
-from search.helpers import prepare_stock_document, prepare_image
+from search.helpers import prepare_stock_document, prepare_image, StockDocumentContext
 
 
 @registry.register_document
@@ -1248,6 +1248,9 @@ class StockDocument(Document):
         queryset_pagination = 1000
         ignore_signals = True
 
+    # `StockDocumentContext` of the batch being indexed, see `_get_actions`
+    indexing_context = None
+
     def get_queryset(self, filters={}, orders=["-pk"], queryset=None):
         if isinstance(queryset, QuerySet):
             qs = queryset
@@ -1312,7 +1315,24 @@ class StockDocument(Document):
         return qs.iterator(**kwargs)
 
     def prepare(self, instance):
-        return prepare_stock_document(instance)
+        context = self.indexing_context
+        if context is None:
+            # A single document prepared outside `_get_actions`
+            context = StockDocumentContext()
+        return prepare_stock_document(instance, context)
+
+    def _get_actions(self, object_list, action):
+        """
+        Prepare the actions sharing one `StockDocumentContext` per batch of
+        `queryset_pagination` stocks
+        """
+        batch_size = self.django.queryset_pagination or 1000
+        for index, object_instance in enumerate(object_list):
+            if index % batch_size == 0:
+                self.indexing_context = StockDocumentContext()
+            if action == 'delete' or self.should_index_object(object_instance):
+                yield self._prepare_action(object_instance, action)
+        self.indexing_context = None
 
     def update(self, thing, refresh=None, action='index', parallel=False, **kwargs):
         """
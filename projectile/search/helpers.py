@@ -1,3 +1,7 @@
+import logging
+
+from django.core.exceptions import ObjectDoesNotExist
+from django_redis.exceptions import ConnectionInterrupted
 from versatileimagefield.utils import (
     get_rendition_key_set,
     validate_versatileimagefield_sizekey_list
@@ -13,9 +17,15 @@ from pharmacy.utils import (
     get_organization_order_closing_and_reopening_time,
 )
 
+logger = logging.getLogger(__name__)
+
 
-def prepare_image(image_name, image_key_set="product_images"):
-    sizes = validate_versatileimagefield_sizekey_list(get_rendition_key_set(image_key_set))
+def get_image_sizes(image_key_set="product_images"):
+    return validate_versatileimagefield_sizekey_list(get_rendition_key_set(image_key_set))
+
+def prepare_image(image_name, image_key_set="product_images", sizes=None):
+    if sizes is None:
+        sizes = get_image_sizes(image_key_set)
     image_set = build_versatileimagefield_url_set_from_image_name(image_name, sizes)
     return image_set
 
@@ -27,9 +37,10 @@ def prepare_is_order_enabled():
 
     return not order_closing_date and not order_reopening_date
 
-def prepare_current_order_mode(order_mode):
+def prepare_current_order_mode(order_mode, setting=None):
     try:
-        setting = get_healthos_settings()
+        if setting is None:
+            setting = get_healthos_settings()
         if setting.overwrite_order_mode_by_product:
             product_order_mode = order_mode
         else:
@@ -38,14 +49,15 @@ def prepare_current_order_mode(order_mode):
         product_order_mode = 0
     return product_order_mode
 
-def prepare_is_out_of_stock(orderable_stock, order_mode):
+def prepare_is_out_of_stock(orderable_stock, order_mode, setting=None):
     # Stock_and_Open:
     # 1. if order mode is Stock_and_Open then we consider product order mode as the order mode
     # 2. if product order_mode is Stock_and_Next_day then we need to return False unless product
     #    has orderable quantity greater then 0 the we need to return True
     # we are getting updated order mode of the product from get_product_order_mode
     # if order mode is by Organization and its Stock_and_Open
-    setting = get_healthos_settings()
+    if setting is None:
+        setting = get_healthos_settings()
     if (
             order_mode == AllowOrderFrom.STOCK_AND_NEXT_DAY and
             orderable_stock <= 0 and
@@ -56,6 +68,37 @@ def prepare_is_out_of_stock(orderable_stock, order_mode):
 
     return orderable_stock <= 0 and order_mode == AllowOrderFrom.STOCK
 
+class StockDocumentContext:
+    """
+    Values shared by every stock document of an indexing batch, computed once per batch
+    instead of reading the settings / order closing time from cache for every stock.
+    """
+    def __init__(self):
+        try:
+            self.setting = get_healthos_settings()
+        except (ObjectDoesNotExist, ConnectionInterrupted) as exception:
+            # The documents are still prepared, with 0 as the current order mode
+            logger.error(f"Unable to read the distributor settings for the stock documents: {exception}")
+            self.setting = None
+        self.is_order_enabled = prepare_is_order_enabled()
+        self.delivery_dates = {
+            True: prepare_delivery_date(True),
+            False: prepare_delivery_date(False),
+        }
+        self.image_sizes = get_image_sizes("product_images")
+
+    def get_current_order_mode(self, order_mode):
+        if self.setting is None:
+            return 0
+        return prepare_current_order_mode(order_mode, self.setting)
+
+    def get_delivery_date(self, is_queueing_item):
+        return self.delivery_dates[bool(is_queueing_item)]
+
+    def get_is_out_of_stock(self, orderable_stock, order_mode):
+        return prepare_is_out_of_stock(orderable_stock, order_mode, self.setting)
+
+
 def get_related_object(alias, name):
     if not alias:
         return {}
@@ -91,16 +134,27 @@ def get_ranking_value(is_queueing_item:bool, is_salesable_item: bool, is_stock_r
         return WISH_LIST
 
 
-def prepare_stock_document(instance):
+def prepare_stock_document(instance, context):
+    """Prepare the es document of a stock from `StockDocument.get_queryset` values
+
+    Args:
+        instance (dict): stock values
+        context (StockDocumentContext): shared values of the indexing batch, built once
+            per batch by the caller
+    """
+    is_out_of_stock = context.get_is_out_of_stock(
+        instance.get("orderable_stock"),
+        instance.get("product__order_mode")
+    )
 
     data = {
         "id": instance.get("id"),
         "alias": instance.get("alias"),
         "status": instance.get("status"),
-        "current_order_mode": prepare_current_order_mode(instance.get("product__order_mode")),
-        "is_out_of_stock": prepare_is_out_of_stock(instance.get("orderable_stock"), instance.get("product__order_mode")),
-        "delivery_date": prepare_delivery_date(instance.get("product__is_queueing_item")),
-        "is_order_enabled": prepare_is_order_enabled(),
+        "current_order_mode": context.get_current_order_mode(instance.get("product__order_mode")),
+        "is_out_of_stock": is_out_of_stock,
+        "delivery_date": context.get_delivery_date(instance.get("product__is_queueing_item")),
+        "is_order_enabled": context.is_order_enabled,
         "orderable_stock": instance.get("orderable_stock"),
         "organization": {
             "pk": instance.get("organization_id")
@@ -111,7 +165,7 @@ def prepare_stock_document(instance):
         "ranking": get_ranking_value(
             instance.get("product__is_queueing_item"),
             instance.get("product__is_salesable"),
-            prepare_is_out_of_stock(instance.get("orderable_stock"), instance.get("product__order_mode"))
+            is_out_of_stock
         ),
         "product": {
             "id": instance.get("product_id"),
@@ -128,7 +182,7 @@ def prepare_stock_document(instance):
             "order_limit_per_day_uttara": instance.get("product__order_limit_per_day_uttara"),
             "name": instance.get("product__name"),
             "name_not_analyzed": instance.get("product__name"),
-            "image": prepare_image(instance.get("product__image"), "product_images"),
+            "image": prepare_image(instance.get("product__image"), sizes=context.image_sizes),
             "strength": instance.get("product__strength"),
             "display_name": instance.get("product__display_name"),
             "full_name": instance.get("product__full_name"),
@@ -0,0 +1,93 @@
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from common.cache_helpers import RedisCommandCounter
+from common.enums import Status
+from common.healthos_helpers import CustomerHelper
+from core.models import Person
+from pharmacy.models import Stock
+from pharmacy.pricing import PricingContext
+from pharmacy.utils import (
+    get_product_dynamic_discount_rate,
+    remove_discount_factor_for_coupon,
+)
+
+
+def legacy_decorate_products(request, items):
+    """The per product decoration previously used by the e-commerce product search"""
+    for item in items:
+        item["product"]["discount_rate_factor"] = remove_discount_factor_for_coupon(
+            request=request,
+            data=item
+        )
+        item["product"]["dynamic_discount_rate"] = get_product_dynamic_discount_rate(
+            user_org_id=request.user.organization_id,
+            stock_id=item["id"],
+            trading_price=item["product"]["trading_price"],
+            discount_rate=item["product"]["discount_rate"]
+        )
+        item["product"]["dynamic_discount_factors"] = CustomerHelper(
+            organization_id=request.user.organization_id
+        ).get_organization_and_area_discount()
+
+
+class Command(BaseCommand):
+    help = "Compare redis calls and latency of pricing a product page per product and with a pricing context"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            dest='user_id',
+            type=int,
+            required=True,
+            help='Id of the (pharmacy) user the prices are computed for',
+        )
+        parser.add_argument(
+            '--page-size',
+            dest='page_size',
+            type=int,
+            default=100,
+        )
+
+    def get_items(self, page_size):
+        stocks = Stock.objects.filter(
+            status=Status.ACTIVE,
+            product__is_published=True,
+        ).values('id', 'product__trading_price', 'product__discount_rate').order_by('-pk')[:page_size]
+        return [
+            {
+                "id": stock["id"],
+                "product": {
+                    "trading_price": stock["product__trading_price"],
+                    "discount_rate": stock["product__discount_rate"],
+                },
+            }
+            for stock in stocks
+        ]
+
+    def run(self, label, decorate, items):
+        with RedisCommandCounter() as counter:
+            start = time.perf_counter()
+            decorate(items)
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:<16} {counter.count:>5} redis calls {elapsed * 1000:8.2f} ms"
+        )
+        return [item["product"] for item in items]
+
+    def handle(self, *args, **options):
+        user = Person.objects.get(pk=options['user_id'])
+        request = SimpleNamespace(user=user)
+        items = self.get_items(options['page_size'])
+        self.stdout.write(f"{len(items)} products for organization {user.organization_id}")
+
+        legacy = self.run(
+            "per product", lambda page: legacy_decorate_products(request, page), self.get_items(options['page_size'])
+        )
+        pricing = self.run(
+            "pricing context", lambda page: PricingContext.for_request(request).decorate_products(page), items
+        )
+        if legacy != pricing:
+            self.stderr.write("The prices of the pricing context differ from the per product prices")
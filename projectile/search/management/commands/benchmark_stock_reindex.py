@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.document.pharmacy_search import StockDocument
+from search.helpers import StockDocumentContext, prepare_stock_document
+
+
+class Command(BaseCommand):
+    help = "Benchmark preparing stock documents with a per row and a per batch indexing context"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            dest='limit',
+            type=int,
+            default=5000,
+            help='Number of stocks to prepare',
+        )
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(
+            f"{label:<12} {count} docs in {elapsed:.2f}s ({count / elapsed:.0f} docs/sec)"
+        )
+
+    def handle(self, *args, **options):
+        document = StockDocument()
+        stocks = list(document.get_queryset()[:options['limit']])
+        if not stocks:
+            self.stdout.write("No stock found to prepare")
+            return
+
+        # Before: every stock reads the settings and order closing time again
+        start = time.perf_counter()
+        for stock in stocks:
+            prepare_stock_document(stock, StockDocumentContext())
+        self.report("per row", len(stocks), time.perf_counter() - start)
+
+        # After: one context for each batch of `queryset_pagination` stocks
+        start = time.perf_counter()
+        for _action in document._get_actions(stocks, 'index'):
+            pass
+        self.report("per batch", len(stocks), time.perf_counter() - start)
+
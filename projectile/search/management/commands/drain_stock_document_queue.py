@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from search.stock_indexer import drain_stock_document_queue
+
+
+class Command(BaseCommand):
+    help = "Index the stocks queued by search.stock_indexer, draining the queue every interval for a while"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration',
+            dest='duration',
+            type=int,
+            default=55,
+            help='Seconds to keep draining, 0 drains once. Run every minute from cron',
+        )
+        parser.add_argument(
+            '--interval',
+            dest='interval',
+            type=int,
+            default=None,
+            help='Seconds between two drains, defaults to STOCK_DOCUMENT_INDEXER_INTERVAL',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or settings.STOCK_DOCUMENT_INDEXER_INTERVAL
+        deadline = time.monotonic() + options['duration']
+        stocks = 0
+        while True:
+            started_at = time.monotonic()
+            stocks += drain_stock_document_queue().stocks
+            if started_at + interval >= deadline:
+                break
+            time.sleep(max(interval - (time.monotonic() - started_at), 0))
+        self.stdout.write(f"Indexed {stocks} queued stock documents")
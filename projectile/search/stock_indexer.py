@@ -0,0 +1,221 @@
+"""Coalescing indexer for the stock es documents
+
+Instead of rebuilding the documents of every changed stock right away (one bulk request
+and one index refresh per change), the ids of the changed stocks are added to a redis
+sorted set scored by the time they were first queued. `drain_stock_document_queue` runs
+periodically (the `drain_stock_document_queue` command, run every minute from cron by
+bin/drain_stock_document_queue.sh), pops the queued ids in batches and indexes every batch
+with one `values()` query and one bulk request without forcing an index refresh.
+
+The queue is used only when `STOCK_DOCUMENT_INDEXER_ENABLED` is on, off by default the
+documents are updated by an `update_stock_document_lazy` task per change.
+
+A stock changed many times between two drains is indexed once, the documents are at most
+`STOCK_DOCUMENT_INDEXER_INTERVAL` seconds (plus the drain time) behind the database.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from common.cache_keys import (
+    STOCK_DOCUMENT_INDEX_QUEUE_CACHE_KEY,
+    STOCK_DOCUMENT_INDEXER_STATS_CACHE_KEY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Filters resolved to stock ids without a query
+STOCK_ID_FILTER_KEYS = ('pk', 'id', 'pk__in', 'id__in')
+
+
+class StockIndexerStats:
+
+    def __init__(self):
+        self.stocks = 0
+        self.batches = 0
+        self.max_lag = 0
+        self.total_lag = 0
+        self.started_at = time.perf_counter()
+        self.elapsed = 0
+
+    @property
+    def average_lag(self):
+        return self.total_lag / self.stocks if self.stocks else 0
+
+    def add_batch(self, queued_at_list, now):
+        lags = [now - queued_at for queued_at in queued_at_list]
+        self.stocks += len(lags)
+        self.batches += 1
+        self.total_lag += sum(lags)
+        self.max_lag = max([self.max_lag] + lags)
+
+    def as_dict(self):
+        return {
+            'stocks': self.stocks,
+            'batches': self.batches,
+            'max_lag': round(self.max_lag, 3),
+            'average_lag': round(self.average_lag, 3),
+            'elapsed': round(self.elapsed, 3),
+        }
+
+
+def get_queue_client():
+    return get_redis_connection("default")
+
+
+def get_queue_key():
+    # Prefixed like the other cache keys, so the test runs get their own queue
+    return cache.make_key(STOCK_DOCUMENT_INDEX_QUEUE_CACHE_KEY)
+
+
+def get_stock_ids_from_filters(filters):
+    """
+    Find the stocks matching the filters of `update_stock_es_doc`
+
+    Args:
+        filters (dict): stock queryset filters
+
+    Returns:
+        list: stock ids
+    """
+    from pharmacy.models import Stock
+
+    filters = filters or {}
+    if len(filters) == 1:
+        key, value = next(iter(filters.items()))
+        if key in STOCK_ID_FILTER_KEYS:
+            return list(value) if key.endswith('__in') else [value]
+    return list(Stock.objects.filter(**filters).values_list('pk', flat=True))
+
+
+def queue_stock_document_update(stock_ids):
+    """
+    Queue stocks for the next drain, a stock already waiting keeps its first queued time
+
+    Args:
+        stock_ids (list): ids of the changed stocks
+
+    Returns:
+        int: number of stocks newly added to the queue
+    """
+    stock_ids = [int(stock_id) for stock_id in stock_ids if stock_id is not None]
+    if not stock_ids:
+        return 0
+    now = time.time()
+    return get_queue_client().zadd(
+        get_queue_key(),
+        {stock_id: now for stock_id in stock_ids},
+        nx=True
+    )
+
+
+def request_stock_document_update(filters):
+    """
+    Update the es documents of the stocks matching the filters, through the queue when
+    `STOCK_DOCUMENT_INDEXER_ENABLED` else with `update_stock_document_lazy`
+
+    The stocks are queued after the current transaction commits, so a drain never indexes
+    the values from before the change.
+
+    Args:
+        filters (dict): stock queryset filters
+    """
+    from search.tasks import update_stock_document_lazy
+
+    if settings.STOCK_DOCUMENT_INDEXER_ENABLED:
+        transaction.on_commit(
+            lambda: queue_stock_document_update(get_stock_ids_from_filters(filters))
+        )
+        return
+    update_stock_document_lazy.apply_async(
+        (filters,),
+        countdown=1,
+        retry=True, retry_policy={
+            'max_retries': 10,
+            'interval_start': 0,
+            'interval_step': 0.2,
+            'interval_max': 0.2,
+        }
+    )
+
+
+def pop_queued_stocks(batch_size):
+    """
+    Pop the stocks queued for the longest time
+
+    Returns:
+        list: (stock id, queued at timestamp) tuples
+    """
+    return [
+        (int(stock_id), queued_at)
+        for stock_id, queued_at in get_queue_client().zpopmin(get_queue_key(), batch_size)
+    ]
+
+
+def requeue_stocks(queued_stocks):
+    """Put back stocks which could not be indexed with their original queued time"""
+    if queued_stocks:
+        get_queue_client().zadd(
+            get_queue_key(),
+            {stock_id: queued_at for stock_id, queued_at in queued_stocks},
+            nx=True
+        )
+
+
+def get_queue_length():
+    return get_queue_client().zcard(get_queue_key())
+
+
+def index_stock_documents(stock_ids):
+    """Rebuild the es documents of the stocks with one query and one bulk request"""
+    from search.document.pharmacy_search import StockDocument
+
+    document = StockDocument()
+    queryset = document.get_queryset(filters={"pk__in": stock_ids})
+    document.update(queryset, refresh=False, parallel=False, chunk_size=max(len(stock_ids), 1))
+
+
+def drain_stock_document_queue(batch_size=None, max_batches=None):
+    """
+    Index the queued stocks in batches until the queue is empty
+
+    Args:
+        batch_size (int, optional): stocks per bulk request, defaults to
+            `settings.STOCK_DOCUMENT_INDEXER_BATCH_SIZE`
+        max_batches (int, optional): stop after this many batches, the remaining stocks
+            are left for the next drain
+
+    Returns:
+        StockIndexerStats: number of stocks and batches indexed and the queue lag
+    """
+    batch_size = batch_size or settings.STOCK_DOCUMENT_INDEXER_BATCH_SIZE
+    stats = StockIndexerStats()
+    while max_batches is None or stats.batches < max_batches:
+        queued_stocks = pop_queued_stocks(batch_size)
+        if not queued_stocks:
+            break
+        try:
+            index_stock_documents([stock_id for stock_id, _queued_at in queued_stocks])
+        except Exception:
+            requeue_stocks(queued_stocks)
+            raise
+        stats.add_batch([queued_at for _stock_id, queued_at in queued_stocks], time.time())
+
+    stats.elapsed = time.perf_counter() - stats.started_at
+    if stats.stocks:
+        cache.set(
+            STOCK_DOCUMENT_INDEXER_STATS_CACHE_KEY,
+            dict(stats.as_dict(), finished_at=time.time(), queue_length=get_queue_length()),
+            None
+        )
+        log = logger.warning if stats.max_lag > settings.STOCK_DOCUMENT_INDEXER_MAX_STALENESS else logger.info
+        log(
+            "Indexed {} stock documents in {} batches in {:.2f}s, lag max {:.2f}s avg {:.2f}s".format(
+                stats.stocks, stats.batches, stats.elapsed, stats.max_lag, stats.average_lag
+            )
+        )
+    return stats
@@ -1,15 +1,23 @@
 import logging
 
+from django.conf import settings
 from elasticsearch.exceptions import ConnectionTimeout
 from projectile.celery import app
 from search.utils import update_stock_es_doc
+from search.stock_indexer import (
+    get_stock_ids_from_filters,
+    queue_stock_document_update,
+)
 
 logger = logging.getLogger(__name__)
 
 @app.task(bind=True, max_retries=10)
 def update_stock_document_lazy(self, filters={}):
     try:
-        update_stock_es_doc(filters)
+        if settings.STOCK_DOCUMENT_INDEXER_ENABLED:
+            queue_stock_document_update(get_stock_ids_from_filters(filters))
+        else:
+            update_stock_es_doc(filters)
     except Exception as exc:
         logger.info('will retry in 5 sec')
         self.retry(exc=exc, countdown=5)
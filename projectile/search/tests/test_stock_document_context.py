@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.test import SimpleTestCase
+
+from search import helpers
+from search.document.pharmacy_search import StockDocument
+
+
+@mock.patch.object(helpers, "get_image_sizes", return_value=[])
+@mock.patch.object(helpers, "get_delivery_date_for_product", return_value=None)
+@mock.patch.object(
+    helpers, "get_organization_order_closing_and_reopening_time", return_value=(None, None)
+)
+class StockDocumentContextTest(SimpleTestCase):
+
+    @mock.patch.object(helpers, "get_healthos_settings", side_effect=ObjectDoesNotExist("missing"))
+    def test_missing_settings_logged(self, *_mocks):
+        with self.assertLogs("search.helpers", level="ERROR"):
+            context = helpers.StockDocumentContext()
+        self.assertIsNone(context.setting)
+        self.assertEqual(context.get_current_order_mode(1), 0)
+
+    @mock.patch.object(helpers, "get_healthos_settings")
+    def test_one_context_per_batch(self, get_healthos_settings, *_mocks):
+        document = StockDocument()
+        stocks = [{"id": pk} for pk in range(1, 2501)]
+
+        with mock.patch(
+            "search.document.pharmacy_search.prepare_stock_document", return_value={}
+        ) as prepare_stock_document, mock.patch.object(
+            StockDocument, "should_index_object", return_value=True
+        ), mock.patch.object(
+            StockDocument, "_prepare_action", side_effect=lambda stock, _action: document.prepare(stock)
+        ):
+            actions = list(document._get_actions(stocks, "index"))
+
+        self.assertEqual(len(actions), len(stocks))
+        # queryset_pagination is 1000
+        self.assertEqual(get_healthos_settings.call_count, 3)
+        contexts = [call.args[1] for call in prepare_stock_document.call_args_list]
+        self.assertIs(contexts[0], contexts[999])
+        self.assertIsNot(contexts[999], contexts[1000])
+        self.assertIsNone(document.indexing_context)
@@ -0,0 +1,88 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from pharmacy.tests import StockFactory
+from search.stock_indexer import (
+    drain_stock_document_queue,
+    get_queue_client,
+    get_queue_key,
+    get_queue_length,
+    get_stock_ids_from_filters,
+    pop_queued_stocks,
+    queue_stock_document_update,
+    request_stock_document_update,
+)
+
+
+class StockIndexerQueueTest(SimpleTestCase):
+
+    def setUp(self):
+        get_queue_client().delete(get_queue_key())
+
+    def tearDown(self):
+        get_queue_client().delete(get_queue_key())
+
+    def test_stock_ids_from_id_filters(self):
+        self.assertEqual(get_stock_ids_from_filters({"pk": 7}), [7])
+        self.assertEqual(get_stock_ids_from_filters({"pk__in": [3, 4]}), [3, 4])
+        self.assertEqual(get_stock_ids_from_filters({"id__in": (5,)}), [5])
+
+    def test_queue_coalesces_stocks(self):
+        self.assertEqual(queue_stock_document_update([1, 2, 3]), 3)
+        self.assertEqual([stock_id for stock_id, _ in pop_queued_stocks(1)], [1])
+        queue_stock_document_update([1])
+        # Already waiting, the first queued time is kept
+        self.assertEqual(queue_stock_document_update([2, 3, None]), 0)
+
+        self.assertEqual(get_queue_length(), 3)
+        self.assertEqual([stock_id for stock_id, _ in pop_queued_stocks(10)], [2, 3, 1])
+
+    @mock.patch('search.stock_indexer.index_stock_documents')
+    def test_drain_indexes_batches(self, index_stock_documents):
+        queue_stock_document_update(range(1, 6))
+        queue_stock_document_update([2, 4])
+
+        stats = drain_stock_document_queue(batch_size=2)
+
+        self.assertEqual(
+            [call.args[0] for call in index_stock_documents.call_args_list],
+            [[1, 2], [3, 4], [5]]
+        )
+        self.assertEqual(stats.stocks, 5)
+        self.assertEqual(stats.batches, 3)
+        self.assertGreaterEqual(stats.max_lag, 0)
+        self.assertEqual(get_queue_length(), 0)
+
+    @mock.patch('search.stock_indexer.index_stock_documents', side_effect=ConnectionError)
+    def test_failed_batch_is_requeued(self, _index_stock_documents):
+        queue_stock_document_update([8, 9])
+
+        with self.assertRaises(ConnectionError):
+            drain_stock_document_queue(batch_size=10)
+        self.assertEqual(get_queue_length(), 2)
+
+
+@override_settings(STOCK_DOCUMENT_INDEXER_ENABLED=True)
+class StockIndexerDrainCommandTest(TestCase):
+
+    def setUp(self):
+        get_queue_client().delete(get_queue_key())
+
+    def tearDown(self):
+        get_queue_client().delete(get_queue_key())
+
+    @mock.patch('search.document.pharmacy_search.StockDocument.update')
+    def test_queued_stock_is_indexed(self, update):
+        stock = StockFactory()
+        with self.captureOnCommitCallbacks(execute=True):
+            request_stock_document_update({"pk": stock.pk})
+        self.assertEqual(get_queue_length(), 1)
+
+        call_command('drain_stock_document_queue', duration=0, stdout=StringIO())
+
+        update.assert_called_once()
+        self.assertEqual([row["id"] for row in update.call_args.args[0]], [stock.pk])
+        self.assertEqual(get_queue_length(), 0)
@@ -21,7 +21,7 @@ from common.utils import (
     string_to_bool,
 )
 from common.enums import Status, PublishStatus
-from common.healthos_helpers import CustomerHelper, HealthOSHelper
+from common.healthos_helpers import HealthOSHelper
 from core.utils import isDate, formatDate, get_global_product_category
 
 from core.permissions import (
@@ -65,11 +65,9 @@ from pharmacy.models import (
 from pharmacy.utils import (
     filter_data_by_user_permitted_store_points,
     get_sorting_value,
-    remove_discount_factor_for_coupon,
-    get_product_dynamic_discount_rate,
-    get_organization_order_closing_and_reopening_time,
 )
 from pharmacy.helpers import get_cached_company_ids_of_published_products
+from pharmacy.pricing import PricingContext
 from pharmacy.serializers import (
     ProductWithoutStockSerializer,
     ProductFormSerializer,
@@ -1209,25 +1207,13 @@ class ECommerceStockProductSearchView(generics.ListAPIView):
             response=self.list(request, *args, **kwargs)
         ).data
         results = finalize_response["results"]
+        # as per organization/user cumulative_discount_factor is different,
+        # the factors are read once for the whole page
+        pricing_context = PricingContext.for_request(request)
+        pricing_context.decorate_products(results)
         # check if order is disabled
-        order_closing_date, order_reopening_date = get_organization_order_closing_and_reopening_time()
-        is_order_enabled = not order_closing_date and not order_reopening_date
-
-        # as per organization/user cumulative_discount_factor is different
+        is_order_enabled = pricing_context.is_order_enabled
         for item in results:
-            item["product"]["discount_rate_factor"] = remove_discount_factor_for_coupon(
-                request=request,
-                data=item
-            )
-            item["product"]["dynamic_discount_rate"] = get_product_dynamic_discount_rate(
-                user_org_id=request.user.organization_id,
-                stock_id=item["id"],
-                trading_price=item["product"]["trading_price"],
-                discount_rate=item["product"]["discount_rate"]
-            )
-            item["product"]["dynamic_discount_factors"] = CustomerHelper(
-                organization_id=request.user.organization_id
-            ).get_organization_and_area_discount()
             # update is_order_enabled value
             item["is_order_enabled"] = is_order_enabled
         return Response(finalize_response, status=status.HTTP_200_OK)
@@ -0,0 +1,261 @@
+"""Set based builder of the daily sale snapshots
+
+The io logs of the distributor orders of a day are read with their derived columns
+(sales rate, effective sales rate / value, total short and total return) computed by the
+database. The rows are streamed in fixed size batches into `DailySaleSnapshot`, the
+existing rows of the date are replaced in the same transaction, so a build can be run
+again for any date and a failed date leaves the previous snapshot in place.
+"""
+import datetime
+import functools
+import logging
+import time
+
+import billiard
+from django.db import connections, transaction
+from django.db.models import (
+    Case,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+
+from common.enums import Status
+from ecommerce.enums import ShortReturnLogType
+from pharmacy.enums import DistributorOrderType, OrderTrackingStatus, PurchaseType
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_BATCH_SIZE = 2000
+
+# Snapshot field to the io log value it is read from
+SNAPSHOT_FIELDS = {
+    'stock_io_id': 'id',
+    'purchase_id': 'purchase_id',
+    'invoice_group_id': 'purchase__invoice_group_id',
+    'status': 'purchase__current_order_status',
+    'stock_id': 'stock_id',
+    'product_id': 'stock__product_id',
+    'product_name': 'stock__product_full_name',
+    'quantity': 'quantity',
+    'rate': 'rate',
+    'discount_rate': 'discount_rate',
+    'sales_rate': 'snapshot_sales_rate',
+    'additional_discount_rate': 'purchase__additional_discount_rate',
+    'effective_sales_rate': 'snapshot_effective_sales_rate',
+    'effective_sales_value': 'snapshot_effective_sales_value',
+    'order_additional_discount': 'purchase__additional_discount',
+    'order_grand_total': 'purchase__grand_total',
+    'pharmacy_name': 'purchase__organization__name',
+    'organization_id': 'purchase__organization_id',
+    'delivery_thana': 'snapshot_delivery_thana',
+    'address': 'purchase__organization__address',
+    'mobile': 'purchase__organization__primary_mobile',
+    'employee_id': 'purchase__responsible_employee_id',
+    'employee_first_name': 'purchase__responsible_employee__first_name',
+    'employee_last_name': 'purchase__responsible_employee__last_name',
+    'total_short': 'snapshot_total_short',
+    'total_return': 'snapshot_total_return',
+}
+
+
+class SnapshotBuildResult:
+
+    def __init__(self, snapshot_date, rows=0, elapsed=0):
+        self.snapshot_date = snapshot_date
+        self.rows = rows
+        self.elapsed = elapsed
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0
+
+    def __str__(self):
+        return f"{self.snapshot_date}: {self.rows} rows in {self.elapsed:.2f} s ({self.rows_per_second:.0f} rows/s)"
+
+
+def get_short_return_quantity(short_return_items):
+    """Total quantity of the short / return items of the outer io log invoice group and stock"""
+    return Coalesce(
+        Subquery(
+            short_return_items.filter(
+                status=Status.ACTIVE,
+                short_return_log__invoice_group_id=OuterRef('purchase__invoice_group_id'),
+                stock_io__stock_id=OuterRef('stock_id'),
+            ).order_by().values(
+                'short_return_log__invoice_group_id', 'stock_io__stock_id'
+            ).annotate(
+                total_quantity=Sum('quantity')
+            ).values('total_quantity')[:1],
+            output_field=FloatField()
+        ),
+        Value(0.0)
+    )
+
+
+def get_snapshot_queryset(snapshot_date):
+    """
+    Io logs of the distributor orders to deliver on a date with the snapshot columns
+
+    Args:
+        snapshot_date (date): tentative delivery date of the orders
+
+    Returns:
+        QuerySet: values of `SNAPSHOT_FIELDS` ordered by io log id
+    """
+    from ecommerce.models import ShortReturnItem
+    from pharmacy.models import StockIOLog
+
+    sales_rate = F('rate') - F('rate') / 100 * F('discount_rate')
+    effective_sales_rate = sales_rate - sales_rate / 100 * F('purchase__additional_discount_rate')
+    short_items = ShortReturnItem.objects.filter(
+        date=snapshot_date,
+        type=ShortReturnLogType.SHORT,
+    )
+    return_items = ShortReturnItem.objects.filter(
+        type=ShortReturnLogType.RETURN,
+        short_return_log__approved_at__isnull=False,
+    )
+    return StockIOLog.objects.filter(
+        purchase__tentative_delivery_date=snapshot_date,
+        purchase__distributor_order_type=DistributorOrderType.ORDER,
+        purchase__purchase_type=PurchaseType.VENDOR_ORDER,
+        purchase__status=Status.DISTRIBUTOR_ORDER,
+        # A snapshot row requires an invoice group
+        purchase__invoice_group__isnull=False,
+    ).exclude(
+        purchase__current_order_status__in=[
+            OrderTrackingStatus.REJECTED,
+            OrderTrackingStatus.CANCELLED,
+        ]
+    ).annotate(
+        snapshot_sales_rate=ExpressionWrapper(sales_rate, output_field=FloatField()),
+        snapshot_effective_sales_rate=ExpressionWrapper(effective_sales_rate, output_field=FloatField()),
+        snapshot_effective_sales_value=ExpressionWrapper(
+            effective_sales_rate * F('quantity'), output_field=FloatField()
+        ),
+        snapshot_delivery_thana=Coalesce(
+            'purchase__organization__delivery_thana', Value(0), output_field=IntegerField()
+        ),
+        snapshot_total_short=get_short_return_quantity(short_items),
+        # The whole quantity of a fully returned order is returned
+        snapshot_total_return=Case(
+            When(
+                purchase__current_order_status=OrderTrackingStatus.FULL_RETURNED,
+                then=F('quantity'),
+            ),
+            default=get_short_return_quantity(return_items),
+            output_field=FloatField(),
+        ),
+    ).order_by('id').values_list(*SNAPSHOT_FIELDS.values())
+
+
+def iterate_snapshot_batches(snapshot_date, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Unsaved `DailySaleSnapshot` rows of a date in lists of `batch_size`, read with a server side cursor
+
+    The io logs of the orders without a responsible employee are skipped and logged, a
+    snapshot row requires an employee.
+    """
+    from stats.models import DailySaleSnapshot
+
+    batch = []
+    field_names = list(SNAPSHOT_FIELDS)
+    employee_index = field_names.index('employee_id')
+    purchase_index = field_names.index('purchase_id')
+    skipped_purchase_ids = set()
+    for values in get_snapshot_queryset(snapshot_date).iterator(chunk_size=batch_size):
+        if values[employee_index] is None:
+            skipped_purchase_ids.add(values[purchase_index])
+            continue
+        batch.append(DailySaleSnapshot(snapshot_date=snapshot_date, **dict(zip(field_names, values))))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if skipped_purchase_ids:
+        logger.warning(
+            f"Skipped the io logs of {len(skipped_purchase_ids)} orders of {snapshot_date} "
+            f"without a responsible employee: {sorted(skipped_purchase_ids)}"
+        )
+    if batch:
+        yield batch
+
+
+def build_daily_sale_snapshot(snapshot_date, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Replace the sale snapshot rows of a date
+
+    Args:
+        snapshot_date (date): snapshot date
+        batch_size (int): rows read and created per batch
+
+    Returns:
+        SnapshotBuildResult: number of rows created and the time taken
+    """
+    from common import models as common_models
+    from stats.models import DailySaleSnapshot
+
+    result = SnapshotBuildResult(snapshot_date)
+    started_at = time.perf_counter()
+    with transaction.atomic():
+        DailySaleSnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+        for batch in iterate_snapshot_batches(snapshot_date, batch_size):
+            for row in batch:
+                # Set by `CreatedAtUpdatedAtBaseModel.save`, which bulk create skips
+                row.user_ip = common_models.USER_IP_ADDRESS
+            DailySaleSnapshot.objects.bulk_create(batch, batch_size=batch_size)
+            result.rows += len(batch)
+    result.elapsed = time.perf_counter() - started_at
+    logger.info(f"Created daily sales snapshot records for {result}")
+    return result
+
+
+def get_snapshot_dates(start_date, end_date):
+    return [
+        start_date + datetime.timedelta(days=day)
+        for day in range((end_date - start_date).days + 1)
+    ]
+
+
+def _build_daily_sale_snapshot_in_process(snapshot_date, batch_size):
+    try:
+        return build_daily_sale_snapshot(snapshot_date, batch_size)
+    except Exception as exception:
+        logger.exception(f"Failed to create daily sales snapshot records for date {snapshot_date}: {exception}")
+        return None
+
+
+def backfill_daily_sale_snapshots(start_date, end_date, processes=1, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Build the snapshots of every date of a range, a date per process
+
+    A failed date is logged and skipped, the other dates are built.
+
+    Args:
+        start_date (date): first date
+        end_date (date): last date, included
+        processes (int): number of worker processes
+        batch_size (int): rows read and created per batch
+
+    Yields:
+        SnapshotBuildResult: result of every date, None for a failed date
+    """
+    dates = get_snapshot_dates(start_date, end_date)
+    if processes <= 1 or len(dates) <= 1:
+        for snapshot_date in dates:
+            yield _build_daily_sale_snapshot_in_process(snapshot_date, batch_size)
+        return
+    # The forked processes must not share the connection of the parent
+    connections.close_all()
+    with billiard.Pool(processes=min(processes, len(dates))) as pool:
+        yield from pool.imap(
+            functools.partial(_build_daily_sale_snapshot_in_process, batch_size=batch_size),
+            dates
+        )
@@ -1,33 +1,65 @@
 import logging
+import time
 
 from dateutil.relativedelta import relativedelta
 from datetime import datetime
 
 from django.core.management.base import BaseCommand, CommandError
-from django.core.management import call_command
 
-import pandas as pd
+from stats.daily_sale_snapshot import SNAPSHOT_BATCH_SIZE, backfill_daily_sale_snapshots
 
 logger = logging.getLogger(__name__)
 
 
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError as e:
+        raise CommandError('Date format must be YYYY-MM-DD') from e
+
+
 class Command(BaseCommand):
-    help = ''
-
-    def handle(self, *args, **kwargs):
-        # Calculate the date 6 months ago
-        start_date = datetime.today() - relativedelta(months=3)
-        # Current date
-        end_date = datetime.today()
-
-        # Generate all dates from 6 months ago to today
-        date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-
-        for date in date_range:
-            date_ = date.strftime('%Y-%m-%d')
-            try:
-                # Call the convert_date command
-                call_command('stats_create_daily_sale_snapshot', date_)
-            except Exception as e:
-                logger.exception(f'An error occurred on {date_}: {str(e)}')
+    help = 'Create the daily sale snapshots of a date range, the last 3 months by default'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', dest='start_date', type=str, help='First date in YYYY-MM-DD format')
+        parser.add_argument('--end-date', dest='end_date', type=str, help='Last date in YYYY-MM-DD format')
+        parser.add_argument(
+            '--processes',
+            dest='processes',
+            type=int,
+            default=1,
+            help='Number of dates built in parallel',
+        )
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            type=int,
+            default=SNAPSHOT_BATCH_SIZE,
+            help='Number of rows read and created per batch',
+        )
+
+    def handle(self, *args, **options):
+        end_date = parse_date(options['end_date']) if options['end_date'] else datetime.today().date()
+        if options['start_date']:
+            start_date = parse_date(options['start_date'])
+        else:
+            start_date = end_date - relativedelta(months=3)
+
+        total_rows = 0
+        started_at = time.perf_counter()
+        for result in backfill_daily_sale_snapshots(
+            start_date,
+            end_date,
+            processes=options['processes'],
+            batch_size=options['batch_size'],
+        ):
+            if result is None:
                 continue
+            total_rows += result.rows
+            self.stdout.write(str(result))
+        elapsed = time.perf_counter() - started_at
+        rows_per_second = total_rows / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{start_date} - {end_date}: {total_rows} rows in {elapsed:.2f} s ({rows_per_second:.0f} rows/s)"
+        ))
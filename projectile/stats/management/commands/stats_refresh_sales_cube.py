@@ -0,0 +1,57 @@
+import logging
+import time
+
+from dateutil.relativedelta import relativedelta
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from stats.sales_cube import get_dates, refresh_sales_cube
+
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError as e:
+        raise CommandError('Date format must be YYYY-MM-DD') from e
+
+
+class Command(BaseCommand):
+    help = 'Roll up the order lines of a delivery date range into the daily sales cube, the last 3 months by default'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', dest='start_date', type=str, help='First date in YYYY-MM-DD format')
+        parser.add_argument('--end-date', dest='end_date', type=str, help='Last date in YYYY-MM-DD format')
+        parser.add_argument(
+            '--recent',
+            action='store_true',
+            help='Refresh the dates around today set by SALES_CUBE_REFRESH_PAST_DAYS / '
+                 'SALES_CUBE_REFRESH_FUTURE_DAYS, the daily refresh run from cron',
+        )
+
+    def handle(self, *args, **options):
+        if options['recent']:
+            today = datetime.today().date()
+            start_date = today - relativedelta(days=settings.SALES_CUBE_REFRESH_PAST_DAYS)
+            end_date = today + relativedelta(days=settings.SALES_CUBE_REFRESH_FUTURE_DAYS)
+        else:
+            end_date = parse_date(options['end_date']) if options['end_date'] else datetime.today().date()
+            if options['start_date']:
+                start_date = parse_date(options['start_date'])
+            else:
+                start_date = end_date - relativedelta(months=3)
+
+        total_rows = 0
+        started_at = time.perf_counter()
+        for date in get_dates(start_date, end_date):
+            # A date is replaced as a whole, the command can be run again for a range
+            rows = refresh_sales_cube([date])
+            total_rows += rows
+            self.stdout.write(f"{date}: {rows} rows")
+        elapsed = time.perf_counter() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {total_rows} sales cube rows from {start_date} to {end_date} in {elapsed:.2f} s"
+        ))
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2024-06-02 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import enumerify.fields
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0178_recheck_top_sheet_recheckproduct_invoice_group_and_more'),
+        ('core', '0229_remove_district_division_remove_district_entry_by_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesCubeDate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('status', enumerify.fields.SelectIntegerField(choices=[(0, 'Active'), (1, 'Inactive'), (2, 'Draft'), (3, 'Released'), (4, 'Approved Draft'), (5, 'Absent'), (6, 'Purchase Order'), (7, 'Suspend'), (8, 'On Hold'), (9, 'Hardwired'), (10, 'Loss'), (11, 'Freeze'), (12, 'For Adjustment'), (13, 'Distributor Order')], db_index=True, default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization_wise_serial', models.PositiveIntegerField(default=0, editable=False, help_text='OrganizationWise Serial Number')),
+                ('user_ip', models.GenericIPAddressField(blank=True, editable=False, null=True)),
+                ('date', models.DateField(unique=True)),
+                ('entry_by', models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='%(app_label)s_%(class)s_entry_by', to=settings.AUTH_USER_MODEL, verbose_name='entry by')),
+                ('updated_by', models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='%(app_label)s_%(class)s_updated_by', to=settings.AUTH_USER_MODEL, verbose_name='last updated by')),
+            ],
+            options={
+                'verbose_name': 'Daily Sales Cube Date',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('status', enumerify.fields.SelectIntegerField(choices=[(0, 'Active'), (1, 'Inactive'), (2, 'Draft'), (3, 'Released'), (4, 'Approved Draft'), (5, 'Absent'), (6, 'Purchase Order'), (7, 'Suspend'), (8, 'On Hold'), (9, 'Hardwired'), (10, 'Loss'), (11, 'Freeze'), (12, 'For Adjustment'), (13, 'Distributor Order')], db_index=True, default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization_wise_serial', models.PositiveIntegerField(default=0, editable=False, help_text='OrganizationWise Serial Number')),
+                ('user_ip', models.GenericIPAddressField(blank=True, editable=False, null=True)),
+                ('date', models.DateField(db_index=True, help_text='Tentative delivery date of the orders')),
+                ('order_status', models.PositiveIntegerField()),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('quantity', models.FloatField(default=0.0)),
+                ('value', models.FloatField(default=0.0)),
+                ('discount', models.FloatField(default=0.0)),
+                ('short_quantity', models.FloatField(default=0.0)),
+                ('return_quantity', models.FloatField(default=0.0)),
+                ('delivery_hub', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='core.deliveryhub')),
+                ('entry_by', models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='%(app_label)s_%(class)s_entry_by', to=settings.AUTH_USER_MODEL, verbose_name='entry by')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.organization')),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pharmacy.stock')),
+                ('updated_by', models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='%(app_label)s_%(class)s_updated_by', to=settings.AUTH_USER_MODEL, verbose_name='last updated by')),
+            ],
+            options={
+                'verbose_name': 'Daily Sales Cube',
+                'unique_together': {('date', 'organization', 'stock', 'delivery_hub', 'order_status')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2024-06-04 09:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import enumerify.fields
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0229_remove_district_division_remove_district_entry_by_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stats', '0002_dailysalescube_dailysalescubedate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PharmacyOrderDate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('status', enumerify.fields.SelectIntegerField(choices=[(0, 'Active'), (1, 'Inactive'), (2, 'Draft'), (3, 'Released'), (4, 'Approved Draft'), (5, 'Absent'), (6, 'Purchase Order'), (7, 'Suspend'), (8, 'On Hold'), (9, 'Hardwired'), (10, 'Loss'), (11, 'Freeze'), (12, 'For Adjustment'), (13, 'Distributor Order')], db_index=True, default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization_wise_serial', models.PositiveIntegerField(default=0, editable=False, help_text='OrganizationWise Serial Number')),
+                ('user_ip', models.GenericIPAddressField(blank=True, editable=False, null=True)),
+                ('delivery_date', models.DateField(blank=True, help_text='Tentative delivery date of the orders', null=True)),
+                ('last_tracked_at', models.DateTimeField(db_index=True, help_text='Time of the latest order tracking of the orders')),
+                ('entry_by', models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='%(app_label)s_%(class)s_entry_by', to=settings.AUTH_USER_MODEL, verbose_name='entry by')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.organization')),
+                ('updated_by', models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='%(app_label)s_%(class)s_updated_by', to=settings.AUTH_USER_MODEL, verbose_name='last updated by')),
+            ],
+            options={
+                'verbose_name': 'Pharmacy Order Date',
+                'unique_together': {('organization', 'delivery_date')},
+                'index_together': {('organization', 'last_tracked_at')},
+            },
+        ),
+    ]
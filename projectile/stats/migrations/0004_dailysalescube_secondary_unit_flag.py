@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+def clear_sales_cube(apps, schema_editor):
+    # The rows of the primary and secondary unit lines were summed together, the dates
+    # are read from the order lines again until the next refresh rolls them up
+    apps.get_model('stats', 'DailySalesCubeDate').objects.all().delete()
+    apps.get_model('stats', 'DailySalesCube').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0003_pharmacyorderdate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysalescube',
+            name='secondary_unit_flag',
+            field=models.BooleanField(default=False, help_text='The quantities are in the secondary unit of the product'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailysalescube',
+            unique_together={('date', 'organization', 'stock', 'delivery_hub', 'order_status', 'secondary_unit_flag')},
+        ),
+        migrations.RunPython(clear_sales_cube, migrations.RunPython.noop),
+    ]
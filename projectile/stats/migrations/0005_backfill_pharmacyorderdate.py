@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Max
+
+BATCH_SIZE = 5000
+
+
+def backfill_pharmacy_order_dates(apps, schema_editor):
+    # Same roll up as `notebookapi.notebooks.pharmacies.rebuild_pharmacy_order_dates`, the
+    # dropped pharmacy list reads the table only, so it's filled with the existing trackings
+    OrderTracking = apps.get_model('pharmacy', 'OrderTracking')
+    PharmacyOrderDate = apps.get_model('stats', 'PharmacyOrderDate')
+
+    rows = OrderTracking.objects.order_by().values(
+        'order__organization_id',
+        'order__tentative_delivery_date',
+    ).annotate(
+        last_tracked_at=Max('date'),
+    ).values_list(
+        'order__organization_id',
+        'order__tentative_delivery_date',
+        'last_tracked_at',
+    )
+    PharmacyOrderDate.objects.all().delete()
+    batch = []
+    for organization_id, delivery_date, last_tracked_at in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(PharmacyOrderDate(
+            organization_id=organization_id,
+            delivery_date=delivery_date,
+            last_tracked_at=last_tracked_at,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            PharmacyOrderDate.objects.bulk_create(batch)
+            batch = []
+    PharmacyOrderDate.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0178_recheck_top_sheet_recheckproduct_invoice_group_and_more'),
+        ('stats', '0004_dailysalescube_secondary_unit_flag'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_pharmacy_order_dates, migrations.RunPython.noop),
+    ]
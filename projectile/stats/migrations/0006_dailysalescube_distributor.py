@@ -0,0 +1,30 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def clear_sales_cube(apps, schema_editor):
+    # The rows have no distributor yet, the dates are read from the order lines again
+    # until the next refresh rolls them up
+    apps.get_model('stats', 'DailySalesCubeDate').objects.all().delete()
+    apps.get_model('stats', 'DailySalesCube').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0229_remove_district_division_remove_district_entry_by_and_more'),
+        ('stats', '0005_backfill_pharmacyorderdate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysalescube',
+            name='distributor',
+            field=models.ForeignKey(blank=True, help_text='Distributor organization of the orders', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='distributor_sales_cubes', to='core.organization'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailysalescube',
+            unique_together={('date', 'organization', 'distributor', 'stock', 'delivery_hub', 'order_status', 'secondary_unit_flag')},
+        ),
+        migrations.RunPython(clear_sales_cube, migrations.RunPython.noop),
+    ]
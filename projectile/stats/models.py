@@ -43,3 +43,85 @@ class DailySaleSnapshot(CreatedAtUpdatedAtBaseModel):
         return f"{self.pharmacy_name} / {self.order_grand_total}"
 
 
+
+
+class DailySalesCube(CreatedAtUpdatedAtBaseModel):
+    """
+    E-commerce order lines rolled up per delivery date, customer organization, distributor,
+    stock, delivery hub, order status and unit (primary / secondary), maintained by
+    `stats.sales_cube`
+    """
+    date = models.DateField(db_index=True, help_text='Tentative delivery date of the orders')
+    organization = models.ForeignKey('core.Organization', on_delete=models.CASCADE)
+    distributor = models.ForeignKey(
+        'core.Organization',
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name='distributor_sales_cubes',
+        help_text='Distributor organization of the orders'
+    )
+    stock = models.ForeignKey('pharmacy.Stock', on_delete=models.CASCADE)
+    delivery_hub = models.ForeignKey(
+        'core.DeliveryHub',
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+    )
+    order_status = models.PositiveIntegerField()
+    secondary_unit_flag = models.BooleanField(
+        default=False,
+        help_text='The quantities are in the secondary unit of the product'
+    )
+    line_count = models.PositiveIntegerField(default=0)
+    quantity = models.FloatField(default=0.00)
+    value = models.FloatField(default=0.00)
+    discount = models.FloatField(default=0.00)
+    short_quantity = models.FloatField(default=0.00)
+    return_quantity = models.FloatField(default=0.00)
+
+    class Meta:
+        verbose_name = "Daily Sales Cube"
+        unique_together = (
+            'date', 'organization', 'distributor', 'stock', 'delivery_hub', 'order_status',
+            'secondary_unit_flag',
+        )
+
+    def __str__(self):
+        return f"{self.date} / {self.organization_id} / {self.stock_id} / {self.order_status}"
+
+
+class DailySalesCubeDate(CreatedAtUpdatedAtBaseModel):
+    """Delivery dates rolled up in `DailySalesCube`, the reports read the cube for these dates"""
+    date = models.DateField(unique=True)
+
+    class Meta:
+        verbose_name = "Daily Sales Cube Date"
+
+    def __str__(self):
+        return f"{self.date}"
+
+
+class PharmacyOrderDate(CreatedAtUpdatedAtBaseModel):
+    """
+    Latest order tracking time of the orders of a pharmacy per delivery date, maintained
+    from the order trackings for `notebookapi.notebooks.pharmacies`
+    """
+    organization = models.ForeignKey('core.Organization', on_delete=models.CASCADE)
+    delivery_date = models.DateField(
+        blank=True,
+        null=True,
+        help_text='Tentative delivery date of the orders'
+    )
+    last_tracked_at = models.DateTimeField(
+        db_index=True,
+        help_text='Time of the latest order tracking of the orders'
+    )
+
+    class Meta:
+        verbose_name = "Pharmacy Order Date"
+        unique_together = ('organization', 'delivery_date')
+        index_together = ('organization', 'last_tracked_at')
+
+    def __str__(self):
+        return f"{self.organization_id} / {self.delivery_date}"
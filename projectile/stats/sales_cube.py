@@ -0,0 +1,300 @@
+"""Daily sales cube of the e-commerce orders
+
+The order lines (`StockIOLog` of distributor orders) are rolled up into `DailySalesCube`
+per delivery date, customer organization, distributor, stock, delivery hub, order status and
+unit (`secondary_unit_flag`) with their quantity, value, discount and short / return quantities.
+A delivery date is rolled up as a whole by the daily refresh (`refresh_sales_cube`, the
+`stats_refresh_sales_cube --recent` command run from cron by bin/stats_refresh_sales_cube.sh)
+and recorded in `DailySalesCubeDate`. A change of an order status, an order line or a
+short / return item rolls up again the lines of the customer on the delivery date of the
+order (`request_sales_cube_refresh`, `refresh_sales_cube_for_orders`). An order moved to
+another delivery date also rolls up again the lines of the customer on its previous date.
+
+Reports read the cube with `get_sales_cube` when every date of the requested range is
+rolled up, and aggregate the raw order lines otherwise.
+"""
+import datetime
+import logging
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, When
+from django.db.models.functions import Coalesce
+
+from common.enums import Status
+from ecommerce.enums import ShortReturnLogType
+from pharmacy.enums import DistributorOrderType, PurchaseType
+
+logger = logging.getLogger(__name__)
+
+# Cube field to the order line (io log) field it is grouped by
+CUBE_DIMENSIONS = {
+    'date': 'purchase__tentative_delivery_date',
+    'organization_id': 'purchase__organization_id',
+    'distributor_id': 'purchase__distributor_id',
+    'stock_id': 'stock_id',
+    'delivery_hub_id': 'purchase__organization__delivery_hub_id',
+    'order_status': 'purchase__current_order_status',
+    'secondary_unit_flag': 'secondary_unit_flag',
+}
+
+
+def get_order_lines():
+    from pharmacy.models import StockIOLog
+
+    return StockIOLog.objects.filter(
+        status=Status.DISTRIBUTOR_ORDER,
+        purchase__status=Status.DISTRIBUTOR_ORDER,
+        purchase__distributor_order_type=DistributorOrderType.ORDER,
+        purchase__purchase_type=PurchaseType.VENDOR_ORDER,
+        purchase__tentative_delivery_date__isnull=False,
+    )
+
+
+def get_cube_rows(lines_filter):
+    """
+    Roll up the order lines matching a filter
+
+    Args:
+        lines_filter (Q): filter of the order lines (`StockIOLog`)
+
+    Returns:
+        list: unsaved `DailySalesCube` rows
+    """
+    from ecommerce.models import ShortReturnItem
+    from stats.models import DailySalesCube
+
+    dimensions = list(CUBE_DIMENSIONS.values())
+    lines = get_order_lines().filter(lines_filter).order_by().values(*dimensions).annotate(
+        line_count=Count('id'),
+        total_quantity=Coalesce(Sum('quantity'), 0.00),
+        total_value=Coalesce(Sum(F('rate') * F('quantity'), output_field=FloatField()), 0.00),
+        total_discount=Coalesce(Sum('discount_total'), 0.00),
+    )
+    # Short / return items of the same lines, grouped by the dimensions of their line
+    short_returns = ShortReturnItem.objects.filter(
+        status=Status.ACTIVE,
+        stock_io__in=get_order_lines().filter(lines_filter),
+    ).order_by().values(
+        *[f"stock_io__{dimension}" for dimension in dimensions]
+    ).annotate(
+        short_quantity=Coalesce(Sum(Case(
+            When(type=ShortReturnLogType.SHORT, then=F('quantity')),
+            output_field=FloatField()
+        )), 0.00),
+        return_quantity=Coalesce(Sum(Case(
+            When(type=ShortReturnLogType.RETURN, then=F('quantity')),
+            output_field=FloatField()
+        )), 0.00),
+    )
+    short_return_quantities = {
+        tuple(item[f"stock_io__{dimension}"] for dimension in dimensions): item
+        for item in short_returns
+    }
+
+    rows = []
+    for line in lines:
+        key = tuple(line[dimension] for dimension in dimensions)
+        short_return = short_return_quantities.get(key, {})
+        rows.append(DailySalesCube(
+            line_count=line['line_count'],
+            quantity=line['total_quantity'],
+            value=line['total_value'],
+            discount=line['total_discount'],
+            short_quantity=short_return.get('short_quantity', 0),
+            return_quantity=short_return.get('return_quantity', 0),
+            **dict(zip(CUBE_DIMENSIONS, key))
+        ))
+    return rows
+
+
+def replace_cube_rows(cube_filter, lines_filter):
+    from common import models as common_models
+    from stats.models import DailySalesCube
+
+    rows = get_cube_rows(lines_filter)
+    for row in rows:
+        # Set by `CreatedAtUpdatedAtBaseModel.save`, which bulk create skips
+        row.user_ip = common_models.USER_IP_ADDRESS
+    DailySalesCube.objects.filter(cube_filter).delete()
+    DailySalesCube.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_sales_cube(dates):
+    """
+    Roll up all the order lines of delivery dates
+
+    Args:
+        dates (list): delivery dates
+
+    Returns:
+        int: number of cube rows of the dates
+    """
+    from stats.models import DailySalesCubeDate
+
+    dates = list(dates)
+    with transaction.atomic():
+        count = replace_cube_rows(
+            Q(date__in=dates),
+            Q(purchase__tentative_delivery_date__in=dates)
+        )
+        for date in dates:
+            DailySalesCubeDate.objects.update_or_create(date=date)
+    logger.info(f"Refreshed {count} sales cube rows of {len(dates)} dates")
+    return count
+
+
+def get_cube_orders(order_ids):
+    """Orders (`Purchase`) among the ids whose lines are rolled up in the cube"""
+    from pharmacy.models import Purchase
+
+    return Purchase.objects.filter(
+        pk__in=order_ids,
+        distributor_order_type=DistributorOrderType.ORDER,
+        purchase_type=PurchaseType.VENDOR_ORDER,
+        tentative_delivery_date__isnull=False,
+    )
+
+
+def parse_customer_dates(customer_dates):
+    """(date, organization id) pairs, the dates may be iso strings of a task argument"""
+    return {
+        (datetime.date.fromisoformat(date) if isinstance(date, str) else date, organization_id)
+        for date, organization_id in customer_dates
+    }
+
+
+def refresh_sales_cube_for_orders(order_ids, customer_dates=()):
+    """
+    Roll up again the order lines of the customers of orders on the delivery date of the orders,
+    after a change of the orders. Dates not rolled up yet are left to the daily refresh.
+
+    Args:
+        order_ids (list): order (`Purchase`) ids
+        customer_dates (list): other (delivery date, customer organization id) pairs to roll
+            up again, e.g. the previous delivery date of orders moved to another date
+    """
+    from stats.models import DailySalesCubeDate
+
+    customer_dates = parse_customer_dates(customer_dates) | set(
+        get_cube_orders(order_ids).values_list('tentative_delivery_date', 'organization_id')
+    )
+    covered_dates = set(DailySalesCubeDate.objects.filter(
+        date__in=[date for date, _ in customer_dates]
+    ).values_list('date', flat=True))
+    customer_dates = [
+        (date, organization_id) for date, organization_id in customer_dates if date in covered_dates
+    ]
+    if not customer_dates:
+        return 0
+
+    cube_filter = Q()
+    lines_filter = Q()
+    for date, organization_id in customer_dates:
+        cube_filter |= Q(date=date, organization_id=organization_id)
+        lines_filter |= Q(
+            purchase__tentative_delivery_date=date,
+            purchase__organization_id=organization_id
+        )
+    with transaction.atomic():
+        return replace_cube_rows(cube_filter, lines_filter)
+
+
+class SalesCubeRefreshBuffer:
+    """Orders and order lines changed in the current transaction, refreshed by one task on commit"""
+
+    def __init__(self):
+        self.order_ids = set()
+        self.stock_io_ids = set()
+        self.customer_dates = set()
+        # `run_on_commit` list of the connection the flush is registered in, see
+        # `common.cache_invalidation.CacheInvalidationBuffer`
+        self.registered_in = None
+
+    def add(self, order_ids=(), stock_io_ids=(), customer_dates=()):
+        self.order_ids.update(order_id for order_id in order_ids if order_id)
+        self.stock_io_ids.update(stock_io_id for stock_io_id in stock_io_ids if stock_io_id)
+        self.customer_dates.update(parse_customer_dates(customer_dates))
+        if not connection.in_atomic_block:
+            self.flush()
+        elif self.registered_in is not connection.run_on_commit:
+            transaction.on_commit(self.flush)
+            self.registered_in = connection.run_on_commit
+
+    def flush(self):
+        from pharmacy.models import StockIOLog
+        from stats.tasks import refresh_sales_cube_for_orders_lazy
+
+        order_ids, stock_io_ids, customer_dates = self.order_ids, self.stock_io_ids, self.customer_dates
+        self.order_ids, self.stock_io_ids, self.customer_dates = set(), set(), set()
+        self.registered_in = None
+        if stock_io_ids:
+            order_ids.update(StockIOLog.objects.filter(
+                pk__in=stock_io_ids
+            ).values_list('purchase_id', flat=True))
+        # Carts and other purchases are not in the cube, no task for them
+        order_ids = sorted(get_cube_orders(order_ids).values_list('pk', flat=True)) if order_ids else []
+        if order_ids or customer_dates:
+            refresh_sales_cube_for_orders_lazy.apply_async(
+                (
+                    order_ids,
+                    sorted((date.isoformat(), organization_id) for date, organization_id in customer_dates),
+                ),
+                countdown=5
+            )
+
+
+_local = threading.local()
+
+
+def request_sales_cube_refresh(order_ids=(), stock_io_ids=(), customer_dates=()):
+    """
+    Roll up again the cube rows of changed orders once the current transaction commits
+
+    Args:
+        order_ids (list): ids of the changed orders (`Purchase`)
+        stock_io_ids (list): ids of order lines (`StockIOLog`) whose order is changed
+        customer_dates (list): (delivery date, customer organization id) pairs the changed
+            orders left, e.g. the previous delivery date of delayed orders
+    """
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = SalesCubeRefreshBuffer()
+    buffer.add(order_ids, stock_io_ids, customer_dates)
+
+
+def get_dates(start_date, end_date):
+    return [
+        start_date + datetime.timedelta(days=day)
+        for day in range((end_date - start_date).days + 1)
+    ]
+
+
+def is_sales_cube_covering(start_date, end_date):
+    from stats.models import DailySalesCubeDate
+
+    if not start_date or not end_date or start_date > end_date:
+        return False
+    covered_dates = DailySalesCubeDate.objects.filter(
+        date__range=(start_date, end_date)
+    ).count()
+    return covered_dates == len(get_dates(start_date, end_date))
+
+
+def get_sales_cube(start_date, end_date):
+    """
+    Cube rows of a delivery date range
+
+    Args:
+        start_date (date): first delivery date
+        end_date (date): last delivery date
+
+    Returns:
+        QuerySet: `DailySalesCube` rows of the range, None when a date of the range is not rolled up
+    """
+    from stats.models import DailySalesCube
+
+    if not is_sales_cube_covering(start_date, end_date):
+        return None
+    return DailySalesCube.objects.filter(date__range=(start_date, end_date))
@@ -0,0 +1,15 @@
+import logging
+
+from projectile.celery import app
+from stats.sales_cube import refresh_sales_cube_for_orders
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(bind=True, max_retries=10)
+def refresh_sales_cube_for_orders_lazy(self, order_ids, customer_dates=()):
+    try:
+        refresh_sales_cube_for_orders(order_ids, customer_dates)
+    except Exception as exc:
+        logger.info('will retry in 5 sec')
+        self.retry(exc=exc, countdown=5)
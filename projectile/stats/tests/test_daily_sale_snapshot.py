@@ -0,0 +1,163 @@
+import datetime
+
+from django.utils import timezone
+
+from common.enums import Status
+from common.test_case import OmisTestCase
+from core.tests import OrganizationFactory, PersonOrganizationFactory
+from ecommerce.enums import ShortReturnLogType
+from ecommerce.models import OrderInvoiceGroup, ShortReturnItem, ShortReturnLog
+from pharmacy.enums import DistributorOrderType, OrderTrackingStatus, PurchaseType, StockIOType
+from pharmacy.models import StockIOLog
+from pharmacy.tests import PurchaseFactory, StockFactory, UnitFactory
+
+from ..daily_sale_snapshot import build_daily_sale_snapshot
+from ..models import DailySaleSnapshot
+
+SNAPSHOT_DATE = datetime.date(2024, 1, 10)
+
+
+class DailySaleSnapshotTest(OmisTestCase):
+
+    def setUp(self):
+        super(DailySaleSnapshotTest, self).setUp()
+        self.pharmacy = OrganizationFactory()
+        self.employee = PersonOrganizationFactory(organization=self.pharmacy)
+        self.unit = UnitFactory()
+        self.stock, self.other_stock = (
+            StockFactory(product_full_name="napa"), StockFactory(product_full_name="ace")
+        )
+
+    def create_order(self, order_status, lines, additional_discount_rate=0, responsible_employee=True):
+        # The signals of the invoice groups and short / return logs start celery tasks
+        invoice_group = OrderInvoiceGroup.objects.bulk_create([
+            OrderInvoiceGroup(
+                organization=self.pharmacy,
+                order_by_organization=self.pharmacy,
+                date=timezone.now(),
+                delivery_date=SNAPSHOT_DATE,
+            )
+        ])[0]
+        order = PurchaseFactory(
+            organization=self.pharmacy,
+            status=Status.DISTRIBUTOR_ORDER,
+            purchase_type=PurchaseType.VENDOR_ORDER,
+            distributor_order_type=DistributorOrderType.ORDER,
+            current_order_status=order_status,
+            tentative_delivery_date=SNAPSHOT_DATE,
+            invoice_group=invoice_group,
+            responsible_employee=self.employee if responsible_employee else None,
+            additional_discount_rate=additional_discount_rate,
+        )
+        io_logs = StockIOLog.objects.bulk_create([
+            StockIOLog(
+                stock_id=stock.id,
+                organization_id=self.pharmacy.id,
+                purchase_id=order.id,
+                quantity=quantity,
+                rate=rate,
+                discount_rate=discount_rate,
+                batch="N/A",
+                type=StockIOType.OUT,
+                status=Status.DISTRIBUTOR_ORDER,
+                primary_unit_id=self.unit.id,
+                secondary_unit_id=self.unit.id,
+            )
+            for stock, quantity, rate, discount_rate in lines
+        ])
+        return order, io_logs
+
+    def create_short_return(self, io_log, log_type, quantity, approved=True, date=SNAPSHOT_DATE,
+                            status=Status.ACTIVE):
+        order = io_log.purchase
+        short_return_log = ShortReturnLog.objects.bulk_create([
+            ShortReturnLog(
+                organization=self.pharmacy,
+                date=timezone.now(),
+                received_by=self.employee,
+                order_by_organization=self.pharmacy,
+                order=order,
+                invoice_group_id=order.invoice_group_id,
+                type=log_type,
+                approved_at=timezone.now() if approved else None,
+            )
+        ])[0]
+        ShortReturnItem.objects.bulk_create([
+            ShortReturnItem(
+                organization=self.pharmacy,
+                type=log_type,
+                stock_id=io_log.stock_id,
+                stock_io=io_log,
+                short_return_log=short_return_log,
+                product_name="product",
+                unit_name="unit",
+                batch="N/A",
+                quantity=quantity,
+                date=date,
+                status=status,
+            )
+        ])
+
+    def get_snapshot_rows(self):
+        return {
+            row.stock_io_id: row
+            for row in DailySaleSnapshot.objects.filter(snapshot_date=SNAPSHOT_DATE)
+        }
+
+    def test_derived_columns(self):
+        order, (short_line, return_line) = self.create_order(
+            OrderTrackingStatus.DELIVERED,
+            [(self.stock, 10, 100, 10), (self.other_stock, 4, 50, 0)],
+            additional_discount_rate=5,
+        )
+        self.create_short_return(short_line, ShortReturnLogType.SHORT, 2)
+        # Not counted: shorts of another date or inactive, returns not approved
+        self.create_short_return(
+            short_line, ShortReturnLogType.SHORT, 1, date=SNAPSHOT_DATE - datetime.timedelta(days=1)
+        )
+        self.create_short_return(short_line, ShortReturnLogType.SHORT, 1, status=Status.INACTIVE)
+        self.create_short_return(return_line, ShortReturnLogType.RETURN, 1)
+        self.create_short_return(return_line, ShortReturnLogType.RETURN, 3, approved=False)
+        _, (full_return_line, ) = self.create_order(
+            OrderTrackingStatus.FULL_RETURNED,
+            [(self.stock, 6, 100, 10)],
+        )
+        self.create_short_return(full_return_line, ShortReturnLogType.RETURN, 2)
+
+        self.assertEqual(build_daily_sale_snapshot(SNAPSHOT_DATE).rows, 3)
+
+        rows = self.get_snapshot_rows()
+        expected = {
+            # sales rate, effective sales rate, effective sales value, short, return
+            short_line.id: (90, 85.5, 855, 2, 0),
+            return_line.id: (50, 47.5, 190, 0, 1),
+            # The whole quantity of a fully returned order is returned
+            full_return_line.id: (90, 90, 540, 0, 6),
+        }
+        self.assertEqual(set(rows), set(expected))
+        for stock_io_id, values in expected.items():
+            row = rows[stock_io_id]
+            self.assertEqual(
+                (
+                    float(row.sales_rate),
+                    float(row.effective_sales_rate),
+                    float(row.effective_sales_value),
+                    row.total_short,
+                    row.total_return,
+                ),
+                values
+            )
+        self.assertEqual(rows[short_line.id].employee_id, self.employee.id)
+        self.assertEqual(rows[short_line.id].invoice_group_id, order.invoice_group_id)
+
+    def test_orders_without_responsible_employee_skipped(self):
+        _, (io_log, ) = self.create_order(OrderTrackingStatus.DELIVERED, [(self.stock, 1, 10, 0)])
+        self.create_order(
+            OrderTrackingStatus.DELIVERED,
+            [(self.stock, 1, 10, 0)],
+            responsible_employee=False,
+        )
+
+        with self.assertLogs('stats.daily_sale_snapshot', level='WARNING'):
+            self.assertEqual(build_daily_sale_snapshot(SNAPSHOT_DATE).rows, 1)
+        self.assertEqual(list(self.get_snapshot_rows()), [io_log.id])
@@ -0,0 +1,173 @@
+import datetime
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from common.enums import Status
+from common.test_case import OmisTestCase
+from core.tests import OrganizationFactory
+from pharmacy.enums import DistributorOrderType, OrderTrackingStatus, PurchaseType, StockIOType
+from pharmacy.models import Purchase, StockIOLog
+from pharmacy.tests import PurchaseFactory, StockFactory, UnitFactory
+
+from ..models import DailySalesCube
+from ecommerce.signals import refresh_sales_cube_of_short_return_item
+from ..sales_cube import (
+    get_sales_cube,
+    refresh_sales_cube,
+    refresh_sales_cube_for_orders,
+    request_sales_cube_refresh,
+)
+
+DELIVERY_DATE = datetime.date(2024, 1, 10)
+
+
+class DailySalesCubeTest(OmisTestCase):
+
+    def setUp(self):
+        super(DailySalesCubeTest, self).setUp()
+        self.unit = UnitFactory()
+        self.stock = StockFactory()
+
+    def create_order(self, quantities, secondary_unit_flag=False):
+        order = PurchaseFactory(
+            organization=self.stock.organization,
+            status=Status.DISTRIBUTOR_ORDER,
+            purchase_type=PurchaseType.VENDOR_ORDER,
+            distributor_order_type=DistributorOrderType.ORDER,
+            current_order_status=OrderTrackingStatus.PENDING,
+            tentative_delivery_date=DELIVERY_DATE,
+        )
+        StockIOLog.objects.bulk_create([
+            StockIOLog(
+                stock_id=self.stock.id,
+                organization_id=self.stock.organization_id,
+                purchase_id=order.id,
+                quantity=quantity,
+                rate=10,
+                batch="N/A",
+                type=StockIOType.OUT,
+                status=Status.DISTRIBUTOR_ORDER,
+                primary_unit_id=self.unit.id,
+                secondary_unit_id=self.unit.id,
+                secondary_unit_flag=secondary_unit_flag,
+            )
+            for quantity in quantities
+        ])
+        return order
+
+    def test_refresh_rolls_up_order_lines(self):
+        self.create_order([1, 2])
+        self.create_order([3])
+
+        self.assertIsNone(get_sales_cube(DELIVERY_DATE, DELIVERY_DATE))
+        self.assertEqual(refresh_sales_cube([DELIVERY_DATE]), 1)
+        # A second refresh replaces the rows of the date
+        self.assertEqual(refresh_sales_cube([DELIVERY_DATE]), 1)
+
+        row = get_sales_cube(DELIVERY_DATE, DELIVERY_DATE).get()
+        self.assertEqual(row.stock_id, self.stock.id)
+        self.assertEqual(row.order_status, OrderTrackingStatus.PENDING)
+        self.assertEqual(row.line_count, 3)
+        self.assertEqual(row.quantity, 6)
+        self.assertEqual(row.value, 60)
+        self.assertIsNone(
+            get_sales_cube(DELIVERY_DATE, DELIVERY_DATE + datetime.timedelta(days=1))
+        )
+
+    def test_refresh_for_orders_moves_lines_to_new_status(self):
+        order = self.create_order([1, 2])
+        self.create_order([3])
+        refresh_sales_cube([DELIVERY_DATE])
+
+        Purchase.objects.filter(pk=order.id).update(current_order_status=OrderTrackingStatus.CANCELLED)
+        refresh_sales_cube_for_orders([order.id])
+
+        quantities = dict(
+            DailySalesCube.objects.filter(date=DELIVERY_DATE).values_list('order_status', 'quantity')
+        )
+        self.assertEqual(quantities, {
+            OrderTrackingStatus.PENDING: 3,
+            OrderTrackingStatus.CANCELLED: 3,
+        })
+
+    def test_delayed_order_moves_to_new_date(self):
+        new_delivery_date = DELIVERY_DATE + datetime.timedelta(days=1)
+        order = self.create_order([1, 2])
+        self.create_order([3])
+        refresh_sales_cube([DELIVERY_DATE, new_delivery_date])
+
+        # As the invoice group serializer delays an order, with a bulk update
+        Purchase.objects.bulk_update(
+            [Purchase(pk=order.id, tentative_delivery_date=new_delivery_date, is_delayed=True)],
+            ['tentative_delivery_date', 'is_delayed']
+        )
+        refresh_sales_cube_for_orders(
+            [order.id],
+            [(DELIVERY_DATE.isoformat(), order.organization_id)]
+        )
+
+        quantities = dict(
+            get_sales_cube(DELIVERY_DATE, new_delivery_date).values_list('date', 'quantity')
+        )
+        self.assertEqual(quantities, {DELIVERY_DATE: 3, new_delivery_date: 3})
+
+    def test_distributor_rolled_up(self):
+        distributor = OrganizationFactory()
+        order = self.create_order([1, 2])
+        Purchase.objects.filter(pk=order.id).update(distributor=distributor)
+        self.create_order([3])
+
+        refresh_sales_cube([DELIVERY_DATE])
+
+        quantities = dict(
+            get_sales_cube(DELIVERY_DATE, DELIVERY_DATE).values_list('distributor_id', 'quantity')
+        )
+        self.assertEqual(quantities, {distributor.id: 3, None: 3})
+
+    def test_secondary_unit_lines_rolled_up_apart(self):
+        self.create_order([1, 2])
+        self.create_order([5], secondary_unit_flag=True)
+
+        self.assertEqual(refresh_sales_cube([DELIVERY_DATE]), 2)
+        quantities = dict(
+            get_sales_cube(DELIVERY_DATE, DELIVERY_DATE).values_list('secondary_unit_flag', 'quantity')
+        )
+        self.assertEqual(quantities, {False: 3, True: 5})
+
+    # Without the orders left in the buffer by the other tests
+    @mock.patch('stats.sales_cube._local', new=threading.local())
+    @mock.patch('stats.tasks.refresh_sales_cube_for_orders_lazy')
+    def test_changed_lines_refreshed_once_per_commit(self, refresh_sales_cube_for_orders_lazy):
+        order = self.create_order([1, 2])
+        cart = self.create_order([3])
+        Purchase.objects.filter(pk=cart.id).update(distributor_order_type=DistributorOrderType.CART)
+        line_ids = list(StockIOLog.objects.filter(purchase=order).values_list('pk', flat=True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            request_sales_cube_refresh(order_ids=[order.id, cart.id])
+            refresh_sales_cube_of_short_return_item(None, SimpleNamespace(stock_io_id=line_ids[0]))
+            request_sales_cube_refresh(stock_io_ids=line_ids)
+            refresh_sales_cube_for_orders_lazy.apply_async.assert_not_called()
+
+        # The cart is not rolled up in the cube
+        refresh_sales_cube_for_orders_lazy.apply_async.assert_called_once_with(
+            ([order.id], []),
+            countdown=5
+        )
+
+    @mock.patch('stats.sales_cube._local', new=threading.local())
+    @mock.patch('stats.tasks.refresh_sales_cube_for_orders_lazy')
+    def test_previous_dates_of_moved_orders_sent_to_the_task(self, refresh_sales_cube_for_orders_lazy):
+        order = self.create_order([1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            request_sales_cube_refresh(
+                order_ids=[order.id],
+                customer_dates=[(DELIVERY_DATE, order.organization_id)]
+            )
+
+        refresh_sales_cube_for_orders_lazy.apply_async.assert_called_once_with(
+            ([order.id], [(DELIVERY_DATE.isoformat(), order.organization_id)]),
+            countdown=5
+        )